@@ -1,8 +1,6 @@
 from typing import Dict, Any, Optional
 from agentscope.agent import ReActAgent
 from agentscope.formatter import OllamaChatFormatter
-from agentscope.memory import InMemoryMemory
-from agentscope.model import OllamaChatModel
 from agentscope.tool import Toolkit
 from utils.agent_tools import (
     specific_question_about_the_museum,
@@ -12,6 +10,8 @@ from utils.agent_tools import (
     send_museum_email
 )
 from agentscope.message import Msg
+from utils.model_pool import ModelPool, get_model_pool
+from utils.session_manager import session_memory
 
 import logging
 
@@ -22,23 +22,21 @@ logger = logging.getLogger(__name__)
 class CollectionManagementAgent(ReActAgent):
     """博物馆藏品管理智能体"""
     
-    def __init__(self):
+    def __init__(self, model_pool: Optional[ModelPool] = None):
         # 初始化工具集
         toolkit = Toolkit()
 
         toolkit.register_tool_function(search_collection_info, func_description="搜索藏品信息\n参数说明：\n- keywords: 字符串类型，必填参数，搜索关键词，用于匹配藏品名称、描述等信息")
-        toolkit.register_tool_function(get_collection_environment_data, func_description="获取藏品环境监测数据\n参数说明：\n- location: 字符串类型，必填参数，监测位置，如展厅名称或位置标识")
+        toolkit.register_tool_function(get_collection_environment_data, func_description="获取藏品环境监测数据（各传感器最新读数和告警）\n参数说明：\n- location: 字符串类型，可选参数，监测位置，如展厅名称或位置编号，不填时返回所有位置\n- hours: 整数类型，可选参数，附带最近若干小时读数的最低、最高、平均和95分位值，如24")
         toolkit.register_tool_function(create_exhibition_loan_request, func_description="创建借展申请\n参数说明：\n- loan_data: 字典类型，必填参数，借展申请数据\n  包含字段：exhibition_name(展览名称)、requesting_institution(申请机构)、contact_person(联系人)、\n            contact_phone(联系电话)、start_date(开始日期)、end_date(结束日期)、collection_ids(藏品ID列表)、\n            purpose(借展目的)")
         toolkit.register_tool_function(send_museum_email, func_description="发送博物馆邮件通知\n参数说明：\n- recipient: 字符串类型，必填参数，收件人邮箱地址\n- subject: 字符串类型，必填参数，邮件主题\n- content: 字符串类型，必填参数，邮件内容")
         
-        model = OllamaChatModel(
-            model_name="qwen2:latest",
-            enable_thinking=False,
-            stream=True,
-        )
+        # 模型请求由模型池分配到各Ollama节点，模型名称可按智能体覆盖
+        model = (model_pool or get_model_pool()).chat_model("CollectionManagementAgent", enable_thinking=False)
         
         formatter = OllamaChatFormatter()
-        memory = InMemoryMemory()
+        # 记忆按会话（user_id）隔离，智能体实例、模型和工具集在所有会话间共享
+        memory = session_memory("CollectionManagementAgent")
         name = "CollectionManagementAgent"
         sys_prompt = "你是博物馆的藏品管理助手，负责处理藏品相关的各种事务，包括藏品查询、环境监测、借展申请等。"
         
@@ -77,7 +75,10 @@ class CollectionManagementAgent(ReActAgent):
     async def _get_collection_list(self, user_message: str) -> str:
         """获取藏品列表"""
         # 调用服务获取藏品列表
-        tool_response = specific_question_about_the_museum(endpoint="/api/internal/collection/list")
+        # 只请求展示用到的一页和字段，不传输数字资产、修复记录等大字段
+        tool_response = await specific_question_about_the_museum(
+            endpoint="/api/internal/collection/list?limit=10&fields=collection_id,name,era"
+        )
         result = tool_response.metadata
         
         if result.get("status") == "success":
@@ -86,7 +87,7 @@ class CollectionManagementAgent(ReActAgent):
                 return "暂无藏品记录。"
             
             response = "藏品列表：\n"
-            for collection in collections[:10]:  # 只显示前10个藏品
+            for collection in collections:
                 response += f"- ID: {collection.get('collection_id', '')}, 名称: {collection.get('name', '')}, " \
                           f"年代: {collection.get('era', '不详')}\n"
             return response
@@ -102,7 +103,7 @@ class CollectionManagementAgent(ReActAgent):
             return "请提供藏品的ID或名称，我可以为您查询详情。"
         
         # 调用服务获取藏品详情
-        tool_response = specific_question_about_the_museum(
+        tool_response = await specific_question_about_the_museum(
             endpoint=f"/api/internal/collection/detail/{collection_id}"
         )
         result = tool_response.metadata
@@ -127,21 +128,29 @@ class CollectionManagementAgent(ReActAgent):
         # 模拟从用户消息中提取藏品ID或展厅位置
         # 在实际应用中，这里可以使用NLP技术更精确地提取信息
         location = self._extract_location(user_message)
-        if not location:
-            location = "默认展厅"  # 使用默认值
         
-        # 调用服务获取环境监测数据
-        tool_response = get_collection_environment_data(location)
+        # 调用服务获取环境监测数据：最新读数和最近24小时的统计
+        tool_response = await get_collection_environment_data(location or None, hours=24)
         result = tool_response.metadata
         
         if result.get("status") == "success":
-            env_data = result.get("data", {})
-            return f"{location}的环境监测数据：\n" \
-                   f"温度: {env_data.get('temperature', '未知')}°C\n" \
-                   f"湿度: {env_data.get('humidity', '未知')}%\n" \
-                   f"光照: {env_data.get('light_intensity', '未知')} lux\n" \
-                   f"空气质量: {env_data.get('air_quality', '未知')}\n" \
-                   f"监测时间: {env_data.get('timestamp', '未知')}"
+            locations = result.get("data", {}).get("locations", [])
+            if not locations:
+                return "暂无环境监测数据。"
+            
+            response = ""
+            for loc in locations:
+                response += f"{loc.get('name', '')}的环境监测数据：\n"
+                for sensor in loc.get("sensors", []):
+                    response += f"- {sensor.get('type', '')}: {sensor.get('value', '未知')}{sensor.get('unit', '')}" \
+                              f"（监测时间: {sensor.get('last_update') or '未知'}）\n"
+                    aggregates = sensor.get("aggregates", {})
+                    if aggregates.get("count"):
+                        response += f"  近24小时: 最低 {aggregates['min'][0]}，最高 {aggregates['max'][0]}，" \
+                                  f"平均 {aggregates['mean'][0]}（共 {aggregates['count'][0]} 条读数）\n"
+                for alert in loc.get("alerts", []):
+                    response += f"  告警: {alert.get('message', '')}（{alert.get('status', '')}）\n"
+            return response
         else:
             return f"获取失败：{result.get('message', '未知错误')}"
     
@@ -161,7 +170,7 @@ class CollectionManagementAgent(ReActAgent):
         }
         
         # 调用服务创建借展申请
-        tool_response = create_exhibition_loan_request(loan_data)
+        tool_response = await create_exhibition_loan_request(loan_data)
         result = tool_response.metadata
         
         if result.get("status") == "success":
@@ -192,7 +201,7 @@ class CollectionManagementAgent(ReActAgent):
             return "请提供搜索关键词，我可以帮您查找相关藏品。"
         
         # 调用服务搜索藏品
-        tool_response = search_collection_info(keywords)
+        tool_response = await search_collection_info(keywords)
         result = tool_response.metadata
         
         if result.get("status") == "success":
@@ -231,6 +240,11 @@ class CollectionManagementAgent(ReActAgent):
         """从文本中提取位置信息"""
         # 这里是一个简单的位置提取示例
         # 在实际应用中，可以使用更复杂的NLP技术
+        import re
+        # 环境监测数据中的位置编号和名称，如 LOC2025001、南馆1楼展厅、展厅A、文物库房A
+        match = re.search(r'LOC\d{7}|[东南西北]馆\d楼展厅|展厅[A-Z]|文物库房[A-Z]', text)
+        if match:
+            return match.group(0)
         locations = ["一层", "二层", "三层", "东厅", "西厅", "南厅", "北厅", "中厅"]
         for loc in locations:
             if loc in text:
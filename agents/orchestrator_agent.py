@@ -1,14 +1,22 @@
 import asyncio
+import importlib
 import os
+import threading
+import time
 from typing import Dict, Any, Optional, List
 
 from agentscope.agent import ReActAgent, AgentBase, UserAgent
 from agentscope.formatter import OllamaChatFormatter
-from agentscope.memory import InMemoryMemory
-from agentscope.model import OllamaChatModel
 from agentscope.tool import Toolkit
 from agentscope.message import Msg
+from utils.model_pool import ModelPool, get_model_pool
+from utils.session_manager import session_memory, get_session_manager
+from utils.response_stream import attach_stream_hook
+from utils.context_budget import attach_context_budget
+from utils.keyword_matcher import KeywordMatcher
+from utils.semantic_router import SemanticRouter
 from utils.agent_tools import (
+    MuseumToolkit,
     specific_question_about_the_museum,
     send_museum_email,
     get_museum_booking_info,
@@ -17,21 +25,95 @@ from utils.agent_tools import (
     submit_museum_feedback
 )
 
-# 导入所有专业智能体
-from agents.tour_booking_agent import TourBookingAgent
-from agents.qa_agent import QAAgent
-from agents.collection_management_agent import CollectionManagementAgent
-
 import logging
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 简单的意图到智能体的映射 TODO 
+INTENT_TO_AGENT = {
+    "tour_booking": "TourBookingAgent",
+    "qa": "QAAgent",
+    "facility": "FacilityServiceAgent",
+    "feedback": "FeedbackAgent",
+    "collection": "CollectionManagementAgent",
+    "security": "SecurityMonitoringAgent",
+    "facility_management": "FacilityManagementAgent",
+    "administration": "AdministrativeAssistantAgent",
+    "analytics": "DataAnalyticsAgent"
+}
+
+# 意图关键词映射
+INTENT_KEYWORDS = {
+    "tour_booking": ["预约", "预订", "门票", "参观"],
+    "qa": ["展览", "藏品", "历史", "介绍", "开放时间", "青铜鼎", "木乃伊"],
+    "facility": ["洗手间", "餐厅", "停车场", "寄存", "无障碍"],
+    "feedback": ["投诉", "建议", "评价", "反馈"],
+    "collection": ["藏品", "文物", "展品", "收藏"],
+    "security": ["安保", "监控", "安全", "丢失"],
+    "facility_management": ["维护", "维修", "设备", "设施"],
+    "administration": ["审批", "报销", "请假", "会议"],
+    "analytics": ["数据", "统计", "客流", "分析"]
+}
+
+# 语义路由的意图示例短语，离线向量化为每个意图的质心
+INTENT_EXAMPLES = {
+    "tour_booking": [
+        "我想预约明天上午参观", "帮我订两张周六的门票", "可以团体预约吗", "怎么预约讲解导览",
+        "周末还有没有名额", "我要取消之前的预约", "帮我查一下我的预约记录", "想带孩子下周来看展，怎么订票"
+    ],
+    "qa": [
+        "博物馆几点开门", "现在有什么展览", "青铜鼎是哪个朝代的", "门票多少钱",
+        "周一闭馆吗", "这件文物有什么历史故事", "木乃伊展在哪个展厅", "请介绍一下博物馆的历史"
+    ],
+    "facility": [
+        "洗手间在哪里", "馆内有餐厅吗", "停车场怎么走", "可以寄存行李吗",
+        "有没有轮椅可以借", "哪里可以给孩子喂奶", "馆里有电梯吗", "纪念品商店在几楼"
+    ],
+    "feedback": [
+        "我要投诉工作人员态度", "展厅里太吵了", "给你们提个建议", "这次参观体验很好，想表扬一下",
+        "展厅空调太冷", "讲解员讲得不清楚", "厕所不太干净", "我对服务不满意"
+    ],
+    "collection": [
+        "查询藏品编号col001的详情", "库房里有多少件青铜器", "这件文物需要修复吗", "整理一下馆藏清单",
+        "借展的展品什么时候归还", "登记一件新入藏的文物", "查看文物的保存状况", "藏品的环境监测数据"
+    ],
+    "security": [
+        "三号展厅的监控画面", "有游客丢了钱包", "孩子和家长走散了", "发现可疑人员",
+        "消防通道被堵住了", "报警系统响了", "今天的安保巡逻记录", "紧急疏散预案是什么"
+    ],
+    "facility_management": [
+        "空调坏了需要维修", "展柜灯不亮了", "提交设备报修单", "电梯年检什么时候做",
+        "本月能耗报表", "恒温恒湿设备运行状态", "安排设施定期维护", "更换老化的照明设备"
+    ],
+    "administration": [
+        "我要请假两天", "提交差旅报销", "下周部门会议安排", "审批一下这份采购申请",
+        "查看公文流转进度", "本月排班表", "新员工入职手续", "预算执行情况"
+    ],
+    "analytics": [
+        "上个月的客流统计", "哪个展览最受欢迎", "分析一下游客年龄分布", "门票收入同比变化",
+        "今天实时在馆人数", "各展厅停留时长", "导出运营数据报表", "节假日客流趋势"
+    ]
+}
+
+# 专业智能体工厂：智能体名称 -> "模块:类名"
+# 首次路由到某个智能体（或启动后的后台预热）时才导入模块并创建实例，应用启动不再等待所有智能体
+AGENT_FACTORIES: Dict[str, str] = {
+    "TourBookingAgent": "agents.tour_booking_agent:TourBookingAgent",
+    "QAAgent": "agents.qa_agent:QAAgent",
+    "CollectionManagementAgent": "agents.collection_management_agent:CollectionManagementAgent",
+}
+
+
+class AgentInitError(RuntimeError):
+    """专业智能体创建失败，下次使用时会重新尝试创建"""
+
+
 class OrchestratorAgent(ReActAgent):
     """博物馆智能体系统的核心协调智能体"""
     
-    def __init__(self):
+    def __init__(self, model_pool: Optional[ModelPool] = None):
         logger.info("[核心协调智能体] 开始初始化...")
         
         # 初始化工具集
@@ -55,11 +137,8 @@ class OrchestratorAgent(ReActAgent):
 
 你可以使用工具来调用博物馆服务API获取信息或执行操作。"""
         
-        model = OllamaChatModel(
-            model_name="qwen2:latest",
-            enable_thinking=False,
-            stream=True,
-        )
+        # 模型请求由模型池分配到各Ollama节点，模型名称可按智能体覆盖
+        model = (model_pool or get_model_pool()).chat_model("OrchestratorAgent", enable_thinking=False)
         
         formatter = OllamaChatFormatter()
         
@@ -70,92 +149,94 @@ class OrchestratorAgent(ReActAgent):
             model=model,
             formatter=formatter,
             toolkit=toolkit,
-            memory=InMemoryMemory()
+            memory=session_memory(name)
         )
         
-        # 智能体系统中的其他专业智能体
-        self.agents: Dict[str, AgentBase] = {}
-        
-        # 注册所有专业智能体
-        self._register_all_agents()
-        
-        logger.info("[核心协调智能体] 初始化完成 - 已加载6个工具函数，使用模型: qwen2:latest，注册了{}个专业智能体".format(len(self.agents)))
-    
-    def _register_all_agents(self) -> None:
-        """注册所有可用的专业智能体
-        
-        此方法会自动创建并注册项目中已实现的所有专业智能体，
-        确保核心协调智能体能够正确路由请求到对应的专业智能体。
-        """
-        logger.info("[核心协调智能体] 开始注册专业智能体...")
+        # 专业智能体与协调智能体共用同一个模型池
+        self.model_pool = model_pool or get_model_pool()
         
-        # 记录注册前的智能体数量
-        initial_count = len(self.agents)
-        registered_count = 0
-        failed_count = 0
+        # 已创建的专业智能体，以及最近一次创建失败的原因
+        self.agents: Dict[str, AgentBase] = {}
+        self.agent_errors: Dict[str, str] = {}
+        self._agent_locks: Dict[str, threading.Lock] = {}
         
-        # 创建并注册 TourBookingAgent
-        try:
-            tour_booking_agent = TourBookingAgent()
-            self.register_agent("TourBookingAgent", tour_booking_agent)
-            registered_count += 1
-        except Exception as e:
-            logger.error(f"[核心协调智能体] 注册TourBookingAgent失败: {str(e)}")
-            failed_count += 1
+        # 意图关键词编译为Aho-Corasick自动机，关键词表变化时自动重建
+        self._keyword_matcher = KeywordMatcher({"intent": INTENT_KEYWORDS})
         
-        # 创建并注册 QAAgent
-        try:
-            qa_agent = QAAgent()
-            self.register_agent("QAAgent", qa_agent)
-            registered_count += 1
-        except Exception as e:
-            logger.error(f"[核心协调智能体] 注册QAAgent失败: {str(e)}")
-            failed_count += 1
+        # 语义路由：按意图质心的向量相似度识别意图，置信度不足时退回关键词路由
+        # 每次识别都要调用一次向量模型，默认关闭，部署了向量模型时再开启
+        self.semantic_router: Optional[SemanticRouter] = None
+        if os.getenv("MUSEUM_SEMANTIC_ROUTER", "false").lower() not in ("0", "false", "no"):
+            self.semantic_router = SemanticRouter(INTENT_EXAMPLES)
         
-        # 创建并注册 CollectionManagementAgent
-        try:
-            collection_agent = CollectionManagementAgent()
-            self.register_agent("CollectionManagementAgent", collection_agent)
-            registered_count += 1
-        except Exception as e:
-            logger.error(f"[核心协调智能体] 注册CollectionManagementAgent失败: {str(e)}")
-            failed_count += 1
+        logger.info("[核心协调智能体] 初始化完成 - 使用模型: {}，专业智能体将在首次使用时创建: {}".format(model.model_name, ", ".join(AGENT_FACTORIES)))
+    
+    def get_agent(self, agent_name: str) -> Optional[AgentBase]:
+        """获取专业智能体，首次使用时按工厂表创建并注册
         
-        # TODO: 未来可以根据需要添加更多智能体的注册
-        # 例如: FacilityServiceAgent, FeedbackAgent 等
+        Returns:
+            智能体实例，工厂表中没有该名称时返回None
         
-        logger.info(f"[核心协调智能体] 专业智能体注册完成 - 成功: {registered_count}, 失败: {failed_count}, 总计: {len(self.agents)}个智能体")
+        Raises:
+            AgentInitError: 智能体创建失败（不缓存失败结果，下次调用重新创建）
+        """
+        agent = self.agents.get(agent_name)
+        if agent is not None or agent_name not in AGENT_FACTORIES:
+            return agent
         
-        # 记录已注册的智能体列表
-        if self.agents:
-            agent_names = ", ".join(self.agents.keys())
-            logger.debug(f"[核心协调智能体] 已注册智能体列表: {agent_names}")
+        with self._agent_locks.setdefault(agent_name, threading.Lock()):
+            agent = self.agents.get(agent_name)
+            if agent is not None:
+                return agent
+            started = time.perf_counter()
+            module_name, _, class_name = AGENT_FACTORIES[agent_name].partition(":")
+            try:
+                agent_class = getattr(importlib.import_module(module_name), class_name)
+                agent = agent_class(self.model_pool)
+            except Exception as e:
+                self.agent_errors[agent_name] = f"{type(e).__name__}: {str(e)}"
+                logger.exception(f"[核心协调智能体] 创建专业智能体 {agent_name} 失败")
+                raise AgentInitError(f"专业智能体 {agent_name} 创建失败: {str(e)}") from e
+            self.agent_errors.pop(agent_name, None)
+            self.register_agent(agent_name, agent)
+            logger.info(f"[核心协调智能体] 专业智能体 {agent_name} 创建完成，耗时 {(time.perf_counter() - started) * 1000:.1f}ms")
+            return agent
+    
+    async def aget_agent(self, agent_name: str) -> Optional[AgentBase]:
+        """在异步请求中获取专业智能体：尚未创建时在线程池中创建（或等待后台预热创建完成），不阻塞事件循环"""
+        agent = self.agents.get(agent_name)
+        if agent is not None or agent_name not in AGENT_FACTORIES:
+            return agent
+        return await asyncio.get_running_loop().run_in_executor(None, self.get_agent, agent_name)
+    
+    def warmup_agents(self) -> Dict[str, str]:
+        """依次创建工厂表中尚未创建的专业智能体，返回各智能体的状态（ready 或失败原因）"""
+        status = {}
+        for agent_name in AGENT_FACTORIES:
+            try:
+                self.get_agent(agent_name)
+                status[agent_name] = "ready"
+            except AgentInitError:
+                status[agent_name] = self.agent_errors.get(agent_name, "error")
+        logger.info(f"[核心协调智能体] 专业智能体预热完成 - {status}")
+        return status
     
     def register_agent(self, agent_name: str, agent: AgentBase) -> None:
         """注册一个专业智能体"""
         self.agents[agent_name] = agent
+        # 流式请求时，专业智能体的模型输出会实时推送给调用方
+        attach_stream_hook(agent)
+        # 长会话中按token预算裁剪提示词，较早的对话在后台压缩为摘要
+        attach_context_budget(agent)
         logger.info(f"[核心协调智能体] 成功注册专业智能体: {agent_name} ({agent.__class__.__name__})")
     
-    def get_agent_by_intent(self, intent: str) -> Optional[AgentBase]:
+    async def get_agent_by_intent(self, intent: str) -> Optional[AgentBase]:
         """根据意图获取对应的专业智能体"""
-        # 简单的意图到智能体的映射 TODO 
-        intent_to_agent = {
-            "tour_booking": "TourBookingAgent",
-            "qa": "QAAgent",
-            "facility": "FacilityServiceAgent",
-            "feedback": "FeedbackAgent",
-            "collection": "CollectionManagementAgent",
-            "security": "SecurityMonitoringAgent",
-            "facility_management": "FacilityManagementAgent",
-            "administration": "AdministrativeAssistantAgent",
-            "analytics": "DataAnalyticsAgent"
-        }
-        
-        agent_name = intent_to_agent.get(intent)
+        agent_name = INTENT_TO_AGENT.get(intent)
         
         logger.info(f"[核心协调智能体集合] - {self.agents}")
 
-        agent = self.agents.get(agent_name) if agent_name else None
+        agent = await self.aget_agent(agent_name) if agent_name else None
         
         if agent:
             logger.info(f"[核心协调智能体] 意图映射成功 - 意图: {intent} -> 智能体: {agent_name}")
@@ -166,37 +247,33 @@ class OrchestratorAgent(ReActAgent):
         
     def recognize_intent(self, message: str) -> str:
         """简单的意图识别逻辑，实际项目中可以替换为更复杂的NLP模型 TODO """
-        message_lower = message.lower()
-        
-        # 意图关键词映射
-        intent_keywords = {
-            "tour_booking": ["预约", "预订", "门票", "参观"],
-            "qa": ["展览", "藏品", "历史", "介绍", "开放时间", "青铜鼎", "木乃伊"],
-            "facility": ["洗手间", "餐厅", "停车场", "寄存", "无障碍"],
-            "feedback": ["投诉", "建议", "评价", "反馈"],
-            "collection": ["藏品", "文物", "展品", "收藏"],
-            "security": ["安保", "监控", "安全", "丢失"],
-            "facility_management": ["维护", "维修", "设备", "设施"],
-            "administration": ["审批", "报销", "请假", "会议"],
-            "analytics": ["数据", "统计", "客流", "分析"]
-        }
-        
-        # 基于关键词的意图匹配
-        for intent, keywords in intent_keywords.items():
-            for keyword in keywords:
-                if keyword in message_lower:
-                    logger.info(f"[核心协调智能体] 意图识别成功 - 消息: '{message[:50]}...' -> 意图: {intent} (匹配关键词: {keyword})")
-                    return intent
+        # 一次扫描得到所有命中的意图，按INTENT_KEYWORDS中的顺序取优先级最高的
+        matched = self._keyword_matcher.match(message)["intent"]
+        for intent, keywords in INTENT_KEYWORDS.items():
+            if intent in matched:
+                keyword = next(k for k in keywords if k in matched[intent])
+                logger.info(f"[核心协调智能体] 意图识别成功 - 消息: '{message[:50]}...' -> 意图: {intent} (匹配关键词: {keyword})")
+                return intent
         
         # 默认返回通用意图
         logger.info(f"[核心协调智能体] 意图识别 - 默认分类为'general' - 消息: '{message[:50]}...'")
         return "general"
 
+    async def resolve_intent(self, message: str) -> str:
+        """识别意图：语义路由优先，置信度不足或向量模型不可用时使用关键词路由"""
+        if self.semantic_router is not None:
+            routed = await self.semantic_router.route(message)
+            if routed is not None:
+                intent, similarity = routed
+                logger.info(f"[核心协调智能体] 语义路由成功 - 消息: '{message[:50]}...' -> 意图: {intent} (相似度: {similarity:.3f})")
+                return intent
+        return self.recognize_intent(message)
+
     async def route_request(self, message: str, user_id: str) -> Dict[str, Any]:
         """路由请求到合适的智能体"""
         try:
             # 调用核心协调服务进行意图识别
-            result = specific_question_about_the_museum(
+            result = await MuseumToolkit.acall_service(
                 endpoint="/api/core/orchestrate",
                 method="POST",
                 data={"user_id": user_id, "message": message}
@@ -207,7 +284,7 @@ class OrchestratorAgent(ReActAgent):
                 target_service = result.get("target_service")
                 
                 # 尝试找到对应的智能体
-                agent = self.get_agent_by_intent(intent)
+                agent = await self.get_agent_by_intent(intent)
                 if agent:
                     # 构建消息并发送给目标智能体
                     msg = Msg(
@@ -215,7 +292,8 @@ class OrchestratorAgent(ReActAgent):
                         content=message,
                         role="user"
                     )
-                    response = await agent(msg)
+                    async with get_session_manager().session_scope(user_id):
+                        response = await agent(msg)
                     return {
                         "status": "success",
                         "intent": intent,
@@ -248,23 +326,23 @@ class OrchestratorAgent(ReActAgent):
             # 提取请求数据
             user_id = request_data.get("user_id")
             message = request_data.get("message")
-            context = request_data.get("context", {})
-            history = request_data.get("history", [])
+            context = request_data.get("context") or {}
+            history = request_data.get("history") or []
             
             # 记录接收到的请求基本信息
             logger.info(f"[核心协调智能体] 收到请求 - 用户ID: {user_id}, 请求数据长度: {len(str(request_data))}字符")
             logger.debug(f"[核心协调智能体] 请求详细信息 - 消息: '{message[:100]}...', 上下文: {context}, 历史记录数量: {len(history)}")
             
-            # 1. 进行意图识别
+            # 1. 进行意图识别（调用方已识别过意图时直接复用）
             logger.info(f"[核心协调智能体] 开始意图识别 - 消息: '{message[:50]}...'")
-            intent = self.recognize_intent(message)
+            intent = request_data.get("intent") or await self.resolve_intent(message)
             
             # 2. 记录识别到的意图
             logger.info(f"[核心协调智能体] 意图识别完成 - 识别意图: {intent}")
             
             # 3. 尝试找到对应的专业智能体
             logger.info(f"[核心协调智能体] 查找匹配的专业智能体 - 意图: {intent}")
-            agent = self.get_agent_by_intent(intent)
+            agent = await self.get_agent_by_intent(intent)
             
             if agent:
                 # 4. 如果有对应的智能体，将请求路由给它
@@ -279,7 +357,9 @@ class OrchestratorAgent(ReActAgent):
                 
                 # 调用专业智能体处理请求
                 logger.info(f"[核心协调智能体] 开始调用专业智能体处理请求 - 智能体: {agent.name}")
-                response = await agent(msg)
+                # 在该用户的会话上下文中调用，专业智能体只读写该会话自己的记忆
+                async with get_session_manager().session_scope(user_id or "anonymous"):
+                    response = await agent(msg)
                 
                 # 5. 记录智能体响应信息
                 logger.info(f"[核心协调智能体] 专业智能体处理完成 - 智能体: {agent.name}, 响应状态: 成功")
@@ -2,8 +2,6 @@ from pydoc import describe
 from typing import Dict, Any, Optional
 from agentscope.agent import ReActAgent
 from agentscope.formatter import OllamaChatFormatter
-from agentscope.memory import InMemoryMemory
-from agentscope.model import OllamaChatModel
 from agentscope.tool import Toolkit
 from utils.agent_tools import (
     specific_question_about_the_museum,
@@ -16,13 +14,53 @@ from utils.agent_tools import (
     get_museum_staff
 )
 from agentscope.message import Msg
+from utils.model_pool import ModelPool, get_model_pool
+from utils.session_manager import session_memory
+from utils.response_stream import collect_model_text
+from utils.response_cache import get_response_cache, is_cacheable_question
 
+import json
+import time
 import logging
+from contextvars import ContextVar
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 回答中出现这些文字说明走了回退或出错分支，不写入回答缓存
+_FALLBACK_MARKERS = ("稍后再试", "发生错误", "出现错误", "无法为您提供", "查询失败")
+
+# 当前请求的ReAct运行状态（智能体实例在会话间共享，按请求上下文隔离）
+_run_state: ContextVar[Optional[Dict[str, int]]] = ContextVar("qa_run_state", default=None)
+
+
+def _is_tool_error(output: Any) -> bool:
+    """工具结果是否表示失败：服务返回 status=error，或工具执行异常时框架返回的 Error 文本"""
+    if isinstance(output, list):
+        text = "".join(block.get("text", "") for block in output if isinstance(block, dict) and block.get("type") == "text")
+    else:
+        text = str(output or "")
+    if text.lstrip().startswith("Error"):
+        return True
+    try:
+        result = json.loads(text)
+    except ValueError:
+        return False
+    return isinstance(result, dict) and result.get("status") == "error"
+
+
+def _tool_error_hook(agent: Any, kwargs: Dict[str, Any]) -> None:
+    """智能体print钩子：统计本次运行中失败的工具调用"""
+    state = _run_state.get()
+    msg = kwargs.get("msg")
+    if state is None or msg is None:
+        return None
+    for block in msg.get_content_blocks():
+        if block.get("type") == "tool_result" and _is_tool_error(block.get("output")):
+            state["tool_errors"] += 1
+    return None
+
 class QAAgent(ReActAgent):
     """博物馆咨询问答智能体
     
@@ -31,7 +69,7 @@ class QAAgent(ReActAgent):
     
     遵循ReActAgent框架的推理-行动-反思设计模式
     """
-    def __init__(self):
+    def __init__(self, model_pool: Optional[ModelPool] = None):
         logger.info("[咨询问答智能体] 开始初始化...")
         
         # 初始化工具集
@@ -48,16 +86,14 @@ class QAAgent(ReActAgent):
         
         # 初始化模型
         logger.info("[咨询问答智能体] 初始化语言模型...")
-        model = OllamaChatModel(
-            model_name="qwen2:latest",
-            enable_thinking=False,  # qwen2:latest模型不支持thinking功能 ollama._types.ResponseError: registry.ollama.ai/library/glm4:latest does not support tools ollama._types.ResponseError: registry.ollama.ai/library/qwen2:latest does not support thinking (status code: 400)
-            stream=True,
-        )
-        logger.info("[咨询问答智能体] 语言模型初始化完成 - 模型名称: qwen2:latest")
+        # 模型请求由模型池分配到各Ollama节点，模型名称可按智能体覆盖
+        model = (model_pool or get_model_pool()).chat_model("QAAgent", enable_thinking=False)
+        logger.info(f"[咨询问答智能体] 语言模型初始化完成 - 模型名称: {model.model_name}")
         
         # 初始化其他组件
         formatter = OllamaChatFormatter()
-        memory = InMemoryMemory()
+        # 记忆按会话（user_id）隔离，智能体实例、模型和工具集在所有会话间共享
+        memory = session_memory("QAAgent")
         name = "QAAgent"
         sys_prompt = """你是博物馆的咨询助手，负责回答关于博物馆的各种问题，包括开放时间、票价、交通、展览、藏品等信息。
 
@@ -80,6 +116,10 @@ class QAAgent(ReActAgent):
         super().__init__(name=name, sys_prompt=sys_prompt, model=model, formatter=formatter, toolkit=toolkit, memory=memory)
         
         # 常见问题的预设答案将由系统提示词处理，不再需要单独存储
+        # 相同或相近问题的回答缓存，公众服务数据更新后自动失效
+        self.response_cache = get_response_cache("qa_agent")
+        # 只缓存成功的ReAct运行：记录每次运行中失败的工具调用
+        self.register_instance_hook("pre_print", "qa_tool_errors", _tool_error_hook)
         logger.info("[咨询问答智能体] 初始化完成")
     
     def _reason(self, message: str) -> str:
@@ -194,8 +234,25 @@ class QAAgent(ReActAgent):
             # 如果输入是字符串，转换为Msg对象
             x = Msg(name="user", content=x, role="user")
         
-        # 调用父类的回复方法，让框架处理ReAct流程
-        response = await super().reply(x, **kwargs)
+        # 不依赖上文的问题先查回答缓存，命中时跳过ReAct流程和模型调用
+        question = x.content if x is not None and isinstance(x.content, str) else None
+        cacheable = question is not None and is_cacheable_question(question)
+        cached_answer = await self.response_cache.aget(question) if cacheable else None
+        
+        if cached_answer is not None:
+            logger.info("[咨询问答智能体] 命中回答缓存")
+            response = Msg(name=self.name, content=cached_answer, role="assistant")
+        else:
+            # 调用父类的回复方法，让框架处理ReAct流程
+            started = time.perf_counter()
+            state = {"tool_errors": 0}
+            token = _run_state.set(state)
+            try:
+                response = await super().reply(x, **kwargs)
+            finally:
+                _run_state.reset(token)
+            if cacheable and self._answer_cacheable(response.content, state):
+                await self.response_cache.aput(question, response.content, time.perf_counter() - started)
         
         # 将结果添加到记忆中（如果有输入消息）
         if x is not None:
@@ -208,6 +265,16 @@ class QAAgent(ReActAgent):
         logger.info(f"[咨询问答智能体] 请求处理完成 - 响应内容长度: {len(response.content) if response.content else 0} 字符")
         return response
     
+    @staticmethod
+    def _answer_cacheable(content: Any, state: Dict[str, int]) -> bool:
+        """ReAct运行成功（没有失败的工具调用）且回答不是回退或出错提示时才缓存"""
+        if not isinstance(content, str) or not content:
+            return False
+        if state["tool_errors"]:
+            logger.info(f"[咨询问答智能体] 本次运行有 {state['tool_errors']} 次工具调用失败，回答不缓存")
+            return False
+        return not any(marker in content for marker in _FALLBACK_MARKERS)
+    
     async def __call__(self, x: Any = None, **kwargs) -> Msg:
         """实现__call__方法，作为框架调用智能体的标准入口
         
@@ -236,11 +303,11 @@ class QAAgent(ReActAgent):
             
             # 根据工具名称直接调用对应的函数，不再通过toolkit获取
             if tool_name == "search_collection_info":
-                result = search_collection_info(*tool_args)
+                result = await search_collection_info(*tool_args)
             elif tool_name == "search_exhibition_info":
-                result = search_exhibition_info(*tool_args)
+                result = await search_exhibition_info(*tool_args)
             elif tool_name == "execute_museum_service":
-                result = specific_question_about_the_museum(*tool_args)
+                result = await specific_question_about_the_museum(*tool_args)
             else:
                 logger.error(f"[咨询问答智能体] 未知的工具名称: {tool_name}")
                 return None
@@ -338,12 +405,9 @@ class QAAgent(ReActAgent):
             # 直接调用模型生成回答
             response = await self.model(messages)
             
-            # 从响应中提取回答内容
-            if isinstance(response, dict) and "text" in response:
-                answer = response["text"]
-            elif hasattr(response, "content"):
-                answer = response.content
-            else:
+            # 从响应中提取回答内容，流式输出时边生成边推送给调用方
+            answer = await collect_model_text(response)
+            if not answer:
                 answer = "抱歉，我暂时无法为您提供该问题的回答。请稍后再试。"
             
             logger.info(f"[咨询问答智能体] 大模型回答生成完成 - 回答长度: {len(answer)} 字符")
@@ -1,55 +1,108 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
+from datetime import datetime, timedelta
 from agentscope.agent import ReActAgent
 from agentscope.formatter import OllamaChatFormatter
-from agentscope.memory import InMemoryMemory
-from agentscope.model import OllamaChatModel
 from agentscope.tool import Toolkit
 from utils.agent_tools import MuseumToolkit
 from agentscope.message import Msg
+from utils.model_pool import ModelPool, get_model_pool
+from utils.session_manager import session_memory
+from utils.response_stream import collect_model_text
+import os
+import re
+import json
 import logging
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 关键词意图：按顺序匹配，命中即返回
+INTENT_KEYWORDS = [
+    ("booking", ["预约", "订票", "门票"]),
+    ("route", ["路线", "参观", "导览"]),
+    ("query", ["查询", "查看", "我的"]),
+    ("slots", ["时段", "时间", "可用"]),
+]
+
+# 创建预约必须由用户提供的信息，票种和数量有合理的默认值
+REQUIRED_BOOKING_SLOTS = {
+    "visitor_name": "姓名",
+    "visitor_phone": "手机号",
+    "visit_date": "参观日期",
+    "visit_time": "参观时段",
+}
+
+_PHONE_PATTERN = re.compile(r"(?<!\d)1[3-9]\d{9}(?!\d)")
+_FULL_DATE_PATTERN = re.compile(r"(\d{4})\s*[-/.年]\s*(\d{1,2})\s*[-/.月]\s*(\d{1,2})")
+_MONTH_DAY_PATTERN = re.compile(r"(\d{1,2})\s*月\s*(\d{1,2})\s*[日号]")
+_RELATIVE_DAYS = {"今天": 0, "明天": 1, "后天": 2}
+_TIME_RANGE_PATTERN = re.compile(r"(\d{1,2})[:：](\d{2})\s*[-~到至]\s*(\d{1,2})[:：](\d{2})")
+_TICKET_TYPE_PATTERN = re.compile(r"(成人|学生|老人|儿童|团体)票")
+_TICKET_COUNT_PATTERN = re.compile(r"(\d+|[一二两三四五六七八九十])\s*张")
+_NAME_PATTERN = re.compile(r"(?:我叫|我是|姓名[:：]?|名字[:：]?)\s*([\u4e00-\u9fa5]{2,4}?)(?=[，,。.\s\d]|手机|电话|$)")
+# "我是学生""我是带孩子来的家长"等表示身份而不是姓名
+_ROLE_WORDS = ("学生", "老师", "教师", "游客", "会员", "家长", "老人", "儿童", "孩子", "导游", "领队", "团队", "学校")
+_CHINESE_NUMBERS = {"一": 1, "二": 2, "两": 2, "三": 3, "四": 4, "五": 5, "六": 6, "七": 7, "八": 8, "九": 9, "十": 10}
+
+_EXTRACTION_PROMPT = """你是博物馆预约助手的信息抽取模块。根据对话判断用户意图，并抽取预约信息，只输出一个JSON对象，不要输出其他内容。
+JSON字段：
+- intent: "booking"（预约门票）、"route"（参观路线）、"query"（查询预约）、"slots"（可预约时段）或 "other"
+- visitor_name: 游客姓名
+- visitor_phone: 手机号
+- visit_date: 参观日期，YYYY-MM-DD格式（今天是{today}）
+- visit_time: 参观时段，如"09:00-11:00"
+- ticket_type: 票种，如"成人票"、"学生票"
+- ticket_count: 票数，整数
+无法确定的字段填null。"""
+
 class TourBookingAgent(ReActAgent):
     """博物馆导览与预约智能体"""
     
-    def __init__(self):
+    def __init__(self, model_pool: Optional[ModelPool] = None):
         # 初始化工具集
         toolkit = Toolkit()
         # 注册MuseumToolkit的方法作为工具
         toolkit.register_tool_function(
-            MuseumToolkit.get_booking_info,
+            MuseumToolkit.aget_booking_info,
             func_description="获取用户预约信息。参数：phone（可选，字符串类型，用户手机号，用于精确查询特定用户的预约记录）"
         )
         toolkit.register_tool_function(
-            MuseumToolkit.create_booking,
+            MuseumToolkit.acreate_booking,
             func_description="创建新的参观预约。参数：booking_data（必填，字典类型，包含预约信息，必须包含visitor_name（游客姓名，字符串）、visitor_phone（游客手机号，字符串）、visit_date（参观日期，YYYY-MM-DD格式）、visit_time（参观时间段，字符串）、ticket_type（票种，字符串）、ticket_count（票数，整数）字段）"
         )
         toolkit.register_tool_function(
-            MuseumToolkit.call_service,
+            MuseumToolkit.acreate_group_booking,
+            func_description="批量创建团体或学校参观预约，整批一次提交。参数：bookings（必填，列表类型，每一项为一条预约信息，字段同acreate_booking的booking_data）、mode（可选，字符串类型，'all_or_nothing'表示任一条失败则整批不预约（默认），'best_effort'表示能预约的先预约、失败的单独返回原因）"
+        )
+        toolkit.register_tool_function(
+            MuseumToolkit.acall_service,
             func_description="调用博物馆服务API。参数：endpoint（必填，字符串类型，API端点路径，如'/api/public/tour-booking/available-slots'）、method（可选，字符串类型，HTTP方法，支持'GET'或'POST'，默认为'GET'）、data（可选，字典类型，请求参数或请求体，GET请求时作为URL参数，POST请求时作为JSON请求体）"
         )
         # toolkit.register_tool_function(MuseumToolkit.get_visit_route, func_description="获取参观路线,参数为用户ID和参观时间")
         # toolkit.register_tool_function(MuseumToolkit.get_visit_time, func_description="获取参观时间,参数为用户ID和参观日期")
         
-        model = OllamaChatModel(
-            model_name="qwen2:latest",
-            enable_thinking=False,
-            stream=True,
-        )
+        # 模型请求由模型池分配到各Ollama节点，模型名称可按智能体覆盖
+        model = (model_pool or get_model_pool()).chat_model("TourBookingAgent", enable_thinking=False)
         
         formatter = OllamaChatFormatter()
-        memory = InMemoryMemory()
+        # 记忆按会话（user_id）隔离，智能体实例、模型和工具集在所有会话间共享
+        memory = session_memory("TourBookingAgent")
         name = "TourBookingAgent"
         sys_prompt = "你是博物馆的导览与预约助手，负责处理门票预约、参观路线规划等相关事务。"
         
         # 调用父类的初始化方法
         super().__init__(name=name, sys_prompt=sys_prompt, model=model, formatter=formatter, toolkit=toolkit, memory=memory)
+        
+        # 关键词无法判断意图、或规则抽取不到预约信息时，是否调用模型兜底
+        self.use_model_fallback = os.getenv("MUSEUM_BOOKING_MODEL_FALLBACK", "true").lower() not in ("0", "false", "no")
     
     async def reply(self, x: Any = None, **kwargs) -> Msg:
-        """处理用户的预约请求"""
+        """处理用户的预约请求
+        
+        意图优先用关键词判断，只有关键词无法判断时才调用模型，
+        且模型调用同时完成意图分类和预约信息抽取，结果直接用于后续处理。
+        """
         if x is None:
             return Msg(name=self.name, content="您好！我是博物馆的导览与预约助手，请问有什么可以帮助您的？", role="assistant")
         
@@ -58,26 +111,23 @@ class TourBookingAgent(ReActAgent):
         user_id = x.name if isinstance(x, Msg) else "anonymous"
         
         # 分析用户意图
-        # 确保每个Msg对象都使用正确的初始化方式（包含name、role和content属性）
-        content = [
-            Msg(name="system", content="你是博物馆的导览与预约助手，负责处理门票预约、团队预约，并为用户生成个性化参观路线。", role="system"),
-            Msg(name=user_id, content=user_message, role="user")
-        ]
-        
-        # 使用模型理解用户意图
-        model_input = await self.formatter.format(content)
-        response = await self.model(model_input)
-        
-        # OllamaChatFormatter没有parse方法，直接使用response
+        intent = self._match_intent(user_message)
+        extracted = None
+        if intent != "booking" and self._continues_booking(user_message, user_id, intent):
+            intent = "booking"
+        if intent is None and self.use_model_fallback:
+            logger.info("[导览预约智能体] 关键词无法判断意图，调用模型进行意图识别和信息抽取")
+            extracted = await self._extract_with_model(user_message, user_id)
+            intent = extracted.get("intent")
         
         # 根据用户意图调用不同的功能
-        if any(keyword in user_message for keyword in ["预约", "订票", "门票"]):
-            result = await self._handle_booking(user_message, user_id)
-        elif any(keyword in user_message for keyword in ["路线", "参观", "导览"]):
+        if intent == "booking":
+            result = await self._handle_booking(user_message, user_id, extracted)
+        elif intent == "route":
             result = await self._generate_route(user_message)
-        elif any(keyword in user_message for keyword in ["查询", "查看", "我的"]):
+        elif intent == "query":
             result = await self._query_booking(user_message)
-        elif any(keyword in user_message for keyword in ["时段", "时间", "可用"]):
+        elif intent == "slots":
             result = await self._get_available_slots(user_message)
         else:
             result = "请问您需要预约门票、查询预约信息、了解可用时段，还是需要我为您生成个性化参观路线？"
@@ -89,24 +139,153 @@ class TourBookingAgent(ReActAgent):
         # 返回响应
         return Msg(name=self.name, content=result, role="assistant")
     
-    async def _handle_booking(self, user_message: str, user_id: str) -> str:
-        """处理预约请求"""
-        # 模拟从用户消息中提取预约信息
-        # 在实际应用中，这里可以使用NLP技术更精确地提取信息
-        booking_data = {
-            "visitor_name": "游客",  # 默认值，实际应用中应从用户输入提取
-            "visitor_phone": "13800138000",  # 默认值，实际应用中应从用户输入提取
-            "visit_date": "2025-08-26",  # 默认值，实际应用中应从用户输入提取
-            "visit_time": "09:30-11:30",  # 默认值，实际应用中应从用户输入提取
-            "ticket_type": "成人票",  # 默认值，实际应用中应从用户输入提取
-            "ticket_count": 1  # 默认值，实际应用中应从用户输入提取
-        }
+    def _booking_drafts(self) -> Dict[str, Dict[str, Any]]:
+        """当前会话中尚未填完的预约信息，按 user_id 保存"""
+        return self.memory.state.setdefault("booking_drafts", {})
+    
+    def _continues_booking(self, user_message: str, user_id: str, intent: Optional[str]) -> bool:
+        """上一轮在追问预约信息时，本轮是否是在补充预约信息
+        
+        无法判断意图的回复（如只回复手机号）视为补充；命中其他关键词的回复（如"我的手机号是…"命中"我的"），
+        只有补充了尚缺的必填信息时才视为补充。
+        """
+        draft = self._booking_drafts().get(user_id)
+        if not draft:
+            return False
+        if intent is None:
+            return True
+        provided = self._extract_slots(user_message)
+        return any(field in provided and field not in draft for field in REQUIRED_BOOKING_SLOTS)
+    
+    def _match_intent(self, user_message: str) -> Optional[str]:
+        """基于关键词判断意图，无法判断时返回None"""
+        for intent, keywords in INTENT_KEYWORDS:
+            if any(keyword in user_message for keyword in keywords):
+                return intent
+        return None
+    
+    def _extract_slots(self, user_message: str) -> Dict[str, Any]:
+        """用规则从用户消息中抽取预约信息，只返回抽取到的字段"""
+        slots: Dict[str, Any] = {}
+        
+        phone = _PHONE_PATTERN.search(user_message)
+        if phone:
+            slots["visitor_phone"] = phone.group(0)
+        
+        full_date = _FULL_DATE_PATTERN.search(user_message)
+        month_day = _MONTH_DAY_PATTERN.search(user_message)
+        if full_date:
+            year, month, day = (int(v) for v in full_date.groups())
+            slots["visit_date"] = f"{year:04d}-{month:02d}-{day:02d}"
+        elif month_day:
+            month, day = (int(v) for v in month_day.groups())
+            slots["visit_date"] = f"{datetime.now().year:04d}-{month:02d}-{day:02d}"
+        else:
+            for word, offset in _RELATIVE_DAYS.items():
+                if word in user_message:
+                    slots["visit_date"] = (datetime.now() + timedelta(days=offset)).strftime("%Y-%m-%d")
+                    break
+        
+        time_range = _TIME_RANGE_PATTERN.search(user_message)
+        if time_range:
+            h1, m1, h2, m2 = (int(v) for v in time_range.groups())
+            slots["visit_time"] = f"{h1:02d}:{m1:02d}-{h2:02d}:{m2:02d}"
+        
+        ticket_type = _TICKET_TYPE_PATTERN.search(user_message)
+        if ticket_type:
+            slots["ticket_type"] = ticket_type.group(0)
+        
+        ticket_count = _TICKET_COUNT_PATTERN.search(user_message)
+        if ticket_count:
+            count = ticket_count.group(1)
+            slots["ticket_count"] = int(count) if count.isdigit() else _CHINESE_NUMBERS[count]
+        
+        for name in _NAME_PATTERN.finditer(user_message):
+            if not name.group(1).startswith(_ROLE_WORDS):
+                slots["visitor_name"] = name.group(1)
+                break
+        
+        return slots
+    
+    async def _extract_with_model(self, user_message: str, user_id: str) -> Dict[str, Any]:
+        """调用模型进行意图分类和结构化信息抽取，结合最近几轮对话，失败时返回空字典"""
+        try:
+            history = (await self.memory.get_memory())[-4:]
+            content = [
+                Msg(name="system", content=_EXTRACTION_PROMPT.format(today=datetime.now().strftime("%Y-%m-%d")), role="system"),
+                *history,
+                Msg(name=user_id, content=user_message, role="user")
+            ]
+            model_input = await self.formatter.format(content)
+            # 抽取结果不直接展示给用户，不推送到流式输出
+            text = await collect_model_text(await self.model(model_input), emit=False)
+            
+            matched = re.search(r"\{.*\}", text, re.S)
+            parsed = json.loads(matched.group(0)) if matched else {}
+            if not isinstance(parsed, dict):
+                return {}
+            logger.info(f"[导览预约智能体] 模型抽取结果: {parsed}")
+            return {key: value for key, value in parsed.items() if value not in (None, "", "null")}
+        except Exception as e:
+            logger.warning(f"[导览预约智能体] 模型抽取失败: {str(e)}")
+            return {}
+    
+    def _normalize_model_slots(self, extracted: Dict[str, Any]) -> Dict[str, Any]:
+        """校验模型抽取的字段，格式不合法的字段丢弃"""
+        slots: Dict[str, Any] = {}
+        if isinstance(extracted.get("visitor_name"), str):
+            slots["visitor_name"] = extracted["visitor_name"].strip()
+        phone = _PHONE_PATTERN.search(str(extracted.get("visitor_phone", "")))
+        if phone:
+            slots["visitor_phone"] = phone.group(0)
+        # 日期和时段复用规则抽取，统一格式
+        for field in ("visit_date", "visit_time", "ticket_type"):
+            value = extracted.get(field)
+            if isinstance(value, str):
+                normalized = self._extract_slots(value).get(field)
+                if normalized:
+                    slots[field] = normalized
+        try:
+            count = int(extracted.get("ticket_count"))
+            if count > 0:
+                slots["ticket_count"] = count
+        except (TypeError, ValueError):
+            pass
+        return {key: value for key, value in slots.items() if value}
+    
+    async def _handle_booking(self, user_message: str, user_id: str, extracted: Optional[Dict[str, Any]] = None) -> str:
+        """处理预约请求
+        
+        先用规则抽取预约信息，与之前几轮已提供的信息合并（本轮提供的信息优先）；
+        必填信息不全时再调用模型抽取（若本轮已调用过模型则直接复用其结果），
+        仍然缺失的必填信息保存在会话中并向用户追问，而不是使用默认值下单。
+        """
+        drafts = self._booking_drafts()
+        booking_data = {**drafts.get(user_id, {}), **self._extract_slots(user_message)}
+        
+        missing = [field for field in REQUIRED_BOOKING_SLOTS if field not in booking_data]
+        if missing and extracted is None and self.use_model_fallback:
+            logger.info(f"[导览预约智能体] 规则未抽取到 {missing}，调用模型抽取预约信息")
+            extracted = await self._extract_with_model(user_message, user_id)
+        if missing and extracted:
+            for field, value in self._normalize_model_slots(extracted).items():
+                booking_data.setdefault(field, value)
+        
+        missing = [label for field, label in REQUIRED_BOOKING_SLOTS.items() if field not in booking_data]
+        if missing:
+            drafts[user_id] = booking_data
+            return f"好的，为您办理预约。请补充以下信息：{'、'.join(missing)}。"
+        
+        booking_data.setdefault("ticket_type", "成人票")
+        booking_data.setdefault("ticket_count", 1)
+        logger.info(f"[导览预约智能体] 预约信息抽取完成: {booking_data}")
         
         try:
             # 直接调用MuseumToolkit的方法
-            result = MuseumToolkit.create_booking(booking_data)
+            result = await MuseumToolkit.acreate_booking(booking_data)
             
             if result.get("status") == "success":
+                drafts.pop(user_id, None)
                 booking_info = result.get("data", {})
                 return f"预约成功！您的预约编号是{booking_info.get('booking_id', '')}，\n" \
                        f"预约日期：{booking_info.get('visit_date', '')}\n" \
@@ -115,6 +294,8 @@ class TourBookingAgent(ReActAgent):
                        f"数量：{booking_info.get('ticket_count', '')}张\n" \
                        f"请在参观当天凭预约信息到博物馆入口处核销。"
             else:
+                # 保留已填写的信息，用户换个时段或日期即可重新提交
+                drafts[user_id] = booking_data
                 return f"预约失败：{result.get('message', '未知错误')}"
         except Exception as e:
             return f"处理预约请求时发生错误：{str(e)}"
@@ -131,12 +312,15 @@ class TourBookingAgent(ReActAgent):
     
     async def _query_booking(self, user_message: str) -> str:
         """查询预约信息"""
-        # 模拟从用户消息中提取手机号
-        phone = "13800138000"  # 默认值，实际应用中应从用户输入提取
+        # 从用户消息中提取手机号
+        phone_match = _PHONE_PATTERN.search(user_message)
+        if not phone_match:
+            return "请提供预约时使用的手机号，我来为您查询预约记录。"
+        phone = phone_match.group(0)
         
         try:
             # 直接调用MuseumToolkit的方法
-            result = MuseumToolkit.get_booking_info(phone)
+            result = await MuseumToolkit.aget_booking_info(phone)
             
             if result.get("status") == "success":
                 bookings = result.get("data", [])
@@ -159,9 +343,10 @@ class TourBookingAgent(ReActAgent):
         """获取可用时段"""
         try:
             # 直接调用MuseumToolkit的方法
-            result = MuseumToolkit.call_service(
+            result = await MuseumToolkit.acall_service(
                 endpoint="/api/public/tour-booking/available-slots",
-                method="GET"
+                method="GET",
+                data={"limit": 2}  # 只显示最近两天的
             )
             
             if result.get("status") == "success":
@@ -170,7 +355,7 @@ class TourBookingAgent(ReActAgent):
                     return "暂无可用预约时段。"
                 
                 response = "近期可用的预约时段：\n"
-                for slot in slots[:2]:  # 只显示最近两天的
+                for slot in slots:
                     response += f"日期：{slot.get('date', '')}\n"
                     for time_slot in slot.get('time_slots', [])[:3]:  # 只显示前3个时段
                         response += f"  - {time_slot.get('time', '')}（剩余{time_slot.get('available', '')}个名额）\n"
@@ -0,0 +1,117 @@
+"""意图路由基准测试：比较关键词路由与语义路由（含关键词兜底）的准确率和延迟
+
+用法:
+    python bench_intent_router.py [--rounds 5]
+
+语义路由需要本地Ollama服务中已拉取向量模型（默认 bge-m3，可通过 MUSEUM_EMBEDDING_MODEL 指定）。
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+# 测试集：不在关键词表和示例短语中的问法
+LABELED_MESSAGES: List[Tuple[str, str]] = [
+    ("下周三上午还能约吗", "tour_booking"),
+    ("帮我订三张票，周日下午去", "tour_booking"),
+    ("学校组织学生来参观需要提前申请吗", "tour_booking"),
+    ("我之前约的时间想改一下", "tour_booking"),
+    ("请问晚上开到几点", "qa"),
+    ("最近有什么新展", "qa"),
+    ("那件玉琮是什么年代的", "qa"),
+    ("老人进馆要收费吗", "qa"),
+    ("厕所怎么走", "facility"),
+    ("带着婴儿车方便进去吗", "facility"),
+    ("附近哪里能吃饭", "facility"),
+    ("包太大了能放哪", "facility"),
+    ("保安态度太差了", "feedback"),
+    ("二楼展厅灯光太暗看不清", "feedback"),
+    ("希望多增加一些互动体验", "feedback"),
+    ("讲解很精彩，谢谢你们", "feedback"),
+    ("编号col003那件瓷器现在在哪个库房", "collection"),
+    ("这批新征集的书画登记了没有", "collection"),
+    ("漆器的养护记录调出来看看", "collection"),
+    ("外借给省博的那几件什么时候回来", "collection"),
+    ("东门摄像头没信号了", "security"),
+    ("有人在展厅里奔跑打闹", "security"),
+    ("游客捡到一部手机交到哪", "security"),
+    ("火警演练安排在什么时候", "security"),
+    ("三楼的除湿机一直在报警", "facility_management"),
+    ("地下室漏水了", "facility_management"),
+    ("展柜玻璃裂了找谁修", "facility_management"),
+    ("这个月电费怎么这么高", "facility_management"),
+    ("我明天想调休", "administration"),
+    ("出差的发票交给谁", "administration"),
+    ("周五的馆务会几点开始", "administration"),
+    ("采购合同走到哪一步了", "administration"),
+    ("国庆期间每天来了多少人", "analytics"),
+    ("哪个时段人最多", "analytics"),
+    ("外地游客占比是多少", "analytics"),
+    ("文创销售额环比增长了吗", "analytics"),
+]
+
+
+def percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+async def measure(name: str, router: Callable[[str], Awaitable[str]], rounds: int) -> Dict[str, float]:
+    latencies: List[float] = []
+    correct = 0
+    for round_index in range(rounds):
+        for message, expected in LABELED_MESSAGES:
+            started = time.perf_counter()
+            intent = await router(message)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if round_index == 0 and intent == expected:
+                correct += 1
+    result = {
+        "accuracy": correct / len(LABELED_MESSAGES),
+        "p50_ms": percentile(latencies, 0.5),
+        "p99_ms": percentile(latencies, 0.99)
+    }
+    print(f"{name:<28} 准确率 {result['accuracy']:6.1%}   p50 {result['p50_ms']:8.3f}ms   p99 {result['p99_ms']:8.3f}ms")
+    return result
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="意图路由基准测试")
+    parser.add_argument("--rounds", type=int, default=5, help="每条消息重复的轮数（第2轮起语义路由命中向量缓存）")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    from agents.orchestrator_agent import OrchestratorAgent
+
+    agent = OrchestratorAgent()
+    print(f"测试集: {len(LABELED_MESSAGES)} 条消息, {len(set(label for _, label in LABELED_MESSAGES))} 个意图\n")
+
+    async def keyword_router(message: str) -> str:
+        return agent.recognize_intent(message)
+
+    await measure("关键词路由", keyword_router, args.rounds)
+
+    router = agent.semantic_router
+    if router is None:
+        print("语义路由未启用（MUSEUM_SEMANTIC_ROUTER=false），跳过")
+        return
+
+    started = time.perf_counter()
+    if not await router.load_or_build():
+        print("语义路由不可用：请确认Ollama服务已启动并已拉取向量模型")
+        return
+    print(f"{'质心索引加载/构建':<24} {(time.perf_counter() - started) * 1000:.1f}ms\n")
+
+    await measure("语义路由+关键词兜底（冷）", agent.resolve_intent, 1)
+    await measure("语义路由+关键词兜底（缓存）", agent.resolve_intent, args.rounds)
+
+    stats = router.get_stats()
+    print(f"\n语义路由命中 {stats['routed']} 次, 不确定退回关键词 {stats['uncertain']} 次, "
+          f"向量缓存命中率 {stats['cache_hits'] / max(stats['cache_hits'] + stats['cache_misses'], 1):.1%}, "
+          f"平均向量化耗时 {stats['avg_embed_ms']}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,99 @@
+"""应用启动基准测试：比较启动时创建全部智能体（旧方式）与按需创建智能体的首个请求耗时
+
+用法:
+    python bench_startup.py [--rounds 3]
+
+每轮在新的子进程中冷启动，分别测量：
+- 导入 main（创建FastAPI应用及路由）的耗时
+- 从进程开始到首个请求（GET /）返回的耗时
+- 按需模式下首次使用各专业智能体时的创建耗时（预热完成前到达的请求需要承担这部分开销）
+
+不需要Ollama服务：智能体的模型客户端在首次调用模型时才创建。
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+MODES = {
+    "eager": "启动时创建全部智能体（旧）",
+    "lazy": "按需创建智能体（新）",
+}
+
+
+def run_child(mode: str) -> None:
+    started = time.perf_counter()
+    import logging
+    logging.disable(logging.INFO)
+
+    import main
+    imported = time.perf_counter()
+
+    from services.core_orchestrator import get_orchestrator_agent
+    from agents.orchestrator_agent import AGENT_FACTORIES
+
+    if mode == "eager":
+        get_orchestrator_agent().warmup_agents()
+
+    from fastapi.testclient import TestClient
+    client = TestClient(main.app)
+    response = client.get("/")
+    first_request = time.perf_counter()
+
+    agent_ms: Dict[str, float] = {}
+    if mode == "lazy":
+        orchestrator_started = time.perf_counter()
+        agent = get_orchestrator_agent()
+        agent_ms["OrchestratorAgent"] = (time.perf_counter() - orchestrator_started) * 1000
+        for agent_name in AGENT_FACTORIES:
+            agent_started = time.perf_counter()
+            agent.get_agent(agent_name)
+            agent_ms[agent_name] = (time.perf_counter() - agent_started) * 1000
+
+    print(json.dumps({
+        "status_code": response.status_code,
+        "import_ms": (imported - started) * 1000,
+        "first_request_ms": (first_request - started) * 1000,
+        "agent_ms": agent_ms
+    }))
+
+
+def measure(mode: str, rounds: int) -> List[Dict]:
+    env = {**os.environ, "MUSEUM_SEMANTIC_ROUTER": os.getenv("MUSEUM_SEMANTIC_ROUTER", "false")}
+    results = []
+    for _ in range(rounds):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", mode],
+            capture_output=True, text=True, env=env, cwd=os.path.dirname(os.path.abspath(__file__)), check=True
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="应用启动基准测试")
+    parser.add_argument("--rounds", type=int, default=3, help="每种模式冷启动的次数")
+    parser.add_argument("--child", choices=list(MODES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child)
+        return
+
+    for mode, label in MODES.items():
+        results = measure(mode, args.rounds)
+        import_ms = statistics.median(r["import_ms"] for r in results)
+        first_ms = statistics.median(r["first_request_ms"] for r in results)
+        print(f"{label:<24} 导入 {import_ms:8.1f}ms   首个请求 {first_ms:8.1f}ms")
+        if mode == "lazy":
+            for agent_name in results[0]["agent_ms"]:
+                cost = statistics.median(r["agent_ms"][agent_name] for r in results)
+                print(f"    首次使用 {agent_name:<28} 创建 {cost:8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
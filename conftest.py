@@ -0,0 +1,17 @@
+import os
+import tempfile
+
+# 测试中创建的SQLite数据库和传感器存储写入临时目录，不影响 .cache 中的本地数据
+_TEST_DATA_DIR = tempfile.mkdtemp(prefix="museum-tests-")
+os.environ.setdefault("MUSEUM_BOOKING_DB_PATH", os.path.join(_TEST_DATA_DIR, "bookings.sqlite3"))
+os.environ.setdefault("MUSEUM_MEMORY_DB_PATH", os.path.join(_TEST_DATA_DIR, "agent_memory.sqlite3"))
+os.environ.setdefault("MUSEUM_SENSOR_STORE_DIR", os.path.join(_TEST_DATA_DIR, "sensor_store"))
+
+# 以下脚本需要本地Ollama模型，直接用 python 运行，不作为pytest用例收集
+collect_ignore = [
+    "test_museum_agents.py",
+    "test_qa_agent.py",
+    "test_exhibition_log.py",
+    "agents/test_react_qa_agent.py",
+    "agents/test_refactored_qa_agent.py",
+]
@@ -3,8 +3,11 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import RedirectResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
 import os
+import asyncio
+from utils.json_response import FastJSONResponse
 
-app = FastAPI(title="Museum Service API", version="1.0")
+# 默认使用orjson序列化响应，比标准库json更快，中文不转义
+app = FastAPI(title="Museum Service API", version="1.0", default_response_class=FastJSONResponse)
 
 # 挂载静态文件目录
 app.mount("/assets", StaticFiles(directory="assets"), name="assets")
@@ -54,4 +57,34 @@ for path, target_path in SIMPLE_PATH_REDIRECTS.items():
 # Register routers
 app.include_router(core_router)
 app.include_router(public_router)
-app.include_router(internal_router)
\ No newline at end of file
+app.include_router(internal_router)
+
+# 配置智能体工具的服务调用方式：
+# inprocess（默认）- 智能体与API运行在同一进程，直接调用路由函数，避免本机回环HTTP请求
+# http - 智能体通过HTTP调用远程部署的API服务
+from utils.agent_tools import MuseumToolkit
+MuseumToolkit.configure_transport(
+    os.getenv("MUSEUM_TOOL_TRANSPORT", "inprocess"),
+    routers=[public_router, internal_router]
+)
+
+from services.core_orchestrator import startup_http_client, shutdown_http_client, startup_agents
+from utils.session_manager import get_session_manager
+from utils.model_pool import get_model_pool
+from utils.email_tool import get_mail_dispatcher
+
+@app.on_event("startup")
+async def open_service_clients():
+    """创建核心协调服务共享的下游HTTP客户端，启动模型池健康检查，并在后台创建智能体、预热语义路由"""
+    await startup_http_client()
+    await startup_agents()
+    get_model_pool().start()
+
+@app.on_event("shutdown")
+async def close_service_clients():
+    """关闭核心协调服务和智能体工具共享的HTTP连接池，写入会话记忆中尚未持久化的消息，发送完队列中的邮件"""
+    await shutdown_http_client()
+    await MuseumToolkit.aclose()
+    await get_model_pool().stop()
+    await asyncio.to_thread(get_session_manager().flush_all)
+    await asyncio.to_thread(get_mail_dispatcher().stop)
\ No newline at end of file
@@ -1,17 +1,60 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException
 from pydantic import BaseModel
 from typing import Dict, Any, Optional, List
 import json
+import os
 import re
+import hmac
+import random
+import time
+import asyncio
+import threading
 import logging
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
 import httpx
 
 # 导入核心协调智能体
-from agents.orchestrator_agent import OrchestratorAgent
+from agents.orchestrator_agent import OrchestratorAgent, INTENT_TO_AGENT
+from utils.session_manager import get_session_manager
+from utils.admission_control import AdmissionController, AdmissionRejected, PRIORITY_INTERNAL, PRIORITY_PUBLIC
+from utils.response_stream import ResponseStream, stream_scope, drain, format_sse
+from utils.keyword_matcher import KeywordMatcher
+from utils.context_budget import get_context_budget_stats
+from utils.model_pool import get_model_pool
+
+# 全局的核心协调智能体实例，首次使用时创建，导入本模块时不再构建任何智能体
+_orchestrator_agent: Optional[OrchestratorAgent] = None
+_orchestrator_lock = threading.Lock()
+
+def get_orchestrator_agent() -> OrchestratorAgent:
+    """获取核心协调智能体，不存在时创建"""
+    global _orchestrator_agent
+    if _orchestrator_agent is None:
+        with _orchestrator_lock:
+            if _orchestrator_agent is None:
+                _orchestrator_agent = OrchestratorAgent()
+    return _orchestrator_agent
+
+async def aget_orchestrator_agent() -> OrchestratorAgent:
+    """在异步请求中获取核心协调智能体：尚未创建时在线程池中创建（或等待后台预热创建完成），不阻塞事件循环"""
+    if _orchestrator_agent is not None:
+        return _orchestrator_agent
+    return await asyncio.get_running_loop().run_in_executor(None, get_orchestrator_agent)
+
+# 意图识别的准入通道：语义路由需要调用向量模型，同样限制并发
+ROUTER_LANE = "IntentRouter"
+
+# 协调请求的准入控制：每个下游智能体的并发上限、等待队列长度和排队截止时间
+admission_controller = AdmissionController(
+    default_concurrency=int(os.getenv("MUSEUM_AGENT_CONCURRENCY", "4")),
+    default_max_queue=int(os.getenv("MUSEUM_AGENT_QUEUE_SIZE", "32")),
+    queue_timeout=float(os.getenv("MUSEUM_AGENT_QUEUE_TIMEOUT", "30")),
+    limits={ROUTER_LANE: int(os.getenv("MUSEUM_ROUTER_CONCURRENCY", "8"))}
+)
 
-# 创建全局的核心协调智能体实例
-orchestrator_agent = OrchestratorAgent()
+# 员工令牌：请求头 X-Museum-Staff-Token 与之相同的请求按内部员工优先排队，未配置时所有请求按公众优先级排队
+STAFF_TOKEN = os.getenv("MUSEUM_STAFF_TOKEN", "")
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -97,6 +140,9 @@ SUB_INTENT_MAPPING = {
     "museum_info": ["博物馆信息", "开放时间", "门票价格", "参观指南"]
 }
 
+# 意图表和子意图表共享一个Aho-Corasick自动机，表内容变化时自动重建
+keyword_matcher = KeywordMatcher({"intent": INTENT_MAPPING, "sub_intent": SUB_INTENT_MAPPING})
+
 # 为测试目的添加的重定向路径，处理简单路径调用
 SIMPLE_PATH_REDIRECTS = {
     "/booking": "/api/public/tour-booking/bookings",
@@ -105,42 +151,131 @@ SIMPLE_PATH_REDIRECTS = {
     "/search/collections": "/api/internal/collection/search"
 }
 
+# 下游服务调用配置，可通过环境变量调整
+SERVICE_BASE_URL = os.getenv("MUSEUM_CORE_SERVICE_BASE_URL", os.getenv("MUSEUM_SERVICE_BASE_URL", "http://localhost:8000"))
+SERVICE_TIMEOUT = float(os.getenv("MUSEUM_CORE_SERVICE_TIMEOUT", "10.0"))
+SERVICE_CONNECT_TIMEOUT = float(os.getenv("MUSEUM_CORE_SERVICE_CONNECT_TIMEOUT", "3.0"))
+SERVICE_MAX_CONNECTIONS = int(os.getenv("MUSEUM_CORE_SERVICE_MAX_CONNECTIONS", "100"))
+SERVICE_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("MUSEUM_CORE_SERVICE_MAX_KEEPALIVE_CONNECTIONS", "20"))
+SERVICE_MAX_RETRIES = int(os.getenv("MUSEUM_CORE_SERVICE_MAX_RETRIES", "2"))
+SERVICE_RETRY_BACKOFF = float(os.getenv("MUSEUM_CORE_SERVICE_RETRY_BACKOFF", "0.2"))
+SERVICE_RETRY_BACKOFF_MAX = float(os.getenv("MUSEUM_CORE_SERVICE_RETRY_BACKOFF_MAX", "2.0"))
+
+# 应用生命周期内共享的HTTP客户端，在FastAPI启动时创建、关闭时释放
+_http_client: Optional[httpx.AsyncClient] = None
+
+async def startup_http_client() -> None:
+    """创建共享的下游服务HTTP客户端（长连接、连接池）"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            base_url=SERVICE_BASE_URL,
+            timeout=httpx.Timeout(SERVICE_TIMEOUT, connect=SERVICE_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=SERVICE_MAX_CONNECTIONS,
+                max_keepalive_connections=SERVICE_MAX_KEEPALIVE_CONNECTIONS
+            )
+        )
+        logger.info(f"下游服务HTTP客户端已创建: {SERVICE_BASE_URL}, 最大连接数: {SERVICE_MAX_CONNECTIONS}")
+
+async def shutdown_http_client() -> None:
+    """关闭共享的下游服务HTTP客户端"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+        logger.info("下游服务HTTP客户端已关闭")
+
+async def startup_agents() -> None:
+    """服务就绪后在后台创建核心协调智能体、预热语义路由和专业智能体，不阻塞应用启动
+
+    预热完成前到达的请求会在首次使用时自行创建所需的智能体，语义路由就绪前使用关键词路由。
+    """
+    asyncio.get_running_loop().create_task(_warmup_agents())
+
+async def _warmup_agents() -> None:
+    started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    try:
+        # 智能体的构造是同步的，放到线程池中执行，避免阻塞事件循环
+        agent = await loop.run_in_executor(None, get_orchestrator_agent)
+        if agent.semantic_router is not None:
+            agent.semantic_router.warmup()
+        if os.getenv("MUSEUM_AGENT_WARMUP", "true").lower() not in ("0", "false", "no"):
+            await loop.run_in_executor(None, agent.warmup_agents)
+        logger.info(f"智能体后台预热完成，耗时 {(time.perf_counter() - started) * 1000:.1f}ms")
+    except Exception as e:
+        logger.error(f"智能体后台预热失败，将在首次请求时重新创建: {type(e).__name__}: {str(e)}")
+
+async def get_http_client() -> httpx.AsyncClient:
+    """获取共享的HTTP客户端，未随应用启动时（如脚本中直接调用）按需创建"""
+    if _http_client is None or _http_client.is_closed:
+        await startup_http_client()
+    return _http_client
+
+def _retry_delay(attempt: int, response: Optional[httpx.Response] = None) -> float:
+    """计算重试等待时间：优先遵循Retry-After，否则使用带抖动的指数退避"""
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), SERVICE_RETRY_BACKOFF_MAX)
+    return random.uniform(0, min(SERVICE_RETRY_BACKOFF * (2 ** attempt), SERVICE_RETRY_BACKOFF_MAX))
+
 # 简化的内部请求函数，用于向其他服务发送请求
-async def send_request(service_url: str, params: Dict[str, Any]) -> Dict[str, Any]:
-    """发送请求到指定服务并返回结果"""
+async def send_request(service_url: str, params: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+    """发送请求到指定服务并返回结果
+    
+    Args:
+        service_url: 服务路径，相对于 SERVICE_BASE_URL
+        params: 请求体参数
+        timeout: 本次请求的超时时间（秒），默认使用 SERVICE_TIMEOUT
+    """
     try:
-        # 使用 httpx 发送 HTTP POST 请求到指定服务
-        async with httpx.AsyncClient() as client:
-            # 构建完整的 URL（假设服务运行在 localhost:8001）
-            full_url = f"http://localhost:8000{service_url}"
-            
-            # 发送 POST 请求并等待响应
-            response = await client.post(full_url, json=params)
-            
-            # 检查响应状态码
-            if response.status_code == 200:
-                # 尝试解析 JSON 响应
-                try:
-                    return {
-                        "status": "success",
-                        "data": response.json()
-                    }
-                except json.JSONDecodeError:
-                    return {
-                        "status": "success",
-                        "data": {
-                            "message": "请求成功，但无法解析响应内容",
-                            "raw_content": response.text
-                        }
-                    }
+        client = await get_http_client()
+        request_timeout = httpx.Timeout(timeout, connect=SERVICE_CONNECT_TIMEOUT) if timeout else httpx.USE_CLIENT_DEFAULT
+        
+        # 对503和连接失败进行有限次数的重试
+        attempt = 0
+        while True:
+            try:
+                # 发送 POST 请求并等待响应
+                response = await client.post(service_url, json=params, timeout=request_timeout)
+            except httpx.TransportError:
+                if attempt >= SERVICE_MAX_RETRIES:
+                    raise
+                delay = _retry_delay(attempt)
             else:
-                # 处理非 200 状态码的响应
-                logger.error(f"服务 {service_url} 返回非成功状态码: {response.status_code}")
+                if response.status_code != 503 or attempt >= SERVICE_MAX_RETRIES:
+                    break
+                delay = _retry_delay(attempt, response)
+            attempt += 1
+            logger.info(f"服务 {service_url} 暂不可用，{delay:.2f}秒后进行第{attempt}次重试")
+            await asyncio.sleep(delay)
+        
+        # 检查响应状态码
+        if response.status_code == 200:
+            # 尝试解析 JSON 响应
+            try:
+                return {
+                    "status": "success",
+                    "data": response.json()
+                }
+            except json.JSONDecodeError:
                 return {
-                    "status": "error",
-                    "code": response.status_code,
-                    "message": f"服务请求失败: {response.reason_phrase}"
+                    "status": "success",
+                    "data": {
+                        "message": "请求成功，但无法解析响应内容",
+                        "raw_content": response.text
+                    }
                 }
+        else:
+            # 处理非 200 状态码的响应
+            logger.error(f"服务 {service_url} 返回非成功状态码: {response.status_code}")
+            return {
+                "status": "error",
+                "code": response.status_code,
+                "message": f"服务请求失败: {response.reason_phrase}"
+            }
     except httpx.RequestError as e:
         logger.error(f"发送请求到服务 {service_url} 网络错误: {str(e)}")
         return {
@@ -164,13 +299,13 @@ def recognize_intent(message: str, history: Optional[List[Dict[str, str]]] = Non
     # 记录匹配的意图和得分
     intent_scores = {}
     
-    # 1. 基于关键词的意图匹配
-    for intent, keywords in INTENT_MAPPING.items():
+    # 1. 基于关键词的意图匹配：一次扫描得到所有命中的关键词
+    matched = keyword_matcher.match(message)["intent"]
+    for intent in INTENT_MAPPING:
         score = 0
-        for keyword in keywords:
-            if keyword.lower() in message_lower:
-                # 关键词越长，权重越高
-                score += len(keyword) / len(message_lower)
+        for keyword in matched.get(intent, ()):
+            # 关键词越长，权重越高
+            score += len(keyword) / len(message_lower)
         
         if score > 0:
             intent_scores[intent] = score
@@ -182,15 +317,13 @@ def recognize_intent(message: str, history: Optional[List[Dict[str, str]]] = Non
     
     # 3. 基于上下文的意图推断（如果有历史记录）
     if history:
-        recent_intents = []
         for i, h in enumerate(reversed(history[-3:])):  # 考虑最近3条历史记录
             # 简单的假设：如果用户之前询问过某个服务，可能会继续相关问题
-            for intent, keywords in INTENT_MAPPING.items():
-                for keyword in keywords:
-                    if keyword.lower() in h.get("content", "").lower():
-                        # 越近的历史记录权重越高
-                        intent_scores[intent] = intent_scores.get(intent, 0) + 0.2 / (i + 1)
-                        break
+            history_matched = keyword_matcher.match(h.get("content", ""))["intent"]
+            for intent in INTENT_MAPPING:
+                if intent in history_matched:
+                    # 越近的历史记录权重越高
+                    intent_scores[intent] = intent_scores.get(intent, 0) + 0.2 / (i + 1)
     
     # 选择得分最高的意图
     if intent_scores:
@@ -201,8 +334,6 @@ def recognize_intent(message: str, history: Optional[List[Dict[str, str]]] = Non
 
 def recognize_sub_intent(message: str, main_intent: str) -> Optional[str]:
     """识别子意图"""
-    message_lower = message.lower()
-    
     # 根据主意图确定可能的子意图范围
     relevant_sub_intents = {
         "tour_booking": ["booking_info", "new_booking", "booking_modify"],
@@ -213,16 +344,96 @@ def recognize_sub_intent(message: str, main_intent: str) -> Optional[str]:
     # 获取与主意图相关的子意图
     possible_sub_intents = relevant_sub_intents.get(main_intent, [])
     
-    # 匹配子意图
+    # 匹配子意图，按优先顺序返回第一个命中的
+    matched = keyword_matcher.match(message)["sub_intent"]
     for sub_intent in possible_sub_intents:
-        for keyword in SUB_INTENT_MAPPING.get(sub_intent, []):
-            if keyword.lower() in message_lower:
-                return sub_intent
+        if sub_intent in matched:
+            return sub_intent
     
     return None
 
+def _caller_priority(staff_token: Optional[str]) -> int:
+    """按调用方确定排队优先级：携带有效员工令牌的请求优先，与消息内容无关"""
+    if STAFF_TOKEN and staff_token and hmac.compare_digest(staff_token.encode("utf-8"), STAFF_TOKEN.encode("utf-8")):
+        return PRIORITY_INTERNAL
+    return PRIORITY_PUBLIC
+
+async def _admission_lane(message: str, priority: int):
+    """在意图识别通道的并发槽位内识别意图，返回意图和准入通道（目标智能体）
+
+    Raises:
+        AdmissionRejected: 意图识别通道繁忙
+    """
+    async with admission_controller.slot(ROUTER_LANE, priority):
+        agent = await aget_orchestrator_agent()
+        intent = await agent.resolve_intent(message)
+    return intent, INTENT_TO_AGENT.get(intent, "default")
+
+def _admission_rejected_response(e: AdmissionRejected) -> JSONResponse:
+    """未被接纳的请求：队列已满返回429，排队超时返回503，均带Retry-After"""
+    logger.warning(f"请求未被接纳: {str(e)}")
+    status_code = 429 if e.reason == "queue_full" else 503
+    return JSONResponse(
+        status_code=status_code,
+        headers={"Retry-After": str(e.retry_after)},
+        content={
+            "status": "error",
+            "code": status_code,
+            "message": "当前咨询人数较多，请稍后再试。",
+            "data": {
+                "fallback_response": True,
+                "retry_after": e.retry_after,
+                "content": "当前咨询人数较多，请稍后再试。"
+            }
+        }
+    )
+
+def _internal_error_payload() -> Dict[str, Any]:
+    """处理过程中发生异常时的回退内容，避免直接向用户暴露内部错误信息"""
+    return {
+        "status": "error",
+        "code": 500,
+        "message": "处理您的请求时发生错误，请稍后再试。",
+        "data": {
+            "fallback_response": True,
+            "content": "感谢您的提问。我们暂时无法处理您的请求，请稍后再试。"
+        }
+    }
+
+class _SlotRelease:
+    """流式请求的并发槽位归还，只生效一次
+
+    推流结束时和响应结束时（包括客户端在推流开始前断开、事件生成器从未运行的情况）都会调用。
+    """
+
+    def __init__(self, lane: str):
+        self.lane = lane
+        self.started = time.monotonic()
+        self.released = False
+
+    def __call__(self) -> None:
+        if not self.released:
+            self.released = True
+            admission_controller.release(self.lane, time.monotonic() - self.started)
+
+class _AdmittedStreamingResponse(StreamingResponse):
+    """持有并发槽位的流式响应：无论响应如何结束，最终都归还槽位"""
+
+    def __init__(self, content: Any, release: _SlotRelease, **kwargs: Any):
+        super().__init__(content, **kwargs)
+        self.release = release
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.release()
+
 @router.post("/orchestrate")
-async def orchestrate_request(request: RequestMessage) -> Dict[str, Any]:
+async def orchestrate_request(
+    request: RequestMessage,
+    x_museum_staff_token: Optional[str] = Header(None)
+) -> Dict[str, Any]:
     """处理协调请求，调用核心协调智能体进行内部agent调度"""
     try:
         # 1. 记录接收到的请求
@@ -236,11 +447,20 @@ async def orchestrate_request(request: RequestMessage) -> Dict[str, Any]:
             "history": request.history
         }
         
-        # 3. 调用核心协调智能体处理请求
-        logger.info(f"调用核心协调智能体处理请求")
-        agent_response = await orchestrator_agent.process_request(request_data)
+        # 3. 准入控制：意图识别和目标智能体分别限制并发，携带员工令牌的请求优先排队
+        priority = _caller_priority(x_museum_staff_token)
+        try:
+            intent, lane = await _admission_lane(request.message, priority)
+            request_data["intent"] = intent
+            async with admission_controller.slot(lane, priority) as waited:
+                # 4. 调用核心协调智能体处理请求
+                logger.info(f"调用核心协调智能体处理请求, 目标: {lane}, 排队耗时: {waited * 1000:.0f}ms")
+                agent = await aget_orchestrator_agent()
+                agent_response = await agent.process_request(request_data)
+        except AdmissionRejected as e:
+            return _admission_rejected_response(e)
         
-        # 4. 处理核心协调智能体返回的结果
+        # 5. 处理核心协调智能体返回的结果
         if agent_response.get("status") == "success":
             # 成功响应
             logger.info(f"核心协调智能体处理成功，返回结果 {agent_response.get('result', {})}")
@@ -269,16 +489,135 @@ async def orchestrate_request(request: RequestMessage) -> Dict[str, Any]:
             }
     except Exception as e:
         logger.error(f"调用核心协调智能体时发生错误: {str(e)}")
-        # 避免直接向用户暴露内部错误信息
-        return {
-            "status": "error",
-            "code": 500,
-            "message": "处理您的请求时发生错误，请稍后再试。",
-            "data": {
-                "fallback_response": True,
-                "content": "感谢您的提问。我们暂时无法处理您的请求，请稍后再试。"
-            }
-        }
+        return _internal_error_payload()
+
+@router.post("/orchestrate/stream")
+async def orchestrate_request_stream(
+    request: RequestMessage,
+    x_museum_staff_token: Optional[str] = Header(None)
+):
+    """流式处理协调请求（Server-Sent Events）
+    
+    事件顺序：
+    - meta：意图识别与路由信息，在调用智能体之前发送
+    - token：回复的增量文本，可能有多个
+    - done：完整回复和 handled_by；处理失败时改为发送 error 事件
+    """
+    logger.info(f"收到流式请求: user_id={request.user_id}, message={request.message[:100]}...")
+    
+    request_data = {
+        "user_id": request.user_id,
+        "message": request.message,
+        "context": request.context,
+        "history": request.history
+    }
+    priority = _caller_priority(x_museum_staff_token)
+    try:
+        # 在开始推流之前完成准入，未被接纳时仍返回普通的429/503响应
+        try:
+            intent, lane = await _admission_lane(request.message, priority)
+            request_data["intent"] = intent
+            waited = await admission_controller.acquire(lane, priority)
+        except AdmissionRejected as e:
+            return _admission_rejected_response(e)
+    except Exception as e:
+        logger.error(f"流式请求准入时发生错误: {str(e)}")
+        return _internal_error_payload()
+    
+    release = _SlotRelease(lane)
+    try:
+        return _AdmittedStreamingResponse(
+            _orchestrate_events(request_data, lane, waited, release),
+            release,
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    except Exception:
+        release()
+        raise
+
+async def _orchestrate_events(request_data: Dict[str, Any], lane: str, waited: float, release: _SlotRelease):
+    """调用核心协调智能体，并把处理过程编码为SSE事件"""
+    started = time.monotonic()
+    stream = ResponseStream()
+    task = None
+    try:
+        intent = request_data["intent"]
+        yield format_sse("meta", {
+            "intent": intent,
+            "target_service": SERVICE_ROUTING.get(intent),
+            "agent": lane,
+            "queue_wait_ms": round(waited * 1000)
+        })
+        
+        # 任务在流式通道的上下文中创建，智能体生成的增量文本都写入该通道
+        agent = await aget_orchestrator_agent()
+        with stream_scope(stream):
+            task = asyncio.create_task(agent.process_request(request_data))
+        async for event in drain(stream, task):
+            yield format_sse(event["event"], event["data"])
+        
+        agent_response = task.result()
+        if agent_response.get("status") == "success":
+            result = agent_response.get("result", {})
+            response = result.get("response")
+            # 没有经过流式模型的回复（如工具查询结果）整体作为一个分片发送
+            if stream.token_count == 0 and isinstance(response, str) and response:
+                yield format_sse("token", {"delta": response})
+            logger.info(f"流式请求处理完成 - 智能体: {result.get('handled_by')}, 分片数: {stream.token_count}, 耗时: {time.monotonic() - started:.2f}s")
+            yield format_sse("done", {
+                "status": "success",
+                "intent": result.get("intent", intent),
+                "handled_by": result.get("handled_by"),
+                "response": response,
+                "agent_info": agent_response.get("agent_info", {})
+            })
+        else:
+            error_code = agent_response.get("code", 500)
+            logger.error(f"核心协调智能体返回错误: {error_code}, {agent_response.get('message')}")
+            yield format_sse("error", {
+                "status": "error",
+                "code": error_code,
+                "message": agent_response.get("message", "核心协调智能体处理失败"),
+                "data": {
+                    "fallback_response": True,
+                    "content": "感谢您的提问。我们正在处理您的请求，请稍候。"
+                }
+            })
+    except Exception as e:
+        logger.error(f"流式调用核心协调智能体时发生错误: {str(e)}")
+        yield format_sse("error", _internal_error_payload())
+    finally:
+        # 客户端提前断开时取消仍在运行的智能体调用，并尽早归还并发槽位
+        if task is not None and not task.done():
+            task.cancel()
+        release()
+
+@router.get("/admission/stats")
+def get_admission_stats():
+    """获取准入控制统计：各智能体的并发数、队列深度、拒绝/超时次数和排队耗时"""
+    return {"status": "success", "data": admission_controller.get_stats()}
+
+@router.get("/router/stats")
+def get_router_stats():
+    """获取语义路由统计：命中/不确定/不可用次数、向量缓存命中和平均向量化耗时"""
+    semantic_router = get_orchestrator_agent().semantic_router
+    return {"status": "success", "data": semantic_router.get_stats() if semantic_router else {"enabled": False}}
+
+@router.get("/sessions/stats")
+def get_session_stats():
+    """获取会话管理统计：活跃会话数、LRU/空闲淘汰次数等"""
+    return {"status": "success", "data": get_session_manager().get_stats()}
+
+@router.get("/context/stats")
+def get_context_stats():
+    """获取各智能体的提示词token统计：每次模型调用的提示词大小、超预算次数和摘要生成情况"""
+    return {"status": "success", "data": get_context_budget_stats()}
+
+@router.get("/models/stats")
+def get_model_pool_stats():
+    """获取模型池统计：各Ollama节点的进行中请求数、平均延迟、健康状态和摘除情况"""
+    return {"status": "success", "data": get_model_pool().get_stats()}
 
 @router.get("/services")
 def list_services():
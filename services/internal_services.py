@@ -1,9 +1,21 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Header
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
 from datetime import datetime
+import os
 from fastapi import APIRouter, HTTPException, Query
 from utils.data_loader import load_collection_management, load_security_management, load_facility_management, load_administration
+from utils.data_loader import COLLECTION_MANAGEMENT_FILE, SECURITY_MANAGEMENT_FILE
+from utils.data_store import get_data_store
+from utils.response_cache import get_response_cache_stats
+from utils.single_flight import get_single_flight_stats
+from utils.http_cache import get_conditional_cache_stats, conditional_response, make_etag
+from utils.email_tool import get_mail_dispatcher
+from utils.booking_ledger import get_booking_ledger
+from utils.pagination import paginate
+from utils.sensor_store import get_sensor_store, parse_timestamp, parse_interval, parse_aggregates, format_timestamp
+from utils.json_response import static_payload, static_response
+from utils.data_indexes import collection_index, equipment_index, camera_index, collection_text_index
 
 router = APIRouter(prefix="/api/internal", tags=["Internal Management"])
 
@@ -21,6 +33,10 @@ class EnvironmentAlert(BaseModel):
     threshold: float
     status: str
 
+class SensorReadingBatch(BaseModel):
+    # 每项包含 sensor_id、timestamp、value，单条格式错误只影响该条
+    readings: List[Dict[str, Any]]
+
 class MaintenanceRequest(BaseModel):
     equipment_id: str
     location: str
@@ -39,29 +55,28 @@ class ApprovalRequest(BaseModel):
 def list_collections(
     name: Optional[str] = Query(None),
     category: Optional[str] = Query(None),
-    status: Optional[str] = Query(None)
+    status: Optional[str] = Query(None),
+    limit: Optional[int] = Query(None),
+    cursor: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None)
 ):
-    """列出藏品信息，支持筛选"""
-    data = load_collection_management()
-    collections = data.get("collections", [])
+    """列出藏品信息，支持筛选
+    
+    按藏品编号排序，支持 limit/cursor 分页；fields 指定返回的字段（如 fields=collection_id,name），
+    省略 digital_assets、conservation_history 等大字段可以显著减小响应体积。
+    """
+    # 分类和展出状态通过索引定位，名称为模糊匹配，在索引结果上过滤
+    collections = collection_index().filter(category=category, exhibition_status=status)
     
-    # 应用筛选条件
     if name:
         collections = [c for c in collections if name in c["name"]]
-    if category:
-        collections = [c for c in collections if c["category"] == category]
-    if status:
-        collections = [c for c in collections if c["exhibition_status"] == status]
     
-    return {"status": "success", "data": collections}
+    return {"status": "success", **paginate(collections, ("collection_id",), limit, cursor, fields)}
 
 @router.get("/collection/detail/{collection_id}")
 def get_collection_detail(collection_id: str):
     """获取单个藏品的详细信息"""
-    data = load_collection_management()
-    collections = data.get("collections", [])
-    
-    collection = next((c for c in collections if c["collection_id"] == collection_id), None)
+    collection = collection_index().get("collection_id", collection_id)
     
     if collection:
         return {"status": "success", "data": collection}
@@ -72,35 +87,109 @@ def get_collection_detail(collection_id: str):
 def search_collection_info(
     keywords: Optional[str] = Query(None),
     category: Optional[str] = Query(None),
-    period: Optional[str] = Query(None)
+    period: Optional[str] = Query(None),
+    match: str = Query("any", pattern="^(any|all)$")
 ):
-    """搜索藏品信息"""
-    data = load_collection_management()
-    collections = data.get("collections", [])
+    """搜索藏品信息
+    
+    关键词通过全文索引检索（中文按二字切分），多个关键词以空格分隔，
+    match=any 时按相关度排序返回命中任一关键词的藏品，match=all 时要求全部命中。
+    """
+    collections = collection_index().filter(category=category)
     
     # 应用搜索条件
     if keywords:
-        keywords = keywords.lower()
-        collections = [
-            c for c in collections 
-            if keywords in c["name"].lower() or 
-               keywords in c["description"].lower() or 
-               keywords in c["origin"].lower()
-        ]
-    if category:
-        collections = [c for c in collections if c["category"] == category]
+        allowed = {id(c) for c in collections}
+        collections = [c for c, _ in collection_text_index().search(keywords, match=match) if id(c) in allowed]
     if period:
         collections = [c for c in collections if period in c["period"]]
     
     return {"status": "success", "data": collections}
 
+def _latest_reading(store, sensor_id: str, live: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """传感器的最新读数：时间序列存储中的读数与数据文件中的实时读数取较新的一条"""
+    latest = store.latest(sensor_id)
+    if live and live.get("last_update") and (latest is None or parse_timestamp(live["last_update"]) >= latest[0]):
+        return {"value": live.get("value"), "status": live.get("status"), "last_update": live["last_update"]}
+    if latest is None:
+        return {"value": None, "status": None, "last_update": None}
+    return {"value": latest[1], "status": None, "last_update": format_timestamp(latest[0])}
+
 @router.get("/collection/environment")
-def get_environment_monitoring():
-    """获取藏品环境监测数据"""
-    data = load_collection_management()
-    environment_data = data.get("environment_monitoring", {})
+def get_environment_monitoring(
+    location: Optional[str] = Query(None),
+    sensor_type: Optional[str] = Query(None),
+    start: Optional[str] = Query(None),
+    end: Optional[str] = Query(None),
+    interval: Optional[str] = Query(None),
+    aggregates: str = Query("min,max,mean"),
+    if_none_match: Optional[str] = Header(None)
+):
+    """获取藏品环境监测数据，读数来自传感器时间序列存储
+    
+    - 返回各位置每个传感器的最新读数和该位置的告警，location 匹配位置编号或位置名称，sensor_type 匹配传感器类型（如 温度）
+    - 指定 start/end（ISO时间或日期，不含end）时附带该时间范围内的历史读数（列式）
+    - 同时指定 interval（如 15m、1h、1d）时按时间桶降采样，aggregates 为聚合指标（min、max、mean、p50、p95 等）
+    """
+    store = get_sensor_store()
+    try:
+        start_ts = parse_timestamp(start) if start else None
+        end_ts = parse_timestamp(end) if end else None
+        interval_seconds = parse_interval(interval) if interval else None
+        names = parse_aggregates(aggregates)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    history = start_ts is not None or end_ts is not None or interval_seconds is not None
+    max_points = int(os.getenv("MUSEUM_SENSOR_MAX_POINTS", "10000"))
+    
+    etag = make_etag(
+        f"{store.revision()};{get_data_store().fingerprint(COLLECTION_MANAGEMENT_FILE)}",
+        "collection/environment", location, sensor_type, start, end, interval, aggregates
+    )
     
-    return {"status": "success", "data": environment_data}
+    def build() -> Dict[str, Any]:
+        sensors = store.sensors(location, sensor_type)
+        if location and not sensors:
+            raise HTTPException(status_code=404, detail=f"未找到位置 {location} 的环境传感器")
+        snapshot = load_collection_management().get("environment_monitoring", {}).get("locations", [])
+        live = {sensor["sensor_id"]: sensor for loc in snapshot for sensor in loc.get("sensors", [])}
+        alerts = {loc.get("location_id"): loc.get("alerts", []) for loc in snapshot}
+        
+        locations: Dict[str, Dict[str, Any]] = {}
+        for info in sensors:
+            entry = locations.setdefault(info["location_id"], {
+                "location_id": info["location_id"], "name": info["location_name"],
+                "sensors": [], "alerts": alerts.get(info["location_id"], [])
+            })
+            sensor = {"sensor_id": info["sensor_id"], "type": info["type"], "unit": info["unit"],
+                      **_latest_reading(store, info["sensor_id"], live.get(info["sensor_id"]))}
+            if interval_seconds is not None:
+                sensor["aggregates"] = store.aggregate(info["sensor_id"], interval_seconds, names, start_ts, end_ts)
+            elif history:
+                timestamps, values = store.query(info["sensor_id"], start_ts, end_ts)
+                if timestamps.size > max_points:
+                    raise HTTPException(status_code=400, detail=f"时间范围内读数超过 {max_points} 条，请指定 interval 降采样")
+                sensor["readings"] = {"timestamp": [format_timestamp(ts) for ts in timestamps], "value": values.tolist()}
+            entry["sensors"].append(sensor)
+        
+        return {"status": "success", "data": {"locations": list(locations.values())}}
+    
+    return conditional_response(etag, None, build, if_none_match)
+
+@router.post("/collection/environment/readings")
+def ingest_environment_readings(batch: SensorReadingBatch):
+    """批量写入传感器读数（只追加，每个传感器的读数需晚于其已有的最新读数）"""
+    max_rows = int(os.getenv("MUSEUM_SENSOR_INGEST_MAX", "100000"))
+    if len(batch.readings) > max_rows:
+        raise HTTPException(status_code=400, detail=f"单次最多写入 {max_rows} 条读数")
+    
+    result = get_sensor_store().ingest(batch.readings)
+    
+    if result["rejected"] == 0:
+        return {"status": "success", "message": f"已写入 {result['accepted']} 条读数", "data": result}
+    if result["accepted"] == 0:
+        return {"status": "error", "message": "读数均未写入，请查看拒绝原因", "data": result}
+    return {"status": "partial", "message": f"已写入 {result['accepted']} 条读数，拒绝 {result['rejected']} 条", "data": result}
 
 @router.get("/collection/loans")
 def get_loan_requests(status: Optional[str] = Query(None)):
@@ -117,55 +206,79 @@ def get_loan_requests(status: Optional[str] = Query(None)):
 @router.get("/security/camera-list")
 def get_camera_list():
     """获取监控摄像头列表"""
-    data = load_security_management()
-    cameras = data.get("monitoring_system", {}).get("cameras", [])
+    return {"status": "success", "data": list(camera_index().records)}
+
+@router.get("/security/camera/{camera_id}")
+def get_camera_detail(camera_id: str):
+    """获取单个监控摄像头的信息"""
+    camera = camera_index().get("camera_id", camera_id)
     
-    return {"status": "success", "data": cameras}
+    if camera:
+        return {"status": "success", "data": camera}
+    else:
+        raise HTTPException(status_code=404, detail="未找到摄像头信息")
 
 @router.get("/security/incidents")
 def get_security_incidents(
     start_date: Optional[str] = Query(None),
     end_date: Optional[str] = Query(None),
-    status: Optional[str] = Query(None)
+    status: Optional[str] = Query(None),
+    limit: Optional[int] = Query(None),
+    cursor: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None)
 ):
-    """获取安全事件记录"""
+    """获取监控安全事件记录，按发生时间排序，支持 limit/cursor 分页和 fields 字段投影
+    
+    start_date/end_date 可以是日期（YYYY-MM-DD，包含当天）或完整时间。
+    """
     data = load_security_management()
-    incidents = data.get("monitoring_system", {}).get("incident_records", [])
+    incidents = data.get("surveillance", {}).get("incidents", [])
     
-    # 应用筛选条件
+    # 应用筛选条件，按参数的精度截取事件时间后比较
     if start_date:
-        incidents = [i for i in incidents if i["timestamp"] >= start_date]
+        incidents = [i for i in incidents if i["time"][:len(start_date)] >= start_date]
     if end_date:
-        incidents = [i for i in incidents if i["timestamp"] <= end_date]
+        incidents = [i for i in incidents if i["time"][:len(end_date)] <= end_date]
     if status:
         incidents = [i for i in incidents if i["status"] == status]
     
-    return {"status": "success", "data": incidents}
+    return {"status": "success", **paginate(incidents, ("time", "incident_id"), limit, cursor, fields)}
 
 @router.get("/security/emergency-plans")
-def get_emergency_plans():
-    """获取应急预案列表"""
-    data = load_security_management()
-    plans = data.get("emergency_response", {}).get("emergency_plans", [])
-    
-    return {"status": "success", "data": plans}
+def get_emergency_plans(if_none_match: Optional[str] = Header(None)):
+    """获取应急预案列表（预编码响应，数据文件更新后才重新编码，支持ETag）"""
+    payload = static_payload(
+        SECURITY_MANAGEMENT_FILE, "emergency_plans",
+        lambda data: {"status": "success", "data": data.get("emergency_response", {}).get("emergency_plans", [])}
+    )
+    return static_response(payload, if_none_match)
 
 # 设施管理服务
 @router.get("/facility/equipment")
 def list_equipment(
     equipment_type: Optional[str] = Query(None),
-    status: Optional[str] = Query(None)
+    status: Optional[str] = Query(None),
+    limit: Optional[int] = Query(None),
+    cursor: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None)
 ):
-    """列出设施设备信息"""
-    data = load_facility_management()
-    equipment = data.get("equipment_management", {}).get("equipment", [])
+    """列出设施设备信息，按设备编号排序，支持 limit/cursor 分页和 fields 字段投影"""
+    equipment = equipment_index().filter(type=equipment_type)
     
-    if equipment_type:
-        equipment = [e for e in equipment if e["type"] == equipment_type]
     if status:
         equipment = [e for e in equipment if e["status"] == status]
     
-    return {"status": "success", "data": equipment}
+    return {"status": "success", **paginate(equipment, ("equipment_id",), limit, cursor, fields)}
+
+@router.get("/facility/equipment/{equipment_id}")
+def get_equipment_detail(equipment_id: str):
+    """获取单个设备的详细信息"""
+    equipment = equipment_index().get("equipment_id", equipment_id)
+    
+    if equipment:
+        return {"status": "success", "data": equipment}
+    else:
+        raise HTTPException(status_code=404, detail="未找到设备信息")
 
 @router.post("/facility/maintenance-request")
 def create_maintenance_request(request: MaintenanceRequest):
@@ -187,21 +300,31 @@ def create_maintenance_request(request: MaintenanceRequest):
 def get_energy_consumption(
     start_date: Optional[str] = Query(None),
     end_date: Optional[str] = Query(None),
-    area: Optional[str] = Query(None)
+    area: Optional[str] = Query(None),
+    limit: Optional[int] = Query(None),
+    cursor: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None)
 ):
-    """获取能耗数据"""
-    data = load_facility_management()
-    energy_data = data.get("energy_management", {}).get("consumption_data", [])
+    """获取能耗数据
     
-    # 应用筛选条件
-    if start_date:
-        energy_data = [e for e in energy_data if e["date"] >= start_date]
-    if end_date:
-        energy_data = [e for e in energy_data if e["date"] <= end_date]
+    summary 为全馆当日的用电、用水、用气汇总，data 为各区域的能耗，按区域编号排序，
+    支持 limit/cursor 分页和 fields 字段投影；area 可以是区域编号或区域名称。
+    日期不在 start_date/end_date 范围内时两者都为空。
+    """
+    energy = load_facility_management().get("energy_management", {})
+    consumption = energy.get("consumption", {})
+    date = consumption.get("date", "")
+    in_range = (not start_date or date >= start_date) and (not end_date or date <= end_date)
+    
+    zones = [{"date": date, **zone} for zone in energy.get("zones", [])] if in_range else []
     if area:
-        energy_data = [e for e in energy_data if e["area"] == area]
+        zones = [z for z in zones if area in (z["zone_id"], z["name"])]
     
-    return {"status": "success", "data": energy_data}
+    return {
+        "status": "success",
+        "summary": consumption if in_range else None,
+        **paginate(zones, ("zone_id",), limit, cursor, fields)
+    }
 
 # 行政助理服务
 @router.post("/administration/approval")
@@ -283,9 +406,58 @@ def get_exhibition_popularity():
     exhibitions = info_data.get("exhibitions", [])
     
     # 为每个展览添加模拟的 popularity 数据
+    # 缓存数据是只读视图，这里基于副本补充统计字段
+    popularity = []
     for i, exhibition in enumerate(exhibitions):
-        exhibition["visitors_count"] = 5000 + i * 2000
-        exhibition["average_stay_time"] = 45 + i * 10
-        exhibition["satisfaction_rate"] = 0.92 - i * 0.03
+        popularity.append({
+            **exhibition,
+            "visitors_count": 5000 + i * 2000,
+            "average_stay_time": 45 + i * 10,
+            "satisfaction_rate": 0.92 - i * 0.03
+        })
     
-    return {"status": "success", "data": exhibitions}
\ No newline at end of file
+    return {"status": "success", "data": popularity}
+
+# 系统运行状态
+@router.get("/system/data-cache")
+def get_data_cache_stats():
+    """获取数据缓存的命中/未命中/重新加载统计"""
+    return {"status": "success", "data": get_data_store().get_stats()}
+
+@router.get("/system/response-cache")
+def get_response_cache_stats_endpoint():
+    """获取问答回答缓存的命中率、各类命中次数和节省的生成耗时"""
+    return {"status": "success", "data": get_response_cache_stats()}
+
+@router.get("/system/single-flight")
+def get_single_flight_stats_endpoint():
+    """获取请求合并统计：服务调用和模型调用中被合并的并发相同请求数"""
+    return {"status": "success", "data": get_single_flight_stats()}
+
+@router.get("/system/http-cache")
+def get_http_cache_stats():
+    """获取智能体HTTP客户端条件请求缓存统计：携带ETag的请求数、304重新验证命中数和缓存条目数"""
+    return {"status": "success", "data": get_conditional_cache_stats()}
+
+@router.get("/system/sensor-store")
+def get_sensor_store_stats():
+    """获取传感器时间序列存储统计：传感器数、读数总数、数据块数以及写入、查询和降采样次数"""
+    return {"status": "success", "data": get_sensor_store().get_stats()}
+
+@router.get("/system/mail")
+def get_mail_stats():
+    """获取邮件投递统计：待发送、已发送、重试和失败数量以及SMTP连接情况"""
+    return {"status": "success", "data": get_mail_dispatcher().get_stats()}
+
+@router.get("/system/mail/{message_id}")
+def get_mail_status(message_id: str):
+    """按邮件ID查询投递状态"""
+    status = get_mail_dispatcher().status(message_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="邮件不存在或状态记录已过期")
+    return {"status": "success", "data": status}
+
+@router.get("/system/booking-ledger")
+def get_booking_ledger_stats():
+    """获取预约台账统计：预约成功数、预留票数、因余票不足或时段无效被拒绝的次数"""
+    return {"status": "success", "data": get_booking_ledger().get_stats()}
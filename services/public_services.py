@@ -1,11 +1,17 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Header
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Literal
 from datetime import datetime
-import json
 import os
 from fastapi import APIRouter, HTTPException, Query
-from utils.data_loader import load_pre_visit_booking, load_pre_visit_information, load_on_visit_services, load_post_visit_services, load_public_info
+from utils.data_loader import load_pre_visit_information, load_on_visit_services, load_post_visit_services
+from utils.data_loader import PUBLIC_INFO_FILE, PRE_VISIT_INFORMATION_FILE
+from utils.data_indexes import membership_index, exhibition_text_index
+from utils.booking_ledger import get_booking_ledger, BookingRejected, BATCH_ALL_OR_NOTHING
+from utils.pagination import paginate
+from utils.json_response import static_payload
+from utils.http_cache import conditional_response, dataset_version, make_etag
+from utils.data_store import get_data_store
 
 router = APIRouter(prefix="/api/public", tags=["Public Services"])
 
@@ -18,6 +24,11 @@ class BookingCreate(BaseModel):
     ticket_type: str
     ticket_count: int
 
+class BookingBatchCreate(BaseModel):
+    # 逐行在台账中校验，单行格式错误只影响该行的结果
+    bookings: List[Dict[str, Any]]
+    mode: Literal["all_or_nothing", "best_effort"] = BATCH_ALL_OR_NOTHING
+
 class FeedbackCreate(BaseModel):
     visitor_id: str
     content: str
@@ -30,45 +41,69 @@ class QARequest(BaseModel):
 
 # 导览与预约服务
 @router.get("/tour-booking/bookings")
-def get_bookings(phone: Optional[str] = Query(None)):
-    """获取预约记录，可以通过手机号筛选"""
-    data = load_pre_visit_booking()
-    bookings = data.get("bookings", [])
-    
-    if phone:
-        bookings = [b for b in bookings if b["visitor_phone"] == phone]
+def get_bookings(
+    phone: Optional[str] = Query(None),
+    limit: Optional[int] = Query(None),
+    cursor: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None)
+):
+    """获取预约记录，可以通过手机号筛选，按预约编号排序，支持 limit/cursor 分页和 fields 字段投影"""
+    bookings = get_booking_ledger().find(phone)
     
-    return {"status": "success", "data": bookings}
+    return {"status": "success", **paginate(bookings, ("booking_id",), limit, cursor, fields)}
 
 @router.post("/tour-booking/create")
 def create_booking(booking: BookingCreate):
-    """创建新的预约"""
-    # 在实际应用中，这里会更新数据库
-    # 为了演示，我们只返回创建成功的信息
-    new_booking = {
-        "booking_id": f"BK{datetime.now().strftime('%Y%m%d%H%M%S')}",
-        "visitor_name": booking.visitor_name,
-        "visitor_phone": booking.visitor_phone,
-        "visit_date": booking.visit_date,
-        "visit_time": booking.visit_time,
-        "ticket_type": booking.ticket_type,
-        "ticket_count": booking.ticket_count,
-        "status": "已预约",
-        "created_at": datetime.now().isoformat() + "Z"
-    }
+    """创建新的预约，在预约台账中原子地扣减该时段的余票，余票不足时返回409"""
+    try:
+        new_booking = get_booking_ledger().reserve(booking.model_dump())
+    except BookingRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     
     return {"status": "success", "message": "预约创建成功", "data": new_booking}
 
+@router.post("/tour-booking/batch-create")
+def create_booking_batch(batch: BookingBatchCreate):
+    """批量创建预约（团体、学校参观）
+    
+    all_or_nothing：任一行无效或任一时段余票不足时整批不预约；best_effort：按顺序逐行预约，放不下的行单独拒绝。
+    返回每一行的预约结果。
+    """
+    max_rows = int(os.getenv("MUSEUM_BOOKING_BATCH_MAX", "1000"))
+    if not batch.bookings:
+        raise HTTPException(status_code=400, detail="预约列表不能为空")
+    if len(batch.bookings) > max_rows:
+        raise HTTPException(status_code=400, detail=f"单次最多批量预约 {max_rows} 条")
+    
+    result = get_booking_ledger().reserve_batch(batch.bookings, batch.mode)
+    
+    if result["rejected"] == 0:
+        return {"status": "success", "message": f"批量预约成功，共 {result['accepted']} 条", "data": result}
+    if result["accepted"] == 0:
+        return {"status": "error", "message": "批量预约未成功，请查看每条预约的原因", "data": result}
+    return {"status": "partial", "message": f"部分预约成功：成功 {result['accepted']} 条，失败 {result['rejected']} 条", "data": result}
+
 @router.get("/tour-booking/available-slots")
-def get_available_slots(date: Optional[str] = Query(None)):
-    """获取可用的预约时段"""
-    data = load_pre_visit_booking()
-    slots = data.get("available_slots", [])
+def get_available_slots(
+    date: Optional[str] = Query(None),
+    limit: Optional[int] = Query(None),
+    cursor: Optional[str] = Query(None),
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None)
+):
+    """获取可用的预约时段，余票来自预约台账的内存余票表，按日期分页（每条记录为一天）
     
-    if date:
-        slots = [s for s in slots if s["date"] == date]
+    ETag由余票表的版本和查询参数生成，余票未变化时条件请求返回304。
+    """
+    ledger = get_booking_ledger()
+    version, last_modified = ledger.capacity_version()
+    etag = make_etag(version, "available-slots", date, limit, cursor)
     
-    return {"status": "success", "data": slots}
+    return conditional_response(
+        etag, last_modified,
+        lambda: {"status": "success", **paginate(ledger.available_slots(date), ("date",), limit, cursor)},
+        if_none_match, if_modified_since
+    )
 
 # 咨询问答服务
 @router.post("/qa")
@@ -97,66 +132,89 @@ def ask_question(qa_request: QARequest):
     return {"status": "success", "question": qa_request.question, "answer": answer}
 
 @router.get("/qa/specific/museum/staff")
-def get_museum_staff():
-    """获取博物馆公开公众人物信息"""
-    # 从信息数据中获取公众人物信息
-    info_data = load_public_info()
-    staff = info_data.get("staff", [])
+def get_museum_staff(
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None)
+):
+    """获取博物馆公开公众人物信息
     
-    return {"status": "success", "data": staff}
+    预编码响应，数据文件更新后才重新编码；支持 If-None-Match / If-Modified-Since 条件请求，数据未变化时返回304
+    """
+    payload = static_payload(PUBLIC_INFO_FILE, "museum_staff", lambda data: {"status": "success", "data": data.get("staff", [])})
+    last_modified = get_data_store().last_modified(PUBLIC_INFO_FILE)
+    return conditional_response(payload.etag, last_modified, payload.body, if_none_match, if_modified_since)
 
 @router.get("/qa/specific/museum/vendors")
-def get_museum_vendors():
-    """获取博物馆公开公众人物信息"""
-    # 从信息数据中获取公众人物信息
-    info_data = load_public_info()
-    vendors = info_data.get("vendors", [])
+def get_museum_vendors(
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None)
+):
+    """获取博物馆公开公众人物信息
     
-    return {"status": "success", "data": vendors}
+    预编码响应，数据文件更新后才重新编码；支持 If-None-Match / If-Modified-Since 条件请求，数据未变化时返回304
+    """
+    payload = static_payload(PUBLIC_INFO_FILE, "museum_vendors", lambda data: {"status": "success", "data": data.get("vendors", [])})
+    last_modified = get_data_store().last_modified(PUBLIC_INFO_FILE)
+    return conditional_response(payload.etag, last_modified, payload.body, if_none_match, if_modified_since)
 
 @router.get("/qa/specific/museum/architecture")
-def get_museum_architecture():
-    """获取博物馆公开架构信息"""
-    # 从信息数据中获取公众人物信息
-    info_data = load_public_info()
-    architecture = info_data.get("architecture", [])
+def get_museum_architecture(
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None)
+):
+    """获取博物馆公开架构信息
     
-    return {"status": "success", "data": architecture}
+    预编码响应，数据文件更新后才重新编码；支持 If-None-Match / If-Modified-Since 条件请求，数据未变化时返回304
+    """
+    payload = static_payload(PUBLIC_INFO_FILE, "museum_architecture", lambda data: {"status": "success", "data": data.get("architecture", [])})
+    last_modified = get_data_store().last_modified(PUBLIC_INFO_FILE)
+    return conditional_response(payload.etag, last_modified, payload.body, if_none_match, if_modified_since)
 
 @router.get("/qa/specific/museum/history")
-def get_museum_history():
-    """获取博物馆公开历史信息"""
-    # 从信息数据中获取公众人物信息
-    info_data = load_public_info()
-    history = info_data.get("history", [])
+def get_museum_history(
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None)
+):
+    """获取博物馆公开历史信息
     
-    return {"status": "success", "data": history}
+    预编码响应，数据文件更新后才重新编码；支持 If-None-Match / If-Modified-Since 条件请求，数据未变化时返回304
+    """
+    payload = static_payload(PUBLIC_INFO_FILE, "museum_history", lambda data: {"status": "success", "data": data.get("history", [])})
+    last_modified = get_data_store().last_modified(PUBLIC_INFO_FILE)
+    return conditional_response(payload.etag, last_modified, payload.body, if_none_match, if_modified_since)
 
 @router.get("/qa/exhibitions/search")
 def search_exhibitions(
     keywords: Optional[str] = Query(None),
     status: Optional[str] = Query(None),
-    start_date: Optional[str] = Query(None)
+    start_date: Optional[str] = Query(None),
+    match: str = Query("any", pattern="^(any|all)$"),
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None)
 ):
-    """搜索展览信息"""
-    info_data = load_pre_visit_information()
-    exhibitions = info_data.get("exhibitions", [])
+    """搜索展览信息
     
-    # 应用搜索条件
-    if keywords:
-        keywords = keywords.lower()
-        exhibitions = [
-            e for e in exhibitions 
-            if keywords in e["title"].lower() or 
-               keywords in e["description"].lower() or 
-               keywords in e["subtitle"].lower()
-        ]
-    if status:
-        exhibitions = [e for e in exhibitions if e["status"] == status]
-    if start_date:
-        exhibitions = [e for e in exhibitions if e["start_date"] >= start_date]
-    
-    return {"status": "success", "data": exhibitions}
+    关键词通过全文索引检索，结果按相关度排序；match=all 时要求所有关键词都命中。
+    ETag由展览数据文件的版本和查询参数生成，数据未变化时条件请求返回304，不再重复检索和编码。
+    """
+    version, last_modified = dataset_version(PRE_VISIT_INFORMATION_FILE)
+    etag = make_etag(version, "exhibitions/search", keywords, status, start_date, match)
+    
+    def build() -> Dict[str, Any]:
+        info_data = load_pre_visit_information()
+        exhibitions = info_data.get("exhibitions", [])
+        
+        # 应用搜索条件
+        if keywords:
+            exhibitions = [e for e, _ in exhibition_text_index().search(keywords, match=match)]
+        if status:
+            exhibitions = [e for e in exhibitions if e["status"] == status]
+        if start_date:
+            exhibitions = [e for e in exhibitions if e["start_date"] >= start_date]
+        
+        return {"status": "success", "data": exhibitions}
+    
+    return conditional_response(etag, last_modified, build, if_none_match, if_modified_since)
 
 # 便民服务
 @router.get("/facility-services/locations")
@@ -176,13 +234,17 @@ def get_locations(type: Optional[str] = Query(None)):
     return {"status": "success", "data": locations}
 
 @router.get("/facility-services/lost-found")
-def get_lost_found():
-    """获取失物招领信息"""
+def get_lost_found(
+    limit: Optional[int] = Query(None),
+    cursor: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None)
+):
+    """获取失物招领信息，按物品编号排序，支持 limit/cursor 分页和 fields 字段投影"""
     # 从服务中数据获取失物招领信息
     on_visit_data = load_on_visit_services()
-    lost_found = on_visit_data.get("facility_services", {}).get("lost_found", [])
+    lost_found = on_visit_data.get("facility_services", {}).get("lost_and_found", [])
     
-    return {"status": "success", "data": lost_found}
+    return {"status": "success", **paginate(lost_found, ("item_id",), limit, cursor, fields)}
 
 # 反馈处理服务
 @router.post("/feedback")
@@ -212,12 +274,8 @@ def submit_feedback(feedback: FeedbackCreate):
 # 游客服务后 - 会员与社区
 @router.get("/post-visit/membership")
 def get_membership_info(visitor_id: str):
-    """获取会员信息"""
-    post_visit_data = load_post_visit_services()
-    membership = post_visit_data.get("membership", [])
-    
-    # 查找特定游客的会员信息
-    member_info = next((m for m in membership if m["visitor_id"] == visitor_id), None)
+    """获取会员信息，visitor_id 为会员编号（member_id）"""
+    member_info = membership_index().get("member_id", visitor_id)
     
     if member_info:
         return {"status": "success", "data": member_info}
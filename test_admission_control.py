@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+
+from utils.admission_control import AdmissionController, AdmissionRejected, PRIORITY_INTERNAL, PRIORITY_PUBLIC
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_admits_up_to_concurrency_without_waiting():
+    async def scenario():
+        controller = AdmissionController(default_concurrency=2, default_max_queue=2)
+        assert await controller.acquire("QAAgent") == 0.0
+        assert await controller.acquire("QAAgent") == 0.0
+        lane = controller.get_stats()["lanes"]["QAAgent"]
+        assert lane["active"] == 2 and lane["queue_depth"] == 0
+
+    run(scenario())
+
+
+def test_queue_full_is_rejected_with_retry_after():
+    async def scenario():
+        controller = AdmissionController(default_concurrency=1, default_max_queue=1, queue_timeout=5)
+        await controller.acquire("QAAgent")
+        waiter = asyncio.ensure_future(controller.acquire("QAAgent"))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as excinfo:
+            await controller.acquire("QAAgent")
+        assert excinfo.value.reason == "queue_full"
+        assert excinfo.value.retry_after >= 1
+
+        controller.release("QAAgent", 0.1)
+        await waiter
+        assert controller.get_stats()["lanes"]["QAAgent"]["rejected"] == 1
+
+    run(scenario())
+
+
+def test_queued_request_times_out_at_deadline():
+    async def scenario():
+        controller = AdmissionController(default_concurrency=1, default_max_queue=4, queue_timeout=0.05)
+        await controller.acquire("QAAgent")
+        with pytest.raises(AdmissionRejected) as excinfo:
+            await controller.acquire("QAAgent")
+        assert excinfo.value.reason == "deadline"
+        lane = controller.get_stats()["lanes"]["QAAgent"]
+        assert lane["timed_out"] == 1 and lane["queue_depth"] == 0
+
+    run(scenario())
+
+
+def test_internal_priority_is_dequeued_first():
+    async def scenario():
+        controller = AdmissionController(default_concurrency=1, default_max_queue=4, queue_timeout=5)
+        await controller.acquire("QAAgent")
+        order = []
+
+        async def request(name, priority):
+            async with controller.slot("QAAgent", priority):
+                order.append(name)
+
+        tasks = [
+            asyncio.ensure_future(request("public-1", PRIORITY_PUBLIC)),
+            asyncio.ensure_future(request("public-2", PRIORITY_PUBLIC)),
+            asyncio.ensure_future(request("staff", PRIORITY_INTERNAL)),
+        ]
+        await asyncio.sleep(0)
+        controller.release("QAAgent")
+        await asyncio.gather(*tasks)
+        assert order == ["staff", "public-1", "public-2"]
+        assert controller.get_stats()["lanes"]["QAAgent"]["active"] == 0
+
+    run(scenario())
+
+
+def test_lanes_are_independent():
+    async def scenario():
+        controller = AdmissionController(default_concurrency=1, default_max_queue=0, limits={"IntentRouter": 2})
+        await controller.acquire("QAAgent")
+        # 其他智能体的通道不受影响
+        assert await controller.acquire("TourBookingAgent") == 0.0
+        await controller.acquire("IntentRouter")
+        assert await controller.acquire("IntentRouter") == 0.0
+        with pytest.raises(AdmissionRejected):
+            await controller.acquire("QAAgent")
+
+    run(scenario())
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        controller = AdmissionController(default_concurrency=1, default_max_queue=4, queue_timeout=5)
+        await controller.acquire("QAAgent")
+        waiter = asyncio.ensure_future(controller.acquire("QAAgent"))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        controller.release("QAAgent")
+        lane = controller.get_stats()["lanes"]["QAAgent"]
+        assert lane["active"] == 0 and lane["queue_depth"] == 0
+
+    run(scenario())
+
+
+def test_rejected_request_returns_429_or_503():
+    core = pytest.importorskip("services.core_orchestrator", exc_type=ImportError)
+    full = core._admission_rejected_response(AdmissionRejected("QAAgent", "queue_full", 3))
+    assert full.status_code == 429 and full.headers["Retry-After"] == "3"
+    late = core._admission_rejected_response(AdmissionRejected("QAAgent", "deadline", 2))
+    assert late.status_code == 503
+
+
+def test_queue_priority_comes_from_staff_token(monkeypatch):
+    core = pytest.importorskip("services.core_orchestrator", exc_type=ImportError)
+    monkeypatch.setattr(core, "STAFF_TOKEN", "secret")
+    assert core._caller_priority("secret") == PRIORITY_INTERNAL
+    assert core._caller_priority("wrong") == PRIORITY_PUBLIC
+    assert core._caller_priority(None) == PRIORITY_PUBLIC
+    monkeypatch.setattr(core, "STAFF_TOKEN", "")
+    assert core._caller_priority("") == PRIORITY_PUBLIC
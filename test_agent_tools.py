@@ -0,0 +1,74 @@
+import asyncio
+import inspect
+
+import pytest
+
+pytest.importorskip("agentscope")
+
+from services.internal_services import router as internal_router
+from services.public_services import router as public_router
+from utils.agent_tools import MuseumToolkit
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+# 每个工具方法都保留同名的同步版本，并提供 a 前缀的异步版本
+_METHODS = [
+    ("get_booking_info", ("13800000000",)),
+    ("ask_question", ("开放时间",)),
+    ("get_collection_info", ()),
+    ("get_museum_staff", ()),
+    ("get_museum_vendor", ()),
+    ("get_museum_architecture", ()),
+    ("get_museum_history", ()),
+]
+
+
+@pytest.fixture
+def inprocess_toolkit():
+    previous = MuseumToolkit._transport
+    MuseumToolkit.configure_transport("inprocess", [public_router, internal_router])
+    try:
+        yield MuseumToolkit
+    finally:
+        MuseumToolkit._transport = previous
+
+
+def test_sync_methods_keep_original_names():
+    for name, _ in _METHODS + [("create_booking", ()), ("create_group_booking", ()), ("submit_feedback", ())]:
+        assert not inspect.iscoroutinefunction(getattr(MuseumToolkit, name)), name
+        assert inspect.iscoroutinefunction(getattr(MuseumToolkit, "a" + name)), name
+
+
+@pytest.mark.parametrize("name,args", _METHODS)
+def test_sync_and_async_variants_return_same_result(inprocess_toolkit, name, args):
+    sync_result = getattr(inprocess_toolkit, name)(*args)
+    async_result = run(getattr(inprocess_toolkit, "a" + name)(*args))
+
+    assert sync_result == async_result
+    assert sync_result.get("status") != "error"
+
+
+def test_sync_and_async_create_booking(inprocess_toolkit):
+    slots = inprocess_toolkit.call_service("/api/public/tour-booking/available-slots")
+    day = slots["data"][0]
+    booking = {
+        "visitor_name": "张三",
+        "visitor_phone": "13900000001",
+        "visit_date": day["date"],
+        "visit_time": day["time_slots"][0]["time"],
+        "ticket_type": "成人票",
+        "ticket_count": 1,
+    }
+
+    created = inprocess_toolkit.create_booking(booking)
+    acreated = run(inprocess_toolkit.acreate_booking(dict(booking, visitor_phone="13900000002")))
+
+    assert created.get("status") != "error" and acreated.get("status") != "error"
+    assert created["data"]["booking_id"] != acreated["data"]["booking_id"]
+    found = inprocess_toolkit.get_booking_info("13900000001")["data"]
+    assert [b["booking_id"] for b in found] == [created["data"]["booking_id"]]
+    afound = run(inprocess_toolkit.aget_booking_info("13900000002"))["data"]
+    assert [b["booking_id"] for b in afound] == [acreated["data"]["booking_id"]]
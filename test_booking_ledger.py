@@ -0,0 +1,103 @@
+import threading
+
+import pytest
+
+from utils.booking_ledger import BATCH_ALL_OR_NOTHING, BATCH_BEST_EFFORT, BookingLedger, BookingRejected
+
+
+def _booking(date, time_slot, count=1, phone="13800000000"):
+    return {"visitor_name": "测试", "visitor_phone": phone, "visit_date": date, "visit_time": time_slot,
+            "ticket_type": "成人票", "ticket_count": count}
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    return BookingLedger(str(tmp_path / "bookings.sqlite3"))
+
+
+def _first_slot(ledger):
+    day = ledger.available_slots()[0]
+    slot = day["time_slots"][0]
+    return day["date"], slot["time"], slot["available"]
+
+
+def _available(ledger, date, time_slot):
+    day = ledger.available_slots(date)[0]
+    return next(slot["available"] for slot in day["time_slots"] if slot["time"] == time_slot)
+
+
+def test_concurrent_reserve_does_not_oversell(ledger, tmp_path):
+    date, time_slot, available = _first_slot(ledger)
+    # 第二个实例使用独立的连接，模拟另一个工作进程
+    other = BookingLedger(ledger.db_path)
+    outcomes = []
+    outcomes_lock = threading.Lock()
+
+    def worker(target, index):
+        try:
+            record = target.reserve(_booking(date, time_slot, phone=f"139{index:08d}"))
+            outcome = record["booking_id"]
+        except BookingRejected as e:
+            outcome = e.reason
+        with outcomes_lock:
+            outcomes.append(outcome)
+
+    threads = [threading.Thread(target=worker, args=(ledger if index % 2 else other, index))
+               for index in range(available + 10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    booking_ids = [outcome for outcome in outcomes if outcome.startswith("BK")]
+    assert len(booking_ids) == available
+    assert len(set(booking_ids)) == available
+    assert outcomes.count("insufficient_capacity") == 10
+    assert _available(ledger, date, time_slot) == 0
+    assert _available(other, date, time_slot) == 0
+
+
+def test_reserve_rejects_unknown_slot_and_invalid_count(ledger):
+    date, time_slot, _ = _first_slot(ledger)
+    with pytest.raises(BookingRejected) as excinfo:
+        ledger.reserve(_booking(date, "23:00-24:00"))
+    assert excinfo.value.reason == "slot_not_found" and excinfo.value.status_code == 404
+
+    with pytest.raises(BookingRejected) as excinfo:
+        ledger.reserve(_booking(date, time_slot, count=2 ** 70))
+    assert excinfo.value.reason == "invalid_ticket_count" and excinfo.value.status_code == 400
+
+
+def test_batch_all_or_nothing_rejects_whole_batch_on_shortage(ledger):
+    date, time_slot, available = _first_slot(ledger)
+    rows = [_booking(date, time_slot, count=available), _booking(date, time_slot, count=1)]
+    result = ledger.reserve_batch(rows, BATCH_ALL_OR_NOTHING)
+    assert result["accepted"] == 0 and result["rejected"] == 2
+    assert {item["reason"] for item in result["results"]} == {"insufficient_capacity"}
+    assert _available(ledger, date, time_slot) == available
+    assert ledger.find("13800000000") == []
+
+
+def test_batch_all_or_nothing_rejects_on_invalid_row(ledger):
+    date, time_slot, available = _first_slot(ledger)
+    rows = [_booking(date, time_slot, count=1), _booking(date, time_slot, count=2 ** 70)]
+    result = ledger.reserve_batch(rows, BATCH_ALL_OR_NOTHING)
+    assert result["accepted"] == 0
+    assert result["results"][0]["reason"] == "batch_rejected"
+    assert result["results"][1]["reason"] == "invalid"
+    assert _available(ledger, date, time_slot) == available
+
+
+def test_batch_best_effort_allocates_in_order(ledger):
+    date, time_slot, available = _first_slot(ledger)
+    rows = [_booking(date, time_slot, count=available - 1), _booking(date, time_slot, count=2),
+            _booking(date, time_slot, count=1), _booking(date, "23:00-24:00")]
+    result = ledger.reserve_batch(rows, BATCH_BEST_EFFORT)
+    assert [item["status"] for item in result["results"]] == ["reserved", "rejected", "reserved", "rejected"]
+    assert result["results"][1]["reason"] == "insufficient_capacity"
+    assert result["results"][3]["reason"] == "slot_not_found"
+    assert _available(ledger, date, time_slot) == 0
+
+    booking_ids = [item["booking"]["booking_id"] for item in result["results"] if item["status"] == "reserved"]
+    assert len(set(booking_ids)) == 2
+    assert all(ledger.get(booking_id) is not None for booking_id in booking_ids)
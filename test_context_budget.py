@@ -0,0 +1,136 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("agentscope")
+
+from agentscope.message import Msg
+
+from utils.context_budget import BudgetedFormatter, ContextBudget
+from utils.session_manager import SessionManager, SessionScopedMemory
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class _EchoFormatter:
+    """记录实际送入格式化的消息"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def format(self, msgs, **kwargs):
+        self.calls.append(list(msgs))
+        return [{"role": msg.role, "content": msg.content} for msg in msgs]
+
+
+class _SummaryModel:
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self, messages):
+        self.calls += 1
+        return SimpleNamespace(content="游客张三想预约五一的门票")
+
+
+def _turns(count, size=200):
+    messages = []
+    for index in range(count):
+        messages.append(Msg("visitor", f"问题{index}" + "问" * size, "user"))
+        messages.append(Msg("QAAgent", f"回答{index}" + "答" * size, "assistant"))
+    return messages
+
+
+def _memory(max_tokens=1000, keep_turns=2, model=None):
+    memory = SessionScopedMemory("QAAgent", max_messages=100)
+    memory.budget = ContextBudget("QAAgent", max_tokens=max_tokens, keep_turns=keep_turns, model=model)
+    return memory
+
+
+def test_get_memory_returns_full_history_without_counting_calls():
+    memory = _memory()
+
+    async def scenario():
+        await memory.add(_turns(6))
+        first = await memory.get_memory()
+        second = await memory.get_memory()
+        return first, second
+
+    first, second = run(scenario())
+
+    assert len(first) == len(second) == 12
+    assert memory.budget.get_stats()["calls"] == 0
+
+
+def test_formatter_trims_history_to_recent_turns():
+    memory = _memory(max_tokens=1000, keep_turns=2)
+    inner = _EchoFormatter()
+    formatter = BudgetedFormatter(inner, memory)
+
+    async def scenario():
+        await memory.add(_turns(6))
+        system = Msg("system", "你是博物馆咨询助手", "system")
+        return await formatter.format([system, *await memory.get_memory()])
+
+    prompt = run(scenario())
+
+    # 系统提示词保留在最前面，只保留最近2轮对话
+    assert prompt[0] == {"role": "system", "content": "你是博物馆咨询助手"}
+    assert [m["content"][:3] for m in prompt[1:]] == ["问题4", "回答4", "问题5", "回答5"]
+    stats = memory.budget.get_stats()
+    assert stats["calls"] == 1 and stats["over_budget"] == 1 and stats["tokens_saved"] > 0
+
+
+def test_history_within_budget_is_sent_unchanged():
+    memory = _memory(max_tokens=100000)
+    formatter = BudgetedFormatter(_EchoFormatter(), memory)
+
+    async def scenario():
+        await memory.add(_turns(3, size=10))
+        return await formatter.format(await memory.get_memory())
+
+    assert len(run(scenario())) == 6
+    assert memory.budget.get_stats()["over_budget"] == 0
+
+
+def test_older_turns_are_replaced_by_summary():
+    model = _SummaryModel()
+    memory = _memory(max_tokens=1000, keep_turns=2, model=model)
+    formatter = BudgetedFormatter(_EchoFormatter(), memory)
+
+    async def scenario():
+        await memory.add(_turns(6))
+        await formatter.format(await memory.get_memory())
+        # 摘要在后台生成，等待其完成后再组装下一次提示词
+        await memory._default_summary.task
+        return await formatter.format(await memory.get_memory())
+
+    prompt = run(scenario())
+
+    assert model.calls == 1
+    assert prompt[0]["role"] == "system" and "游客张三想预约五一的门票" in prompt[0]["content"]
+    assert [m["content"][:3] for m in prompt[1:]] == ["问题4", "回答4", "问题5", "回答5"]
+
+
+def test_summaries_are_kept_per_session():
+    model = _SummaryModel()
+    memory = _memory(max_tokens=1000, keep_turns=2, model=model)
+    formatter = BudgetedFormatter(_EchoFormatter(), memory)
+    sessions = SessionManager()
+
+    async def scenario():
+        async with sessions.session_scope("long") as long_session:
+            await memory.add(_turns(6))
+            await formatter.format(await memory.get_memory())
+            await long_session.summary("QAAgent").task
+        async with sessions.session_scope("short"):
+            await memory.add(_turns(1, size=10))
+            return await formatter.format(await memory.get_memory())
+
+    prompt = run(scenario())
+
+    assert [m["role"] for m in prompt] == ["user", "assistant"]
+    assert sessions.get("long").summary("QAAgent").text
+    assert not sessions.get("short").summary("QAAgent").text
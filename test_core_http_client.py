@@ -0,0 +1,112 @@
+import asyncio
+
+import httpx
+import pytest
+
+pytest.importorskip("agentscope")
+
+from services import core_orchestrator
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture
+def mock_service(monkeypatch):
+    """把共享客户端替换为使用 MockTransport 的客户端，按顺序返回预设的响应"""
+    state = {"responses": [], "requests": 0, "clients": 0}
+
+    def handler(request):
+        state["requests"] += 1
+        outcome = state["responses"].pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    def factory(**kwargs):
+        state["clients"] += 1
+        return real_client(transport=httpx.MockTransport(handler), **kwargs)
+
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(core_orchestrator.httpx, "AsyncClient", factory)
+    monkeypatch.setattr(core_orchestrator, "_http_client", None)
+    # 重试不等待
+    monkeypatch.setattr(core_orchestrator, "SERVICE_RETRY_BACKOFF_MAX", 0.0)
+    yield state
+    run(core_orchestrator.shutdown_http_client())
+
+
+def test_client_is_shared_across_requests(mock_service):
+    mock_service["responses"] = [httpx.Response(200, json={"n": 1}), httpx.Response(200, json={"n": 2})]
+
+    async def scenario():
+        first = await core_orchestrator.send_request("/api/x", {})
+        second = await core_orchestrator.send_request("/api/x", {})
+        return first, second
+
+    first, second = run(scenario())
+
+    assert first == {"status": "success", "data": {"n": 1}}
+    assert second["data"] == {"n": 2}
+    assert mock_service["clients"] == 1
+
+
+def test_client_is_recreated_after_shutdown(mock_service):
+    async def scenario():
+        client = await core_orchestrator.get_http_client()
+        assert await core_orchestrator.get_http_client() is client
+        await core_orchestrator.shutdown_http_client()
+        assert client.is_closed
+        return await core_orchestrator.get_http_client() is not client
+
+    assert run(scenario())
+    assert mock_service["clients"] == 2
+
+
+def test_503_is_retried_until_success(mock_service):
+    mock_service["responses"] = [httpx.Response(503), httpx.Response(503), httpx.Response(200, json={"ok": True})]
+
+    result = run(core_orchestrator.send_request("/api/x", {}))
+
+    assert result == {"status": "success", "data": {"ok": True}}
+    assert mock_service["requests"] == 3
+
+
+def test_retries_are_bounded(mock_service, monkeypatch):
+    monkeypatch.setattr(core_orchestrator, "SERVICE_MAX_RETRIES", 1)
+    mock_service["responses"] = [httpx.Response(503), httpx.Response(503), httpx.Response(200)]
+
+    result = run(core_orchestrator.send_request("/api/x", {}))
+
+    assert result["status"] == "error" and result["code"] == 503
+    assert mock_service["requests"] == 2
+
+
+def test_transport_errors_are_retried_then_reported(mock_service, monkeypatch):
+    monkeypatch.setattr(core_orchestrator, "SERVICE_MAX_RETRIES", 1)
+    error = httpx.ConnectError("connection refused")
+    mock_service["responses"] = [error, error]
+
+    result = run(core_orchestrator.send_request("/api/x", {}))
+
+    assert result["status"] == "error" and result["code"] == 503
+    assert mock_service["requests"] == 2
+
+
+def test_other_errors_are_not_retried(mock_service):
+    mock_service["responses"] = [httpx.Response(500), httpx.Response(200)]
+
+    result = run(core_orchestrator.send_request("/api/x", {}))
+
+    assert result["status"] == "error" and result["code"] == 500
+    assert mock_service["requests"] == 1
+
+
+def test_retry_delay_honours_retry_after(monkeypatch):
+    monkeypatch.setattr(core_orchestrator, "SERVICE_RETRY_BACKOFF", 0.2)
+    monkeypatch.setattr(core_orchestrator, "SERVICE_RETRY_BACKOFF_MAX", 2.0)
+
+    assert core_orchestrator._retry_delay(0, httpx.Response(503, headers={"Retry-After": "1"})) == 1.0
+    assert core_orchestrator._retry_delay(0, httpx.Response(503, headers={"Retry-After": "60"})) == 2.0
+    assert all(0 <= core_orchestrator._retry_delay(attempt) <= min(0.2 * 2 ** attempt, 2.0) for attempt in range(6))
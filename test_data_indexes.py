@@ -0,0 +1,73 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from services.internal_services import router as internal_router
+from services.public_services import router as public_router
+from utils.data_indexes import RecordIndex, camera_index, equipment_index, membership_index
+from utils.data_loader import FACILITY_MANAGEMENT_FILE, POST_VISIT_SERVICES_FILE, SECURITY_MANAGEMENT_FILE
+from utils.data_store import get_data_store, thaw
+
+
+@pytest.fixture(scope="module")
+def client():
+    app = FastAPI()
+    app.include_router(public_router)
+    app.include_router(internal_router)
+    return TestClient(app)
+
+
+def test_record_index_unique_and_group_lookups():
+    index = RecordIndex(
+        [{"id": "A", "type": "x"}, {"id": "B", "type": "y"}, {"id": "A", "type": "y"}, "not a record"],
+        unique=("id",), group=("type",)
+    )
+    assert len(index) == 3
+    # 重复主键保留第一条
+    assert index.get("id", "A") == {"id": "A", "type": "x"}
+    assert index.get("id", "Z") is None
+    assert [record["id"] for record in index.filter(type="y")] == ["B", "A"]
+    assert index.filter(type="z") == []
+    assert len(index.filter(type=None)) == 3
+
+
+def test_indexes_cover_every_record_in_the_data_files():
+    store = get_data_store()
+    cameras = store.get(SECURITY_MANAGEMENT_FILE)["surveillance"]["cameras"]
+    equipment = store.get(FACILITY_MANAGEMENT_FILE)["equipment_maintenance"]["equipment"]
+    members = store.get(POST_VISIT_SERVICES_FILE)["membership"]["members"]
+    assert cameras and equipment and members
+
+    assert all(camera_index().get("camera_id", camera["camera_id"]) == camera for camera in cameras)
+    assert all(equipment_index().get("equipment_id", item["equipment_id"]) == item for item in equipment)
+    assert all(membership_index().get("member_id", member["member_id"]) == member for member in members)
+
+
+def test_detail_endpoints_return_real_records(client):
+    store = get_data_store()
+    camera = thaw(store.get(SECURITY_MANAGEMENT_FILE)["surveillance"]["cameras"][0])
+    equipment = thaw(store.get(FACILITY_MANAGEMENT_FILE)["equipment_maintenance"]["equipment"][0])
+    member = thaw(store.get(POST_VISIT_SERVICES_FILE)["membership"]["members"][0])
+
+    response = client.get(f"/api/internal/security/camera/{camera['camera_id']}")
+    assert response.status_code == 200 and response.json()["data"] == camera
+    response = client.get(f"/api/internal/facility/equipment/{equipment['equipment_id']}")
+    assert response.status_code == 200 and response.json()["data"] == equipment
+    response = client.get("/api/public/post-visit/membership", params={"visitor_id": member["member_id"]})
+    assert response.status_code == 200 and response.json()["data"] == member
+
+    assert client.get("/api/internal/security/camera/NOPE").status_code == 404
+    assert client.get("/api/internal/facility/equipment/NOPE").status_code == 404
+
+
+def test_list_endpoints_use_the_real_data_paths(client):
+    cameras = client.get("/api/internal/security/camera-list").json()["data"]
+    assert len(cameras) == len(camera_index())
+    equipment_type = equipment_index().records[0]["type"]
+    equipment = client.get("/api/internal/facility/equipment", params={"equipment_type": equipment_type}).json()["data"]
+    assert equipment and all(item["type"] == equipment_type for item in equipment)
+
+
+def test_bookings_are_not_exposed_by_booking_id(client):
+    # 预约编号是顺序生成的，只能按手机号查询自己的预约
+    assert client.get("/api/public/tour-booking/bookings/B20250101000001").status_code == 404
@@ -0,0 +1,118 @@
+import copy
+import json
+import os
+import pickle
+
+import pytest
+
+from utils.data_store import DataStore, FrozenDict, freeze, thaw
+
+
+def _write(path, data):
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
+
+@pytest.fixture
+def store(tmp_path):
+    return DataStore(base_dir=str(tmp_path), check_interval=0)
+
+
+def test_file_is_parsed_once_while_unchanged(store, tmp_path):
+    _write(tmp_path / "info.json", {"name": "博物馆"})
+
+    first = store.get("info.json")
+    second = store.get("info.json")
+
+    assert first is second
+    assert store.version("info.json") == 1
+    assert store.get_stats()["misses"] == 1
+
+
+def test_changed_file_is_reloaded(store, tmp_path):
+    path = tmp_path / "info.json"
+    _write(path, {"hours": "09:00-17:00"})
+    assert store.get("info.json")["hours"] == "09:00-17:00"
+
+    _write(path, {"hours": "10:00-18:00", "closed": "周一"})
+    os.utime(path, ns=(0, 10**18))
+
+    assert store.get("info.json")["hours"] == "10:00-18:00"
+    assert store.version("info.json") == 2
+    assert store.get_stats()["reloads"] == 1
+
+
+def test_check_interval_skips_stat(tmp_path):
+    store = DataStore(base_dir=str(tmp_path), check_interval=3600)
+    path = tmp_path / "info.json"
+    _write(path, {"hours": "09:00-17:00"})
+    store.get("info.json")
+
+    _write(path, {"hours": "10:00-18:00", "closed": "周一"})
+    assert store.get("info.json")["hours"] == "09:00-17:00"
+
+    # invalidate 后下次访问立即重新检查
+    store.invalidate("info.json")
+    assert store.get("info.json")["hours"] == "10:00-18:00"
+
+
+def test_invalid_json_keeps_previous_data(store, tmp_path):
+    path = tmp_path / "info.json"
+    _write(path, {"hours": "09:00-17:00"})
+    store.get("info.json")
+
+    path.write_text('{"hours": "10:00', encoding="utf-8")
+
+    assert store.get("info.json")["hours"] == "09:00-17:00"
+    assert store.get_stats()["errors"] == 1
+
+
+def test_missing_file_returns_empty_view(store):
+    assert store.get("missing.json") == {}
+    assert store.fingerprint("missing.json") == "missing"
+    assert store.last_modified("missing.json") is None
+
+
+def test_cached_data_is_read_only(store, tmp_path):
+    _write(tmp_path / "info.json", {"halls": [{"name": "南馆"}]})
+    data = store.get("info.json")
+
+    assert isinstance(data, FrozenDict) and isinstance(data["halls"], tuple)
+    with pytest.raises(TypeError):
+        data["halls"] = []
+    with pytest.raises(TypeError):
+        data["halls"][0]["name"] = "北馆"
+    with pytest.raises(TypeError):
+        data.update(name="x")
+
+    editable = thaw(data)
+    editable["halls"][0]["name"] = "北馆"
+    assert store.get("info.json")["halls"][0]["name"] == "南馆"
+
+
+def test_frozen_views_serialize_and_copy_as_plain_data():
+    data = freeze({"halls": [{"name": "南馆"}]})
+
+    assert json.loads(json.dumps(data, ensure_ascii=False)) == {"halls": [{"name": "南馆"}]}
+    assert type(copy.deepcopy(data)["halls"][0]) is dict
+    assert type(copy.copy(data)) is dict
+    assert type(pickle.loads(pickle.dumps(data))) is dict
+
+
+def test_derived_structures_are_rebuilt_after_reload(store, tmp_path):
+    path = tmp_path / "info.json"
+    _write(path, {"items": [1, 2]})
+    builds = []
+
+    def build(data):
+        builds.append(1)
+        return sum(data["items"])
+
+    assert store.derived("info.json", "total", build) == 3
+    assert store.derived("info.json", "total", build) == 3
+    assert len(builds) == 1
+
+    _write(path, {"items": [1, 2, 3]})
+    os.utime(path, ns=(0, 10**18))
+
+    assert store.derived("info.json", "total", build) == 6
+    assert len(builds) == 2
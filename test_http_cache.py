@@ -0,0 +1,109 @@
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from services.public_services import router as public_router
+from utils.booking_ledger import get_booking_ledger
+from utils.http_cache import ConditionalCache, conditional_response, make_etag
+
+
+@pytest.fixture(scope="module")
+def client():
+    app = FastAPI()
+    app.include_router(public_router)
+    return TestClient(app)
+
+
+def test_make_etag_depends_on_version_and_parameters():
+    etag = make_etag("v1", "search", "青铜")
+    assert etag.startswith('W/"')
+    assert etag == make_etag("v1", "search", "青铜")
+    assert etag != make_etag("v2", "search", "青铜")
+    assert etag != make_etag("v1", "search", "瓷器")
+
+
+def test_conditional_response_skips_builder_on_match():
+    calls = []
+
+    def build():
+        calls.append(1)
+        return {"status": "success"}
+
+    etag = make_etag("v1")
+    response = conditional_response(etag, None, build, if_none_match=etag)
+    assert response.status_code == 304 and not response.body
+    assert response.headers["etag"] == etag
+    assert calls == []
+
+    response = conditional_response(etag, None, build, if_none_match='W/"other"')
+    assert response.status_code == 200 and response.body == b'{"status":"success"}'
+    assert calls == [1]
+
+
+def test_conditional_response_if_modified_since():
+    last_modified = time.time() - 3600
+    fresh = conditional_response('W/"a"', last_modified, b"{}", if_modified_since="Mon, 01 Jan 2035 00:00:00 GMT")
+    stale = conditional_response('W/"a"', last_modified, b"{}", if_modified_since="Mon, 01 Jan 2001 00:00:00 GMT")
+    assert fresh.status_code == 304
+    assert stale.status_code == 200
+    assert "last-modified" in stale.headers
+
+
+def test_search_endpoint_returns_304_for_matching_etag(client):
+    url = "/api/public/qa/exhibitions/search?keywords=青铜"
+    first = client.get(url)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    revalidated = client.get(url, headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["etag"] == etag
+
+    other = client.get("/api/public/qa/exhibitions/search?keywords=瓷器", headers={"If-None-Match": etag})
+    assert other.status_code == 200
+
+
+def test_static_payload_endpoint_returns_304(client):
+    first = client.get("/api/public/qa/specific/museum/history")
+    assert first.status_code == 200
+    response = client.get("/api/public/qa/specific/museum/history", headers={"If-None-Match": first.headers["etag"]})
+    assert response.status_code == 304
+
+
+def test_available_slots_etag_changes_after_reservation(client):
+    first = client.get("/api/public/tour-booking/available-slots")
+    etag = first.headers["etag"]
+    assert client.get("/api/public/tour-booking/available-slots", headers={"If-None-Match": etag}).status_code == 304
+
+    day = first.json()["data"][0]
+    get_booking_ledger().reserve({
+        "visitor_name": "测试", "visitor_phone": "13800000000", "visit_date": day["date"],
+        "visit_time": day["time_slots"][0]["time"], "ticket_type": "成人票", "ticket_count": 1
+    })
+    response = client.get("/api/public/tour-booking/available-slots", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_conditional_cache_returns_copies_and_evicts_lru():
+    cache = ConditionalCache("test", max_entries=2)
+    cache.store("/a", 'W/"1"', {"items": [1]})
+    assert cache.etag("/a") == 'W/"1"'
+    data = cache.revalidated("/a")
+    data["items"].append(2)
+    assert cache.revalidated("/a") == {"items": [1]}
+
+    cache.store("/b", 'W/"2"', {})
+    cache.etag("/a")
+    cache.revalidated("/a")
+    cache.store("/c", 'W/"3"', {})
+    assert cache.etag("/b") is None
+    assert cache.etag("/a") == 'W/"1"'
+
+    # 响应不带ETag时移除旧的缓存
+    cache.store("/a", None, {})
+    assert cache.etag("/a") is None
+    assert cache.get_stats()["evicted"] == 1
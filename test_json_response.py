@@ -0,0 +1,117 @@
+import json
+import os
+from decimal import Decimal
+
+import numpy as np
+import pytest
+from pydantic import BaseModel
+
+from utils import json_response
+from utils.data_store import DataStore, freeze
+from utils.json_response import (
+    FastJSONResponse, dumps, dumps_text, etag_matches, static_payload, static_response
+)
+
+
+class _Exhibit(BaseModel):
+    name: str
+    year: int
+
+
+def test_dumps_keeps_chinese_and_matches_json():
+    content = {"name": "青铜器展", "hours": ["09:00", "17:00"], "open": True, "price": None}
+
+    assert dumps(content) == json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    assert dumps_text(content) == dumps(content).decode("utf-8")
+
+
+def test_dumps_handles_frozen_views_numpy_and_models():
+    content = freeze({
+        "exhibits": [{"name": "瓷器", "count": 3}],
+        "readings": np.array([21.5, 22.0]),
+        "peak": np.float32(0.5),
+        1: "非字符串键",
+        "model": _Exhibit(name="陶俑", year=1974),
+        "tags": {"唐代"},
+        "price": Decimal("20.5"),
+    })
+
+    assert json.loads(dumps(content)) == {
+        "exhibits": [{"name": "瓷器", "count": 3}],
+        "readings": [21.5, 22.0],
+        "peak": 0.5,
+        "1": "非字符串键",
+        "model": {"name": "陶俑", "year": 1974},
+        "tags": ["唐代"],
+        "price": "20.5",
+    }
+
+
+def test_fast_json_response_renders_with_orjson():
+    response = FastJSONResponse({"status": "success", "data": "展览"})
+
+    assert response.body == '{"status":"success","data":"展览"}'.encode("utf-8")
+    assert response.media_type == "application/json"
+
+
+@pytest.mark.parametrize("header, matched", [
+    (None, False),
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"x", "abc"', True),
+    ("*", True),
+    ('"abcd"', False),
+])
+def test_etag_matches(header, matched):
+    assert etag_matches(header, '"abc"') is matched
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = DataStore(base_dir=str(tmp_path), check_interval=0)
+    monkeypatch.setattr(json_response, "get_data_store", lambda: store)
+    return store
+
+
+def _write(path, data):
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
+
+def test_static_payload_is_encoded_once_until_reload(store, tmp_path):
+    path = tmp_path / "info.json"
+    _write(path, {"history": ["建馆"]})
+    calls = []
+
+    def build(data):
+        calls.append(1)
+        return {"status": "success", "data": data["history"]}
+
+    first = static_payload("info.json", "history", build)
+    assert static_payload("info.json", "history", build) is first
+    assert json.loads(first.body) == {"status": "success", "data": ["建馆"]}
+    assert calls == [1]
+
+    _write(path, {"history": ["建馆", "扩建"]})
+    os.utime(path, ns=(0, 10**18))
+    reloaded = static_payload("info.json", "history", build)
+
+    assert calls == [1, 1]
+    assert reloaded.etag != first.etag
+    assert json.loads(reloaded.body)["data"] == ["建馆", "扩建"]
+
+
+def test_static_response_returns_body_or_304(store, tmp_path):
+    _write(tmp_path / "info.json", {"staff": []})
+    payload = static_payload("info.json", "staff", lambda data: {"status": "success", "data": data["staff"]})
+
+    full = static_response(payload, headers={"Cache-Control": "no-cache"})
+    assert full.status_code == 200
+    assert full.body == payload.body
+    assert full.headers["etag"] == payload.etag
+    assert full.headers["cache-control"] == "no-cache"
+    assert full.media_type == "application/json"
+
+    not_modified = static_response(payload, if_none_match=payload.etag)
+    assert not_modified.status_code == 304
+    assert not_modified.body == b""
+    assert not_modified.headers["etag"] == payload.etag
@@ -0,0 +1,79 @@
+from types import SimpleNamespace
+
+import pytest
+
+from utils.keyword_matcher import AhoCorasick, KeywordMatcher
+
+
+def test_automaton_reports_nested_and_overlapping_patterns():
+    automaton = AhoCorasick(["he", "she", "his", "hers"])
+    assert automaton.find("ushers") == {"he", "she", "hers"}
+    assert automaton.find("this") == {"his"}
+    assert automaton.find("xyz") == set()
+
+
+def test_longer_keyword_does_not_hide_its_prefix_or_suffix():
+    automaton = AhoCorasick(["开放", "开放时间", "时间", "间"])
+    assert automaton.find("请问开放时间") == {"开放", "开放时间", "时间", "间"}
+    # 只命中较短的前缀时，不会误报较长的关键词
+    assert automaton.find("几点开放") == {"开放"}
+
+
+def test_same_keyword_in_several_labels_and_tables():
+    matcher = KeywordMatcher({
+        "intent": {"qa": ["藏品", "开放时间"], "collection": ["藏品", "文物"]},
+        "topic": {"hours": ["开放"]},
+    }, check_interval=0)
+
+    result = matcher.match("藏品的开放时间")
+
+    assert {label: sorted(words) for label, words in result["intent"].items()} == {"qa": sorted(["藏品", "开放时间"]), "collection": ["藏品"]}
+    assert result["topic"] == {"hours": ["开放"]}
+
+
+def test_matching_is_case_insensitive():
+    matcher = KeywordMatcher({"intent": {"vip": ["VIP"]}}, check_interval=0)
+    assert matcher.match("我是vip会员")["intent"] == {"vip": ["VIP"]}
+
+
+def test_in_place_table_change_is_picked_up_after_check_interval():
+    table = {"facility": ["洗手间"]}
+    matcher = KeywordMatcher({"intent": table}, check_interval=0)
+    assert matcher.match("哪里有母婴室")["intent"] == {}
+
+    table["facility"].append("母婴室")
+
+    assert matcher.match("哪里有母婴室")["intent"] == {"facility": ["母婴室"]}
+    assert matcher.rebuild_count == 2
+
+
+def test_table_change_waits_for_interval_unless_invalidated():
+    table = {"facility": ["洗手间"]}
+    matcher = KeywordMatcher({"intent": table}, check_interval=3600)
+    matcher.match("洗手间")
+
+    table["facility"].append("母婴室")
+    assert matcher.match("母婴室")["intent"] == {}
+
+    matcher.invalidate()
+    assert matcher.match("母婴室")["intent"] == {"facility": ["母婴室"]}
+
+
+def test_unchanged_table_is_not_rebuilt():
+    matcher = KeywordMatcher({"intent": {"qa": ["展览"]}}, check_interval=0)
+    for _ in range(3):
+        matcher.match("最近有什么展览")
+    assert matcher.rebuild_count == 1
+
+
+def test_intent_priority_follows_table_order():
+    pytest.importorskip("agentscope")
+    from agents.orchestrator_agent import INTENT_KEYWORDS, OrchestratorAgent
+
+    agent = SimpleNamespace(_keyword_matcher=KeywordMatcher({"intent": INTENT_KEYWORDS}, check_interval=0))
+
+    # "藏品"同时属于qa和collection，"门票"属于tour_booking，按表中顺序取第一个命中的意图
+    assert OrchestratorAgent.recognize_intent(agent, "想了解藏品") == "qa"
+    assert OrchestratorAgent.recognize_intent(agent, "买门票看藏品") == "tour_booking"
+    assert OrchestratorAgent.recognize_intent(agent, "文物修复") == "collection"
+    assert OrchestratorAgent.recognize_intent(agent, "你好") == "general"
@@ -0,0 +1,142 @@
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("agentscope")
+
+from agents import orchestrator_agent
+from agents.orchestrator_agent import AgentInitError, OrchestratorAgent
+from services import core_orchestrator
+from utils.model_pool import ModelPool
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class _CountingAgent:
+    """代替专业智能体：记录创建次数，可设置为创建失败"""
+
+    created = 0
+    fail = False
+
+    def __init__(self, model_pool):
+        if _CountingAgent.fail:
+            raise ValueError("模型配置缺失")
+        # 放大创建耗时，便于并发创建时暴露重复构造
+        time.sleep(0.02)
+        _CountingAgent.created += 1
+        self.model_pool = model_pool
+
+    def register_instance_hook(self, hook_type, hook_name, hook):
+        pass
+
+
+@pytest.fixture
+def orchestrator(monkeypatch):
+    _CountingAgent.created = 0
+    _CountingAgent.fail = False
+    monkeypatch.setattr(orchestrator_agent, "AGENT_FACTORIES", {
+        "QAAgent": f"{__name__}:_CountingAgent",
+        "TourBookingAgent": f"{__name__}:_CountingAgent",
+    })
+    return OrchestratorAgent(model_pool=ModelPool(hosts=["http://127.0.0.1:1"], health_interval=0))
+
+
+def test_importing_the_service_builds_no_agent():
+    code = "import services.core_orchestrator as c; assert c._orchestrator_agent is None"
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_specialists_are_created_on_first_use(orchestrator):
+    assert orchestrator.agents == {} and _CountingAgent.created == 0
+
+    first = orchestrator.get_agent("QAAgent")
+
+    assert orchestrator.get_agent("QAAgent") is first
+    assert orchestrator.agents == {"QAAgent": first}
+    assert first.model_pool is orchestrator.model_pool
+    assert _CountingAgent.created == 1
+    assert orchestrator.get_agent("UnknownAgent") is None
+
+
+def test_concurrent_first_use_creates_one_instance(orchestrator):
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(orchestrator.get_agent("QAAgent"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert _CountingAgent.created == 1
+    assert len({id(agent) for agent in results}) == 1
+
+
+def test_failed_creation_is_reported_and_retried(orchestrator):
+    _CountingAgent.fail = True
+    with pytest.raises(AgentInitError):
+        orchestrator.get_agent("QAAgent")
+    assert "模型配置缺失" in orchestrator.agent_errors["QAAgent"]
+    assert "QAAgent" not in orchestrator.agents
+
+    _CountingAgent.fail = False
+    assert orchestrator.get_agent("QAAgent") is not None
+    assert "QAAgent" not in orchestrator.agent_errors
+
+
+def test_warmup_creates_every_specialist(orchestrator):
+    assert orchestrator.warmup_agents() == {"QAAgent": "ready", "TourBookingAgent": "ready"}
+    assert set(orchestrator.agents) == {"QAAgent", "TourBookingAgent"}
+
+
+def test_agent_by_intent_is_created_off_the_event_loop(orchestrator):
+    async def scenario():
+        loop_thread = threading.get_ident()
+        created_in = []
+        original = orchestrator.get_agent
+
+        def tracking_get_agent(agent_name):
+            created_in.append(threading.get_ident())
+            return original(agent_name)
+
+        orchestrator.get_agent = tracking_get_agent
+        agent = await orchestrator.get_agent_by_intent("qa")
+        return agent, created_in, loop_thread
+
+    agent, created_in, loop_thread = run(scenario())
+
+    assert agent is orchestrator.agents["QAAgent"]
+    assert created_in and loop_thread not in created_in
+
+
+def test_orchestrator_is_created_once_and_warmup_respects_switch(monkeypatch):
+    created, warmed = [], []
+
+    class _FakeOrchestrator:
+        semantic_router = None
+
+        def __init__(self):
+            created.append(self)
+
+        def warmup_agents(self):
+            warmed.append(self)
+
+    monkeypatch.setattr(core_orchestrator, "OrchestratorAgent", _FakeOrchestrator)
+    monkeypatch.setattr(core_orchestrator, "_orchestrator_agent", None)
+    monkeypatch.setenv("MUSEUM_AGENT_WARMUP", "false")
+
+    async def scenario():
+        await core_orchestrator._warmup_agents()
+        return await core_orchestrator.aget_orchestrator_agent()
+
+    agent = run(scenario())
+
+    assert created == [agent]
+    # MUSEUM_AGENT_WARMUP=false 时只创建核心协调智能体，不预热专业智能体
+    assert warmed == []
+    assert core_orchestrator.get_orchestrator_agent() is agent
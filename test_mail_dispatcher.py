@@ -0,0 +1,111 @@
+import socket
+import time
+
+import pytest
+
+pytest.importorskip("aiosmtpd")
+
+from aiosmtpd.controller import Controller
+
+from utils.email_tool import MailDispatcher
+
+
+class _FlakyHandler:
+    """前 failures 次 DATA 返回临时错误，之后正常接收；拒绝 blocked 中的收件人"""
+
+    def __init__(self, failures=0, blocked=()):
+        self.failures = failures
+        self.blocked = set(blocked)
+        self.received = []
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address in self.blocked:
+            return "550 mailbox unavailable"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.failures > 0:
+            self.failures -= 1
+            return "451 temporary failure"
+        self.received.append(envelope)
+        return "250 OK"
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server():
+    controllers = []
+
+    def start(handler):
+        controller = Controller(handler, hostname="127.0.0.1", port=_free_port())
+        controller.start()
+        controllers.append(controller)
+        return controller
+
+    yield start
+    for controller in controllers:
+        controller.stop()
+
+
+def _dispatcher(controller, **kwargs):
+    settings = {"host": "127.0.0.1", "port": controller.port, "starttls": False,
+                "sender": "museum@example.com", "password": None, "timeout": 5}
+    return MailDispatcher(settings, **kwargs)
+
+
+def _wait_for(dispatcher, message_id, states, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = dispatcher.status(message_id)
+        if status and status["status"] in states:
+            return status
+        time.sleep(0.02)
+    raise AssertionError(f"邮件状态未变为 {states}: {dispatcher.status(message_id)}")
+
+
+def test_temporary_failure_is_retried_until_sent(smtp_server):
+    handler = _FlakyHandler(failures=1)
+    dispatcher = _dispatcher(smtp_server(handler), retry_base=0.05)
+    try:
+        message_id = dispatcher.submit("visitor@example.com", "预约确认", "您的预约已确认")
+        status = _wait_for(dispatcher, message_id, {"sent", "failed"})
+        assert status["status"] == "sent"
+        assert status["attempts"] == 2
+        stats = dispatcher.get_stats()
+        assert stats["retried"] == 1 and stats["sent"] == 1 and stats["pending"] == 0
+        assert len(handler.received) == 1
+    finally:
+        dispatcher.stop()
+
+
+def test_refused_recipient_is_not_retried(smtp_server):
+    handler = _FlakyHandler(blocked={"nobody@example.com"})
+    dispatcher = _dispatcher(smtp_server(handler), retry_base=0.05)
+    try:
+        message_id = dispatcher.submit("nobody@example.com", "预约确认", "您的预约已确认")
+        status = _wait_for(dispatcher, message_id, {"sent", "failed"})
+        assert status["status"] == "failed"
+        assert status["attempts"] == 1
+        assert dispatcher.get_stats()["retried"] == 0
+    finally:
+        dispatcher.stop()
+
+
+def test_pending_retries_are_abandoned_on_stop(smtp_server):
+    handler = _FlakyHandler(failures=100)
+    dispatcher = _dispatcher(smtp_server(handler), retry_base=60)
+    message_id = dispatcher.submit("visitor@example.com", "预约确认", "您的预约已确认")
+    _wait_for(dispatcher, message_id, {"retrying"})
+
+    dispatcher.stop()
+    status = dispatcher.status(message_id)
+    assert status["status"] == "abandoned"
+    assert "451" in status["error"]
+    stats = dispatcher.get_stats()
+    assert stats["abandoned"] == 1 and stats["pending"] == 0 and stats["waiting_retry"] == 0
@@ -0,0 +1,178 @@
+import asyncio
+import gc
+
+import httpx
+import pytest
+
+pytest.importorskip("agentscope")
+
+from utils import model_pool
+from utils.model_pool import ModelEndpoint, ModelPool, NoModelEndpoint
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class _FakeClient:
+    """替代节点上的 OllamaChatModel：按节点地址返回预设的结果、异常或流式分块"""
+
+    def __init__(self, behaviour):
+        self.behaviour = behaviour
+
+    async def __call__(self, *args, **kwargs):
+        kind, payload = self.behaviour
+        if kind == "raise":
+            raise payload
+        if kind == "stream":
+            return _chunks(payload)
+        return payload
+
+
+async def _chunks(items):
+    for item in items:
+        await asyncio.sleep(0)
+        if isinstance(item, Exception):
+            raise item
+        yield item
+
+
+@pytest.fixture
+def behaviours(monkeypatch):
+    table = {}
+    monkeypatch.setattr(ModelEndpoint, "model", lambda self, *args, **kwargs: _FakeClient(table[self.host]))
+    return table
+
+
+def _pool(hosts, **kwargs):
+    kwargs.setdefault("health_interval", 0)
+    pool = ModelPool(hosts=hosts, **kwargs)
+    return pool, [endpoint.host for endpoint in pool.endpoints]
+
+
+def test_acquire_prefers_fewest_outstanding_then_latency():
+    pool, (a, b, c) = _pool(["a:1", "b:1", "c:1"])
+    pool.endpoints[0].outstanding = 2
+    pool.endpoints[1].latency = 0.5
+    pool.endpoints[2].latency = 0.2
+    assert pool.acquire("m", set()).host == c
+    # c 已有一个进行中的请求，b 没有
+    assert pool.acquire("m", set()).host == b
+    with pytest.raises(NoModelEndpoint):
+        pool.acquire("m", {a, b, c})
+
+
+def test_acquire_skips_hosts_without_the_model():
+    pool, (a, b) = _pool(["a:1", "b:1"])
+    pool.endpoints[0].installed = {"other"}
+    pool.endpoints[1].outstanding = 5
+    assert pool.acquire("m", set()).host == b
+
+
+def test_consecutive_failures_eject_until_timeout(monkeypatch):
+    pool, (a, b) = _pool(["a:1", "b:1"], max_failures=2, eject_seconds=30)
+    first = pool.endpoints[0]
+    now = [1000.0]
+    monkeypatch.setattr(model_pool.time, "monotonic", lambda: now[0])
+    for _ in range(2):
+        pool.release(pool.acquire("m", {b}), None, False)
+    assert first.stats["ejections"] == 1
+    assert pool.acquire("m", set()).host == b
+
+    now[0] += 31
+    pool.endpoints[1].outstanding = 1
+    assert pool.acquire("m", set()).host == a
+
+
+def test_health_check_marks_hosts_down_and_recovered(monkeypatch):
+    state = {"up": False}
+
+    def handler(request):
+        if request.url.host == "a" and not state["up"]:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"models": [{"name": "m"}]})
+
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(model_pool.httpx, "AsyncClient",
+                        lambda **kwargs: real_client(transport=httpx.MockTransport(handler), **kwargs))
+    pool, (a, b) = _pool(["a:1", "b:1"])
+
+    run(pool.check_health())
+    assert [endpoint.healthy for endpoint in pool.endpoints] == [False, True]
+    assert pool.endpoints[1].installed == {"m"}
+    assert pool.acquire("m", set()).host == b
+
+    state["up"] = True
+    run(pool.check_health())
+    assert pool.endpoints[0].healthy
+
+
+def test_failed_call_is_retried_on_another_host(behaviours):
+    pool, (a, b) = _pool(["a:1", "b:1"])
+    behaviours[a] = ("raise", ConnectionError("down"))
+    behaviours[b] = ("value", "ok")
+    model = pool.chat_model("QAAgent", stream=False)
+    model.coalesce = False
+
+    assert run(model()) == "ok"
+    assert pool.get_stats()["retries"] == 1
+    assert [endpoint.outstanding for endpoint in pool.endpoints] == [0, 0]
+
+
+def test_stream_failing_before_first_chunk_is_retried(behaviours):
+    pool, (a, b) = _pool(["a:1", "b:1"])
+    behaviours[a] = ("stream", [ConnectionError("reset")])
+    behaviours[b] = ("stream", ["x", "y"])
+    model = pool.chat_model("QAAgent")
+    model.coalesce = False
+
+    async def scenario():
+        return [chunk async for chunk in await model()]
+
+    assert run(scenario()) == ["x", "y"]
+    assert pool.endpoints[0].stats["failures"] == 1
+    assert [endpoint.outstanding for endpoint in pool.endpoints] == [0, 0]
+
+
+def test_stream_failing_after_first_chunk_is_not_retried(behaviours):
+    pool, (a, b) = _pool(["a:1", "b:1"])
+    behaviours[a] = ("stream", ["x", ConnectionError("reset")])
+    behaviours[b] = ("stream", ["y"])
+    pool.endpoints[1].outstanding = 1
+    model = pool.chat_model("QAAgent")
+    model.coalesce = False
+
+    async def scenario():
+        received = []
+        with pytest.raises(ConnectionError):
+            async for chunk in await model():
+                received.append(chunk)
+        return received
+
+    assert run(scenario()) == ["x"]
+    assert pool.get_stats()["retries"] == 0
+    assert pool.endpoints[0].outstanding == 0
+
+
+def test_stream_that_is_never_iterated_releases_the_host(behaviours):
+    pool, (a,) = _pool(["a:1"])
+    behaviours[a] = ("stream", ["x"])
+    model = pool.chat_model("QAAgent")
+    model.coalesce = False
+
+    async def closed():
+        stream = await model()
+        assert pool.endpoints[0].outstanding == 1
+        await stream.aclose()
+
+    run(closed())
+    assert pool.endpoints[0].outstanding == 0
+
+    async def abandoned():
+        await model()
+
+    run(abandoned())
+    gc.collect()
+    assert pool.endpoints[0].outstanding == 0
+    # 中途放弃不计入成功或失败
+    assert pool.endpoints[0].stats["failures"] == 0 and pool.endpoints[0].consecutive_failures == 0
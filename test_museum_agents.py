@@ -6,6 +6,7 @@ from agents.tour_booking_agent import TourBookingAgent
 from agents.qa_agent import QAAgent
 from agents.collection_management_agent import CollectionManagementAgent
 from agentscope.message import Msg
+from utils.agent_tools import MuseumToolkit
 
 class MuseumAgentSystem:
     """博物馆智能体系统集成测试"""
@@ -25,10 +26,8 @@ class MuseumAgentSystem:
         """检查博物馆服务是否正常运行"""
         try:
             # 尝试调用一个简单的API来检查服务状态
-            result = specific_question_about_the_museum(endpoint="/")
-            # 检查result是ToolResponse类型，需要获取其metadata属性
-            if hasattr(result, 'metadata'):
-                result = result.metadata
+            # 这里运行在同步上下文中，使用同步版本的服务调用
+            result = MuseumToolkit.call_service("/")
             # 根路由返回结构不包含status字段，检查是否包含预期的字段
             if result.get("status") == "success" or ("message" in result and "endpoints" in result):
                 logger.info("博物馆服务已成功启动！")
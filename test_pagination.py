@@ -0,0 +1,134 @@
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from services.internal_services import router as internal_router
+from services.public_services import router as public_router
+from utils.data_loader import FACILITY_MANAGEMENT_FILE, ON_VISIT_SERVICES_FILE, SECURITY_MANAGEMENT_FILE
+from utils.data_store import get_data_store
+from utils.pagination import MAX_PAGE_SIZE, decode_cursor, encode_cursor, paginate
+
+RECORDS = [
+    {"id": f"C{index:03d}", "category": "青铜器" if index % 2 else "瓷器", "name": f"藏品{index}", "era": "宋"}
+    for index in range(25, 0, -1)
+]
+
+
+def _all_pages(records, limit, **kwargs):
+    pages, cursor = [], None
+    while True:
+        page = paginate(records, ("category", "id"), limit=limit, cursor=cursor, **kwargs)
+        pages.append(page)
+        cursor = page["pagination"]["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+def test_pages_cover_all_records_in_stable_order():
+    pages = _all_pages(RECORDS, limit=7)
+    seen = [record["id"] for page in pages for record in page["data"]]
+    assert len(pages) == 4
+    assert sorted(seen) == sorted(record["id"] for record in RECORDS)
+    assert len(set(seen)) == len(seen)
+    assert all(page["pagination"]["total"] == len(RECORDS) for page in pages)
+    expected = [record["id"] for record in sorted(RECORDS, key=lambda record: (record["category"], record["id"]))]
+    assert seen == expected
+
+
+def test_records_added_between_pages_are_not_duplicated():
+    first = paginate(RECORDS, ("id",), limit=10)
+    grown = RECORDS + [{"id": "C000", "category": "瓷器"}]
+    rest = paginate(grown, ("id",), cursor=first["pagination"]["next_cursor"])
+    first_ids = {record["id"] for record in first["data"]}
+    assert first_ids.isdisjoint(record["id"] for record in rest["data"])
+    assert len(first["data"]) + len(rest["data"]) == len(RECORDS)
+
+
+def test_without_limit_returns_everything():
+    page = paginate(RECORDS, ("id",))
+    assert len(page["data"]) == len(RECORDS)
+    assert page["pagination"] == {"total": len(RECORDS), "limit": None, "next_cursor": None}
+
+
+def test_field_projection_ignores_unknown_fields():
+    page = paginate(RECORDS, ("id",), limit=2, fields="id, name,missing")
+    assert page["data"] == [{"id": "C001", "name": "藏品1"}, {"id": "C002", "name": "藏品2"}]
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(("青铜器", "C001"))) == ("青铜器", "C001")
+
+
+@pytest.mark.parametrize("limit", [0, -1, MAX_PAGE_SIZE + 1])
+def test_invalid_limit_is_rejected(limit):
+    with pytest.raises(HTTPException) as excinfo:
+        paginate(RECORDS, ("id",), limit=limit)
+    assert excinfo.value.status_code == 400
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", "YWJj", "eyJhIjoxfQ", "WzFd"])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as excinfo:
+        paginate(RECORDS, ("id",), limit=5, cursor=cursor)
+    assert excinfo.value.status_code == 400
+
+
+def test_missing_sort_key_fails_loudly():
+    with pytest.raises(ValueError, match="timestamp"):
+        paginate(RECORDS, ("timestamp", "id"), limit=5)
+
+
+@pytest.fixture(scope="module")
+def client():
+    app = FastAPI()
+    app.include_router(public_router)
+    app.include_router(internal_router)
+    return TestClient(app)
+
+
+def _pages(client, path, limit, **params):
+    records, cursor = [], None
+    while True:
+        body = client.get(path, params={**params, "limit": limit, **({"cursor": cursor} if cursor else {})}).json()
+        records.extend(body["data"])
+        cursor = body["pagination"]["next_cursor"]
+        if cursor is None:
+            return body, records
+
+
+def test_security_incidents_are_paged_from_surveillance_data(client):
+    incidents = get_data_store().get(SECURITY_MANAGEMENT_FILE)["surveillance"]["incidents"]
+    assert incidents
+
+    _, records = _pages(client, "/api/internal/security/incidents", 1)
+
+    assert [r["incident_id"] for r in records] == [i["incident_id"] for i in sorted(incidents, key=lambda i: (i["time"], i["incident_id"]))]
+    day = incidents[0]["time"][:10]
+    same_day = client.get("/api/internal/security/incidents", params={"start_date": day, "end_date": day}).json()["data"]
+    assert incidents[0]["incident_id"] in [r["incident_id"] for r in same_day]
+
+
+def test_energy_consumption_reports_summary_and_zones(client):
+    energy = get_data_store().get(FACILITY_MANAGEMENT_FILE)["energy_management"]
+    zones = energy["zones"]
+    assert zones
+
+    body, records = _pages(client, "/api/internal/facility/energy-consumption", 1)
+
+    assert body["summary"]["date"] == energy["consumption"]["date"]
+    assert [r["zone_id"] for r in records] == sorted(z["zone_id"] for z in zones)
+    assert all(r["date"] == energy["consumption"]["date"] for r in records)
+
+    by_name = client.get("/api/internal/facility/energy-consumption", params={"area": zones[0]["name"]}).json()
+    assert [r["zone_id"] for r in by_name["data"]] == [zones[0]["zone_id"]]
+    later = client.get("/api/internal/facility/energy-consumption", params={"start_date": "2999-01-01"}).json()
+    assert later["summary"] is None and later["data"] == []
+
+
+def test_lost_and_found_items_are_paged(client):
+    items = get_data_store().get(ON_VISIT_SERVICES_FILE)["facility_services"]["lost_and_found"]
+    assert items
+
+    _, records = _pages(client, "/api/public/facility-services/lost-found", 1)
+
+    assert [r["item_id"] for r in records] == sorted(i["item_id"] for i in items)
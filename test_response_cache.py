@@ -0,0 +1,100 @@
+import asyncio
+import json
+import time
+
+import numpy as np
+
+from utils.data_store import get_data_store
+from utils.response_cache import ResponseCache, is_cacheable_question, normalize_question
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def _cache(tmp_path, **kwargs):
+    data_file = tmp_path / "public.json"
+    if not data_file.exists():
+        data_file.write_text(json.dumps({"hours": "09:00-17:00"}), encoding="utf-8")
+    return ResponseCache("test", data_files=[str(data_file)], **kwargs)
+
+
+def test_normalization_ignores_width_case_punctuation_and_fillers():
+    assert normalize_question("请问，博物馆几点开门？") == normalize_question("博物馆几点开门")
+    assert normalize_question("ＡＢＣ展厅在哪") == normalize_question("abc 展厅在哪!")
+    assert normalize_question("您好 麻烦 问一下 门票多少钱") == normalize_question("问门票多少钱")
+    assert normalize_question("青铜鼎") != normalize_question("青铜器")
+
+
+def test_context_dependent_questions_are_not_cacheable():
+    assert is_cacheable_question("博物馆几点开门？")
+    assert not is_cacheable_question("那这个呢？")
+    assert not is_cacheable_question("它是哪个朝代的")
+    assert not is_cacheable_question("？")
+
+
+def test_exact_and_normalized_hits(tmp_path):
+    cache = _cache(tmp_path)
+    cache.put("博物馆几点开门？", "09:00开门", cost=0.5)
+
+    assert cache.get("博物馆几点开门？") == "09:00开门"
+    assert cache.get("请问 博物馆几点开门") == "09:00开门"
+    assert cache.get("博物馆几点闭馆？") is None
+
+    stats = cache.get_stats()
+    assert (stats["exact_hits"], stats["normalized_hits"], stats["misses"]) == (1, 1, 1)
+    assert stats["latency_saved_ms"] == 1000.0
+
+
+def test_entries_expire_after_ttl(tmp_path):
+    cache = _cache(tmp_path, ttl=0.05)
+    cache.put("门票多少钱", "80元")
+    assert cache.get("门票多少钱") == "80元"
+
+    time.sleep(0.1)
+
+    assert cache.get("门票多少钱") is None
+    assert cache.get_stats()["expirations"] == 1
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    cache = _cache(tmp_path, max_entries=2)
+    cache.put("问题一", "回答一")
+    cache.put("问题二", "回答二")
+    # 访问后"问题一"变为最近使用，写入第三条时淘汰"问题二"
+    assert cache.get("问题一") == "回答一"
+    cache.put("问题三", "回答三")
+
+    assert cache.get("问题二") is None
+    assert cache.get("问题一") == "回答一"
+    assert cache.get("问题三") == "回答三"
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_data_file_change_invalidates_cache(tmp_path):
+    cache = _cache(tmp_path)
+    cache.put("几点开门", "09:00开门")
+    assert cache.get("几点开门") == "09:00开门"
+
+    data_file = tmp_path / "public.json"
+    data_file.write_text(json.dumps({"hours": "10:00-18:00", "note": "夏季延长开放"}), encoding="utf-8")
+    get_data_store().invalidate(str(data_file))
+
+    assert cache.get("几点开门") is None
+    assert cache.get_stats()["invalidations"] == 1
+
+
+def test_semantic_hit_uses_question_vectors(tmp_path):
+    vectors = {"博物馆几点开门": [1.0, 0.0], "博物馆什么时候开门": [0.99, 0.05], "门票多少钱": [0.0, 1.0]}
+
+    async def embed(texts):
+        return np.array([vectors[text] for text in texts], dtype=np.float32)
+
+    cache = _cache(tmp_path, embedder=embed, similarity_threshold=0.95)
+
+    async def scenario():
+        await cache.aput("博物馆几点开门", "09:00开门")
+        return await cache.aget("博物馆什么时候开门"), await cache.aget("门票多少钱")
+
+    assert run(scenario()) == ("09:00开门", None)
+    assert cache.get_stats()["semantic_hits"] == 1
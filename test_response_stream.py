@@ -0,0 +1,166 @@
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("agentscope")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from services import core_orchestrator
+from utils.admission_control import AdmissionController
+from utils.response_stream import ResponseStream, current_stream, drain, format_sse
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def _parse_sse(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+class _FakeOrchestrator:
+    """代替核心协调智能体：按预设的分片写入当前请求的流式通道"""
+
+    def __init__(self, chunks=("您好", "您好，本馆", "您好，本馆九点开馆"), status="success"):
+        self.chunks = chunks
+        self.status = status
+
+    async def resolve_intent(self, message):
+        return "qa"
+
+    async def process_request(self, request_data):
+        stream = current_stream()
+        for text in self.chunks:
+            if stream is not None:
+                stream.emit_text(text, "m1")
+            await asyncio.sleep(0)
+        if self.status != "success":
+            return {"status": "error", "code": 502, "message": "下游服务不可用"}
+        return {"status": "success", "result": {"intent": "qa", "handled_by": "QAAgent", "response": self.chunks[-1] if self.chunks else "开馆时间为九点"}}
+
+
+@pytest.fixture
+def orchestrator(monkeypatch):
+    controller = AdmissionController(default_concurrency=1, default_max_queue=0, queue_timeout=1.0)
+    agent = _FakeOrchestrator()
+    monkeypatch.setattr(core_orchestrator, "admission_controller", controller)
+    monkeypatch.setattr(core_orchestrator, "_orchestrator_agent", agent)
+    app = FastAPI()
+    app.include_router(core_orchestrator.router)
+    return TestClient(app), controller, agent
+
+
+def _active(controller, lane="QAAgent"):
+    return controller.get_stats()["lanes"][lane]["active"]
+
+
+def test_emit_text_sends_only_the_new_suffix():
+    stream = ResponseStream()
+    stream.emit_text("您好", "m1")
+    stream.emit_text("您好，欢迎", "m1")
+    stream.emit_text("您好，欢迎", "m1")
+    stream.emit_text("重新生成", "m1")
+
+    deltas = [stream.queue.get_nowait()["data"]["delta"] for _ in range(stream.queue.qsize())]
+
+    assert deltas == ["您好", "，欢迎", "重新生成"]
+    assert stream.token_count == 3
+
+
+def test_format_sse_keeps_chinese_readable():
+    assert format_sse("token", {"delta": "展览"}) == 'event: token\ndata: {"delta": "展览"}\n\n'
+
+
+def test_drain_yields_events_emitted_while_and_after_the_task_runs():
+    stream = ResponseStream()
+
+    async def work():
+        stream.emit("token", {"delta": "a"})
+        await asyncio.sleep(0.01)
+        stream.emit("token", {"delta": "b"})
+        stream.emit("token", {"delta": "c"})
+
+    async def scenario():
+        task = asyncio.create_task(work())
+        return [event["data"]["delta"] async for event in drain(stream, task)]
+
+    assert run(scenario()) == ["a", "b", "c"]
+
+
+def test_stream_emits_meta_tokens_and_done(orchestrator):
+    client, controller, _ = orchestrator
+
+    response = client.post("/api/core/orchestrate/stream", json={"user_id": "u1", "message": "几点开馆"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _parse_sse(response.text)
+    assert [name for name, _ in events] == ["meta", "token", "token", "token", "done"]
+    assert events[0][1]["intent"] == "qa" and events[0][1]["agent"] == "QAAgent"
+    assert "".join(data["delta"] for name, data in events if name == "token") == "您好，本馆九点开馆"
+    assert events[-1][1]["handled_by"] == "QAAgent"
+    assert _active(controller) == 0
+
+
+def test_reply_without_model_stream_is_sent_as_one_token(orchestrator):
+    client, _, agent = orchestrator
+    agent.chunks = ()
+
+    events = _parse_sse(client.post("/api/core/orchestrate/stream", json={"user_id": "u1", "message": "几点开馆"}).text)
+
+    assert events[1] == ("token", {"delta": "开馆时间为九点"})
+    assert events[-1][0] == "done"
+
+
+def test_agent_error_is_sent_as_error_event_and_slot_released(orchestrator):
+    client, controller, agent = orchestrator
+    agent.status = "error"
+
+    events = _parse_sse(client.post("/api/core/orchestrate/stream", json={"user_id": "u1", "message": "几点开馆"}).text)
+
+    assert events[-1][0] == "error" and events[-1][1]["code"] == 502
+    assert _active(controller) == 0
+
+
+def test_busy_lane_is_rejected_before_streaming(orchestrator):
+    client, controller, _ = orchestrator
+
+    async def occupy():
+        await controller.acquire("QAAgent")
+
+    run(occupy())
+    response = client.post("/api/core/orchestrate/stream", json={"user_id": "u1", "message": "几点开馆"})
+
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
+    assert _active(controller) == 1
+
+
+def test_slot_is_released_when_client_disconnects_before_streaming(orchestrator):
+    _, controller, _ = orchestrator
+    request = core_orchestrator.RequestMessage(user_id="u1", message="几点开馆")
+
+    async def scenario():
+        response = await core_orchestrator.orchestrate_request_stream(request, None)
+        assert _active(controller) == 1
+
+        async def receive():
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            # 客户端已断开，发送响应头即失败，事件生成器从未运行
+            raise OSError("client disconnected")
+
+        with pytest.raises(OSError):
+            await response({"type": "http"}, receive, send)
+
+    run(scenario())
+
+    assert _active(controller) == 0
@@ -0,0 +1,80 @@
+import asyncio
+
+import numpy as np
+
+from utils.semantic_router import SemanticRouter
+
+_EXAMPLES = {"booking": ["预约门票"], "qa": ["开放时间"]}
+_VECTORS = {"预约门票": [1.0, 0.0], "开放时间": [0.0, 1.0], "我想订票": [0.9, 0.1], "几点开门": [0.1, 0.9]}
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def _embedder(delay=0.0):
+    calls = []
+
+    async def embed(texts):
+        calls.append(list(texts))
+        # 构建质心时一次传入全部示例短语，只让单条消息的向量化变慢
+        if delay and len(texts) == 1:
+            await asyncio.sleep(delay)
+        return np.array([_VECTORS[text] for text in texts], dtype=np.float32)
+
+    embed.model_name = "fake"
+    embed.calls = calls
+    return embed
+
+
+def _router(tmp_path, embedder, **kwargs):
+    return SemanticRouter(_EXAMPLES, embedder=embedder, threshold=0.5, margin=0.03,
+                          index_path=str(tmp_path / "centroids.npz"), **kwargs)
+
+
+def test_routes_by_nearest_centroid(tmp_path):
+    router = _router(tmp_path, _embedder())
+
+    async def scenario():
+        assert await router.load_or_build()
+        return await router.route("我想订票"), await router.route("几点开门")
+
+    (booking, booking_score), (qa, _) = run(scenario())
+
+    assert booking == "booking" and booking_score > 0.9
+    assert qa == "qa"
+
+
+def test_slow_embedding_falls_back_to_keywords(tmp_path):
+    embedder = _embedder(delay=0.5)
+    router = _router(tmp_path, embedder, embed_timeout=0.05, retry_interval=60)
+
+    async def scenario():
+        await router.load_or_build()
+        first = await router.route("我想订票")
+        calls_after_timeout = len(embedder.calls)
+        # 冷却期内不再调用向量模型
+        second = await router.route("几点开门")
+        return first, second, calls_after_timeout
+
+    first, second, calls_after_timeout = run(scenario())
+
+    assert first is None and second is None
+    assert len(embedder.calls) == calls_after_timeout
+    stats = router.get_stats()
+    assert stats["timeouts"] == 1
+    # 超时不影响已构建的质心索引
+    assert stats["ready"]
+
+
+def test_routing_resumes_after_cooldown(tmp_path):
+    embedder = _embedder(delay=0.5)
+    router = _router(tmp_path, embedder, embed_timeout=0.05, retry_interval=0)
+
+    async def scenario():
+        await router.load_or_build()
+        assert await router.route("我想订票") is None
+        router.embed_timeout = 0
+        return await router.route("我想订票")
+
+    assert run(scenario())[0] == "booking"
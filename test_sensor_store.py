@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+
+from utils.sensor_store import MAX_TIMESTAMP, SensorStore, parse_aggregates, parse_interval, parse_timestamp
+
+START = 1_700_000_000 // 3600 * 3600
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SensorStore(str(tmp_path / "sensors"), chunk_rows=16)
+    store.register("T1", "L1", "一号展厅", "温度", "°C")
+    return store
+
+
+def _readings(timestamps, values, sensor_id="T1"):
+    return [{"sensor_id": sensor_id, "timestamp": int(ts), "value": float(value)} for ts, value in zip(timestamps, values)]
+
+
+def test_query_across_chunk_boundaries(store):
+    timestamps = START + np.arange(50) * 60
+    values = np.linspace(18.0, 24.0, 50)
+    result = store.ingest(_readings(timestamps, values))
+    assert result == {"accepted": 50, "rejected": 0, "errors": []}
+    assert store.get_stats()["chunks"] >= 4
+
+    ts, vs = store.query("T1")
+    np.testing.assert_array_equal(ts, timestamps)
+    np.testing.assert_allclose(vs, values)
+
+    # [start, end) 跨越多个数据块
+    ts, vs = store.query("T1", int(timestamps[10]), int(timestamps[40]))
+    np.testing.assert_array_equal(ts, timestamps[10:40])
+    assert store.latest("T1") == (int(timestamps[-1]), pytest.approx(values[-1]))
+
+
+def test_aggregate_matches_numpy(store):
+    rng = np.random.default_rng(7)
+    timestamps = START + np.arange(120) * 60
+    values = np.round(rng.normal(20, 2, 120), 3)
+    # 乱序写入，存储按时间排序
+    order = rng.permutation(120)
+    store.ingest(_readings(timestamps[order], values[order]))
+
+    result = store.aggregate("T1", parse_interval("1h"), parse_aggregates("min,max,mean,p95"))
+    assert result["count"] == [60, 60]
+    assert result["bucket_start"][0].endswith(":00:00Z")
+    for bucket in range(2):
+        part = values[bucket * 60:(bucket + 1) * 60]
+        assert result["min"][bucket] == pytest.approx(part.min())
+        assert result["max"][bucket] == pytest.approx(part.max())
+        assert result["mean"][bucket] == pytest.approx(part.mean(), abs=1e-4)
+        assert result["p95"][bucket] == pytest.approx(np.percentile(part, 95), abs=1e-4)
+
+
+def test_aggregate_skips_empty_buckets(store):
+    store.ingest(_readings([START, START + 60, START + 3 * 3600], [1.0, 3.0, 5.0]))
+    result = store.aggregate("T1", 3600, ["mean"], start=START)
+    assert result["count"] == [2, 1]
+    assert result["mean"] == [2.0, 5.0]
+
+
+def test_invalid_readings_are_reported(store):
+    readings = [
+        {"sensor_id": "T1", "timestamp": START, "value": 20.0},
+        {"sensor_id": "T1", "timestamp": 10 ** 30, "value": 20.0},
+        {"sensor_id": "T1", "timestamp": "9999-99-99", "value": 20.0},
+        {"sensor_id": "T1", "timestamp": START + 60, "value": float("nan")},
+        {"sensor_id": "UNKNOWN", "timestamp": START, "value": 1.0},
+        {"sensor_id": "T1", "value": 1.0},
+    ]
+    result = store.ingest(readings)
+    assert result["accepted"] == 1
+    assert [error["index"] for error in result["errors"]] == [1, 2, 3, 4, 5]
+
+
+def test_readings_not_after_latest_are_ignored(store):
+    store.ingest(_readings([START + 120], [1.0]))
+    result = store.ingest(_readings([START, START + 120, START + 180, START + 180], [2.0, 3.0, 4.0, 5.0]))
+    assert result["accepted"] == 1 and result["rejected"] == 3
+    ts, vs = store.query("T1")
+    assert ts.tolist() == [START + 120, START + 180]
+    assert vs.tolist() == [1.0, 4.0]
+
+
+def test_second_instance_sees_writes(store):
+    other = SensorStore(store.root_dir, chunk_rows=16)
+    revision = other.revision()
+    store.ingest(_readings(START + np.arange(20) * 60, np.arange(20)))
+
+    assert other.revision() != revision
+    ts, _ = other.query("T1")
+    assert ts.size == 20
+
+    # 另一个实例继续追加，两个实例看到相同的数据
+    other.ingest(_readings([START + 20 * 60], [99.0]))
+    store.register("T2", "L1", "一号展厅", "湿度", "%")
+    assert store.query("T1")[0].size == 21
+    assert store.latest("T1") == (START + 20 * 60, 99.0)
+    assert "T2" in {sensor["sensor_id"] for sensor in other.sensors()}
+
+
+def test_parse_timestamp_bounds():
+    assert parse_timestamp("2024-01-01T00:00:00Z") == 1704067200
+    assert parse_timestamp(MAX_TIMESTAMP) == MAX_TIMESTAMP
+    for value in (-1, MAX_TIMESTAMP + 1, 1e300, "", None, True):
+        with pytest.raises(ValueError):
+            parse_timestamp(value)
@@ -0,0 +1,132 @@
+import asyncio
+from typing import Optional
+
+import pytest
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from utils.service_transport import InProcessTransport, ServiceCallError, ServiceTransport
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class _Item(BaseModel):
+    name: str
+    count: int = 1
+
+
+router = APIRouter(prefix="/api/test")
+
+
+@router.get("/items/{item_id}")
+def get_item(item_id: int, verbose: bool = Query(False), if_none_match: Optional[str] = Header(None)):
+    if item_id == 404:
+        raise HTTPException(status_code=404, detail="未找到")
+    return {"item_id": item_id, "verbose": verbose}
+
+
+@router.post("/items")
+async def create_item(item: _Item):
+    return {"created": item.name, "count": item.count}
+
+
+@router.get("/encoded")
+def encoded():
+    return JSONResponse({"status": "success", "data": [1, 2]})
+
+
+@router.get("/required")
+def required(q: str):
+    return {"q": q}
+
+
+class _RecordingTransport(ServiceTransport):
+    name = "recording"
+
+    def __init__(self):
+        self.calls = []
+
+    async def arequest(self, endpoint, method="GET", data=None):
+        self.calls.append((endpoint, method, data))
+        return {"via": "fallback"}
+
+    def request(self, endpoint, method="GET", data=None):
+        self.calls.append((endpoint, method, data))
+        return {"via": "fallback"}
+
+
+@pytest.fixture
+def fallback():
+    return _RecordingTransport()
+
+
+@pytest.fixture
+def transport(fallback):
+    return InProcessTransport([router], fallback=fallback)
+
+
+def test_path_and_query_parameters_are_converted(transport):
+    assert run(transport.arequest("/api/test/items/7", "GET", {"verbose": "true"})) == {"item_id": 7, "verbose": True}
+    # 查询参数也可以直接写在端点路径中，未传的参数使用默认值
+    assert transport.request("/api/test/items/8?verbose=1") == {"item_id": 8, "verbose": True}
+    assert transport.request("/api/test/items/9") == {"item_id": 9, "verbose": False}
+
+
+def test_post_body_is_validated_into_the_model(transport):
+    assert run(transport.arequest("/api/test/items", "POST", {"name": "导览器"})) == {"created": "导览器", "count": 1}
+    with pytest.raises(ServiceCallError) as excinfo:
+        run(transport.arequest("/api/test/items", "POST", {"count": "many"}))
+    assert excinfo.value.status_code == 422
+
+
+def test_missing_required_parameter_is_rejected(transport):
+    with pytest.raises(ServiceCallError) as excinfo:
+        transport.request("/api/test/required")
+    assert excinfo.value.status_code == 422
+    assert transport.request("/api/test/required", data={"q": "x"}) == {"q": "x"}
+
+
+def test_http_exception_keeps_its_status_code(transport):
+    with pytest.raises(ServiceCallError) as excinfo:
+        run(transport.arequest("/api/test/items/404"))
+    assert excinfo.value.status_code == 404
+
+
+def test_response_objects_are_decoded(transport):
+    assert transport.request("/api/test/encoded") == {"status": "success", "data": [1, 2]}
+
+
+def test_unknown_endpoint_goes_to_fallback(transport, fallback):
+    assert run(transport.arequest("/", "GET")) == {"via": "fallback"}
+    assert fallback.calls == [("/", "GET", None)]
+
+
+def test_sync_caller_uses_fallback_for_async_route(transport, fallback):
+    assert transport.request("/api/test/items", "POST", {"name": "导览器"}) == {"via": "fallback"}
+    assert fallback.calls == [("/api/test/items", "POST", {"name": "导览器"})]
+
+
+def test_without_fallback_unknown_endpoint_is_404():
+    transport = InProcessTransport([router])
+    with pytest.raises(ServiceCallError) as excinfo:
+        run(transport.arequest("/api/other"))
+    assert excinfo.value.status_code == 404
+
+
+def test_unsupported_method_is_rejected(transport):
+    with pytest.raises(ValueError):
+        transport.request("/api/test/items/1", "DELETE")
+
+
+def test_real_routers_answer_in_process():
+    from services.internal_services import router as internal_router
+    from services.public_services import router as public_router
+
+    transport = InProcessTransport([public_router, internal_router])
+    slots = run(transport.arequest("/api/public/tour-booking/available-slots", "GET", {"limit": 1}))
+
+    assert slots["status"] == "success" and len(slots["data"]) == 1
+    assert transport.request("/api/public/qa/specific/museum/history")["status"] == "success"
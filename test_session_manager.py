@@ -0,0 +1,119 @@
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("agentscope")
+
+from agentscope.message import Msg
+
+from utils.session_manager import BoundedMemory, SessionManager, SessionScopedMemory
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def _msg(text):
+    return Msg(name="visitor", content=text, role="user")
+
+
+class _FlushRecorder(BoundedMemory):
+    flushed = []
+
+    def __init__(self, session_id, max_messages):
+        super().__init__(max_messages)
+        self.session_id = session_id
+
+    def flush(self):
+        _FlushRecorder.flushed.append(self.session_id)
+
+
+def _recording_factory(session_id, owner, max_messages):
+    return _FlushRecorder(session_id, max_messages)
+
+
+def test_memory_is_isolated_per_session():
+    sessions = SessionManager()
+    memory = SessionScopedMemory("QAAgent")
+
+    async def visit(user_id, text):
+        async with sessions.session_scope(user_id):
+            await memory.add(_msg(text))
+            # 让出事件循环，与其他会话交错执行
+            await asyncio.sleep(0)
+            return [m.content for m in await memory.get_memory()]
+
+    async def scenario():
+        return await asyncio.gather(visit("u1", "我叫张三"), visit("u2", "我叫李四"), visit("u1", "我的预约"))
+
+    first, second, third = run(scenario())
+
+    assert second == ["我叫李四"]
+    assert third == ["我叫张三", "我的预约"]
+
+
+def test_agents_have_separate_memories_within_a_session():
+    sessions = SessionManager()
+    qa, booking = SessionScopedMemory("QAAgent"), SessionScopedMemory("TourBookingAgent")
+
+    async def scenario():
+        async with sessions.session_scope("u1"):
+            await qa.add(_msg("开放时间"))
+            await booking.add(_msg("预约门票"))
+            return [m.content for m in await qa.get_memory()], [m.content for m in await booking.get_memory()]
+
+    assert run(scenario()) == (["开放时间"], ["预约门票"])
+
+
+def test_messages_are_bounded_per_session():
+    sessions = SessionManager(max_messages=3)
+    memory = SessionScopedMemory("QAAgent")
+
+    async def scenario():
+        async with sessions.session_scope("u1"):
+            for index in range(5):
+                await memory.add(_msg(f"消息{index}"))
+            return [m.content for m in await memory.get_memory()]
+
+    assert run(scenario()) == ["消息2", "消息3", "消息4"]
+
+
+def test_least_recently_used_session_is_evicted_and_flushed():
+    _FlushRecorder.flushed = []
+    sessions = SessionManager(max_sessions=2, memory_factory=_recording_factory)
+    sessions.get("u1").memory("QAAgent")
+    sessions.get("u2").memory("QAAgent")
+    sessions.get("u1")
+
+    sessions.get("u3")
+
+    assert set(sessions._sessions) == {"u1", "u3"}
+    assert "u2" in _FlushRecorder.flushed
+    stats = sessions.get_stats()
+    assert stats["evicted_lru"] == 1 and stats["active_sessions"] == 2
+
+
+def test_idle_sessions_are_evicted():
+    sessions = SessionManager(idle_ttl=0.05)
+    first = sessions.get("u1")
+    assert sessions.get("u1") is first
+
+    time.sleep(0.1)
+    sessions.get("u2")
+
+    assert "u1" not in sessions._sessions
+    assert sessions.get("u1") is not first
+    assert sessions.get_stats()["evicted_idle"] == 1
+
+
+def test_default_memory_is_used_outside_a_session():
+    memory = SessionScopedMemory("QAAgent")
+
+    async def scenario():
+        await memory.add(_msg("脚本中直接调用"))
+        async with SessionManager().session_scope("u1"):
+            inside = await memory.size()
+        return inside, await memory.size()
+
+    assert run(scenario()) == (0, 1)
@@ -0,0 +1,188 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from utils.single_flight import SingleFlight, make_key
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_concurrent_calls_with_same_key_execute_once():
+    async def scenario():
+        group = SingleFlight("test")
+        executions = 0
+
+        async def fetch():
+            nonlocal executions
+            executions += 1
+            await asyncio.sleep(0.05)
+            return {"items": [1, 2, 3]}
+
+        results = await asyncio.gather(*(group.do("k", fetch) for _ in range(5)))
+        assert executions == 1
+        assert all(result == {"items": [1, 2, 3]} for result in results)
+        stats = group.get_stats()
+        assert stats["calls"] == 5
+        assert stats["executed"] == 1
+        assert stats["coalesced"] == 4
+        assert stats["max_waiters"] == 4
+        assert stats["in_flight"] == 0
+
+    run(scenario())
+
+
+def test_different_keys_are_not_coalesced():
+    async def scenario():
+        group = SingleFlight("test")
+
+        async def fetch(value):
+            await asyncio.sleep(0.01)
+            return value
+
+        results = await asyncio.gather(group.do("a", lambda: fetch(1)), group.do("b", lambda: fetch(2)))
+        assert results == [1, 2]
+        assert group.get_stats()["executed"] == 2
+
+    run(scenario())
+
+
+def test_waiters_receive_independent_copies():
+    async def scenario():
+        group = SingleFlight("test")
+
+        async def fetch():
+            await asyncio.sleep(0.02)
+            return {"items": [1]}
+
+        leader, follower = await asyncio.gather(group.do("k", fetch), group.do("k", fetch))
+        follower["items"].append(2)
+        assert leader == {"items": [1]}
+
+    run(scenario())
+
+
+def test_exception_is_shared_and_not_cached():
+    async def scenario():
+        group = SingleFlight("test")
+        executions = 0
+
+        async def failing():
+            nonlocal executions
+            executions += 1
+            await asyncio.sleep(0.02)
+            raise ValueError("上游失败")
+
+        results = await asyncio.gather(group.do("k", failing), group.do("k", failing), return_exceptions=True)
+        assert executions == 1
+        assert all(isinstance(result, ValueError) for result in results)
+
+        # 调用结束后不缓存结果，下一次调用重新执行
+        with pytest.raises(ValueError):
+            await group.do("k", failing)
+        assert executions == 2
+
+    run(scenario())
+
+
+def test_sync_call_coalesces_across_threads():
+    group = SingleFlight("test")
+    started = threading.Event()
+    executions = []
+
+    def fetch():
+        executions.append(1)
+        started.set()
+        time.sleep(0.1)
+        return [1, 2]
+
+    results = []
+
+    def worker():
+        results.append(group.call("k", fetch))
+
+    leader = threading.Thread(target=worker)
+    leader.start()
+    started.wait(1)
+    followers = [threading.Thread(target=worker) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    for thread in [leader, *followers]:
+        thread.join()
+
+    assert len(executions) == 1
+    assert results == [[1, 2]] * 4
+    assert group.get_stats()["coalesced"] == 3
+
+
+def test_make_key_normalizes_whitespace_and_dict_order():
+    assert make_key("开放  时间\n", {"b": 1, "a": 2}) == make_key("开放 时间", {"a": 2, "b": 1})
+    assert make_key("a") != make_key("b")
+
+
+def _upstream(chunks, started=None, delay=0.01):
+    async def generate():
+        if started is not None:
+            started.append(1)
+        for chunk in chunks:
+            await asyncio.sleep(delay)
+            yield chunk
+
+    async def call():
+        return generate()
+
+    return call
+
+
+def test_stream_is_shared_by_concurrent_callers():
+    async def scenario():
+        group = SingleFlight("test")
+        started = []
+        call = _upstream([{"text": "a"}, {"text": "b"}], started)
+
+        async def consume():
+            return [chunk async for chunk in await group.do_stream("k", call)]
+
+        results = await asyncio.gather(consume(), consume(), consume())
+        assert results == [[{"text": "a"}, {"text": "b"}]] * 3
+        assert started == [1]
+        assert group.get_stats()["in_flight"] == 0
+
+    run(scenario())
+
+
+def test_leader_disconnect_before_follower_iterates_keeps_stream():
+    async def scenario():
+        group = SingleFlight("test")
+        started = []
+        call = _upstream(["a", "b", "c"], started)
+
+        leader = await group.do_stream("k", call)
+        follower = await group.do_stream("k", call)
+        # 领头调用方在跟随者开始迭代之前断开
+        await leader.aclose()
+        del leader
+
+        assert [chunk async for chunk in follower] == ["a", "b", "c"]
+        assert started == [1]
+
+    run(scenario())
+
+
+def test_waiter_reissues_call_when_shared_stream_was_cancelled():
+    async def scenario():
+        group = SingleFlight("test")
+        started = []
+        call = _upstream(["a", "b"], started)
+
+        leader = await group.do_stream("k", call)
+        await leader.aclose()
+        # 上游流已被取消但后台任务尚未结束，后到的调用重新发起而不是读取被取消的流
+        follower = await group.do_stream("k", call)
+        assert [chunk async for chunk in follower] == ["a", "b"]
+        assert group.get_stats()["executed"] == 2
+
+    run(scenario())
@@ -0,0 +1,99 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+pytest.importorskip("agentscope")
+
+from agentscope.message import Msg
+
+from utils.sqlite_memory import SQLiteMemory, SQLiteMemoryStore
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def _msg(text, role="user"):
+    return Msg(name="visitor" if role == "user" else "QAAgent", content=text, role=role)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteMemoryStore(os.path.join(tmp_path, "memory.sqlite3"), keep_messages=3, retention=3600, compact_interval=3600)
+    yield store
+    store.close()
+
+
+def test_messages_are_buffered_until_flush(store):
+    async def scenario():
+        memory = SQLiteMemory(store, "S1", "QAAgent", max_messages=10, batch_size=16)
+        await memory.add([_msg("开放时间？"), _msg("09:00-17:00", "assistant")])
+        assert store.last_id("S1", "QAAgent") == 0
+        await memory.aflush()
+        assert store.last_id("S1", "QAAgent") > 0
+
+    run(scenario())
+
+
+def test_reload_after_another_process_writes(store):
+    async def scenario():
+        first = SQLiteMemory(store, "S1", "QAAgent", max_messages=10)
+        second = SQLiteMemory(store, "S1", "QAAgent", max_messages=10)
+        await first.add(_msg("第一个问题"))
+        await first.aflush()
+        assert [m.content for m in await second.get_memory()] == ["第一个问题"]
+
+        # 另一个工作进程写入新消息后，读取时按最新消息ID重新加载
+        await second.add(_msg("第二个问题"))
+        await second.aflush()
+        assert [m.content for m in await first.get_memory()] == ["第一个问题", "第二个问题"]
+
+    run(scenario())
+
+
+def test_lazy_load_keeps_only_recent_messages(store):
+    async def scenario():
+        writer = SQLiteMemory(store, "S1", "QAAgent", max_messages=10)
+        await writer.add([_msg(f"问题{i}") for i in range(6)])
+        await writer.aflush()
+        reader = SQLiteMemory(store, "S1", "QAAgent", max_messages=2)
+        assert [m.content for m in await reader.get_memory()] == ["问题4", "问题5"]
+
+    run(scenario())
+
+
+def test_compact_keeps_recent_messages_and_drops_stale_sessions(store):
+    async def scenario():
+        active = SQLiteMemory(store, "active", "QAAgent", max_messages=10)
+        await active.add([_msg(f"问题{i}") for i in range(5)])
+        await active.aflush()
+        stale = SQLiteMemory(store, "stale", "QAAgent", max_messages=10)
+        await stale.add(_msg("很久以前的问题"))
+        await stale.aflush()
+
+    run(scenario())
+    # 把 stale 会话的最后活跃时间改到保留期之前
+    store._conn.execute("UPDATE sessions SET last_active = ? WHERE session_id = 'stale'", (time.time() - 7200,))
+
+    deleted = store.compact()
+    assert deleted == 3
+    assert store.get_stats()["sessions"] == 1
+    messages, _ = store.load_recent("active", "QAAgent", 10)
+    assert [m.content for m in messages] == ["问题2", "问题3", "问题4"]
+
+
+def test_clear_and_delete(store):
+    async def scenario():
+        memory = SQLiteMemory(store, "S1", "QAAgent", max_messages=10)
+        await memory.add([_msg("a"), _msg("b"), _msg("c")])
+        await memory.aflush()
+        await memory.delete(1)
+        assert [m.content for m in await memory.get_memory()] == ["a", "c"]
+        fresh = SQLiteMemory(store, "S1", "QAAgent", max_messages=10)
+        assert [m.content for m in await fresh.get_memory()] == ["a", "c"]
+        await memory.clear()
+        assert await fresh.size() == 0
+
+    run(scenario())
@@ -0,0 +1,64 @@
+from utils.text_index import InvertedIndex, tokenize, tokenize_keywords, tokenize_query
+
+
+def _titles(results):
+    return [record["title"] for record, _ in results]
+
+
+def _exhibition_index():
+    index = InvertedIndex({"title": 3.0, "description": 1.0})
+    index.sync([
+        ("E1", {"title": "古埃及文明特展", "description": "木乃伊与法老的世界"}),
+        ("E2", {"title": "古代文明展", "description": "两河流域与黄河流域的早期文明"}),
+        ("E3", {"title": "青铜器精品展", "description": "商周青铜鼎 bronze ding"}),
+        ("E4", {"title": "书画陈列", "description": "明清文人书画，兼论古代文明的审美"}),
+    ])
+    return index
+
+
+def test_tokenize_indexes_chars_and_bigrams():
+    assert tokenize("青铜鼎 Ding") == ["青", "青铜", "铜", "铜鼎", "鼎", "ding"]
+
+
+def test_tokenize_keywords_groups_terms_per_keyword():
+    assert tokenize_keywords("古代文明 Bronze") == [["古代", "代文", "文明"], ["bronze"]]
+    assert tokenize_keywords("鼎") == [["鼎"]]
+    assert tokenize_query("文明 古代文明") == ["文明", "古代", "代文"]
+
+
+def test_keyword_matches_as_phrase():
+    # "古埃及文明特展" 只共享 "文明" 这个bigram，不应命中 "古代文明"
+    assert _titles(_exhibition_index().search("古代文明")) == ["古代文明展", "书画陈列"]
+
+
+def test_any_mode_ors_across_keywords():
+    titles = _titles(_exhibition_index().search("古代文明 青铜", match="any"))
+    assert set(titles) == {"古代文明展", "书画陈列", "青铜器精品展"}
+
+
+def test_all_mode_requires_every_keyword():
+    index = _exhibition_index()
+    assert _titles(index.search("古代文明 青铜", match="all")) == []
+    assert _titles(index.search("青铜 bronze", match="all")) == ["青铜器精品展"]
+
+
+def test_title_match_ranks_above_description_match():
+    # 标题权重更高，"古代文明展" 排在只在描述中提到的 "书画陈列" 之前
+    results = _exhibition_index().search("古代文明")
+    assert results[0][1] > results[1][1]
+
+
+def test_single_character_query():
+    assert _titles(_exhibition_index().search("鼎")) == ["青铜器精品展"]
+
+
+def test_sync_updates_and_removes_documents():
+    index = _exhibition_index()
+    stats = index.sync([
+        ("E1", {"title": "古埃及文明特展", "description": "木乃伊与法老的世界"}),
+        ("E3", {"title": "青铜器精品展", "description": "商周礼器"}),
+    ])
+    assert stats == {"added": 0, "updated": 1, "removed": 2}
+    assert len(index) == 2
+    assert _titles(index.search("bronze")) == []
+    assert _titles(index.search("古代文明")) == []
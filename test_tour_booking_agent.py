@@ -0,0 +1,176 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("agentscope")
+
+from agentscope.message import Msg
+
+from agents.tour_booking_agent import TourBookingAgent
+from utils.agent_tools import MuseumToolkit
+from utils.model_pool import ModelPool
+from utils.session_manager import SessionManager
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture
+def booked(monkeypatch):
+    """替代预约服务，记录提交的预约信息"""
+    calls = []
+
+    async def fake_create(booking_data):
+        calls.append(dict(booking_data))
+        return {"status": "success", "data": {**booking_data, "booking_id": f"B{len(calls):03d}"}}
+
+    monkeypatch.setattr(MuseumToolkit, "acreate_booking", staticmethod(fake_create))
+    return calls
+
+
+def _agent(monkeypatch, extracted=None, use_model_fallback=True):
+    """创建不连接Ollama的智能体，模型抽取替换为返回预设结果，并记录调用次数"""
+    agent = TourBookingAgent(model_pool=ModelPool(hosts=["http://127.0.0.1:1"], health_interval=0))
+    agent.use_model_fallback = use_model_fallback
+    agent.model_calls = []
+
+    async def fake_extract(user_message, user_id):
+        agent.model_calls.append(user_message)
+        return dict(extracted or {})
+
+    monkeypatch.setattr(agent, "_extract_with_model", fake_extract)
+    return agent
+
+
+async def _say(agent, sessions, user_id, text):
+    async with sessions.session_scope(user_id):
+        reply = await agent.reply(Msg(name=user_id, content=text, role="user"))
+    return reply.content
+
+
+def test_name_pattern_skips_role_words(monkeypatch):
+    agent = _agent(monkeypatch)
+
+    assert "visitor_name" not in agent._extract_slots("我是学生，想预约明天的票")
+    assert "visitor_name" not in agent._extract_slots("我是学生家长，手机13800000000")
+    assert agent._extract_slots("我是学生，我叫李雷，手机13800000000")["visitor_name"] == "李雷"
+    assert agent._extract_slots("我是韩梅梅，13800000000")["visitor_name"] == "韩梅梅"
+    assert agent._extract_slots("姓名：王小明 电话13800000000")["visitor_name"] == "王小明"
+
+
+def test_rules_complete_booking_without_model(monkeypatch, booked):
+    agent = _agent(monkeypatch)
+    sessions = SessionManager()
+
+    reply = run(_say(agent, sessions, "u1", "预约2030年5月1日 09:00-11:00 两张学生票，我叫张三，手机13800000000"))
+
+    assert "预约成功" in reply
+    assert agent.model_calls == []
+    assert booked == [{
+        "visitor_name": "张三", "visitor_phone": "13800000000", "visit_date": "2030-05-01",
+        "visit_time": "09:00-11:00", "ticket_type": "学生票", "ticket_count": 2,
+    }]
+
+
+def test_model_fills_only_fields_rules_missed(monkeypatch, booked):
+    extracted = {"intent": "booking", "visitor_name": "李四", "visitor_phone": "13900000000", "visit_time": "13:00-15:00"}
+    agent = _agent(monkeypatch, extracted)
+
+    reply = run(_say(agent, SessionManager(), "u1", "预约2030-05-01的门票，我叫张三"))
+
+    assert "预约成功" in reply
+    assert len(agent.model_calls) == 1
+    # 规则抽取到的字段优先，模型只补充缺失的字段
+    assert booked[0]["visitor_name"] == "张三"
+    assert booked[0]["visitor_phone"] == "13900000000"
+    assert booked[0]["visit_time"] == "13:00-15:00"
+
+
+def test_model_classifies_intent_only_when_keywords_miss(monkeypatch, booked):
+    extracted = {"intent": "booking", "visitor_name": "张三", "visitor_phone": "13800000000",
+                 "visit_date": "2030-05-01", "visit_time": "09:00-11:00"}
+    agent = _agent(monkeypatch, extracted)
+
+    reply = run(_say(agent, SessionManager(), "u1", "五一那天想带孩子过来"))
+
+    assert "预约成功" in reply
+    # 意图识别和信息抽取在同一次模型调用中完成
+    assert len(agent.model_calls) == 1
+
+
+def test_partial_booking_is_merged_across_turns(monkeypatch, booked):
+    agent = _agent(monkeypatch, use_model_fallback=False)
+    sessions = SessionManager()
+
+    async def scenario():
+        first = await _say(agent, sessions, "u1", "我想预约2030-05-01的门票，我叫张三")
+        second = await _say(agent, sessions, "u1", "13800000000")
+        third = await _say(agent, sessions, "u1", "09:00-11:00")
+        return first, second, third
+
+    first, second, third = run(scenario())
+
+    assert "手机号" in first and "参观时段" in first
+    assert "手机号" not in second and "参观时段" in second
+    assert "预约成功" in third
+    assert booked == [{
+        "visitor_name": "张三", "visitor_phone": "13800000000", "visit_date": "2030-05-01",
+        "visit_time": "09:00-11:00", "ticket_type": "成人票", "ticket_count": 1,
+    }]
+    assert agent.model_calls == []
+
+
+def test_reply_hitting_other_keywords_still_completes_booking(monkeypatch, booked):
+    agent = _agent(monkeypatch, use_model_fallback=False)
+    sessions = SessionManager()
+
+    async def scenario():
+        await _say(agent, sessions, "u1", "预约2030-05-01 09:00-11:00的门票，我叫张三")
+        # "我的"是查询预约的关键词，但本轮补充了尚缺的手机号
+        return await _say(agent, sessions, "u1", "我的手机号是13800000000")
+
+    assert "预约成功" in run(scenario())
+    assert booked[0]["visitor_phone"] == "13800000000"
+
+
+def test_partial_bookings_are_isolated_per_session(monkeypatch, booked):
+    agent = _agent(monkeypatch, use_model_fallback=False)
+    sessions = SessionManager()
+
+    async def scenario():
+        await _say(agent, sessions, "u1", "预约2030-05-01 09:00-11:00的门票，我叫张三")
+        other = await _say(agent, sessions, "u2", "13900000000")
+        mine = await _say(agent, sessions, "u1", "13800000000")
+        return other, mine
+
+    other, mine = run(scenario())
+
+    assert "预约成功" not in other
+    assert "预约成功" in mine
+    assert [b["visitor_phone"] for b in booked] == ["13800000000"]
+
+
+def test_failed_booking_keeps_draft_for_retry(monkeypatch):
+    agent = _agent(monkeypatch, use_model_fallback=False)
+    sessions = SessionManager()
+    attempts = []
+
+    async def fake_create(booking_data):
+        attempts.append(dict(booking_data))
+        if booking_data["visit_time"] == "09:00-11:00":
+            return {"status": "error", "message": "该时段余票不足"}
+        return {"status": "success", "data": {**booking_data, "booking_id": "B001"}}
+
+    monkeypatch.setattr(MuseumToolkit, "acreate_booking", staticmethod(fake_create))
+
+    async def scenario():
+        failed = await _say(agent, sessions, "u1", "预约2030-05-01 09:00-11:00的门票，我叫张三，手机13800000000")
+        retried = await _say(agent, sessions, "u1", "那就13:00-15:00")
+        return failed, retried
+
+    failed, retried = run(scenario())
+
+    assert "预约失败" in failed
+    assert "预约成功" in retried
+    assert attempts[1]["visitor_name"] == "张三" and attempts[1]["visit_time"] == "13:00-15:00"
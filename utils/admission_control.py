@@ -0,0 +1,180 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 优先级数值越小越先被调度
+PRIORITY_INTERNAL = 0
+PRIORITY_PUBLIC = 1
+
+
+class AdmissionRejected(Exception):
+    """请求未被接纳：等待队列已满（queue_full）或排队超过截止时间（deadline）"""
+
+    def __init__(self, lane: str, reason: str, retry_after: int):
+        super().__init__(f"{lane} 繁忙（{reason}），请 {retry_after} 秒后重试")
+        self.lane = lane
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Lane:
+    """单个下游智能体的并发槽位、优先级等待队列和统计信息"""
+
+    def __init__(self, name: str, concurrency: int, max_queue: int):
+        self.name = name
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.active = 0
+        self.waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self.queued = 0
+        self.stats = {"admitted": 0, "rejected": 0, "timed_out": 0, "completed": 0}
+        self.wait_times: Deque[float] = deque(maxlen=1000)
+        self.service_time = 0.0
+
+    def record_service_time(self, seconds: float) -> None:
+        # 指数滑动平均，用于估算 Retry-After
+        self.service_time = seconds if self.service_time == 0 else 0.8 * self.service_time + 0.2 * seconds
+
+    def retry_after(self) -> int:
+        estimate = (self.queued + 1) * (self.service_time or 1.0) / max(self.concurrency, 1)
+        return max(1, math.ceil(estimate))
+
+    def snapshot(self) -> Dict[str, Any]:
+        waits = sorted(self.wait_times)
+
+        def percentile(p: float) -> float:
+            if not waits:
+                return 0.0
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))] * 1000, 2)
+
+        return {
+            **self.stats,
+            "concurrency": self.concurrency,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "queue_depth": self.queued,
+            "wait_ms_p50": percentile(0.5),
+            "wait_ms_p95": percentile(0.95),
+            "wait_ms_max": round(waits[-1] * 1000, 2) if waits else 0.0,
+            "avg_service_ms": round(self.service_time * 1000, 2)
+        }
+
+
+class AdmissionController:
+    """协调请求的准入控制
+
+    - 每个下游智能体一个并发上限（信号量语义），避免Ollama饱和时请求无限堆积
+    - 超出并发的请求进入有界等待队列，队列满时立即拒绝（429 + Retry-After）
+    - 排队超过截止时间的请求被放弃，而不是一起超时
+    - 内部员工的请求（PRIORITY_INTERNAL）优先于公众请求出队，优先级由调用方身份决定
+    """
+
+    def __init__(self, default_concurrency: int = 4, default_max_queue: int = 32,
+                 queue_timeout: float = 30.0, limits: Optional[Dict[str, int]] = None):
+        """
+        Args:
+            default_concurrency: 每个下游智能体默认的最大并发数
+            default_max_queue: 每个下游智能体默认的最大排队数
+            queue_timeout: 排队等待的截止时间（秒）
+            limits: 按智能体名称覆盖并发上限，如 {"QAAgent": 2}
+        """
+        self.default_concurrency = default_concurrency
+        self.default_max_queue = default_max_queue
+        self.queue_timeout = queue_timeout
+        self.limits = limits or {}
+        self._lanes: Dict[str, _Lane] = {}
+        self._sequence = itertools.count()
+
+    def _lane(self, name: str) -> _Lane:
+        lane = self._lanes.get(name)
+        if lane is None:
+            lane = _Lane(name, self.limits.get(name, self.default_concurrency), self.default_max_queue)
+            self._lanes[name] = lane
+        return lane
+
+    async def acquire(self, lane_name: str, priority: int = PRIORITY_PUBLIC, timeout: Optional[float] = None) -> float:
+        """获取一个并发槽位，返回排队等待的秒数
+
+        Raises:
+            AdmissionRejected: 队列已满或等待超过截止时间
+        """
+        lane = self._lane(lane_name)
+        started = time.monotonic()
+
+        if lane.active < lane.concurrency and lane.queued == 0:
+            lane.active += 1
+            lane.stats["admitted"] += 1
+            lane.wait_times.append(0.0)
+            return 0.0
+
+        if lane.queued >= lane.max_queue:
+            lane.stats["rejected"] += 1
+            raise AdmissionRejected(lane_name, "queue_full", lane.retry_after())
+
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        heapq.heappush(lane.waiters, (priority, next(self._sequence), future))
+        lane.queued += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout or self.queue_timeout)
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled():
+                # 超时的同时恰好被分配了槽位，照常接纳
+                pass
+            else:
+                future.cancel()
+                lane.queued -= 1
+                lane.stats["timed_out"] += 1
+                raise AdmissionRejected(lane_name, "deadline", lane.retry_after())
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 已分配到槽位但调用方被取消，归还槽位
+                self.release(lane_name)
+            else:
+                future.cancel()
+                lane.queued -= 1
+            raise
+
+        waited = time.monotonic() - started
+        lane.stats["admitted"] += 1
+        lane.wait_times.append(waited)
+        return waited
+
+    def release(self, lane_name: str, service_time: Optional[float] = None) -> None:
+        """释放槽位：优先把槽位直接交给优先级最高的等待者"""
+        lane = self._lane(lane_name)
+        if service_time is not None:
+            lane.record_service_time(service_time)
+            lane.stats["completed"] += 1
+
+        while lane.waiters:
+            _, _, future = heapq.heappop(lane.waiters)
+            if not future.done():
+                lane.queued -= 1
+                future.set_result(True)
+                return
+        lane.active -= 1
+
+    @asynccontextmanager
+    async def slot(self, lane_name: str, priority: int = PRIORITY_PUBLIC) -> AsyncIterator[float]:
+        """在并发槽位内执行代码块，产出排队等待的秒数"""
+        waited = await self.acquire(lane_name, priority)
+        started = time.monotonic()
+        try:
+            yield waited
+        finally:
+            self.release(lane_name, time.monotonic() - started)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """各下游智能体的并发、队列深度、拒绝/超时次数和排队耗时"""
+        return {
+            "queue_timeout": self.queue_timeout,
+            "lanes": {name: lane.snapshot() for name, lane in self._lanes.items()}
+        }
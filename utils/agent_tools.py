@@ -1,50 +1,116 @@
-import requests
-import json
 import os
+from datetime import datetime, timedelta, timezone
 from typing import Dict, Any, List, Optional
-from utils.email_tool import send_email
+from utils.email_tool import get_mail_dispatcher, OutboxFull
+from utils.service_transport import ServiceTransport, ServiceCallError, HttpTransport, InProcessTransport
+from utils.single_flight import get_single_flight, make_key
+from utils.json_response import dumps_text
+from utils.http_cache import get_conditional_cache
 import logging
 from agentscope.tool import ToolResponse
-import requests
 
 logger = logging.getLogger(__name__)
 
 class MuseumToolkit:
     """博物馆智能体工具集"""
     
-    # 基础URL，指向我们的FastAPI服务
-    BASE_URL = "http://localhost:8000"
+    # 服务调用传输层：默认通过HTTP连接池调用FastAPI服务，
+    # 智能体运行在API服务进程内时可通过 configure_transport("inprocess", routers) 切换为直接调用路由函数
+    # GET请求按URL缓存最近的ETag和结果，数据未变化时服务端返回304，不再传输和解析响应体
+    _http_transport = HttpTransport(cache=get_conditional_cache("museum_toolkit"))
+    _transport: ServiceTransport = _http_transport
+    # 相同的并发GET请求（如开展时大量游客同时查询"当前展览"）合并为一次调用，POST等写操作不合并
+    _single_flight = get_single_flight("service_calls")
+    _coalesce = os.getenv("MUSEUM_SINGLE_FLIGHT", "true").lower() not in ("0", "false", "no")
+    
+    @classmethod
+    def configure_http(cls, timeout: Optional[float] = None, connect_timeout: Optional[float] = None,
+                       max_connections: Optional[int] = None, max_keepalive_connections: Optional[int] = None,
+                       base_url: Optional[str] = None) -> None:
+        """调整HTTP客户端的超时和连接池配置，已创建的客户端会在下次调用时按新配置重建"""
+        cls._http_transport.configure(
+            timeout=timeout,
+            connect_timeout=connect_timeout,
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            base_url=base_url
+        )
+    
+    @classmethod
+    def configure_transport(cls, mode: str, routers: Optional[List[Any]] = None) -> ServiceTransport:
+        """选择服务调用方式
+        
+        Args:
+            mode: "http"（通过HTTP调用，适用于远程部署）或 "inprocess"（进程内直接调用路由函数）
+            routers: inprocess模式下可直接调用的FastAPI路由器列表
+        """
+        if mode == "http":
+            cls._transport = cls._http_transport
+        elif mode == "inprocess":
+            cls._transport = InProcessTransport(routers or [], fallback=cls._http_transport)
+        else:
+            raise ValueError(f"不支持的服务调用方式: {mode}")
+        logger.info(f"服务调用方式已设置为: {cls._transport.name}")
+        return cls._transport
+    
+    @classmethod
+    def get_transport(cls) -> ServiceTransport:
+        """获取当前使用的服务调用传输层"""
+        return cls._transport
+    
+    @classmethod
+    async def aclose(cls) -> None:
+        """关闭共享的HTTP客户端，通常在应用关闭时调用"""
+        await cls._transport.aclose()
+        if cls._transport is not cls._http_transport:
+            await cls._http_transport.aclose()
+    
+    @staticmethod
+    async def acall_service(endpoint: str, method: str = "GET", data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """调用博物馆服务API（异步，不阻塞事件循环）"""
+        transport = MuseumToolkit._transport
+        logger.info(f"开始调用服务: {endpoint}, 方法: {method}, 数据: {data}, 传输方式: {transport.name}")
+        try:
+            if MuseumToolkit._coalesce and method.upper() == "GET":
+                result = await MuseumToolkit._single_flight.do(
+                    make_key(transport.name, endpoint, data), lambda: transport.arequest(endpoint, method, data)
+                )
+            else:
+                result = await transport.arequest(endpoint, method, data)
+            logger.info(f"服务调用成功: {endpoint}")
+            return result
+        except ServiceCallError as e:
+            logger.error(f"调用服务失败: {endpoint}, 状态码: {e.status_code}, 错误: {str(e)}")
+            return {"status": "error", "message": str(e)}
     
     @staticmethod
     def call_service(endpoint: str, method: str = "GET", data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """调用博物馆服务API"""
-        url = f"{MuseumToolkit.BASE_URL}{endpoint}"
-        logger.info(f"开始调用服务: {url}, 方法: {method}, 数据: {data}")
+        """调用博物馆服务API（同步版本，供非异步调用方使用）"""
+        transport = MuseumToolkit._transport
+        logger.info(f"开始调用服务: {endpoint}, 方法: {method}, 数据: {data}, 传输方式: {transport.name}")
         try:
-            if method == "GET":
-                response = requests.get(url, params=data)
-            elif method == "POST":
-                response = requests.post(url, json=data)
+            if MuseumToolkit._coalesce and method.upper() == "GET":
+                result = MuseumToolkit._single_flight.call(
+                    make_key(transport.name, endpoint, data), lambda: transport.request(endpoint, method, data)
+                )
             else:
-                raise ValueError(f"不支持的请求方法: {method}")
-            
-            response.raise_for_status()
-            result = response.json()
-            logger.info(f"服务调用成功: {url}, 响应状态码: {response.status_code}")
+                result = transport.request(endpoint, method, data)
+            logger.info(f"服务调用成功: {endpoint}")
             return result
-        except requests.exceptions.RequestException as e:
-            logger.error(f"调用服务失败: {url}, 错误: {str(e)}")
+        except ServiceCallError as e:
+            logger.error(f"调用服务失败: {endpoint}, 状态码: {e.status_code}, 错误: {str(e)}")
             return {"status": "error", "message": str(e)}
     
     @staticmethod
     def send_email_notification(recipient: str, subject: str, content: str) -> Dict[str, str]:
-        """发送邮件通知"""
+        """发送邮件通知：放入后台投递队列后立即返回邮件ID，不等待SMTP发送完成"""
         logger.info(f"开始发送邮件: 收件人={recipient}, 主题={subject}")
         try:
-            send_email(recipient, subject, content)
-            logger.info(f"邮件发送成功: 收件人={recipient}")
-            return {"status": "success", "message": f"邮件已发送至 {recipient}"}
-        except Exception as e:
+            message_id = get_mail_dispatcher().submit(recipient, subject, content)
+            logger.info(f"邮件已加入发送队列: 收件人={recipient}, 邮件ID={message_id}")
+            return {"status": "success", "message_id": message_id, "delivery": "queued",
+                    "message": f"邮件已加入发送队列，将发送至 {recipient}"}
+        except OutboxFull as e:
             logger.error(f"发送邮件失败: 收件人={recipient}, 错误: {str(e)}")
             return {"status": "error", "message": str(e)}
     
@@ -58,6 +124,16 @@ class MuseumToolkit:
         logger.info(f"获取预约信息完成: 手机号={phone}, 结果状态={result.get('status', 'success')}")
         return result
     
+    @staticmethod
+    async def aget_booking_info(phone: Optional[str] = None) -> Dict[str, Any]:
+        """获取预约信息（异步版本）"""
+        logger.info(f"开始获取预约信息: 手机号={phone}")
+        endpoint = "/api/public/tour-booking/bookings"
+        params = {"phone": phone} if phone else {}
+        result = await MuseumToolkit.acall_service(endpoint, method="GET", data=params)
+        logger.info(f"获取预约信息完成: 手机号={phone}, 结果状态={result.get('status', 'success')}")
+        return result
+    
     @staticmethod
     def create_booking(booking_data: Dict[str, Any]) -> Dict[str, Any]:
         """创建新的预约"""
@@ -67,6 +143,33 @@ class MuseumToolkit:
         logger.info(f"创建预约完成: 结果状态={result.get('status', 'success')}")
         return result
     
+    @staticmethod
+    async def acreate_booking(booking_data: Dict[str, Any]) -> Dict[str, Any]:
+        """创建新的预约（异步版本）"""
+        logger.info(f"开始创建预约: 预约数据={booking_data}")
+        endpoint = "/api/public/tour-booking/create"
+        result = await MuseumToolkit.acall_service(endpoint, method="POST", data=booking_data)
+        logger.info(f"创建预约完成: 结果状态={result.get('status', 'success')}")
+        return result
+    
+    @staticmethod
+    def create_group_booking(bookings: List[Dict[str, Any]], mode: str = "all_or_nothing") -> Dict[str, Any]:
+        """批量创建预约（团体、学校参观），一次请求完成整批的余票检查和预约"""
+        logger.info(f"开始批量创建预约: 共 {len(bookings)} 条, 模式={mode}")
+        endpoint = "/api/public/tour-booking/batch-create"
+        result = MuseumToolkit.call_service(endpoint, method="POST", data={"bookings": bookings, "mode": mode})
+        logger.info(f"批量创建预约完成: 结果状态={result.get('status', 'success')}")
+        return result
+    
+    @staticmethod
+    async def acreate_group_booking(bookings: List[Dict[str, Any]], mode: str = "all_or_nothing") -> Dict[str, Any]:
+        """批量创建预约（团体、学校参观），一次请求完成整批的余票检查和预约（异步版本）"""
+        logger.info(f"开始批量创建预约: 共 {len(bookings)} 条, 模式={mode}")
+        endpoint = "/api/public/tour-booking/batch-create"
+        result = await MuseumToolkit.acall_service(endpoint, method="POST", data={"bookings": bookings, "mode": mode})
+        logger.info(f"批量创建预约完成: 结果状态={result.get('status', 'success')}")
+        return result
+    
     @staticmethod
     def ask_question(question: str) -> Dict[str, Any]:
         """向咨询问答服务提问"""
@@ -77,6 +180,16 @@ class MuseumToolkit:
         logger.info(f"咨询问答服务返回: 结果状态={result.get('status', 'success')}")
         return result
     
+    @staticmethod
+    async def aask_question(question: str) -> Dict[str, Any]:
+        """向咨询问答服务提问（异步版本）"""
+        logger.info(f"开始向咨询问答服务提问: {question}")
+        endpoint = "/api/public/qa"
+        data = {"question": question}
+        result = await MuseumToolkit.acall_service(endpoint, method="POST", data=data)
+        logger.info(f"咨询问答服务返回: 结果状态={result.get('status', 'success')}")
+        return result
+    
     @staticmethod
     def submit_feedback(feedback_data: Dict[str, Any]) -> Dict[str, Any]:
         """提交游客反馈"""
@@ -87,14 +200,45 @@ class MuseumToolkit:
         return result
     
     @staticmethod
-    def get_collection_info(collection_id: Optional[str] = None) -> Dict[str, Any]:
-        """获取藏品信息"""
+    async def asubmit_feedback(feedback_data: Dict[str, Any]) -> Dict[str, Any]:
+        """提交游客反馈（异步版本）"""
+        logger.info(f"开始提交游客反馈: {feedback_data}")
+        endpoint = "/api/public/feedback"
+        result = await MuseumToolkit.acall_service(endpoint, method="POST", data=feedback_data)
+        logger.info(f"提交游客反馈完成: 结果状态={result.get('status', 'success')}")
+        return result
+    
+    @staticmethod
+    def get_collection_info(collection_id: Optional[str] = None, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """获取藏品信息，不指定藏品ID时分页返回藏品概要，cursor 为上一页返回的 pagination.next_cursor"""
         logger.info(f"开始获取藏品信息: 藏品ID={collection_id}")
+        params = None
         if collection_id:
             endpoint = f"/api/internal/collection/detail/{collection_id}"
         else:
             endpoint = "/api/internal/collection/list"
-        result = MuseumToolkit.call_service(endpoint, method="GET")
+            # 列表只返回概要字段，详情通过藏品ID查询
+            params = {"limit": 20, "fields": "collection_id,name,category,period,exhibition_status"}
+            if cursor:
+                params["cursor"] = cursor
+        result = MuseumToolkit.call_service(endpoint, method="GET", data=params)
+        logger.info(f"获取藏品信息完成: 藏品ID={collection_id}, 结果状态={result.get('status', 'success')}")
+        return result
+    
+    @staticmethod
+    async def aget_collection_info(collection_id: Optional[str] = None, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """获取藏品信息，不指定藏品ID时分页返回藏品概要，cursor 为上一页返回的 pagination.next_cursor（异步版本）"""
+        logger.info(f"开始获取藏品信息: 藏品ID={collection_id}")
+        params = None
+        if collection_id:
+            endpoint = f"/api/internal/collection/detail/{collection_id}"
+        else:
+            endpoint = "/api/internal/collection/list"
+            # 列表只返回概要字段，详情通过藏品ID查询
+            params = {"limit": 20, "fields": "collection_id,name,category,period,exhibition_status"}
+            if cursor:
+                params["cursor"] = cursor
+        result = await MuseumToolkit.acall_service(endpoint, method="GET", data=params)
         logger.info(f"获取藏品信息完成: 藏品ID={collection_id}, 结果状态={result.get('status', 'success')}")
         return result
     
@@ -107,6 +251,15 @@ class MuseumToolkit:
         logger.info(f"创建维修请求完成: 结果状态={result.get('status', 'success')}")
         return result
     
+    @staticmethod
+    async def acreate_maintenance_request(request_data: Dict[str, Any]) -> Dict[str, Any]:
+        """创建维修请求（异步版本）"""
+        logger.info(f"开始创建维修请求: {request_data}")
+        endpoint = "/api/internal/facility/maintenance-request"
+        result = await MuseumToolkit.acall_service(endpoint, method="POST", data=request_data)
+        logger.info(f"创建维修请求完成: 结果状态={result.get('status', 'success')}")
+        return result
+    
     @staticmethod
     def submit_approval(approval_data: Dict[str, Any]) -> Dict[str, Any]:
         """提交审批申请"""
@@ -116,6 +269,15 @@ class MuseumToolkit:
         logger.info(f"提交审批申请完成: 结果状态={result.get('status', 'success')}")
         return result
     
+    @staticmethod
+    async def asubmit_approval(approval_data: Dict[str, Any]) -> Dict[str, Any]:
+        """提交审批申请（异步版本）"""
+        logger.info(f"开始提交审批申请: {approval_data}")
+        endpoint = "/api/internal/administration/approval"
+        result = await MuseumToolkit.acall_service(endpoint, method="POST", data=approval_data)
+        logger.info(f"提交审批申请完成: 结果状态={result.get('status', 'success')}")
+        return result
+    
     @staticmethod
     def search_knowledge_base(query: str) -> Dict[str, Any]:
         """搜索内部知识库"""
@@ -125,6 +287,15 @@ class MuseumToolkit:
         logger.info(f"搜索内部知识库完成: 查询={query}, 结果状态={result.get('status', 'success')}")
         return result
     
+    @staticmethod
+    async def asearch_knowledge_base(query: str) -> Dict[str, Any]:
+        """搜索内部知识库（异步版本）"""
+        logger.info(f"开始搜索内部知识库: 查询={query}")
+        endpoint = f"/api/internal/administration/knowledge-base?query={query}"
+        result = await MuseumToolkit.acall_service(endpoint, method="GET")
+        logger.info(f"搜索内部知识库完成: 查询={query}, 结果状态={result.get('status', 'success')}")
+        return result
+    
     @staticmethod
     def get_visitor_analytics(start_date: str, end_date: str) -> Dict[str, Any]:
         """获取游客统计数据"""
@@ -133,6 +304,15 @@ class MuseumToolkit:
         result = MuseumToolkit.call_service(endpoint, method="GET")
         logger.info(f"获取游客统计数据完成: 结果状态={result.get('status', 'success')}")
         return result
+    
+    @staticmethod
+    async def aget_visitor_analytics(start_date: str, end_date: str) -> Dict[str, Any]:
+        """获取游客统计数据（异步版本）"""
+        logger.info(f"开始获取游客统计数据: 开始日期={start_date}, 结束日期={end_date}")
+        endpoint = f"/api/internal/analytics/visitor-stats?start_date={start_date}&end_date={end_date}"
+        result = await MuseumToolkit.acall_service(endpoint, method="GET")
+        logger.info(f"获取游客统计数据完成: 结果状态={result.get('status', 'success')}")
+        return result
 
     @staticmethod
     def specific_question_about_the_museum(endpoint: str) -> Dict[str, Any]:
@@ -143,6 +323,15 @@ class MuseumToolkit:
         logger.info(f"获取游客统计数据完成: 结果状态={result.get('status', 'success')}")
         return result
     
+    @staticmethod
+    async def aspecific_question_about_the_museum(endpoint: str) -> Dict[str, Any]:
+        """获取关于展馆更加有针对性的信息，比如展馆是否服务、展馆紧急状态等，在其他服务能够支持的情况下，不建议使用此服务，但是可以通过传递Endpoint参数来获取非标准的内部服务信息，比如传递'endpoint=/'能够获取对应内部'/'路由的信息，该信息表示展馆的it service是online状态（异步版本）"""
+        logger.info(f"开始获取关于展馆更加有针对性的信息: 端点={endpoint}")
+        
+        result = await MuseumToolkit.acall_service(endpoint, method="GET")
+        logger.info(f"获取游客统计数据完成: 结果状态={result.get('status', 'success')}")
+        return result
+    
     @staticmethod
     def get_museum_staff() -> Dict[str, Any]:
         """获取博物馆公开人物信息"""
@@ -152,6 +341,15 @@ class MuseumToolkit:
         logger.info(f"获取博物馆公开人物信息: 结果状态={result.get('status', 'success')}")
         return result
     
+    @staticmethod
+    async def aget_museum_staff() -> Dict[str, Any]:
+        """获取博物馆公开人物信息（异步版本）"""
+        logger.info(f"开始获取博物馆公开人物信息")
+        endpoint = f"/api/public/qa/specific/museum/staff"
+        result = await MuseumToolkit.acall_service(endpoint, method="GET")
+        logger.info(f"获取博物馆公开人物信息: 结果状态={result.get('status', 'success')}")
+        return result
+    
     @staticmethod
     def get_museum_vendor() -> Dict[str, Any]:
         """获取博物馆公开供应商信息"""
@@ -161,6 +359,15 @@ class MuseumToolkit:
         logger.info(f"获取博物馆公开供应商信息: 结果状态={result.get('status', 'success')}")
         return result
     
+    @staticmethod
+    async def aget_museum_vendor() -> Dict[str, Any]:
+        """获取博物馆公开供应商信息（异步版本）"""
+        logger.info(f"开始获取博物馆公开供应商信息")
+        endpoint = f"/api/public/qa/specific/museum/vendors"
+        result = await MuseumToolkit.acall_service(endpoint, method="GET")
+        logger.info(f"获取博物馆公开供应商信息: 结果状态={result.get('status', 'success')}")
+        return result
+    
     @staticmethod
     def get_museum_architecture() -> Dict[str, Any]:
         """获取博物馆公开建筑信息"""
@@ -170,6 +377,15 @@ class MuseumToolkit:
         logger.info(f"获取博物馆公开建筑信息: 结果状态={result.get('status', 'success')}")
         return result
     
+    @staticmethod
+    async def aget_museum_architecture() -> Dict[str, Any]:
+        """获取博物馆公开建筑信息（异步版本）"""
+        logger.info(f"开始获取博物馆公开建筑信息")
+        endpoint = f"/api/public/qa/specific/museum/architecture"
+        result = await MuseumToolkit.acall_service(endpoint, method="GET")
+        logger.info(f"获取博物馆公开建筑信息: 结果状态={result.get('status', 'success')}")
+        return result
+    
     @staticmethod
     def get_museum_history() -> Dict[str, Any]:
         """获取博物馆公开历史信息"""
@@ -178,45 +394,54 @@ class MuseumToolkit:
         result = MuseumToolkit.call_service(endpoint, method="GET")
         logger.info(f"获取博物馆公开历史信息: 结果状态={result.get('status', 'success')}")
         return result
+    
+    @staticmethod
+    async def aget_museum_history() -> Dict[str, Any]:
+        """获取博物馆公开历史信息（异步版本）"""
+        logger.info(f"开始获取博物馆公开历史信息")
+        endpoint = f"/api/public/qa/specific/museum/history"
+        result = await MuseumToolkit.acall_service(endpoint, method="GET")
+        logger.info(f"获取博物馆公开历史信息: 结果状态={result.get('status', 'success')}")
+        return result
 
 # 为agentscope工具注册准备的函数
-def specific_question_about_the_museum(endpoint: str) -> ToolResponse:
+async def specific_question_about_the_museum(endpoint: str) -> ToolResponse:
     """获取关于展馆更加有针对性的信息的工具函数"""
     logger.info(f"工具函数调用 - specific_question_about_the_museum: 端点={endpoint}")
-    result = MuseumToolkit.specific_question_about_the_museum(endpoint)
-    content = [{"type": "text", "text": json.dumps(result)}]
+    result = await MuseumToolkit.aspecific_question_about_the_museum(endpoint)
+    content = [{"type": "text", "text": dumps_text(result)}]
     logger.info(f"工具函数完成 - specific_question_about_the_museum: 结果状态={result.get('status', 'success')}")
     return ToolResponse(content=content, metadata=result)
 
-def get_museum_staff() -> ToolResponse:
+async def get_museum_staff() -> ToolResponse:
     """获取博物馆公开人物信息的工具函数"""
     logger.info(f"工具函数调用 - get_museum_staff")
-    result = MuseumToolkit.get_museum_staff()
-    content = [{"type": "text", "text": json.dumps(result)}]
+    result = await MuseumToolkit.aget_museum_staff()
+    content = [{"type": "text", "text": dumps_text(result)}]
     logger.info(f"工具函数完成 - get_museum_staff: 结果状态={result.get('status', 'success')}")
     return ToolResponse(content=content, metadata=result)
 
-def get_museum_vendor() -> ToolResponse:
+async def get_museum_vendor() -> ToolResponse:
     """获取博物馆公开供应商信息的工具函数"""
     logger.info(f"工具函数调用 - get_museum_vendor")
-    result = MuseumToolkit.get_museum_vendor()
-    content = [{"type": "text", "text": json.dumps(result)}]
+    result = await MuseumToolkit.aget_museum_vendor()
+    content = [{"type": "text", "text": dumps_text(result)}]
     logger.info(f"工具函数完成 - get_museum_vendor: 结果状态={result.get('status', 'success')}")
     return ToolResponse(content=content, metadata=result)
 
-def get_museum_architecture() -> ToolResponse:
+async def get_museum_architecture() -> ToolResponse:
     """获取博物馆公开建筑信息的工具函数"""
     logger.info(f"工具函数调用 - get_museum_architecture")
-    result = MuseumToolkit.get_museum_architecture()
-    content = [{"type": "text", "text": json.dumps(result)}]
+    result = await MuseumToolkit.aget_museum_architecture()
+    content = [{"type": "text", "text": dumps_text(result)}]
     logger.info(f"工具函数完成 - get_museum_architecture: 结果状态={result.get('status', 'success')}")
     return ToolResponse(content=content, metadata=result)
 
-def get_museum_history() -> ToolResponse:
+async def get_museum_history() -> ToolResponse:
     """获取博物馆公开历史信息的工具函数"""
     logger.info(f"工具函数调用 - get_museum_history")
-    result = MuseumToolkit.get_museum_history()
-    content = [{"type": "text", "text": json.dumps(result)}]
+    result = await MuseumToolkit.aget_museum_history()
+    content = [{"type": "text", "text": dumps_text(result)}]
     logger.info(f"工具函数完成 - get_museum_history: 结果状态={result.get('status', 'success')}")
     return ToolResponse(content=content, metadata=result)
 
@@ -224,75 +449,81 @@ def send_museum_email(recipient: str, subject: str, content: str) -> ToolRespons
     """发送博物馆邮件通知的工具函数"""
     logger.info(f"工具函数调用 - send_museum_email: 收件人={recipient}, 主题={subject}")
     result = MuseumToolkit.send_email_notification(recipient, subject, content)
-    content = [{"type": "text", "text": json.dumps(result)}]
+    content = [{"type": "text", "text": dumps_text(result)}]
     logger.info(f"工具函数完成 - send_museum_email: 结果状态={result.get('status', 'success')}")
     return ToolResponse(content=content, metadata=result)
 
-def get_museum_booking_info(phone: Optional[str] = None) -> ToolResponse:
+async def get_museum_booking_info(phone: Optional[str] = None) -> ToolResponse:
     """获取博物馆预约信息的工具函数"""
     logger.info(f"工具函数调用 - get_museum_booking_info: 手机号={phone}")
-    result = MuseumToolkit.get_booking_info(phone)
-    content = [{"type": "text", "text": json.dumps(result)}]
+    result = await MuseumToolkit.aget_booking_info(phone)
+    content = [{"type": "text", "text": dumps_text(result)}]
     logger.info(f"工具函数完成 - get_museum_booking_info: 结果状态={result.get('status', 'success')}")
     return ToolResponse(content=content, metadata=result)
 
-def create_museum_booking(booking_data: Dict[str, Any]) -> ToolResponse:
+async def create_museum_booking(booking_data: Dict[str, Any]) -> ToolResponse:
     """创建博物馆预约的工具函数"""
     logger.info(f"工具函数调用 - create_museum_booking: 预约数据={booking_data}")
-    result = MuseumToolkit.create_booking(booking_data)
-    content = [{"type": "text", "text": json.dumps(result)}]
+    result = await MuseumToolkit.acreate_booking(booking_data)
+    content = [{"type": "text", "text": dumps_text(result)}]
     logger.info(f"工具函数完成 - create_museum_booking: 结果状态={result.get('status', 'success')}")
     return ToolResponse(content=content, metadata=result)
 
-def general_question_about_the_museum(question: str) -> ToolResponse:
+async def general_question_about_the_museum(question: str) -> ToolResponse:
     """向博物馆咨询问答服务提问的工具函数(关于展馆的通用问题都可以咨询)"""
     logger.info(f"工具函数调用 - ask_museum_question: {question}")
-    result = MuseumToolkit.ask_question(question)
-    content = [{"type": "text", "text": json.dumps(result)}]
+    result = await MuseumToolkit.aask_question(question)
+    content = [{"type": "text", "text": dumps_text(result)}]
     logger.info(f"工具函数完成 - ask_museum_question: 结果状态={result.get('status', 'success')}")
     return ToolResponse(content=content, metadata=result)
 
-def submit_museum_feedback(feedback_data: Dict[str, Any]) -> ToolResponse:
+async def submit_museum_feedback(feedback_data: Dict[str, Any]) -> ToolResponse:
     """提交博物馆游客反馈的工具函数"""
     logger.info(f"工具函数调用 - submit_museum_feedback: {feedback_data}")
-    result = MuseumToolkit.submit_feedback(feedback_data)
-    content = [{"type": "text", "text": json.dumps(result)}]
+    result = await MuseumToolkit.asubmit_feedback(feedback_data)
+    content = [{"type": "text", "text": dumps_text(result)}]
     logger.info(f"工具函数完成 - submit_museum_feedback: 结果状态={result.get('status', 'success')}")
     return ToolResponse(content=content, metadata=result)
 
-def search_collection_info(keywords: str) -> ToolResponse:
+async def search_collection_info(keywords: str) -> ToolResponse:
     """搜索博物馆藏品信息的工具函数"""
     logger.info(f"工具函数调用 - search_collection_info: 关键词={keywords}")
     endpoint = f"/api/internal/collection/search?keywords={keywords}"
-    result = MuseumToolkit.call_service(endpoint, method="GET")
-    content = [{"type": "text", "text": json.dumps(result)}]
+    result = await MuseumToolkit.acall_service(endpoint, method="GET")
+    content = [{"type": "text", "text": dumps_text(result)}]
     logger.info(f"工具函数完成 - search_collection_info: 结果状态={result.get('status', 'success')}")
     return ToolResponse(content=content, metadata=result)
 
-def search_exhibition_info(keywords: str) -> ToolResponse:
+async def search_exhibition_info(keywords: str) -> ToolResponse:
     """搜索博物馆展览信息的工具函数"""
     logger.info(f"工具函数调用 - search_exhibition_info: 关键词={keywords}")
     endpoint = f"/api/public/qa/exhibitions/search?keywords={keywords}"
-    result = MuseumToolkit.call_service(endpoint, method="GET")
-    content = [{"type": "text", "text": json.dumps(result)}]
+    result = await MuseumToolkit.acall_service(endpoint, method="GET")
+    content = [{"type": "text", "text": dumps_text(result)}]
     logger.info(f"工具函数完成 - search_exhibition_info: 结果状态={result.get('status', 'success')}")
     return ToolResponse(content=content, metadata=result)
 
-def get_collection_environment_data(location: str) -> ToolResponse:
-    """获取藏品环境监测数据的工具函数"""
-    logger.info(f"工具函数调用 - get_collection_environment_data: 位置={location}")
-    endpoint = f"/api/internal/collection/environment?location={location}"
-    result = MuseumToolkit.call_service(endpoint, method="GET")
-    content = [{"type": "text", "text": json.dumps(result)}]
+async def get_collection_environment_data(location: Optional[str] = None, hours: Optional[int] = None) -> ToolResponse:
+    """获取藏品环境监测数据的工具函数，指定 hours 时附带最近若干小时的最低、最高、平均和95分位读数"""
+    logger.info(f"工具函数调用 - get_collection_environment_data: 位置={location}, 最近小时数={hours}")
+    endpoint = "/api/internal/collection/environment"
+    params: Dict[str, Any] = {"location": location} if location else {}
+    if hours:
+        # 整个时间范围作为一个时间桶，由传感器存储在服务端完成聚合，不传输原始读数
+        start = datetime.now(timezone.utc) - timedelta(hours=hours)
+        params.update({"start": start.strftime("%Y-%m-%dT%H:%M:%SZ"), "interval": f"{hours}h",
+                       "aggregates": "min,max,mean,p95"})
+    result = await MuseumToolkit.acall_service(endpoint, method="GET", data=params)
+    content = [{"type": "text", "text": dumps_text(result)}]
     logger.info(f"工具函数完成 - get_collection_environment_data: 结果状态={result.get('status', 'success')}")
     return ToolResponse(content=content, metadata=result)
 
-def create_exhibition_loan_request(loan_data: Dict[str, Any]) -> ToolResponse:
+async def create_exhibition_loan_request(loan_data: Dict[str, Any]) -> ToolResponse:
     """创建借展申请的工具函数"""
     logger.info(f"工具函数调用 - create_exhibition_loan_request: 借展数据={loan_data}")
     endpoint = "/api/internal/collection/loan-request"
-    result = MuseumToolkit.call_service(endpoint, method="POST", data=loan_data)
-    content = [{"type": "text", "text": json.dumps(result)}]
+    result = await MuseumToolkit.acall_service(endpoint, method="POST", data=loan_data)
+    content = [{"type": "text", "text": dumps_text(result)}]
     logger.info(f"工具函数完成 - create_exhibition_loan_request: 结果状态={result.get('status', 'success')}")
     return ToolResponse(content=content, metadata=result)
 
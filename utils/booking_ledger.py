@@ -0,0 +1,458 @@
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils.data_store import PROJECT_ROOT, get_data_store
+from utils.data_loader import PRE_VISIT_BOOKING_FILE
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.path.join(PROJECT_ROOT, ".cache", "bookings.sqlite3")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS slots (
+    visit_date TEXT NOT NULL,
+    visit_time TEXT NOT NULL,
+    available INTEGER NOT NULL CHECK (available >= 0),
+    PRIMARY KEY (visit_date, visit_time)
+);
+CREATE TABLE IF NOT EXISTS bookings (
+    booking_id TEXT PRIMARY KEY,
+    visitor_name TEXT NOT NULL,
+    visitor_phone TEXT NOT NULL,
+    visit_date TEXT NOT NULL,
+    visit_time TEXT NOT NULL,
+    ticket_type TEXT NOT NULL,
+    ticket_count INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    seq INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_bookings_phone ON bookings (visitor_phone, seq);
+CREATE TABLE IF NOT EXISTS id_sequence (
+    day TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+_BOOKING_FIELDS = ("booking_id", "visitor_name", "visitor_phone", "visit_date", "visit_time",
+                   "ticket_type", "ticket_count", "status", "created_at")
+_INSERT_BOOKING = (
+    f"INSERT INTO bookings ({', '.join(_BOOKING_FIELDS)}, seq) "
+    f"VALUES ({', '.join('?' * (len(_BOOKING_FIELDS) + 1))})"
+)
+_REQUIRED_FIELDS = ("visitor_name", "visitor_phone", "visit_date", "visit_time", "ticket_type", "ticket_count")
+
+# 单条预约的票数上限，超出的预约直接拒绝（也避免超出SQLite整数范围）
+MAX_TICKETS_PER_BOOKING = int(os.getenv("MUSEUM_BOOKING_MAX_TICKETS", "1000"))
+
+BATCH_ALL_OR_NOTHING = "all_or_nothing"
+BATCH_BEST_EFFORT = "best_effort"
+
+
+_TICKET_COUNT_ERROR = f"票数必须为 1-{MAX_TICKETS_PER_BOOKING} 之间的整数"
+
+
+def _valid_ticket_count(count: Any) -> bool:
+    # 先判断范围再写入int64数组或SQLite，超大整数不会引发OverflowError
+    return isinstance(count, int) and not isinstance(count, bool) and 0 < count <= MAX_TICKETS_PER_BOOKING
+
+
+class BookingRejected(Exception):
+    """预约未被接受：时段不存在（slot_not_found）、余票不足（insufficient_capacity）或票数无效（invalid_ticket_count）"""
+
+    def __init__(self, message: str, reason: str, status_code: int):
+        super().__init__(message)
+        self.reason = reason
+        self.status_code = status_code
+
+
+class BookingLedger:
+    """基于本地SQLite文件（WAL模式）的预约台账
+
+    - 时段余票和预约记录持久化在同一个数据库中，首次打开时从 pre_visit_booking.json 导入，
+      数据文件更新后新增的时段和预约会补充导入，已有时段的余票以台账为准
+    - 扣减余票使用带条件的 UPDATE（available >= 票数）并在同一个写事务中插入预约记录，
+      多个并发请求（包括多个工作进程）不会超卖
+    - 预约编号为 BK + 日期 + 当日序号，序号在写事务中递增，不会重复
+    - 余票表在内存中保留一份，其他进程写入后（PRAGMA data_version 变化）才重新读取
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.getenv("MUSEUM_BOOKING_DB_PATH", DEFAULT_DB_PATH)
+        self._lock = threading.Lock()
+        self._capacity: "OrderedDict[str, OrderedDict[str, int]]" = OrderedDict()
+        self._db_version: Optional[int] = None
+        self._seeded_version: Optional[int] = None
+        # 余票表内容的摘要，作为可预约时段的数据版本（ETag），余票变化后置为None，下次访问时重新计算
+        self._capacity_revision: Optional[str] = None
+        self._capacity_digest: Optional[str] = None
+        self._capacity_modified = time.time()
+        self._stats = {"reserved": 0, "batches": 0, "tickets_reserved": 0, "rejected_full": 0, "rejected_invalid": 0,
+                       "capacity_reloads": 0}
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        logger.info(f"[预约台账] SQLite预约台账已打开: {self.db_path}")
+
+    def _seed(self) -> None:
+        """导入数据文件中尚未进入台账的时段和预约，调用方需持有锁"""
+        store = get_data_store()
+        version = store.version(PRE_VISIT_BOOKING_FILE)
+        if version == self._seeded_version:
+            return
+        data = store.get(PRE_VISIT_BOOKING_FILE)
+        slots = [
+            (day["date"], slot["time"], int(slot["available"]))
+            for day in data.get("available_slots", [])
+            for slot in day.get("time_slots", [])
+        ]
+        bookings = [
+            tuple(booking.get(field) for field in _BOOKING_FIELDS) + (index,)
+            for index, booking in enumerate(data.get("bookings", []))
+        ]
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.executemany("INSERT OR IGNORE INTO slots (visit_date, visit_time, available) VALUES (?, ?, ?)", slots)
+            self._conn.executemany(_INSERT_BOOKING.replace("INSERT", "INSERT OR IGNORE", 1), bookings)
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._seeded_version = version
+        # 本连接的写入不会改变 data_version，导入后强制重新读取余票表
+        self._capacity = OrderedDict()
+
+    def _refresh_capacity(self) -> None:
+        """数据库被写入过（本进程或其他进程）时重新读取余票表，调用方需持有锁"""
+        self._seed()
+        db_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if db_version == self._db_version and self._capacity:
+            return
+        capacity: "OrderedDict[str, OrderedDict[str, int]]" = OrderedDict()
+        for row in self._conn.execute("SELECT visit_date, visit_time, available FROM slots ORDER BY visit_date, visit_time"):
+            capacity.setdefault(row["visit_date"], OrderedDict())[row["visit_time"]] = row["available"]
+        self._capacity = capacity
+        self._db_version = db_version
+        self._capacity_revision = None
+        self._stats["capacity_reloads"] += 1
+
+    def capacity_version(self) -> Tuple[str, float]:
+        """余票表的数据版本和最后变化时间
+
+        版本为余票内容的摘要，多个工作进程看到相同余票时版本相同，可直接用于ETag。
+        """
+        with self._lock:
+            self._refresh_capacity()
+            if self._capacity_revision is None:
+                digest = hashlib.blake2b(digest_size=12)
+                for day, slots in self._capacity.items():
+                    for time_slot, available in slots.items():
+                        digest.update(f"{day}|{time_slot}|{available}\n".encode("utf-8"))
+                revision = digest.hexdigest()
+                if revision != self._capacity_digest:
+                    self._capacity_modified = time.time()
+                    self._capacity_digest = revision
+                self._capacity_revision = revision
+            return self._capacity_revision, self._capacity_modified
+
+    def available_slots(self, date: Optional[str] = None) -> List[Dict[str, Any]]:
+        """可预约时段，格式与数据文件中的 available_slots 相同"""
+        with self._lock:
+            self._refresh_capacity()
+            days = [date] if date else list(self._capacity)
+            return [
+                {"date": day, "time_slots": [{"time": time_slot, "available": available}
+                                             for time_slot, available in self._capacity[day].items()]}
+                for day in days if day in self._capacity
+            ]
+
+    def _next_booking_id(self, day: str) -> str:
+        """在写事务中生成预约编号，跳过数据文件中已存在的编号"""
+        while True:
+            updated = self._conn.execute("UPDATE id_sequence SET value = value + 1 WHERE day = ?", (day,)).rowcount
+            if not updated:
+                self._conn.execute("INSERT INTO id_sequence (day, value) VALUES (?, 1)", (day,))
+            value = self._conn.execute("SELECT value FROM id_sequence WHERE day = ?", (day,)).fetchone()[0]
+            booking_id = f"BK{day}{value:03d}"
+            if self._conn.execute("SELECT 1 FROM bookings WHERE booking_id = ?", (booking_id,)).fetchone() is None:
+                return booking_id
+
+    @staticmethod
+    def _record(booking: Dict[str, Any], booking_id: str, now: datetime) -> Dict[str, Any]:
+        return {
+            "booking_id": booking_id,
+            "visitor_name": booking["visitor_name"],
+            "visitor_phone": booking["visitor_phone"],
+            "visit_date": booking["visit_date"],
+            "visit_time": booking["visit_time"],
+            "ticket_type": booking["ticket_type"],
+            "ticket_count": booking["ticket_count"],
+            "status": "已预约",
+            "created_at": now.isoformat() + "Z"
+        }
+
+    def _allocate_booking_ids(self, day: str, count: int) -> List[str]:
+        """在写事务中一次分配 count 个预约编号，跳过数据文件中已存在的编号"""
+        booking_ids: List[str] = []
+        while len(booking_ids) < count:
+            needed = count - len(booking_ids)
+            updated = self._conn.execute("UPDATE id_sequence SET value = value + ? WHERE day = ?", (needed, day)).rowcount
+            if not updated:
+                self._conn.execute("INSERT INTO id_sequence (day, value) VALUES (?, ?)", (day, needed))
+            last = self._conn.execute("SELECT value FROM id_sequence WHERE day = ?", (day,)).fetchone()[0]
+            candidates = [f"BK{day}{value:03d}" for value in range(last - needed + 1, last + 1)]
+            taken = set()
+            for start in range(0, len(candidates), 500):
+                chunk = candidates[start:start + 500]
+                taken.update(row[0] for row in self._conn.execute(
+                    f"SELECT booking_id FROM bookings WHERE booking_id IN ({', '.join('?' * len(chunk))})", chunk
+                ))
+            booking_ids.extend(booking_id for booking_id in candidates if booking_id not in taken)
+        return booking_ids
+
+    def _reserve(self, booking: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+        """在当前写事务中扣减余票并写入预约记录
+
+        Raises:
+            BookingRejected: 票数无效、时段不存在或余票不足
+        """
+        count = booking["ticket_count"]
+        if not _valid_ticket_count(count):
+            self._stats["rejected_invalid"] += 1
+            raise BookingRejected(_TICKET_COUNT_ERROR, "invalid_ticket_count", 400)
+        updated = self._conn.execute(
+            "UPDATE slots SET available = available - ? WHERE visit_date = ? AND visit_time = ? AND available >= ?",
+            (count, booking["visit_date"], booking["visit_time"], count)
+        ).rowcount
+        if not updated:
+            row = self._conn.execute(
+                "SELECT available FROM slots WHERE visit_date = ? AND visit_time = ?",
+                (booking["visit_date"], booking["visit_time"])
+            ).fetchone()
+            if row is None:
+                self._stats["rejected_invalid"] += 1
+                raise BookingRejected(f"{booking['visit_date']} {booking['visit_time']} 不是可预约的时段", "slot_not_found", 404)
+            self._stats["rejected_full"] += 1
+            raise BookingRejected(f"{booking['visit_date']} {booking['visit_time']} 余票不足，剩余 {row['available']} 张", "insufficient_capacity", 409)
+
+        record = self._record(booking, self._next_booking_id(now.strftime("%Y%m%d")), now)
+        self._conn.execute(_INSERT_BOOKING, tuple(record[field] for field in _BOOKING_FIELDS) + (time.time_ns() // 1000,))
+        self._stats["reserved"] += 1
+        self._stats["tickets_reserved"] += count
+        return record
+
+    def reserve(self, booking: Dict[str, Any]) -> Dict[str, Any]:
+        """原子地预留票数并创建预约记录
+
+        Args:
+            booking: 包含 visitor_name、visitor_phone、visit_date、visit_time、ticket_type、ticket_count
+
+        Raises:
+            BookingRejected: 票数无效、时段不存在或余票不足
+        """
+        with self._lock:
+            self._seed()
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                record = self._reserve(booking, datetime.now())
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            # 本连接的写入不会改变 data_version，直接更新内存中的余票
+            if self._capacity:
+                slots = self._capacity.get(record["visit_date"])
+                if slots is not None and record["visit_time"] in slots:
+                    slots[record["visit_time"]] -= record["ticket_count"]
+                    self._capacity_revision = None
+        logger.info(f"[预约台账] 预约成功: {record['booking_id']} {record['visit_date']} {record['visit_time']} x{record['ticket_count']}")
+        return record
+
+    @staticmethod
+    def _validate_batch(rows: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray, List[Optional[str]], List[Tuple[str, str]]]:
+        """逐行校验整批预约的字段和票数，并为涉及的时段编号
+
+        Returns:
+            (每行票数, 每行所属时段的编号（无效行为-1）, 每行的错误信息（有效行为None）, 时段列表)
+        """
+        errors: List[Optional[str]] = [None] * len(rows)
+        counts = np.zeros(len(rows), dtype=np.int64)
+        slot_ids = np.full(len(rows), -1, dtype=np.int64)
+        slots: Dict[Tuple[str, str], int] = {}
+        for index, row in enumerate(rows):
+            if not isinstance(row, dict):
+                errors[index] = "预约信息必须是对象"
+                continue
+            missing = [field for field in _REQUIRED_FIELDS if row.get(field) in (None, "")]
+            if missing:
+                errors[index] = f"缺少字段: {', '.join(missing)}"
+                continue
+            count = row["ticket_count"]
+            if not _valid_ticket_count(count):
+                errors[index] = _TICKET_COUNT_ERROR
+                continue
+            counts[index] = count
+            slot_ids[index] = slots.setdefault((str(row["visit_date"]), str(row["visit_time"])), len(slots))
+        return counts, slot_ids, errors, list(slots)
+
+    def reserve_batch(self, rows: List[Dict[str, Any]], mode: str = BATCH_ALL_OR_NOTHING) -> Dict[str, Any]:
+        """批量预约（团体、学校参观）
+
+        整批在一次校验和一个写事务中完成：按时段汇总需求后一次性与余票比较，
+        每个时段只执行一次余票扣减，预约记录批量插入。
+
+        Args:
+            rows: 预约信息列表，字段同 reserve
+            mode: all_or_nothing（任一行无效或任一时段余票不足时整批拒绝）
+                  或 best_effort（按顺序逐行分配，放不下的行单独拒绝）
+
+        Returns:
+            {"mode", "accepted", "rejected", "results": [{"index", "status", "booking" 或 "reason"/"message"}]}
+        """
+        if mode not in (BATCH_ALL_OR_NOTHING, BATCH_BEST_EFFORT):
+            raise ValueError(f"不支持的批量预约模式: {mode}")
+        counts, slot_ids, errors, slot_keys = self._validate_batch(rows)
+        reasons: List[Optional[str]] = ["invalid" if error else None for error in errors]
+        now = datetime.now()
+
+        with self._lock:
+            self._seed()
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # 读取本批涉及的时段余票（在写事务中读取，提交前不会被其他进程修改）
+                capacity = np.full(len(slot_keys), -1, dtype=np.int64)
+                slot_positions = {key: index for index, key in enumerate(slot_keys)}
+                dates = sorted({date for date, _ in slot_keys})
+                for start in range(0, len(dates), 500):
+                    chunk = dates[start:start + 500]
+                    for row in self._conn.execute(
+                        f"SELECT visit_date, visit_time, available FROM slots WHERE visit_date IN ({', '.join('?' * len(chunk))})", chunk
+                    ):
+                        key = (row["visit_date"], row["visit_time"])
+                        if key in slot_positions:
+                            capacity[slot_positions[key]] = row["available"]
+                for index in np.flatnonzero((slot_ids >= 0) & (capacity[np.maximum(slot_ids, 0)] < 0)):
+                    date, time_slot = slot_keys[slot_ids[index]]
+                    errors[index] = f"{date} {time_slot} 不是可预约的时段"
+                    reasons[index] = "slot_not_found"
+                    slot_ids[index] = -1
+
+                valid = slot_ids >= 0
+                accepted = np.zeros(len(rows), dtype=bool)
+                if mode == BATCH_ALL_OR_NOTHING:
+                    demand = np.bincount(slot_ids[valid], weights=counts[valid], minlength=len(slot_keys)).astype(np.int64)
+                    short = np.flatnonzero(demand > np.maximum(capacity, 0))
+                    if valid.all() and len(short) == 0:
+                        accepted = valid
+                    else:
+                        for slot_index in short:
+                            date, time_slot = slot_keys[slot_index]
+                            for index in np.flatnonzero(slot_ids == slot_index):
+                                errors[index] = f"{date} {time_slot} 余票不足：本批需要 {demand[slot_index]} 张，剩余 {capacity[slot_index]} 张"
+                                reasons[index] = "insufficient_capacity"
+                else:
+                    remaining = capacity.copy()
+                    for index in np.flatnonzero(valid):
+                        slot_index = slot_ids[index]
+                        if counts[index] <= remaining[slot_index]:
+                            remaining[slot_index] -= counts[index]
+                            accepted[index] = True
+                        else:
+                            date, time_slot = slot_keys[slot_index]
+                            errors[index] = f"{date} {time_slot} 余票不足，剩余 {remaining[slot_index]} 张"
+                            reasons[index] = "insufficient_capacity"
+
+                records: Dict[int, Dict[str, Any]] = {}
+                accepted_rows = np.flatnonzero(accepted)
+                if len(accepted_rows):
+                    taken = np.bincount(slot_ids[accepted_rows], weights=counts[accepted_rows], minlength=len(slot_keys)).astype(np.int64)
+                    self._conn.executemany(
+                        "UPDATE slots SET available = available - ? WHERE visit_date = ? AND visit_time = ?",
+                        [(int(taken[i]), *slot_keys[i]) for i in np.flatnonzero(taken)]
+                    )
+                    booking_ids = self._allocate_booking_ids(now.strftime("%Y%m%d"), len(accepted_rows))
+                    seq = time.time_ns() // 1000
+                    inserts = []
+                    for offset, (index, booking_id) in enumerate(zip(accepted_rows, booking_ids)):
+                        record = self._record({**rows[index], "ticket_count": int(counts[index])}, booking_id, now)
+                        records[int(index)] = record
+                        inserts.append(tuple(record[field] for field in _BOOKING_FIELDS) + (seq + offset,))
+                    self._conn.executemany(_INSERT_BOOKING, inserts)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+            # 本连接的写入不会改变 data_version，直接更新内存中的余票
+            for record in records.values():
+                slots = self._capacity.get(record["visit_date"])
+                if slots is not None and record["visit_time"] in slots:
+                    slots[record["visit_time"]] -= record["ticket_count"]
+            if records:
+                self._capacity_revision = None
+            self._stats["batches"] += 1
+            self._stats["reserved"] += len(records)
+            self._stats["tickets_reserved"] += sum(record["ticket_count"] for record in records.values())
+            self._stats["rejected_full"] += sum(1 for reason in reasons if reason == "insufficient_capacity")
+            self._stats["rejected_invalid"] += sum(1 for reason in reasons if reason in ("invalid", "slot_not_found"))
+
+        results = []
+        for index in range(len(rows)):
+            if index in records:
+                results.append({"index": index, "status": "reserved", "booking": records[index]})
+            else:
+                # 整批拒绝时，本身有效的行也标记为未预约
+                results.append({"index": index, "status": "rejected", "reason": reasons[index] or "batch_rejected",
+                                "message": errors[index] or "同批其他预约未通过，整批未预约"})
+        logger.info(f"[预约台账] 批量预约完成 - 模式: {mode}, 成功: {len(records)}, 拒绝: {len(rows) - len(records)}")
+        return {"mode": mode, "accepted": len(records), "rejected": len(rows) - len(records), "results": results}
+
+    def get(self, booking_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._seed()
+            row = self._conn.execute(
+                f"SELECT {', '.join(_BOOKING_FIELDS)} FROM bookings WHERE booking_id = ?", (booking_id,)
+            ).fetchone()
+        return dict(row) if row is not None else None
+
+    def find(self, phone: Optional[str] = None) -> List[Dict[str, Any]]:
+        """按手机号查询预约记录，不传手机号时返回全部，按创建顺序排列"""
+        with self._lock:
+            self._seed()
+            if phone is None:
+                rows = self._conn.execute(f"SELECT {', '.join(_BOOKING_FIELDS)} FROM bookings ORDER BY seq").fetchall()
+            else:
+                rows = self._conn.execute(
+                    f"SELECT {', '.join(_BOOKING_FIELDS)} FROM bookings WHERE visitor_phone = ? ORDER BY seq", (phone,)
+                ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "db_path": self.db_path}
+
+
+_ledger: Optional[BookingLedger] = None
+_ledger_lock = threading.Lock()
+
+
+def get_booking_ledger() -> BookingLedger:
+    """获取全局预约台账"""
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            _ledger = BookingLedger()
+        return _ledger
@@ -0,0 +1,233 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from agentscope.message import Msg
+
+logger = logging.getLogger(__name__)
+
+_SUMMARY_PROMPT = """请把下面这段博物馆咨询对话压缩成一段简短的摘要，供后续对话参考。
+保留用户的身份和需求、已确认的事实（日期、人数、藏品、展览、联系方式等）以及尚未解决的问题，省略寒暄和工具调用细节。
+只输出摘要内容，不超过200字。
+"""
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算文本的token数
+
+    本地Ollama模型没有可直接调用的分词器，这里按经验估算：
+    中日韩字符约1个token，其余字符约4个一个token。
+    """
+    if not text:
+        return 0
+    cjk = sum(1 for char in text if "⺀" <= char <= "鿿" or "豈" <= char <= "﫿")
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def estimate_msg_tokens(msg: Msg) -> int:
+    """估算单条消息的token数（含角色等格式开销）"""
+    content = msg.content if isinstance(msg.content, str) else json.dumps(msg.content, ensure_ascii=False)
+    return estimate_tokens(content) + 4
+
+
+class SummaryState:
+    """某个会话中某个智能体的滚动摘要"""
+
+    def __init__(self):
+        self.text = ""
+        # 摘要已覆盖到的最后一条消息ID
+        self.covered_id: Optional[str] = None
+        self.task: Optional["asyncio.Task[None]"] = None
+
+
+class ContextBudget:
+    """提示词token预算
+
+    每次模型调用前估算提示词大小（系统提示词 + 工具定义 + 对话记忆）：
+    - 未超预算时原样使用全部记忆
+    - 超出预算时保留最近 keep_turns 轮对话原文，更早的对话用一段滚动摘要代替
+    - 摘要在后台任务中用智能体自己的模型生成，不阻塞当前请求；摘要生成之前较早的对话直接省略
+    - 记录每次调用的提示词token数，供统计接口查看
+    """
+
+    def __init__(self, owner: str, max_tokens: int = 3000, keep_turns: int = 3,
+                 model: Any = None, fixed_tokens: int = 0, history_size: int = 50):
+        """
+        Args:
+            owner: 智能体名称
+            max_tokens: 提示词token预算
+            keep_turns: 超出预算时原样保留的最近对话轮数（以用户消息为一轮的开始）
+            model: 生成摘要使用的模型，为None时只截断不摘要
+            fixed_tokens: 系统提示词和工具定义等固定部分的token数
+            history_size: 保留最近多少次调用的token记录
+        """
+        self.owner = owner
+        self.max_tokens = max_tokens
+        self.keep_turns = keep_turns
+        self.model = model
+        self.fixed_tokens = fixed_tokens
+        self._history: Deque[Dict[str, Any]] = deque(maxlen=history_size)
+        self._stats = {"calls": 0, "over_budget": 0, "summaries": 0, "summary_failures": 0,
+                       "prompt_tokens_total": 0, "prompt_tokens_max": 0, "tokens_saved": 0}
+
+    def _split_recent(self, messages: List[Msg]) -> int:
+        """最近 keep_turns 轮对话的起始位置"""
+        turns = 0
+        for index in range(len(messages) - 1, -1, -1):
+            if messages[index].role == "user":
+                turns += 1
+                if turns >= self.keep_turns:
+                    return index
+        return 0
+
+    def fit(self, messages: List[Msg], state: SummaryState, session_id: str = "") -> List[Msg]:
+        """返回本次模型调用实际使用的对话记忆，超出预算时触发后台摘要"""
+        full_tokens = self.fixed_tokens + sum(estimate_msg_tokens(msg) for msg in messages)
+        view = messages
+        prompt_tokens = full_tokens
+
+        if full_tokens > self.max_tokens:
+            self._stats["over_budget"] += 1
+            split = self._split_recent(messages)
+            older, recent = messages[:split], messages[split:]
+            if older:
+                covered = 0
+                if state.covered_id is not None:
+                    for index, msg in enumerate(older):
+                        if msg.id == state.covered_id:
+                            covered = index + 1
+                            break
+                uncovered = older[covered:]
+
+                view = list(recent)
+                if state.text:
+                    view.insert(0, Msg("system", f"<conversation_summary>此前对话的摘要：\n{state.text}</conversation_summary>", "system"))
+                prompt_tokens = self.fixed_tokens + sum(estimate_msg_tokens(msg) for msg in view)
+                # 尚未进入摘要的较早对话，预算允许时保留原文
+                uncovered_tokens = sum(estimate_msg_tokens(msg) for msg in uncovered)
+                if uncovered and prompt_tokens + uncovered_tokens <= self.max_tokens:
+                    view[1 if state.text else 0:1 if state.text else 0] = uncovered
+                    prompt_tokens += uncovered_tokens
+
+                if uncovered:
+                    self._schedule_summary(state, uncovered)
+
+        self._stats["calls"] += 1
+        self._stats["prompt_tokens_total"] += prompt_tokens
+        self._stats["prompt_tokens_max"] = max(self._stats["prompt_tokens_max"], prompt_tokens)
+        self._stats["tokens_saved"] += full_tokens - prompt_tokens
+        self._history.append({
+            "session_id": session_id, "prompt_tokens": prompt_tokens, "full_tokens": full_tokens,
+            "messages": len(view), "summarized": view is not messages, "time": time.time()
+        })
+        logger.info(f"[上下文预算] {self.owner} 提示词约 {prompt_tokens} tokens（完整记忆 {full_tokens}，预算 {self.max_tokens}）")
+        return view
+
+    def _schedule_summary(self, state: SummaryState, uncovered: List[Msg]) -> None:
+        if self.model is None or (state.task is not None and not state.task.done()):
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        state.task = loop.create_task(self._summarize(state, list(uncovered)))
+
+    async def _summarize(self, state: SummaryState, messages: List[Msg]) -> None:
+        from utils.response_stream import collect_model_text
+
+        lines = [f"{msg.name}（{msg.role}）：{msg.get_text_content() or ''}" for msg in messages]
+        lines = [line for line in lines if not line.endswith("：")]
+        content = "\n".join(lines)
+        if state.text:
+            content = f"已有摘要：\n{state.text}\n\n新增对话：\n{content}"
+        try:
+            response = await self.model([
+                {"role": "system", "content": _SUMMARY_PROMPT},
+                {"role": "user", "content": content}
+            ])
+            summary = (await collect_model_text(response, emit=False)).strip()
+        except Exception as e:
+            self._stats["summary_failures"] += 1
+            logger.warning(f"[上下文预算] {self.owner} 生成对话摘要失败: {type(e).__name__}: {str(e)}")
+            return
+        if summary:
+            state.text = summary
+            state.covered_id = messages[-1].id
+            self._stats["summaries"] += 1
+            logger.info(f"[上下文预算] {self.owner} 对话摘要已更新，覆盖 {len(messages)} 条消息，摘要约 {estimate_tokens(summary)} tokens")
+
+    def get_stats(self) -> Dict[str, Any]:
+        calls = self._stats["calls"]
+        return {
+            **{key: value for key, value in self._stats.items() if key != "prompt_tokens_total"},
+            "avg_prompt_tokens": round(self._stats["prompt_tokens_total"] / calls, 1) if calls else 0.0,
+            "max_tokens": self.max_tokens,
+            "keep_turns": self.keep_turns,
+            "fixed_tokens": self.fixed_tokens,
+            "recent_calls": list(self._history)
+        }
+
+
+class BudgetedFormatter:
+    """组装提示词时应用token预算的格式化器
+
+    对话记忆本身原样保存和读取，只在格式化为模型输入这一步（每次模型调用前）
+    把开头的系统提示词之后的对话消息交给记忆的 fit_prompt 裁剪，其余行为与原格式化器一致。
+    """
+
+    def __init__(self, formatter: Any, memory: Any):
+        self.formatter = formatter
+        self.memory = memory
+
+    async def format(self, msgs: List[Msg], **kwargs: Any) -> Any:
+        head = 0
+        while head < len(msgs) and msgs[head].role == "system":
+            head += 1
+        fitted = self.memory.fit_prompt(list(msgs[head:]))
+        return await self.formatter.format([*msgs[:head], *fitted], **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.formatter, name)
+
+
+def attach_context_budget(agent: Any) -> Optional[ContextBudget]:
+    """为使用会话记忆的智能体启用提示词token预算，固定部分按系统提示词和工具定义估算"""
+    from utils.session_manager import SessionScopedMemory
+
+    if os.getenv("MUSEUM_CONTEXT_BUDGET", "true").lower() in ("0", "false", "no"):
+        return None
+    memory = getattr(agent, "memory", None)
+    if not isinstance(memory, SessionScopedMemory):
+        return None
+    toolkit = getattr(agent, "toolkit", None)
+    tool_schemas = json.dumps(toolkit.get_json_schemas(), ensure_ascii=False) if toolkit is not None else ""
+    summarize = os.getenv("MUSEUM_CONTEXT_SUMMARY", "true").lower() in ("1", "true", "yes")
+    budget = ContextBudget(
+        memory.owner,
+        max_tokens=int(os.getenv("MUSEUM_CONTEXT_MAX_TOKENS", "3000")),
+        keep_turns=int(os.getenv("MUSEUM_CONTEXT_KEEP_TURNS", "3")),
+        model=getattr(agent, "model", None) if summarize else None,
+        fixed_tokens=estimate_tokens(getattr(agent, "sys_prompt", "") or "") + estimate_tokens(tool_schemas)
+    )
+    memory.budget = budget
+    if not isinstance(agent.formatter, BudgetedFormatter):
+        agent.formatter = BudgetedFormatter(agent.formatter, memory)
+    with _budgets_lock:
+        _budgets[memory.owner] = budget
+    return budget
+
+
+_budgets: Dict[str, ContextBudget] = {}
+_budgets_lock = threading.Lock()
+
+
+def get_context_budget_stats() -> Dict[str, Any]:
+    """所有智能体的提示词token统计"""
+    with _budgets_lock:
+        budgets = list(_budgets.items())
+    return {owner: budget.get_stats() for owner, budget in budgets}
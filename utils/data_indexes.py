@@ -0,0 +1,157 @@
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from utils.data_store import get_data_store
+from utils.text_index import InvertedIndex
+from utils.data_loader import (
+    PRE_VISIT_INFORMATION_FILE,
+    POST_VISIT_SERVICES_FILE,
+    COLLECTION_MANAGEMENT_FILE,
+    SECURITY_MANAGEMENT_FILE,
+    FACILITY_MANAGEMENT_FILE
+)
+
+logger = logging.getLogger(__name__)
+
+
+class RecordIndex:
+    """记录列表及其哈希索引
+
+    - 唯一索引（主键）：字段值 -> 记录，用于O(1)的详情查询
+    - 分组索引：字段值 -> 记录位置元组，用于O(1)定位筛选结果，多个条件时求交集
+
+    索引随数据文件一起缓存在DataStore中，文件重新加载后自动重建。
+    """
+
+    def __init__(self, records: Iterable[dict], unique: Sequence[str] = (), group: Sequence[str] = ()):
+        self.records: Tuple[dict, ...] = tuple(r for r in records if isinstance(r, dict))
+        self._unique: Dict[str, Dict[Any, dict]] = {field: {} for field in unique}
+        self._group: Dict[str, Dict[Any, List[int]]] = {field: {} for field in group}
+
+        for position, record in enumerate(self.records):
+            for field, index in self._unique.items():
+                value = record.get(field)
+                # 与原先 next(...) 的语义一致：重复主键时保留第一条
+                if value is not None and value not in index:
+                    index[value] = record
+            for field, index in self._group.items():
+                value = record.get(field)
+                if value is not None:
+                    index.setdefault(value, []).append(position)
+
+        # 分组索引构建完成后转为不可变元组
+        self._group = {
+            field: {value: tuple(positions) for value, positions in index.items()}
+            for field, index in self._group.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def get(self, field: str, value: Any) -> Optional[dict]:
+        """按唯一索引查询单条记录"""
+        return self._unique[field].get(value)
+
+    def filter(self, **criteria: Any) -> List[dict]:
+        """按分组索引筛选记录，值为None的条件会被忽略，结果保持原始顺序"""
+        postings = [
+            self._group[field].get(value, ())
+            for field, value in criteria.items()
+            if value is not None
+        ]
+        if not postings:
+            return list(self.records)
+
+        # 从最短的倒排列表开始求交集
+        postings.sort(key=len)
+        positions = set(postings[0])
+        for other in postings[1:]:
+            positions.intersection_update(other)
+            if not positions:
+                return []
+
+        return [self.records[p] for p in sorted(positions)]
+
+
+def _membership_records(data: dict) -> Iterable[dict]:
+    """会员数据既可能是列表，也可能是包含members列表的字典"""
+    membership = data.get("membership", [])
+    if isinstance(membership, dict):
+        return membership.get("members", [])
+    return membership
+
+
+def collection_index() -> RecordIndex:
+    """藏品索引：collection_id（唯一）、category、exhibition_status"""
+    return get_data_store().derived(
+        COLLECTION_MANAGEMENT_FILE, "collection_index",
+        lambda data: RecordIndex(
+            data.get("collections", []),
+            unique=("collection_id",),
+            group=("category", "exhibition_status")
+        )
+    )
+
+
+def membership_index() -> RecordIndex:
+    """会员索引：member_id（唯一）"""
+    return get_data_store().derived(
+        POST_VISIT_SERVICES_FILE, "membership_index",
+        lambda data: RecordIndex(
+            _membership_records(data),
+            unique=("member_id",)
+        )
+    )
+
+
+def equipment_index() -> RecordIndex:
+    """设备索引：equipment_id（唯一）、type"""
+    return get_data_store().derived(
+        FACILITY_MANAGEMENT_FILE, "equipment_index",
+        lambda data: RecordIndex(
+            data.get("equipment_maintenance", {}).get("equipment", []),
+            unique=("equipment_id",),
+            group=("type",)
+        )
+    )
+
+
+def camera_index() -> RecordIndex:
+    """监控摄像头索引：camera_id（唯一）"""
+    return get_data_store().derived(
+        SECURITY_MANAGEMENT_FILE, "camera_index",
+        lambda data: RecordIndex(
+            data.get("surveillance", {}).get("cameras", []),
+            unique=("camera_id",)
+        )
+    )
+
+
+# 全文索引常驻内存，数据文件重新加载时按文档增量同步，而不是整体重建
+_collection_text_index = InvertedIndex({"name": 3.0, "description": 1.0, "origin": 1.0})
+_exhibition_text_index = InvertedIndex({"title": 3.0, "subtitle": 2.0, "description": 1.0})
+
+
+def _sync_text_index(index: InvertedIndex, records: Iterable[dict], id_field: str) -> InvertedIndex:
+    index.sync(
+        (record.get(id_field, position), record)
+        for position, record in enumerate(records)
+        if isinstance(record, dict)
+    )
+    return index
+
+
+def collection_text_index() -> InvertedIndex:
+    """藏品全文索引：name、description、origin"""
+    return get_data_store().derived(
+        COLLECTION_MANAGEMENT_FILE, "collection_text_index",
+        lambda data: _sync_text_index(_collection_text_index, data.get("collections", []), "collection_id")
+    )
+
+
+def exhibition_text_index() -> InvertedIndex:
+    """展览全文索引：title、subtitle、description"""
+    return get_data_store().derived(
+        PRE_VISIT_INFORMATION_FILE, "exhibition_text_index",
+        lambda data: _sync_text_index(_exhibition_text_index, data.get("exhibitions", []), "exhibition_id")
+    )
@@ -1,59 +1,63 @@
-import json
-import os
+import logging
+from utils.data_store import get_data_store
+
+logger = logging.getLogger(__name__)
+
+# 数据文件路径（相对于项目根目录）
+PUBLIC_INFO_FILE = "public_services/museum_public_info.json"
+PRE_VISIT_BOOKING_FILE = "public_services/pre_visit_booking.json"
+PRE_VISIT_INFORMATION_FILE = "public_services/pre_visit_information.json"
+ON_VISIT_SERVICES_FILE = "public_services/on_visit_services.json"
+POST_VISIT_SERVICES_FILE = "public_services/post_visit_services.json"
+COLLECTION_MANAGEMENT_FILE = "internal_management/collection_management.json"
+SECURITY_MANAGEMENT_FILE = "internal_management/security_management.json"
+FACILITY_MANAGEMENT_FILE = "internal_management/facility_management.json"
+ADMINISTRATION_FILE = "internal_management/administration.json"
 
 class DataLoader:
     """数据加载器，用于读取模拟数据文件"""
     
     @staticmethod
     def load_data(file_path: str) -> dict:
-        """加载指定路径的JSON数据文件"""
-        try:
-            # 获取当前文件所在目录的绝对路径
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            # 构建完整的文件路径
-            full_path = os.path.join(current_dir, "..", file_path)
-            
-            with open(full_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            logger.info(f"数据文件不存在: {full_path}")
-            return {}
-        except json.JSONDecodeError:
-            logger.info(f"数据文件格式错误: {full_path}")
-            return {}
+        """加载指定路径的JSON数据文件
+        
+        数据由进程内共享存储缓存，文件未变化时不会重复读取和解析。
+        返回的是只读视图，需要修改时请先使用 utils.data_store.thaw() 复制。
+        """
+        return get_data_store().get(file_path)
 
 def load_public_info() -> dict:
     """加载展馆公开人物数据"""
-    return DataLoader.load_data("public_services/museum_public_info.json")
+    return DataLoader.load_data(PUBLIC_INFO_FILE)
 # 为了方便各服务使用，创建一些常用的加载方法
 def load_pre_visit_booking() -> dict:
     """加载游客服务前的预约数据"""
-    return DataLoader.load_data("public_services/pre_visit_booking.json")
+    return DataLoader.load_data(PRE_VISIT_BOOKING_FILE)
 
 def load_pre_visit_information() -> dict:
     """加载游客服务前的信息发布数据"""
-    return DataLoader.load_data("public_services/pre_visit_information.json")
+    return DataLoader.load_data(PRE_VISIT_INFORMATION_FILE)
 
 def load_on_visit_services() -> dict:
     """加载游客服务中的服务数据"""
-    return DataLoader.load_data("public_services/on_visit_services.json")
+    return DataLoader.load_data(ON_VISIT_SERVICES_FILE)
 
 def load_post_visit_services() -> dict:
     """加载游客服务后的服务数据"""
-    return DataLoader.load_data("public_services/post_visit_services.json")
+    return DataLoader.load_data(POST_VISIT_SERVICES_FILE)
 
 def load_collection_management() -> dict:
     """加载藏品管理数据"""
-    return DataLoader.load_data("internal_management/collection_management.json")
+    return DataLoader.load_data(COLLECTION_MANAGEMENT_FILE)
 
 def load_security_management() -> dict:
     """加载安保管理数据"""
-    return DataLoader.load_data("internal_management/security_management.json")
+    return DataLoader.load_data(SECURITY_MANAGEMENT_FILE)
 
 def load_facility_management() -> dict:
     """加载设施管理数据"""
-    return DataLoader.load_data("internal_management/facility_management.json")
+    return DataLoader.load_data(FACILITY_MANAGEMENT_FILE)
 
 def load_administration() -> dict:
     """加载行政人事数据"""
-    return DataLoader.load_data("internal_management/administration.json")
\ No newline at end of file
+    return DataLoader.load_data(ADMINISTRATION_FILE)
\ No newline at end of file
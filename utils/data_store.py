@@ -0,0 +1,211 @@
+import json
+import os
+import threading
+import time
+import logging
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 项目根目录，所有数据文件路径都相对于该目录
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+class FrozenDict(dict):
+    """只读字典视图
+
+    继承自dict，因此json/orjson/FastAPI都可以直接序列化，
+    但所有修改操作都会抛出TypeError，防止调用方意外修改共享缓存。
+    需要修改时请使用 thaw() 获取一份可修改的副本。
+    """
+
+    __slots__ = ()
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("缓存数据为只读视图，请先调用 thaw() 获取可修改副本")
+
+    __setitem__ = _readonly
+    __delitem__ = _readonly
+    __ior__ = _readonly
+    clear = _readonly
+    pop = _readonly
+    popitem = _readonly
+    setdefault = _readonly
+    update = _readonly
+
+    def __copy__(self) -> dict:
+        return dict(self)
+
+    def __deepcopy__(self, memo) -> dict:
+        return thaw(self)
+
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+
+def freeze(value: Any) -> Any:
+    """将JSON数据递归转换为只读结构（dict -> FrozenDict, list -> tuple）"""
+    if isinstance(value, dict):
+        return FrozenDict((k, freeze(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """将只读结构递归转换回普通的可修改dict/list"""
+    if isinstance(value, dict):
+        return {k: thaw(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(v) for v in value]
+    return value
+
+
+class _Entry:
+    """单个数据文件的缓存条目"""
+
+    __slots__ = ("data", "signature", "version", "checked_at", "derived")
+
+    def __init__(self):
+        self.data: FrozenDict = FrozenDict()
+        self.signature: Optional[Tuple[int, int]] = None
+        self.version: int = 0
+        self.checked_at: float = 0.0
+        self.derived: Dict[str, Any] = {}
+
+
+class DataStore:
+    """进程内共享数据存储
+
+    每个JSON文件只解析一次并常驻内存，仅当文件的mtime/size发生变化时才重新加载。
+    对外返回只读视图，所有调用方共享同一份数据，不会相互污染。
+    """
+
+    def __init__(self, base_dir: str = PROJECT_ROOT, check_interval: float = 1.0):
+        """
+        Args:
+            base_dir: 数据文件相对路径的基准目录
+            check_interval: 两次检查文件变化（stat）之间的最小间隔，单位秒；0表示每次访问都检查
+        """
+        self.base_dir = base_dir
+        self.check_interval = check_interval
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.RLock()
+        self._stats = {"hits": 0, "misses": 0, "reloads": 0, "errors": 0}
+
+    def _full_path(self, file_path: str) -> str:
+        return os.path.normpath(os.path.join(self.base_dir, file_path))
+
+    def _refresh(self, file_path: str) -> _Entry:
+        """确保缓存条目是最新的并返回，调用方需持有锁"""
+        entry = self._entries.get(file_path)
+        now = time.monotonic()
+
+        if entry is not None and now - entry.checked_at < self.check_interval:
+            self._stats["hits"] += 1
+            return entry
+
+        full_path = self._full_path(file_path)
+        try:
+            stat = os.stat(full_path)
+            signature = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            signature = None
+
+        if entry is not None and entry.signature == signature and entry.version > 0:
+            entry.checked_at = now
+            self._stats["hits"] += 1
+            return entry
+
+        if entry is None:
+            entry = _Entry()
+            self._entries[file_path] = entry
+            self._stats["misses"] += 1
+        else:
+            self._stats["reloads"] += 1
+
+        entry.checked_at = now
+        if signature is None:
+            logger.info(f"数据文件不存在: {full_path}")
+            data = FrozenDict()
+        else:
+            try:
+                with open(full_path, 'r', encoding='utf-8') as f:
+                    data = freeze(json.load(f))
+            except json.JSONDecodeError:
+                # 文件可能正在被写入，保留旧数据，下次检查时重试
+                self._stats["errors"] += 1
+                logger.info(f"数据文件格式错误: {full_path}")
+                if entry.version > 0:
+                    return entry
+                data = FrozenDict()
+                signature = None
+
+        entry.data = data
+        entry.signature = signature
+        entry.version += 1
+        entry.derived = {}
+        logger.info(f"数据文件已加载: {file_path}, 版本: {entry.version}")
+        return entry
+
+    def get(self, file_path: str) -> FrozenDict:
+        """获取数据文件内容的只读视图"""
+        with self._lock:
+            return self._refresh(file_path).data
+
+    def version(self, file_path: str) -> int:
+        """获取数据文件当前的版本号，每次重新加载后递增"""
+        with self._lock:
+            return self._refresh(file_path).version
+
+    def fingerprint(self, file_path: str) -> str:
+        """获取当前已加载数据的文件标识（mtime和大小），可作为跨进程一致的数据集版本，用于生成ETag"""
+        with self._lock:
+            signature = self._refresh(file_path).signature
+            return "missing" if signature is None else f"{signature[0]:x}-{signature[1]:x}"
+
+    def last_modified(self, file_path: str) -> Optional[float]:
+        """获取当前已加载数据的文件修改时间（时间戳），文件不存在时返回None"""
+        with self._lock:
+            signature = self._refresh(file_path).signature
+            return None if signature is None else signature[0] / 1e9
+
+    def derived(self, file_path: str, name: str, builder: Callable[[FrozenDict], Any]) -> Any:
+        """获取基于数据文件构建的派生结构（如索引），文件重新加载后自动重建
+
+        Args:
+            file_path: 数据文件相对路径
+            name: 派生结构名称
+            builder: 构建函数，参数为数据文件的只读视图
+        """
+        with self._lock:
+            entry = self._refresh(file_path)
+            if name not in entry.derived:
+                entry.derived[name] = builder(entry.data)
+            return entry.derived[name]
+
+    def invalidate(self, file_path: Optional[str] = None) -> None:
+        """强制下次访问时重新检查文件，不传参数时作用于所有文件"""
+        with self._lock:
+            entries = [self._entries.get(file_path)] if file_path else list(self._entries.values())
+            for entry in entries:
+                if entry is not None:
+                    # monotonic 时钟可能从0附近开始，用负无穷保证下次访问一定超过检查间隔
+                    entry.checked_at = float("-inf")
+                    entry.signature = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存命中/未命中/重新加载计数以及各文件的版本号"""
+        with self._lock:
+            return {
+                **self._stats,
+                "files": {path: entry.version for path, entry in self._entries.items()}
+            }
+
+
+_data_store = DataStore(check_interval=float(os.getenv("MUSEUM_DATA_CHECK_INTERVAL", "1.0")))
+
+
+def get_data_store() -> DataStore:
+    """获取全局共享的数据存储实例"""
+    return _data_store
@@ -1,8 +1,14 @@
-from ast import main
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from email.mime.application import MIMEApplication
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+import heapq
+import itertools
+import queue
 import smtplib
+import threading
+import time
+import uuid
 import os
 import logging
 from dotenv import load_dotenv
@@ -11,35 +17,305 @@ logger = logging.getLogger(__name__)
 
 load_dotenv()
 
-def send_email(mail, subject, content):
-    # 配置邮件服务器
-    smtp_server = "smtp.sina.com"  # 根据实际使用的邮件服务器修改
+
+def _smtp_settings() -> Dict[str, Any]:
     # TODO 如果使用qq邮箱，将会有不可预期的异常：(-1, b'\x00\x00\x00') 即使发送成功也是会有异常发生，不想处理，暂时用新浪邮箱来承载，要开通独立验证码的形态，不是设置邮箱密码
-    # smtp_server = "smtp.qq.com"
-    smtp_port = 587
-    # 从当前的.env文件中获取邮件sender和密码
-    sender_email = os.getenv("EMAIL_SENDER")
-    logger.info(sender_email)
-    # sender_password = "jwvfkpttebjpbiif" # 邮箱应用密码
-    sender_password = os.getenv("EMAIL_PASSWORD")
-    logger.info(sender_password)
-    
-    # 创建邮件对象
+    # 本地测试可指向 aiosmtpd 等SMTP替身，如 EMAIL_SMTP_HOST=127.0.0.1 EMAIL_SMTP_PORT=8025，不设置 EMAIL_PASSWORD 时不登录
+    return {
+        "host": os.getenv("EMAIL_SMTP_HOST", "smtp.sina.com"),
+        "port": int(os.getenv("EMAIL_SMTP_PORT", "587")),
+        "starttls": os.getenv("EMAIL_SMTP_STARTTLS", "false").lower() in ("1", "true", "yes"),
+        "sender": os.getenv("EMAIL_SENDER"),
+        "password": os.getenv("EMAIL_PASSWORD"),
+        "timeout": float(os.getenv("EMAIL_SMTP_TIMEOUT", "30")),
+    }
+
+
+def build_message(mail: str, subject: str, content: str, sender: Optional[str]) -> MIMEMultipart:
+    """创建邮件对象"""
     msg = MIMEMultipart()
-    msg['From'] = sender_email
+    msg['From'] = sender
     msg['To'] = mail
     msg['Subject'] = f'DT: - {subject}'
-    
+
     # 添加邮件正文
     body = f"DT: {content} 祝好！"
     msg.attach(MIMEText(body, 'plain'))
-    
+    return msg
+
+
+def _connect(settings: Dict[str, Any]) -> smtplib.SMTP:
+    server = smtplib.SMTP(settings["host"], settings["port"], timeout=settings["timeout"])
+    if settings["starttls"]:
+        server.starttls()
+    if settings["password"]:
+        server.login(settings["sender"], settings["password"])
+    return server
+
+
+def send_email(mail, subject, content):
+    """同步发送一封邮件（每次新建连接），智能体工具请使用 MailDispatcher 异步投递"""
+    settings = _smtp_settings()
+    msg = build_message(mail, subject, content, settings["sender"])
+
     # 连接到SMTP服务器并发送邮件
-    with smtplib.SMTP(smtp_server, smtp_port) as server:
-        # server.starttls()
-        server.login(sender_email, sender_password)
+    with _connect(settings) as server:
         server.send_message(msg)
         logger.info(f"邮件已发送至 {mail}，主题：{subject}")
-        
+
+
+class OutboxFull(Exception):
+    """待发送邮件队列已满"""
+
+
+class _Mail:
+    def __init__(self, message_id: str, recipient: str, subject: str, content: str):
+        self.message_id = message_id
+        self.recipient = recipient
+        self.subject = subject
+        self.content = content
+        self.attempts = 0
+
+
+class MailDispatcher:
+    """后台邮件投递
+
+    - 调用方把邮件放入有界队列后立即返回邮件ID，队列满时抛出 OutboxFull
+    - 后台线程复用一个SMTP连接：一次取出队列中已有的多封邮件（最多 batch_size 封）在同一连接中连续发送，
+      连接断开时重连，空闲超过 idle_timeout 秒时关闭
+    - 发送失败的邮件按指数退避重试，最多 max_attempts 次
+    - 保留最近 history_size 封邮件的投递状态，可按邮件ID查询
+    """
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None, outbox_size: int = 1000, batch_size: int = 20,
+                 max_attempts: int = 5, retry_base: float = 2.0, retry_max: float = 300.0,
+                 idle_timeout: float = 60.0, history_size: int = 1000):
+        """
+        Args:
+            settings: SMTP配置，默认从环境变量读取
+            outbox_size: 待发送队列容量（含等待重试的邮件）
+            batch_size: 每次连接中连续发送的最多邮件数
+            max_attempts: 每封邮件最多尝试次数
+            retry_base: 重试退避的初始间隔（秒），每次失败翻倍
+            retry_max: 重试退避的最大间隔（秒）
+            idle_timeout: SMTP连接空闲多久后关闭（秒）
+            history_size: 保留多少封邮件的投递状态
+        """
+        self.settings = settings or _smtp_settings()
+        self.outbox_size = outbox_size
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.idle_timeout = idle_timeout
+        self._queue: "queue.Queue[Optional[_Mail]]" = queue.Queue()
+        # 等待重试的邮件：(到期时间, 序号, 邮件)
+        self._retries: List[Any] = []
+        self._sequence = itertools.count()
+        self._pending = 0
+        self._status: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._history_size = history_size
+        self._lock = threading.Lock()
+        self._server: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._stats = {"queued": 0, "sent": 0, "failed": 0, "retried": 0, "rejected": 0, "abandoned": 0,
+                       "connections": 0, "batches": 0}
+
+    def submit(self, recipient: str, subject: str, content: str) -> str:
+        """把邮件放入待发送队列，返回邮件ID
+
+        Raises:
+            OutboxFull: 待发送队列已满
+        """
+        with self._lock:
+            if self._pending >= self.outbox_size:
+                self._stats["rejected"] += 1
+                raise OutboxFull(f"待发送邮件已达上限 {self.outbox_size}，请稍后重试")
+            self._pending += 1
+            self._stats["queued"] += 1
+            mail = _Mail(uuid.uuid4().hex, recipient, subject, content)
+            self._set_status(mail, "queued")
+            self._ensure_worker()
+        self._queue.put(mail)
+        return mail.message_id
+
+    def status(self, message_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            status = self._status.get(message_id)
+            return dict(status) if status is not None else None
+
+    def _set_status(self, mail: _Mail, state: str, error: Optional[str] = None) -> None:
+        self._status[mail.message_id] = {
+            "message_id": mail.message_id, "recipient": mail.recipient, "subject": mail.subject,
+            "status": state, "attempts": mail.attempts, "error": error, "updated_at": time.time()
+        }
+        self._status.move_to_end(mail.message_id)
+        while len(self._status) > self._history_size:
+            self._status.popitem(last=False)
+
+    def _ensure_worker(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="museum-mail-dispatcher", daemon=True)
+            self._thread.start()
+
+    def _next_batch(self) -> List[_Mail]:
+        """等待并取出一批待发送邮件：到期的重试邮件和队列中已有的邮件"""
+        batch: List[_Mail] = []
+        now = time.monotonic()
+        while self._retries and self._retries[0][0] <= now and len(batch) < self.batch_size:
+            batch.append(heapq.heappop(self._retries)[2])
+        if not batch:
+            timeout = self.idle_timeout if self._server is not None else None
+            if self._retries:
+                due = max(0.0, self._retries[0][0] - now)
+                timeout = due if timeout is None else min(timeout, due)
+            try:
+                mail = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                return batch
+            if mail is None:
+                return batch
+            batch.append(mail)
+        while len(batch) < self.batch_size:
+            try:
+                mail = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if mail is None:
+                # 停止信号放回队列，本批发送完后退出
+                self._queue.put(None)
+                break
+            batch.append(mail)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch:
+                self._send_batch(batch)
+            elif self._server is not None and time.monotonic() - self._last_used >= self.idle_timeout:
+                self._close()
+            if self._stopping and self._queue.empty() and not batch:
+                self._close()
+                self._abandon_retries()
+                return
+
+    def _connection(self) -> smtplib.SMTP:
+        if self._server is None:
+            self._server = _connect(self.settings)
+            self._stats["connections"] += 1
+        return self._server
+
+    def _close(self) -> None:
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._server = None
+
+    def _send_batch(self, batch: List[_Mail]) -> None:
+        self._stats["batches"] += 1
+        for mail in batch:
+            mail.attempts += 1
+            try:
+                self._send(mail)
+            except Exception as e:
+                self._close()
+                self._failed(mail, e)
+            else:
+                with self._lock:
+                    self._pending -= 1
+                    self._stats["sent"] += 1
+                    self._set_status(mail, "sent")
+                logger.info(f"[邮件投递] 邮件已发送至 {mail.recipient}，主题：{mail.subject}，ID：{mail.message_id}")
+        self._last_used = time.monotonic()
+
+    def _send(self, mail: _Mail) -> None:
+        msg = build_message(mail.recipient, mail.subject, mail.content, self.settings["sender"])
+        try:
+            self._connection().send_message(msg)
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            # 复用的连接可能已被服务器关闭，重连后再发送一次
+            self._close()
+            self._connection().send_message(msg)
+
+    def _failed(self, mail: _Mail, error: Exception) -> None:
+        message = f"{type(error).__name__}: {str(error)}"
+        # 收件人被拒绝等永久错误不再重试
+        permanent = isinstance(error, (smtplib.SMTPRecipientsRefused, smtplib.SMTPAuthenticationError))
+        if permanent or mail.attempts >= self.max_attempts:
+            with self._lock:
+                self._pending -= 1
+                self._stats["failed"] += 1
+                self._set_status(mail, "failed", message)
+            logger.error(f"[邮件投递] 邮件发送失败，已放弃：{mail.recipient}，ID：{mail.message_id}，尝试 {mail.attempts} 次，错误：{message}")
+            return
+        delay = min(self.retry_max, self.retry_base * 2 ** (mail.attempts - 1))
+        heapq.heappush(self._retries, (time.monotonic() + delay, next(self._sequence), mail))
+        with self._lock:
+            self._stats["retried"] += 1
+            self._set_status(mail, "retrying", message)
+        logger.warning(f"[邮件投递] 邮件发送失败，{delay:.0f} 秒后重试：{mail.recipient}，ID：{mail.message_id}，错误：{message}")
+
+    def _abandon_retries(self) -> None:
+        """停止时仍在等待重试的邮件不再发送，状态标记为 abandoned"""
+        if not self._retries:
+            return
+        retries, self._retries = self._retries, []
+        with self._lock:
+            for _, _, mail in retries:
+                self._pending -= 1
+                self._stats["abandoned"] += 1
+                self._set_status(mail, "abandoned", self._status.get(mail.message_id, {}).get("error"))
+        logger.warning(f"[邮件投递] 投递已停止，{len(retries)} 封等待重试的邮件未发送，已标记为 abandoned")
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """发送完队列中已有的邮件后停止后台线程，会阻塞调用线程
+
+        等待重试的邮件不再发送，状态标记为 abandoned 并记录日志。
+        """
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        self._stopping = True
+        self._queue.put(None)
+        thread.join(timeout)
+        if thread.is_alive():
+            logger.warning(f"[邮件投递] {timeout:.0f} 秒内未发送完队列中的邮件，后台线程将随进程退出")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "pending": self._pending,
+                "waiting_retry": len(self._retries),
+                "outbox_size": self.outbox_size,
+                "connected": self._server is not None,
+                "smtp_host": f"{self.settings['host']}:{self.settings['port']}"
+            }
+
+
+_dispatcher: Optional[MailDispatcher] = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_mail_dispatcher() -> MailDispatcher:
+    """获取全局邮件投递器，配置来自环境变量"""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = MailDispatcher(
+                outbox_size=int(os.getenv("MUSEUM_MAIL_OUTBOX_SIZE", "1000")),
+                batch_size=int(os.getenv("MUSEUM_MAIL_BATCH_SIZE", "20")),
+                max_attempts=int(os.getenv("MUSEUM_MAIL_MAX_ATTEMPTS", "5")),
+                idle_timeout=float(os.getenv("MUSEUM_MAIL_IDLE_TIMEOUT", "60"))
+            )
+        return _dispatcher
+
+
 if __name__ == "__main__":
     send_email("alphachenx@sina.com", "测试", "这是一封测试邮件")
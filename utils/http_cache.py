@@ -0,0 +1,171 @@
+import copy
+import hashlib
+import os
+import threading
+import logging
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+from fastapi.responses import Response
+
+from utils.data_store import get_data_store
+from utils.json_response import dumps, etag_matches
+
+logger = logging.getLogger(__name__)
+
+# 公开只读接口的 Cache-Control max-age（秒），0 表示客户端每次都需要用ETag重新验证
+CACHE_MAX_AGE = int(os.getenv("MUSEUM_HTTP_CACHE_MAX_AGE", "0"))
+
+
+def dataset_version(*file_paths: str) -> Tuple[str, Optional[float]]:
+    """数据文件组合的版本和最后修改时间，任一文件重新加载后版本变化"""
+    store = get_data_store()
+    version = ";".join(store.fingerprint(path) for path in file_paths)
+    modified = [store.last_modified(path) for path in file_paths]
+    modified = [value for value in modified if value is not None]
+    return version, max(modified) if modified else None
+
+
+def make_etag(version: str, *parts: Any) -> str:
+    """由数据版本和请求参数生成弱ETag：数据未变化时相同参数的请求得到相同的ETag"""
+    digest = hashlib.blake2b(digest_size=12)
+    digest.update(version.encode("utf-8"))
+    for part in parts:
+        digest.update(b"\x00" + str(part).encode("utf-8"))
+    return f'W/"{digest.hexdigest()}"'
+
+
+def _not_modified_since(if_modified_since: Optional[str], last_modified: Optional[float]) -> bool:
+    if not if_modified_since or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+        return False
+    # HTTP日期精确到秒
+    return int(last_modified) <= since
+
+
+def cache_headers(etag: str, last_modified: Optional[float], max_age: Optional[int] = None) -> Dict[str, str]:
+    max_age = CACHE_MAX_AGE if max_age is None else max_age
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={max_age}, must-revalidate" if max_age > 0 else "no-cache"
+    }
+    if last_modified is not None:
+        headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+    return headers
+
+
+def conditional_response(
+    etag: str,
+    last_modified: Optional[float],
+    content: Union[bytes, Callable[[], Any]],
+    if_none_match: Optional[str] = None,
+    if_modified_since: Optional[str] = None,
+    max_age: Optional[int] = None
+) -> Response:
+    """处理条件请求：客户端缓存仍有效时返回304（不构建、不编码响应体），否则返回带缓存头的响应
+
+    Args:
+        etag: 当前数据对应的ETag
+        last_modified: 数据最后修改时间（时间戳）
+        content: 预编码的响应体，或构建响应数据的函数（仅在需要返回响应体时调用）
+        if_none_match: 请求头 If-None-Match，存在时优先于 If-Modified-Since
+        if_modified_since: 请求头 If-Modified-Since
+        max_age: Cache-Control max-age，默认取 MUSEUM_HTTP_CACHE_MAX_AGE
+    """
+    headers = cache_headers(etag, last_modified, max_age)
+    if if_none_match:
+        not_modified = etag_matches(if_none_match, etag)
+    else:
+        not_modified = _not_modified_since(if_modified_since, last_modified)
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+    body = content if isinstance(content, bytes) else dumps(content())
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+class ConditionalCache:
+    """客户端条件请求缓存：按URL保存最近的ETag和响应数据
+
+    再次请求同一URL时携带 If-None-Match，服务端返回304时直接使用缓存的数据（返回深拷贝）。
+    按最近使用淘汰，最多保留 max_entries 个URL。
+    """
+
+    def __init__(self, name: str, max_entries: int = 256):
+        self.name = name
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "revalidated": 0, "stored": 0, "evicted": 0}
+
+    def etag(self, key: str) -> Optional[str]:
+        """获取URL对应的缓存ETag，用于构造 If-None-Match"""
+        if self.max_entries <= 0:
+            return None
+        with self._lock:
+            self._stats["requests"] += 1
+            entry = self._entries.get(key)
+            return entry[0] if entry is not None else None
+
+    def revalidated(self, key: str) -> Optional[Any]:
+        """服务端返回304时取出缓存的数据，缓存已被淘汰时返回None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self._stats["revalidated"] += 1
+        return copy.deepcopy(entry[1])
+
+    def store(self, key: str, etag: Optional[str], data: Any) -> None:
+        """保存带ETag的响应数据，响应没有ETag时移除旧的缓存"""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            if not etag:
+                self._entries.pop(key, None)
+                return
+            self._entries[key] = (etag, copy.deepcopy(data))
+            self._entries.move_to_end(key)
+            self._stats["stored"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evicted"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            requests = self._stats["requests"]
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "revalidated_rate": round(self._stats["revalidated"] / requests, 4) if requests else 0.0
+            }
+
+
+_caches: Dict[str, ConditionalCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_conditional_cache(name: str) -> ConditionalCache:
+    """获取指定名称的全局客户端条件请求缓存，容量由 MUSEUM_HTTP_CLIENT_CACHE_SIZE 配置（0表示关闭）"""
+    with _caches_lock:
+        cache = _caches.get(name)
+        if cache is None:
+            cache = ConditionalCache(name, int(os.getenv("MUSEUM_HTTP_CLIENT_CACHE_SIZE", "256")))
+            _caches[name] = cache
+        return cache
+
+
+def get_conditional_cache_stats() -> Dict[str, Any]:
+    """所有客户端条件请求缓存的统计"""
+    with _caches_lock:
+        caches = list(_caches.items())
+    return {name: cache.get_stats() for name, cache in caches}
@@ -0,0 +1,85 @@
+import hashlib
+import logging
+from typing import Any, Callable, Dict, Optional
+
+import orjson
+from fastapi.responses import JSONResponse, Response
+
+from utils.data_store import FrozenDict, get_data_store
+
+logger = logging.getLogger(__name__)
+
+_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(value: Any) -> Any:
+    # pydantic模型等orjson不能直接序列化的对象
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    return str(value)
+
+
+def dumps(content: Any) -> bytes:
+    """使用orjson编码为UTF-8 JSON字节串，中文不转义"""
+    return orjson.dumps(content, default=_default, option=_OPTIONS)
+
+
+def dumps_text(content: Any) -> str:
+    """编码为JSON字符串，用于构造智能体工具的返回内容"""
+    return dumps(content).decode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """使用orjson序列化的JSON响应，作为应用的默认响应类"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class EncodedPayload:
+    """预编码的JSON响应体及其ETag"""
+
+    __slots__ = ("body", "etag")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """判断 If-None-Match 请求头是否命中当前ETag（支持多个值和 *，按弱比较忽略 W/ 前缀）"""
+    if not if_none_match:
+        return False
+    etag = etag.removeprefix("W/")
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def static_payload(file_path: str, name: str, builder: Callable[[FrozenDict], Any]) -> EncodedPayload:
+    """获取基于数据文件构建的预编码响应体，数据文件重新加载后才重新编码
+
+    Args:
+        file_path: 数据文件相对路径
+        name: 响应体名称，同一数据文件中唯一
+        builder: 根据数据文件内容构建响应数据的函数
+    """
+    def encode(data: FrozenDict) -> EncodedPayload:
+        payload = EncodedPayload(dumps(builder(data)))
+        logger.info(f"[预编码响应] {name} 已编码: {len(payload.body)} 字节, ETag={payload.etag}")
+        return payload
+
+    return get_data_store().derived(file_path, f"payload:{name}", encode)
+
+
+def static_response(payload: EncodedPayload, if_none_match: Optional[str] = None,
+                    headers: Optional[Dict[str, str]] = None) -> Response:
+    """返回预编码的响应体；客户端持有相同ETag的版本时返回304且不带响应体"""
+    response_headers = {"ETag": payload.etag, **(headers or {})}
+    if etag_matches(if_none_match, payload.etag):
+        return Response(status_code=304, headers=response_headers)
+    return Response(content=payload.body, media_type="application/json", headers=response_headers)
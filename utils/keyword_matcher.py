@@ -0,0 +1,141 @@
+import os
+import time
+import threading
+import logging
+from collections import deque
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 关键词表：标签（如意图名） -> 关键词列表
+KeywordTable = Mapping[str, Sequence[str]]
+
+
+class AhoCorasick:
+    """Aho-Corasick 多模式匹配自动机
+
+    构建一次后，对任意文本只需扫描一遍即可找出所有命中的关键词，
+    匹配耗时与文本长度和命中数相关，而与关键词数量无关。
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Tuple[str, ...]] = [()]
+        self.pattern_count = 0
+
+        for pattern in dict.fromkeys(p for p in patterns if p):
+            self._insert(pattern)
+            self.pattern_count += 1
+        self._build_failure_links()
+
+    def _insert(self, pattern: str) -> None:
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+                self._goto[state][char] = next_state
+            state = next_state
+        self._output[state] = self._output[state] + (pattern,)
+
+    def _build_failure_links(self) -> None:
+        # 按BFS顺序计算失败指针，并把失败状态的输出合并进来，匹配时无需沿失败链回溯收集
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find(self, text: str) -> Set[str]:
+        """返回文本中出现过的所有关键词（去重）"""
+        found: Set[str] = set()
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+
+class KeywordMatcher:
+    """基于共享自动机的多表关键词匹配
+
+    多个关键词表（如意图表和子意图表）编译进同一个自动机，一次扫描即可得到
+    每个表中所有命中的标签及其关键词。匹配不区分大小写。
+
+    关键词表在运行时可能被修改，匹配前最多每 check_interval 秒比较一次表内容，
+    发生变化时自动重建自动机；修改后需要立即生效时调用 invalidate()。
+    """
+
+    def __init__(self, tables: Mapping[str, KeywordTable], check_interval: Optional[float] = None):
+        """
+        Args:
+            tables: 表名 -> 关键词表，关键词表会被原地引用，修改后自动重建
+            check_interval: 检查关键词表是否变化的最小间隔（秒）
+        """
+        self.tables = tables
+        self.check_interval = check_interval if check_interval is not None else float(os.getenv("MUSEUM_KEYWORD_CHECK_INTERVAL", "1.0"))
+        self._lock = threading.Lock()
+        self._signature: Optional[Tuple] = None
+        self._checked_at = 0.0
+        self._automaton: Optional[AhoCorasick] = None
+        # 关键词（小写） -> [(表名, 标签, 原始关键词)]
+        self._labels: Dict[str, List[Tuple[str, str, str]]] = {}
+        self.rebuild_count = 0
+
+    def _current_signature(self) -> Tuple:
+        return tuple(
+            (table_name, tuple((label, tuple(keywords)) for label, keywords in table.items()))
+            for table_name, table in self.tables.items()
+        )
+
+    def _build(self, signature: Tuple) -> None:
+        labels: Dict[str, List[Tuple[str, str, str]]] = {}
+        for table_name, table in self.tables.items():
+            for label, keywords in table.items():
+                for keyword in keywords:
+                    if keyword:
+                        labels.setdefault(keyword.lower(), []).append((table_name, label, keyword))
+        self._automaton = AhoCorasick(labels.keys())
+        self._labels = labels
+        self._signature = signature
+        self.rebuild_count += 1
+        logger.info(f"关键词自动机已构建: {len(labels)} 个关键词, {len(self.tables)} 张关键词表")
+
+    def _get_automaton(self) -> Tuple[AhoCorasick, Dict[str, List[Tuple[str, str, str]]]]:
+        now = time.monotonic()
+        with self._lock:
+            if self._automaton is None or now - self._checked_at >= self.check_interval:
+                self._checked_at = now
+                signature = self._current_signature()
+                if self._automaton is None or signature != self._signature:
+                    self._build(signature)
+            # 自动机和标签映射成对返回，避免与并发的重建交错
+            return self._automaton, self._labels
+
+    def invalidate(self) -> None:
+        """关键词表修改后调用，下次匹配时立即重新检查并重建"""
+        with self._lock:
+            self._automaton = None
+
+    def match(self, text: str) -> Dict[str, Dict[str, List[str]]]:
+        """扫描一遍文本，返回 表名 -> {标签: [命中的关键词]}"""
+        automaton, labels = self._get_automaton()
+        result: Dict[str, Dict[str, List[str]]] = {table_name: {} for table_name in self.tables}
+        for found in automaton.find(text.lower()):
+            for table_name, label, keyword in labels[found]:
+                result[table_name].setdefault(label, []).append(keyword)
+        return result
@@ -0,0 +1,363 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Set
+
+import httpx
+from agentscope.model import ChatModelBase, OllamaChatModel
+
+from utils.single_flight import get_single_flight, make_key
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OLLAMA_HOST = "http://127.0.0.1:11434"
+DEFAULT_CHAT_MODEL = "qwen2:latest"
+
+
+class NoModelEndpoint(Exception):
+    """模型池中没有可用的Ollama节点"""
+
+
+class ModelEndpoint:
+    """单个Ollama节点：进行中的请求数、延迟、失败计数和摘除状态"""
+
+    def __init__(self, host: str):
+        if "://" not in host:
+            host = f"http://{host}"
+        self.host = host.rstrip("/")
+        self.outstanding = 0
+        # 首个分块（流式）或完整响应（非流式）耗时的指数滑动平均
+        self.latency = 0.0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.healthy = True
+        # 健康检查得到的已安装模型，None表示尚未检查
+        self.installed: Optional[Set[str]] = None
+        self.stats = {"requests": 0, "failures": 0, "ejections": 0}
+        self._models: Dict[Any, OllamaChatModel] = {}
+
+    def model(self, model_name: str, stream: bool, **options: Any) -> OllamaChatModel:
+        """该节点上指定模型的客户端，相同参数复用同一个实例"""
+        key = (model_name, stream, tuple(sorted(options.items())))
+        model = self._models.get(key)
+        if model is None:
+            model = OllamaChatModel(model_name=model_name, stream=stream, host=self.host, **options)
+            self._models[key] = model
+        return model
+
+    def available(self, now: float) -> bool:
+        return self.healthy and now >= self.ejected_until
+
+    def serves(self, model_name: str) -> bool:
+        return self.installed is None or model_name in self.installed
+
+    def snapshot(self, now: float) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "host": self.host,
+            "outstanding": self.outstanding,
+            "avg_latency_ms": round(self.latency * 1000, 2),
+            "healthy": self.healthy,
+            "ejected_for": round(max(0.0, self.ejected_until - now), 1),
+            "consecutive_failures": self.consecutive_failures,
+            "models": sorted(self.installed) if self.installed is not None else None
+        }
+
+
+class ModelPool:
+    """多个Ollama节点组成的模型池
+
+    - 按最少进行中请求数选择节点，相同时选平均延迟较低的
+    - 后台定期访问 /api/tags 做健康检查，同时得知每个节点安装了哪些模型
+    - 连续失败 max_failures 次、或平均延迟超过 slow_threshold 秒的节点被摘除 eject_seconds 秒，
+      到期后重新参与调度，再失败一次即再次摘除
+    - 请求失败且尚未输出内容时换一个节点重试
+    - 按智能体名称覆盖使用的模型，如路由用小模型、问答用大模型
+    """
+
+    def __init__(self, hosts: Optional[List[str]] = None, agent_models: Optional[Dict[str, str]] = None,
+                 default_model: str = DEFAULT_CHAT_MODEL, max_failures: int = 3, eject_seconds: float = 30.0,
+                 slow_threshold: float = 30.0, health_interval: float = 15.0, health_timeout: float = 3.0):
+        """
+        Args:
+            hosts: Ollama节点地址列表
+            agent_models: 智能体名称 -> 模型名称
+            default_model: 未覆盖时使用的模型
+            max_failures: 连续失败多少次后摘除节点
+            eject_seconds: 摘除时长（秒）
+            slow_threshold: 平均延迟超过该值（秒）时摘除节点
+            health_interval: 健康检查间隔（秒），0表示不做后台检查
+            health_timeout: 健康检查超时（秒）
+        """
+        self.endpoints = [ModelEndpoint(host) for host in (hosts or [DEFAULT_OLLAMA_HOST])]
+        self.agent_models = agent_models or {}
+        self.default_model = default_model
+        self.max_failures = max_failures
+        self.eject_seconds = eject_seconds
+        self.slow_threshold = slow_threshold
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self._health_task: Optional["asyncio.Task[None]"] = None
+        self._stats = {"retries": 0, "no_endpoint": 0}
+
+    def model_for(self, agent_name: str) -> str:
+        return self.agent_models.get(agent_name, self.default_model)
+
+    def chat_model(self, agent_name: str, stream: bool = True, **options: Any) -> "PooledChatModel":
+        """为智能体创建模型句柄，实际请求在调用时分配到池中的节点"""
+        return PooledChatModel(self, self.model_for(agent_name), stream=stream, **options)
+
+    def acquire(self, model_name: str, exclude: Set[str]) -> ModelEndpoint:
+        """选择一个节点并占用一个进行中请求名额
+
+        Raises:
+            NoModelEndpoint: 所有节点都已尝试过
+        """
+        now = time.monotonic()
+        candidates = [ep for ep in self.endpoints if ep.host not in exclude and ep.serves(model_name)]
+        if not candidates:
+            self._stats["no_endpoint"] += 1
+            raise NoModelEndpoint(f"没有可提供模型 {model_name} 的Ollama节点")
+        available = [ep for ep in candidates if ep.available(now)]
+        if available:
+            endpoint = min(available, key=lambda ep: (ep.outstanding, ep.latency))
+        else:
+            # 全部节点都不可用时仍要尝试，选最早结束摘除的节点，而不是直接拒绝请求
+            endpoint = min(candidates, key=lambda ep: (not ep.healthy, ep.ejected_until, ep.outstanding))
+        endpoint.outstanding += 1
+        endpoint.stats["requests"] += 1
+        return endpoint
+
+    def has_candidate(self, model_name: str, exclude: Set[str]) -> bool:
+        return any(ep.host not in exclude and ep.serves(model_name) for ep in self.endpoints)
+
+    def release(self, endpoint: ModelEndpoint, latency: Optional[float], ok: Optional[bool]) -> None:
+        """归还请求名额并记录结果，ok为None表示调用方中途放弃（不计入成功或失败）"""
+        endpoint.outstanding -= 1
+        if ok is None:
+            return
+        if not ok:
+            endpoint.stats["failures"] += 1
+            endpoint.consecutive_failures += 1
+            if endpoint.consecutive_failures >= self.max_failures:
+                self._eject(endpoint, f"连续失败 {endpoint.consecutive_failures} 次")
+                # 恢复调度后再失败一次即再次摘除
+                endpoint.consecutive_failures = self.max_failures - 1
+            return
+        endpoint.consecutive_failures = 0
+        if latency is not None:
+            endpoint.latency = latency if endpoint.latency == 0 else 0.8 * endpoint.latency + 0.2 * latency
+            if self.slow_threshold and endpoint.latency > self.slow_threshold:
+                self._eject(endpoint, f"平均延迟 {endpoint.latency:.1f}s")
+                # 摘除结束后按新的测量重新计算
+                endpoint.latency = 0.0
+
+    def _eject(self, endpoint: ModelEndpoint, reason: str) -> None:
+        if len(self.endpoints) == 1:
+            return
+        endpoint.ejected_until = time.monotonic() + self.eject_seconds
+        endpoint.stats["ejections"] += 1
+        logger.warning(f"[模型池] 节点 {endpoint.host} 已摘除 {self.eject_seconds:.0f} 秒：{reason}")
+
+    async def check_health(self) -> None:
+        """访问每个节点的 /api/tags，更新健康状态和已安装模型"""
+        async with httpx.AsyncClient(timeout=self.health_timeout) as client:
+            results = await asyncio.gather(
+                *(client.get(f"{ep.host}/api/tags") for ep in self.endpoints), return_exceptions=True
+            )
+        for endpoint, result in zip(self.endpoints, results):
+            if isinstance(result, Exception) or result.status_code != 200:
+                if endpoint.healthy:
+                    logger.warning(f"[模型池] 节点 {endpoint.host} 健康检查失败: {result if isinstance(result, Exception) else result.status_code}")
+                endpoint.healthy = False
+                continue
+            if not endpoint.healthy:
+                logger.info(f"[模型池] 节点 {endpoint.host} 已恢复")
+            endpoint.healthy = True
+            try:
+                endpoint.installed = {model["name"] for model in result.json().get("models", [])}
+            except (ValueError, KeyError, TypeError):
+                endpoint.installed = None
+
+    async def _health_loop(self) -> None:
+        while True:
+            try:
+                await self.check_health()
+            except Exception as e:
+                logger.error(f"[模型池] 健康检查异常: {type(e).__name__}: {str(e)}")
+            await asyncio.sleep(self.health_interval)
+
+    def start(self) -> None:
+        """启动后台健康检查（需在事件循环中调用）"""
+        if self.health_interval and (self._health_task is None or self._health_task.done()):
+            self._health_task = asyncio.get_running_loop().create_task(self._health_loop())
+
+    async def stop(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            **self._stats,
+            "default_model": self.default_model,
+            "agent_models": dict(self.agent_models),
+            "endpoints": [endpoint.snapshot(now) for endpoint in self.endpoints]
+        }
+
+
+class PooledChatModel(ChatModelBase):
+    """模型池中的模型句柄，与 OllamaChatModel 用法相同，每次调用分配到一个节点
+
+    相同模型、相同提示词（消息、工具定义和参数）的并发调用合并为一次生成，流式输出广播给所有调用方。
+    """
+
+    def __init__(self, pool: ModelPool, model_name: str, stream: bool = True, **options: Any):
+        super().__init__(model_name, stream)
+        self.pool = pool
+        self.options = options
+        self.coalesce = os.getenv("MUSEUM_SINGLE_FLIGHT", "true").lower() not in ("0", "false", "no")
+
+    async def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        if not self.coalesce:
+            return await self._call(args, kwargs, set())
+        key = make_key(self.model_name, self.stream, self.options, args, kwargs)
+        return await get_single_flight("model_calls").do_stream(key, lambda: self._call(args, kwargs, set()))
+
+    async def _call(self, args: tuple, kwargs: Dict[str, Any], tried: Set[str]) -> Any:
+        while True:
+            endpoint = self.pool.acquire(self.model_name, tried)
+            started = time.monotonic()
+            try:
+                result = await endpoint.model(self.model_name, self.stream, **self.options)(*args, **kwargs)
+            except Exception as e:
+                self.pool.release(endpoint, None, False)
+                tried.add(endpoint.host)
+                if not self.pool.has_candidate(self.model_name, tried):
+                    raise
+                self.pool._stats["retries"] += 1
+                logger.warning(f"[模型池] 节点 {endpoint.host} 调用失败，换节点重试: {type(e).__name__}: {str(e)}")
+                continue
+            except BaseException:
+                # 调用方取消等情况下同样归还名额
+                self.pool.release(endpoint, None, None)
+                raise
+            if hasattr(result, "__aiter__"):
+                return _PooledStream(self, endpoint, result, started, args, kwargs, tried)
+            self.pool.release(endpoint, time.monotonic() - started, True)
+            return result
+
+
+class _PooledStream:
+    """转发节点的流式分块，首个分块之前失败时换节点重试
+
+    读完、出错、aclose() 或被回收时归还节点名额，调用方拿到流后没有迭代（如请求中途中止）也不会占用名额。
+    """
+
+    def __init__(self, model: PooledChatModel, endpoint: ModelEndpoint, source: Any, started: float,
+                 args: tuple, kwargs: Dict[str, Any], tried: Set[str]):
+        self._model = model
+        self._endpoint: Optional[ModelEndpoint] = endpoint
+        self._source = source
+        self._started = started
+        self._args = args
+        self._kwargs = kwargs
+        self._tried = tried
+        self._first_chunk_latency: Optional[float] = None
+        # 重试得到非流式结果时作为唯一的分块返回
+        self._tail: List[Any] = []
+
+    def __aiter__(self) -> "_PooledStream":
+        return self
+
+    async def __anext__(self) -> Any:
+        while True:
+            if self._source is None:
+                if self._tail:
+                    return self._tail.pop()
+                raise StopAsyncIteration
+            try:
+                chunk = await self._source.__anext__()
+            except StopAsyncIteration:
+                self._source = None
+                self._release(True)
+                raise
+            except Exception as e:
+                self._source = None
+                host = self._endpoint.host if self._endpoint is not None else None
+                self._release(False)
+                if host is not None:
+                    self._tried.add(host)
+                if self._first_chunk_latency is not None or not self._model.pool.has_candidate(self._model.model_name, self._tried):
+                    raise
+                self._model.pool._stats["retries"] += 1
+                logger.warning(f"[模型池] 流式调用失败，换节点重试: {type(e).__name__}: {str(e)}")
+                self._adopt(await self._model._call(self._args, self._kwargs, self._tried))
+                continue
+            except BaseException:
+                self._release(None)
+                raise
+            if self._first_chunk_latency is None:
+                self._first_chunk_latency = time.monotonic() - self._started
+            return chunk
+
+    def _adopt(self, retry: Any) -> None:
+        """接管重试得到的结果，流式结果由本对象继续转发并负责归还其节点"""
+        if isinstance(retry, _PooledStream):
+            self._endpoint, retry._endpoint = retry._endpoint, None
+            self._source, retry._source = retry._source, None
+            self._started = retry._started
+        else:
+            self._tail = [retry]
+
+    def _release(self, outcome: Optional[bool]) -> None:
+        endpoint, self._endpoint = self._endpoint, None
+        if endpoint is not None:
+            latency = self._first_chunk_latency if outcome else None
+            self._model.pool.release(endpoint, latency, outcome)
+
+    async def aclose(self) -> None:
+        source, self._source = self._source, None
+        self._release(None)
+        if source is not None and hasattr(source, "aclose"):
+            await source.aclose()
+
+    def __del__(self) -> None:
+        self._release(None)
+
+
+def _parse_agent_models(value: str) -> Dict[str, str]:
+    """解析 "OrchestratorAgent=qwen2:1.5b,QAAgent=qwen2:7b" 格式的配置"""
+    models = {}
+    for item in value.split(","):
+        agent, sep, model = item.partition("=")
+        if sep and agent.strip() and model.strip():
+            models[agent.strip()] = model.strip()
+    return models
+
+
+def _create_model_pool() -> ModelPool:
+    hosts = [host.strip() for host in os.getenv("MUSEUM_OLLAMA_HOSTS", "").split(",") if host.strip()]
+    return ModelPool(
+        hosts=hosts or [os.getenv("OLLAMA_HOST", DEFAULT_OLLAMA_HOST)],
+        agent_models=_parse_agent_models(os.getenv("MUSEUM_AGENT_MODELS", "")),
+        default_model=os.getenv("MUSEUM_CHAT_MODEL", DEFAULT_CHAT_MODEL),
+        max_failures=int(os.getenv("MUSEUM_MODEL_MAX_FAILURES", "3")),
+        eject_seconds=float(os.getenv("MUSEUM_MODEL_EJECT_SECONDS", "30")),
+        slow_threshold=float(os.getenv("MUSEUM_MODEL_SLOW_SECONDS", "30")),
+        health_interval=float(os.getenv("MUSEUM_MODEL_HEALTH_INTERVAL", "15"))
+    )
+
+
+_model_pool = _create_model_pool()
+
+
+def get_model_pool() -> ModelPool:
+    """获取全局模型池"""
+    return _model_pool
@@ -0,0 +1,89 @@
+import base64
+import json
+import os
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+
+# 单页最多返回的记录数
+MAX_PAGE_SIZE = int(os.getenv("MUSEUM_MAX_PAGE_SIZE", "200"))
+
+
+def _sort_key(record: Dict[str, Any], key: Sequence[str]) -> Tuple[str, ...]:
+    # 排序键统一转为字符串，保证不同类型的值之间可比较
+    try:
+        return tuple(str(record[field]) for field in key)
+    except KeyError as e:
+        # 排序字段写错或数据结构变化时直接报错，而不是把所有记录当作同一个键、悄悄返回错误的分页
+        raise ValueError(f"分页排序字段 {e.args[0]} 在记录中不存在: {sorted(record)}") from None
+
+
+def encode_cursor(position: Tuple[str, ...]) -> str:
+    """把上一页最后一条记录的排序键编码为不透明的游标"""
+    raw = json.dumps(list(position), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, ...]:
+    """解析游标，格式错误时返回400"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        position = json.loads(raw.decode("utf-8"))
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="无效的分页游标")
+    if not isinstance(position, list) or not all(isinstance(value, str) for value in position):
+        raise HTTPException(status_code=400, detail="无效的分页游标")
+    return tuple(position)
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """解析以逗号分隔的字段列表，未指定时返回None（返回全部字段）"""
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    return names or None
+
+
+def project(record: Dict[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+    """只保留指定的顶层字段，记录中不存在的字段忽略"""
+    if fields is None:
+        return record
+    return {name: record[name] for name in fields if name in record}
+
+
+def paginate(
+    records: List[Dict[str, Any]],
+    key: Sequence[str],
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None
+) -> Dict[str, Any]:
+    """按排序键对筛选结果分页并投影字段
+
+    - 记录按 key 中的字段排序（最后一个字段应能唯一确定记录），分页结果稳定，
+      不受数据文件中记录顺序的影响；记录缺少排序字段时抛出 ValueError
+    - cursor 为上一页返回的 next_cursor，从该位置之后继续读取（键集分页，翻页期间新增的记录不会导致重复或遗漏）
+    - 未指定 limit 时返回游标之后的全部记录，兼容原先一次返回完整列表的调用方
+    - fields 为以逗号分隔的字段名，只返回这些字段
+
+    Returns:
+        {"data": 本页记录, "pagination": {"total", "limit", "next_cursor"}}，total 为筛选后的记录总数
+    """
+    if limit is not None and not 1 <= limit <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit 取值范围为 1-{MAX_PAGE_SIZE}")
+
+    ordered = sorted(records, key=lambda record: _sort_key(record, key))
+    start = 0
+    if cursor:
+        start = bisect_right(ordered, decode_cursor(cursor), key=lambda record: _sort_key(record, key))
+
+    end = len(ordered) if limit is None else min(len(ordered), start + limit)
+    page = ordered[start:end]
+    next_cursor = encode_cursor(_sort_key(page[-1], key)) if page and end < len(ordered) else None
+
+    names = parse_fields(fields)
+    return {
+        "data": [project(record, names) for record in page],
+        "pagination": {"total": len(ordered), "limit": limit, "next_cursor": next_cursor}
+    }
@@ -0,0 +1,303 @@
+import os
+import re
+import glob
+import time
+import threading
+import unicodedata
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from utils.data_store import PROJECT_ROOT, get_data_store
+
+logger = logging.getLogger(__name__)
+
+# 公众服务数据文件，任一文件变化时缓存的回答都可能过期
+PUBLIC_DATA_FILES = tuple(
+    os.path.relpath(path, PROJECT_ROOT)
+    for path in sorted(glob.glob(os.path.join(PROJECT_ROOT, "public_services", "*.json")))
+)
+
+# 不影响语义的客套词
+_FILLER_WORDS = ("请问", "你好", "您好", "麻烦", "一下", "想问", "我想知道")
+_PUNCTUATION_PATTERN = re.compile(r"[\s\W_]+", re.UNICODE)
+# 指代上文的追问，答案依赖对话上下文，不能跨会话复用
+_CONTEXT_DEPENDENT_PATTERN = re.compile(r"^(那|那么|还有|它|他|她|这个|那个|这些|那些|刚才|上面)")
+
+
+def normalize_question(text: str) -> str:
+    """问题文本规范化：全半角统一、小写、去掉标点空白和客套词"""
+    normalized = unicodedata.normalize("NFKC", text).lower()
+    for word in _FILLER_WORDS:
+        normalized = normalized.replace(word, "")
+    return _PUNCTUATION_PATTERN.sub("", normalized)
+
+
+def is_cacheable_question(text: str) -> bool:
+    """问题是否可以独立回答（不依赖上文），只有这类问题的回答才能跨会话复用"""
+    normalized = normalize_question(text)
+    return len(normalized) >= 2 and not _CONTEXT_DEPENDENT_PATTERN.match(normalized)
+
+
+class _CacheEntry:
+    __slots__ = ("question", "answer", "expires_at", "cost", "hits", "vector")
+
+    def __init__(self, question: str, answer: Any, expires_at: float, cost: float, vector: Any = None):
+        self.question = question
+        self.answer = answer
+        self.expires_at = expires_at
+        self.cost = cost
+        self.hits = 0
+        self.vector = vector
+
+
+class ResponseCache:
+    """问答回答缓存
+
+    - 精确匹配：原始问题文本完全相同
+    - 规范化匹配：全半角、大小写、标点和客套词不同的同一问题
+    - 语义匹配（可选）：问题向量与已缓存问题的余弦相似度超过阈值
+    - 每条缓存有TTL，总条数有上限，超出时按LRU淘汰
+    - 依赖的数据文件（DataStore版本号）变化时整体失效
+    - 统计各类命中次数、命中率以及节省的生成耗时
+    """
+
+    def __init__(self, name: str, ttl: float = 3600.0, max_entries: int = 512,
+                 data_files: Sequence[str] = PUBLIC_DATA_FILES, embedder: Any = None,
+                 similarity_threshold: float = 0.92):
+        """
+        Args:
+            name: 缓存名称，用于日志和统计
+            ttl: 每条缓存的有效期（秒）
+            max_entries: 最多缓存的问题数
+            data_files: 回答所依赖的数据文件，任一文件重新加载后缓存失效
+            embedder: 向量化函数（文本列表 -> 向量矩阵），为None时不启用语义匹配
+            similarity_threshold: 语义匹配的最低余弦相似度
+        """
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.data_files = tuple(data_files)
+        self.embedder = embedder
+        self.similarity_threshold = similarity_threshold
+
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._data_version: Optional[Tuple[int, ...]] = None
+        # 语义匹配：已缓存问题的向量矩阵，条目变化后按需重建
+        self._vector_keys: List[str] = []
+        self._vector_matrix: Any = None
+        self._vectors_dirty = False
+        # 最近未命中的问题向量，写入缓存时复用，避免重复向量化
+        self._pending_vectors: "OrderedDict[str, Any]" = OrderedDict()
+        self._stats = {
+            "exact_hits": 0, "normalized_hits": 0, "semantic_hits": 0, "misses": 0,
+            "stores": 0, "evictions": 0, "expirations": 0, "invalidations": 0,
+            "latency_saved_ms": 0.0, "lookup_ms_total": 0.0, "lookups": 0
+        }
+
+    def _check_data_version(self) -> None:
+        """数据文件版本变化时清空缓存，调用方需持有锁"""
+        store = get_data_store()
+        version = tuple(store.version(path) for path in self.data_files)
+        if version != self._data_version:
+            if self._data_version is not None and self._entries:
+                logger.info(f"[回答缓存:{self.name}] 数据文件已更新，清空 {len(self._entries)} 条缓存")
+                self._stats["invalidations"] += 1
+            self._entries.clear()
+            self._pending_vectors.clear()
+            self._vectors_dirty = True
+            self._data_version = version
+
+    def _lookup(self, question: str) -> Tuple[Optional[_CacheEntry], str]:
+        """精确/规范化匹配，返回 (缓存条目, 命中类型)，调用方需持有锁"""
+        self._check_data_version()
+        key = normalize_question(question)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, ""
+        if entry.expires_at <= time.monotonic():
+            del self._entries[key]
+            self._vectors_dirty = True
+            self._stats["expirations"] += 1
+            return None, ""
+        self._entries.move_to_end(key)
+        return entry, "exact" if entry.question == question else "normalized"
+
+    def _record_hit(self, entry: _CacheEntry, kind: str) -> None:
+        entry.hits += 1
+        self._stats[f"{kind}_hits"] += 1
+        self._stats["latency_saved_ms"] += entry.cost * 1000
+
+    def _record_lookup(self, started: float) -> None:
+        self._stats["lookups"] += 1
+        self._stats["lookup_ms_total"] += (time.perf_counter() - started) * 1000
+
+    def get(self, question: str) -> Optional[Any]:
+        """精确或规范化匹配缓存的回答，未命中返回None"""
+        started = time.perf_counter()
+        with self._lock:
+            entry, kind = self._lookup(question)
+            if entry is None:
+                self._stats["misses"] += 1
+                self._record_lookup(started)
+                return None
+            self._record_hit(entry, kind)
+            self._record_lookup(started)
+            return entry.answer
+
+    async def aget(self, question: str) -> Optional[Any]:
+        """先精确/规范化匹配，未命中且启用了语义匹配时再按向量相似度查找"""
+        started = time.perf_counter()
+        with self._lock:
+            entry, kind = self._lookup(question)
+            if entry is not None:
+                self._record_hit(entry, kind)
+                self._record_lookup(started)
+                return entry.answer
+            has_entries = bool(self._entries)
+
+        if self.embedder is not None and has_entries:
+            entry = await self._semantic_lookup(question)
+            if entry is not None:
+                with self._lock:
+                    self._record_hit(entry, "semantic")
+                    self._record_lookup(started)
+                return entry.answer
+
+        with self._lock:
+            self._stats["misses"] += 1
+            self._record_lookup(started)
+        return None
+
+    async def _embed(self, question: str) -> Any:
+        from utils.semantic_router import normalize_rows
+
+        key = normalize_question(question)
+        with self._lock:
+            vector = self._pending_vectors.get(key)
+        if vector is None:
+            # 向量化期间不持有锁
+            vector = normalize_rows(await self.embedder([question]))[0]
+            with self._lock:
+                self._pending_vectors[key] = vector
+                if len(self._pending_vectors) > 64:
+                    self._pending_vectors.popitem(last=False)
+        return vector
+
+    async def _semantic_lookup(self, question: str) -> Optional[_CacheEntry]:
+        import numpy as np
+
+        try:
+            vector = await self._embed(question)
+        except Exception as e:
+            logger.warning(f"[回答缓存:{self.name}] 问题向量化失败，跳过语义匹配: {str(e)}")
+            return None
+
+        with self._lock:
+            if self._vectors_dirty:
+                self._vector_keys = [key for key, entry in self._entries.items() if entry.vector is not None]
+                self._vector_matrix = np.vstack([self._entries[key].vector for key in self._vector_keys]) if self._vector_keys else None
+                self._vectors_dirty = False
+            if self._vector_matrix is None:
+                return None
+
+            similarities = self._vector_matrix @ vector
+            best = int(np.argmax(similarities))
+            if float(similarities[best]) < self.similarity_threshold:
+                return None
+            key = self._vector_keys[best]
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at <= time.monotonic():
+                return None
+            self._entries.move_to_end(key)
+            logger.info(f"[回答缓存:{self.name}] 语义命中: '{question[:30]}' ≈ '{entry.question[:30]}' ({float(similarities[best]):.3f})")
+            return entry
+
+    def put(self, question: str, answer: Any, cost: float = 0.0, vector: Any = None) -> None:
+        """写入回答
+
+        Args:
+            question: 原始问题
+            answer: 回答内容
+            cost: 生成该回答的耗时（秒），命中时计入节省的耗时
+            vector: 问题向量（语义匹配用）
+        """
+        key = normalize_question(question)
+        if not key:
+            return
+        with self._lock:
+            self._check_data_version()
+            if vector is None:
+                vector = self._pending_vectors.pop(key, None)
+            self._entries[key] = _CacheEntry(question, answer, time.monotonic() + self.ttl, cost, vector)
+            self._entries.move_to_end(key)
+            self._stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+            self._vectors_dirty = True
+
+    async def aput(self, question: str, answer: Any, cost: float = 0.0) -> None:
+        """写入回答，启用语义匹配时同时保存问题向量"""
+        vector = None
+        if self.embedder is not None:
+            try:
+                vector = await self._embed(question)
+            except Exception as e:
+                logger.warning(f"[回答缓存:{self.name}] 问题向量化失败，仅按文本缓存: {str(e)}")
+        self.put(question, answer, cost, vector)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._pending_vectors.clear()
+            self._vectors_dirty = True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """命中率、各类命中次数、节省的生成耗时等统计"""
+        with self._lock:
+            hits = self._stats["exact_hits"] + self._stats["normalized_hits"] + self._stats["semantic_hits"]
+            total = hits + self._stats["misses"]
+            lookups = self._stats["lookups"]
+            return {
+                **{key: value for key, value in self._stats.items() if key not in ("lookup_ms_total", "lookups")},
+                "latency_saved_ms": round(self._stats["latency_saved_ms"], 2),
+                "hit_rate": round(hits / total, 4) if total else 0.0,
+                "avg_lookup_ms": round(self._stats["lookup_ms_total"] / lookups, 3) if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "semantic": self.embedder is not None
+            }
+
+
+_caches: Dict[str, ResponseCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_response_cache(name: str) -> ResponseCache:
+    """获取指定名称的全局回答缓存，配置来自环境变量"""
+    with _caches_lock:
+        cache = _caches.get(name)
+        if cache is None:
+            embedder = None
+            if os.getenv("MUSEUM_QA_CACHE_SEMANTIC", "false").lower() in ("1", "true", "yes"):
+                from utils.semantic_router import ollama_embedder
+                embedder = ollama_embedder()
+            cache = ResponseCache(
+                name,
+                ttl=float(os.getenv("MUSEUM_QA_CACHE_TTL", "3600")),
+                max_entries=int(os.getenv("MUSEUM_QA_CACHE_SIZE", "512")),
+                embedder=embedder,
+                similarity_threshold=float(os.getenv("MUSEUM_QA_CACHE_SIMILARITY", "0.92"))
+            )
+            _caches[name] = cache
+        return cache
+
+
+def get_response_cache_stats() -> Dict[str, Any]:
+    """所有回答缓存的统计"""
+    with _caches_lock:
+        caches = list(_caches.items())
+    return {name: cache.get_stats() for name, cache in caches}
@@ -0,0 +1,125 @@
+import asyncio
+import json
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncGenerator, Dict, Iterator, Optional
+
+from agentscope.message import Msg
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseStream:
+    """一次请求的流式输出通道
+
+    智能体在生成回复的过程中把增量文本写入通道，流式接口从通道中读取并推送给浏览器。
+    每个流式请求一个通道，通过上下文变量绑定，共享的智能体实例之间互不干扰。
+    """
+
+    def __init__(self):
+        self.queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+        self.token_count = 0
+        self._prefixes: Dict[str, str] = {}
+
+    def emit(self, event: str, data: Dict[str, Any]) -> None:
+        self.queue.put_nowait({"event": event, "data": data})
+
+    def emit_text(self, text: str, message_id: str = "") -> None:
+        """写入累计文本，只推送比上次多出的部分"""
+        prefix = self._prefixes.get(message_id, "")
+        if text.startswith(prefix):
+            delta = text[len(prefix):]
+        else:
+            # 文本被重写（如模型重新生成），整体重新推送
+            delta = text
+        self._prefixes[message_id] = text
+        if delta:
+            self.token_count += 1
+            self.emit("token", {"delta": delta})
+
+
+_current_stream: ContextVar[Optional[ResponseStream]] = ContextVar("museum_response_stream", default=None)
+
+
+def current_stream() -> Optional[ResponseStream]:
+    """当前请求的流式输出通道，非流式请求时为None"""
+    return _current_stream.get()
+
+
+@contextmanager
+def stream_scope(stream: ResponseStream) -> Iterator[ResponseStream]:
+    """在该作用域内（包括其中创建的异步任务）智能体的增量输出都写入此通道"""
+    token = _current_stream.set(stream)
+    try:
+        yield stream
+    finally:
+        _current_stream.reset(token)
+
+
+def _msg_text(msg: Msg) -> str:
+    return "".join(
+        block.get("text", "")
+        for block in msg.get_content_blocks()
+        if block.get("type") == "text"
+    )
+
+
+def _stream_print_hook(agent: Any, kwargs: Dict[str, Any]) -> None:
+    """智能体print钩子：把流式模型输出的文本增量转发到当前请求的通道"""
+    stream = current_stream()
+    msg = kwargs.get("msg")
+    if stream is None or msg is None or msg.role != "assistant":
+        return None
+    stream.emit_text(_msg_text(msg), msg.id)
+    return None
+
+
+def attach_stream_hook(agent: Any) -> None:
+    """为智能体注册流式输出钩子，ReAct流程中模型生成的文本会实时推送"""
+    agent.register_instance_hook("pre_print", "response_stream", _stream_print_hook)
+
+
+async def collect_model_text(response: Any, emit: bool = True) -> str:
+    """读取模型返回结果中的文本
+
+    stream=True 的模型返回异步生成器，每个分块包含截至当前的累计内容，
+    边读取边把增量推送到当前请求的通道；非流式结果直接提取文本。
+    emit=False 时不推送（如槽位抽取等不面向用户的中间输出）。
+    """
+    stream = current_stream() if emit else None
+    if hasattr(response, "__aiter__"):
+        text = ""
+        async for chunk in response:
+            text = _blocks_text(chunk.content)
+            if stream is not None:
+                stream.emit_text(text, chunk.id)
+        return text
+    return _blocks_text(getattr(response, "content", None))
+
+
+def _blocks_text(content: Any) -> str:
+    if isinstance(content, str):
+        return content
+    if not content:
+        return ""
+    return "".join(block.get("text", "") for block in content if block.get("type") == "text")
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """编码为Server-Sent Events格式"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def drain(stream: ResponseStream, task: "asyncio.Task[Any]") -> AsyncGenerator[Dict[str, Any], None]:
+    """在任务运行期间持续产出通道中的事件，任务结束后产出剩余事件"""
+    while True:
+        getter = asyncio.ensure_future(stream.queue.get())
+        done, _ = await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+        if getter in done:
+            yield getter.result()
+            continue
+        getter.cancel()
+        break
+    while not stream.queue.empty():
+        yield stream.queue.get_nowait()
@@ -0,0 +1,242 @@
+import os
+import time
+import json
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from utils.data_store import PROJECT_ROOT
+
+logger = logging.getLogger(__name__)
+
+# 文本列表 -> 向量矩阵（每行一个文本）
+Embedder = Callable[[List[str]], Awaitable[np.ndarray]]
+
+DEFAULT_INDEX_PATH = os.path.join(PROJECT_ROOT, ".cache", "intent_centroids.npz")
+
+
+def ollama_embedder(model_name: Optional[str] = None, host: Optional[str] = None) -> Embedder:
+    """使用本地Ollama服务中的向量模型"""
+    from agentscope.embedding import OllamaTextEmbedding
+
+    model = OllamaTextEmbedding(
+        model_name=model_name or os.getenv("MUSEUM_EMBEDDING_MODEL", "bge-m3"),
+        host=host or os.getenv("MUSEUM_EMBEDDING_HOST")
+    )
+
+    async def embed(texts: List[str]) -> np.ndarray:
+        response = await model(texts)
+        return np.asarray(response.embeddings, dtype=np.float32)
+
+    embed.model_name = model.model_name
+    return embed
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+class SemanticRouter:
+    """基于向量相似度的意图路由
+
+    - 每个意图的示例短语离线向量化，取归一化均值作为该意图的质心，所有质心组成一个紧凑的float32矩阵
+    - 请求时只需对消息做一次向量化，再与质心矩阵做一次矩阵乘法得到所有意图的余弦相似度
+    - 最高分低于阈值、或与第二名差距过小时视为不确定，由调用方退回关键词路由
+    - 消息向量按规范化文本做LRU缓存，重复的问法不再调用向量模型
+    - 质心矩阵保存在磁盘上，示例短语或模型未变化时启动直接加载
+    - 消息向量化有超时限制，向量模型响应过慢时本次退回关键词路由，并在冷却期内不再调用
+    """
+
+    def __init__(self, examples: Mapping[str, Sequence[str]], embedder: Optional[Embedder] = None,
+                 threshold: Optional[float] = None, margin: Optional[float] = None,
+                 cache_size: int = 2048, index_path: Optional[str] = None,
+                 retry_interval: float = 60.0, embed_timeout: Optional[float] = None):
+        """
+        Args:
+            examples: 意图 -> 示例短语列表
+            embedder: 向量化函数，默认使用本地Ollama向量模型
+            threshold: 接受路由结果的最低余弦相似度
+            margin: 最高分与第二名之间的最小差距
+            cache_size: 消息向量缓存条数
+            index_path: 质心矩阵的保存路径
+            retry_interval: 向量模型不可用后，再次尝试的间隔（秒）
+            embed_timeout: 请求路径上单条消息向量化的最长等待时间（秒），0表示不限制
+        """
+        self.examples = examples
+        self.embedder = embedder
+        self.threshold = threshold if threshold is not None else float(os.getenv("MUSEUM_SEMANTIC_THRESHOLD", "0.55"))
+        self.margin = margin if margin is not None else float(os.getenv("MUSEUM_SEMANTIC_MARGIN", "0.03"))
+        self.cache_size = cache_size
+        self.index_path = index_path or os.getenv("MUSEUM_INTENT_INDEX_PATH", DEFAULT_INDEX_PATH)
+        self.retry_interval = retry_interval
+        self.embed_timeout = embed_timeout if embed_timeout is not None else float(os.getenv("MUSEUM_SEMANTIC_TIMEOUT", "0.5"))
+
+        self.intents: List[str] = []
+        self.centroids: Optional[np.ndarray] = None
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._build_lock: Optional[asyncio.Lock] = None
+        self._warmup_task: Optional["asyncio.Task[bool]"] = None
+        self._unavailable_until = 0.0
+        self._stats = {"routed": 0, "uncertain": 0, "unavailable": 0, "timeouts": 0, "cache_hits": 0, "cache_misses": 0, "embed_ms_total": 0.0}
+
+    @property
+    def ready(self) -> bool:
+        return self.centroids is not None
+
+    def _get_embedder(self) -> Embedder:
+        if self.embedder is None:
+            self.embedder = ollama_embedder()
+        return self.embedder
+
+    def _fingerprint(self) -> str:
+        """示例短语和向量模型的指纹，任一变化都需要重建质心"""
+        payload = json.dumps(
+            {"model": getattr(self._get_embedder(), "model_name", ""), "examples": {k: list(v) for k, v in self.examples.items()}},
+            ensure_ascii=False, sort_keys=True
+        )
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def _load_index(self, fingerprint: str) -> bool:
+        if not os.path.exists(self.index_path):
+            return False
+        try:
+            with np.load(self.index_path, allow_pickle=False) as index:
+                if str(index["fingerprint"]) != fingerprint:
+                    logger.info("意图质心索引已过期（示例短语或向量模型有变化），需要重建")
+                    return False
+                self.intents = [str(intent) for intent in index["intents"]]
+                self.centroids = index["centroids"].astype(np.float32)
+            logger.info(f"已加载意图质心索引: {self.index_path}, {len(self.intents)} 个意图")
+            return True
+        except Exception as e:
+            logger.warning(f"加载意图质心索引失败: {str(e)}")
+            return False
+
+    def _save_index(self, fingerprint: str) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            np.savez(self.index_path, fingerprint=np.array(fingerprint), intents=np.array(self.intents), centroids=self.centroids)
+        except OSError as e:
+            logger.warning(f"保存意图质心索引失败: {str(e)}")
+
+    async def build(self) -> None:
+        """对所有示例短语向量化并计算每个意图的质心"""
+        intents = [intent for intent, phrases in self.examples.items() if phrases]
+        phrases = [phrase for intent in intents for phrase in self.examples[intent]]
+        vectors = normalize_rows(await self._get_embedder()(phrases))
+
+        centroids = []
+        start = 0
+        for intent in intents:
+            count = len(self.examples[intent])
+            centroids.append(vectors[start:start + count].mean(axis=0))
+            start += count
+
+        self.intents = intents
+        self.centroids = normalize_rows(np.vstack(centroids)).astype(np.float32)
+        logger.info(f"意图质心索引构建完成: {len(intents)} 个意图, {len(phrases)} 条示例短语, 维度 {self.centroids.shape[1]}")
+
+    async def load_or_build(self) -> bool:
+        """加载磁盘上的质心索引，不存在或已过期时重建，向量模型不可用时返回False"""
+        if self._build_lock is None:
+            self._build_lock = asyncio.Lock()
+        async with self._build_lock:
+            if self.ready:
+                return True
+            try:
+                fingerprint = self._fingerprint()
+                if not self._load_index(fingerprint):
+                    await self.build()
+                    self._save_index(fingerprint)
+                return True
+            except Exception as e:
+                self._unavailable_until = time.monotonic() + self.retry_interval
+                logger.warning(f"语义路由不可用，暂时使用关键词路由: {type(e).__name__}: {str(e)}")
+                return False
+
+    def warmup(self) -> Optional["asyncio.Task[bool]"]:
+        """在后台加载或构建质心索引；已就绪、正在构建或处于不可用冷却期时不重复启动"""
+        if self.ready or time.monotonic() < self._unavailable_until:
+            return None
+        if self._warmup_task is None or self._warmup_task.done():
+            self._warmup_task = asyncio.get_running_loop().create_task(self.load_or_build())
+        return self._warmup_task
+
+    @staticmethod
+    def _cache_key(message: str) -> str:
+        return " ".join(message.lower().split())
+
+    async def embed_message(self, message: str) -> np.ndarray:
+        """向量化单条消息（归一化），结果按规范化文本缓存"""
+        key = self._cache_key(message)
+        vector = self._cache.get(key)
+        if vector is not None:
+            self._cache.move_to_end(key)
+            self._stats["cache_hits"] += 1
+            return vector
+
+        self._stats["cache_misses"] += 1
+        started = time.perf_counter()
+        vector = normalize_rows(await self._get_embedder()([message]))[0].astype(np.float32)
+        self._stats["embed_ms_total"] += (time.perf_counter() - started) * 1000
+
+        self._cache[key] = vector
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return vector
+
+    async def route(self, message: str) -> Optional[Tuple[str, float]]:
+        """返回 (意图, 相似度)；不确定或向量模型不可用时返回None"""
+        if not message or not message.strip():
+            return None
+        if not self.ready:
+            # 请求路径上不等待索引构建，后台构建完成前使用关键词路由
+            self._stats["unavailable"] += 1
+            self.warmup()
+            return None
+        if time.monotonic() < self._unavailable_until:
+            self._stats["unavailable"] += 1
+            return None
+
+        try:
+            vector = await asyncio.wait_for(self.embed_message(message), self.embed_timeout or None)
+        except asyncio.TimeoutError:
+            # 质心索引仍然有效，只是向量模型暂时过慢，冷却期过后直接恢复
+            self._unavailable_until = time.monotonic() + self.retry_interval
+            self._stats["timeouts"] += 1
+            logger.warning(f"消息向量化超过 {self.embed_timeout} 秒，暂时使用关键词路由")
+            return None
+        except Exception as e:
+            self._unavailable_until = time.monotonic() + self.retry_interval
+            self.centroids = None
+            self._stats["unavailable"] += 1
+            logger.warning(f"消息向量化失败，暂时使用关键词路由: {type(e).__name__}: {str(e)}")
+            return None
+
+        similarities = self.centroids @ vector
+        order = np.argsort(similarities)[::-1]
+        best = float(similarities[order[0]])
+        second = float(similarities[order[1]]) if len(order) > 1 else -1.0
+        if best < self.threshold or best - second < self.margin:
+            self._stats["uncertain"] += 1
+            return None
+
+        self._stats["routed"] += 1
+        return self.intents[order[0]], best
+
+    def get_stats(self) -> Dict[str, Any]:
+        misses = self._stats["cache_misses"]
+        return {
+            **{key: value for key, value in self._stats.items() if key != "embed_ms_total"},
+            "ready": self.ready,
+            "intents": len(self.intents),
+            "cache_size": len(self._cache),
+            "avg_embed_ms": round(self._stats["embed_ms_total"] / misses, 2) if misses else 0.0,
+            "threshold": self.threshold,
+            "margin": self.margin
+        }
@@ -0,0 +1,476 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import logging
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows 没有 fcntl，只支持单进程写入
+    fcntl = None
+
+from utils.data_store import PROJECT_ROOT, get_data_store
+from utils.data_loader import COLLECTION_MANAGEMENT_FILE
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_DIR = os.path.join(PROJECT_ROOT, ".cache", "sensor_store")
+# 每个数据块的行数：按小时采集时一个数据块约为一年的读数
+DEFAULT_CHUNK_ROWS = 8760
+
+_SENSOR_ID = re.compile(r"^[A-Za-z0-9_-]+$")
+_INTERVAL = re.compile(r"^(\d+)\s*([smhd]?)$")
+_PERCENTILE = re.compile(r"^p(\d{1,2}(?:\.\d+)?|100)$")
+_INTERVAL_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400}
+# 时间戳的有效范围：1970-01-01 至 9999-12-31（UTC），超出范围的时间无法存入int64列或格式化
+MIN_TIMESTAMP = 0
+MAX_TIMESTAMP = 253402300799
+
+
+def parse_timestamp(value: Any) -> int:
+    """把时间解析为UTC秒级时间戳，支持ISO 8601字符串（可带Z）、YYYY-MM-DD日期和数字时间戳
+
+    Raises:
+        ValueError: 格式无效或超出 MIN_TIMESTAMP-MAX_TIMESTAMP 范围
+    """
+    if isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, bool):
+        if not MIN_TIMESTAMP <= value <= MAX_TIMESTAMP:
+            raise ValueError(f"时间戳超出范围: {value!r}")
+        return int(value)
+    if not isinstance(value, str) or not value:
+        raise ValueError(f"无效的时间: {value!r}")
+    moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    timestamp = int(moment.timestamp())
+    if not MIN_TIMESTAMP <= timestamp <= MAX_TIMESTAMP:
+        raise ValueError(f"时间超出范围: {value!r}")
+    return timestamp
+
+
+def format_timestamp(timestamp: int) -> str:
+    return datetime.fromtimestamp(int(timestamp), tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def parse_interval(value: str) -> int:
+    """解析降采样间隔，如 900、15m、1h、1d，返回秒数"""
+    matched = _INTERVAL.match(str(value).strip().lower())
+    if not matched or int(matched.group(1)) <= 0:
+        raise ValueError(f"无效的时间间隔: {value!r}，示例：15m、1h、1d")
+    return int(matched.group(1)) * _INTERVAL_UNITS[matched.group(2)]
+
+
+def parse_aggregates(value: str) -> List[str]:
+    """解析聚合指标列表，支持 min、max、mean 和百分位数 p50、p95 等"""
+    names = [name.strip().lower() for name in value.split(",") if name.strip()]
+    for name in names:
+        if name not in ("min", "max", "mean") and not _PERCENTILE.match(name):
+            raise ValueError(f"不支持的聚合指标: {name}，可选 min、max、mean、p50、p95 等")
+    return names
+
+
+class _Series:
+    """单个传感器的时间序列元数据和已打开的数据块"""
+
+    def __init__(self, directory: str, meta: Dict[str, Any], signature: Optional[Tuple[int, int, int]] = None):
+        self.directory = directory
+        self.meta = meta
+        # 已加载的元数据文件标识 (inode, mtime, 大小)，与磁盘上的不一致时说明其他进程写入过
+        self.signature = signature
+        # 数据块序号 -> (时间戳数组, 读数数组)，均为内存映射
+        self.arrays: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+
+    @property
+    def meta_path(self) -> str:
+        return os.path.join(self.directory, "meta.json")
+
+    @property
+    def chunks(self) -> List[Dict[str, Any]]:
+        return self.meta["chunks"]
+
+    @property
+    def count(self) -> int:
+        return sum(chunk["count"] for chunk in self.chunks)
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        return self.chunks[-1]["last"] if self.chunks else None
+
+    def info(self) -> Dict[str, Any]:
+        return {key: self.meta[key] for key in ("sensor_id", "location_id", "location_name", "type", "unit")}
+
+
+class SensorStore:
+    """环境传感器读数的列式时间序列存储
+
+    - 每个传感器一个目录，时间戳（int64，UTC秒）和读数（float64）分别按列存放在固定行数的 .npy 数据块中，
+      通过内存映射读取，查询时只映射与时间范围重叠的数据块，不把历史数据全部读入内存
+    - 只追加：每个传感器的读数必须按时间递增写入，早于或等于最后一条读数的时间会被拒绝；
+      先写入数据块再原子替换元数据文件中的行数，读取方只看到已完整写入的读数
+    - 多个工作进程可共享同一目录：写入时持有目录级的文件锁（fcntl）并先重新加载元数据，
+      读取时按元数据文件的修改时间加载其他进程登记的传感器和写入的读数（Windows 上没有文件锁，只支持单进程写入）
+    - 查询按时间范围在数据块内二分定位；降采样按时间桶向量化计算 min/max/mean 和百分位数
+    - 传感器的位置、类型和单位从 collection_management.json 的 environment_monitoring 登记，数据文件更新后补充登记；
+      数据文件中的实时读数不写入存储，历史读数通过 ingest 按时间顺序导入（可先回填多年的历史数据）
+    """
+
+    def __init__(self, root_dir: Optional[str] = None, chunk_rows: int = DEFAULT_CHUNK_ROWS):
+        self.root_dir = root_dir or os.getenv("MUSEUM_SENSOR_STORE_DIR", DEFAULT_STORE_DIR)
+        self.chunk_rows = chunk_rows
+        self._lock = threading.RLock()
+        self._series: Dict[str, _Series] = {}
+        self._root_signature: Optional[int] = None
+        self._seeded_version: Optional[int] = None
+        self._stats = {"ingested": 0, "rejected": 0, "queries": 0, "aggregations": 0, "chunks_created": 0, "meta_reloads": 0}
+
+        os.makedirs(self.root_dir, exist_ok=True)
+        self._lock_path = os.path.join(self.root_dir, ".lock")
+        with self._lock:
+            self._sync()
+        logger.info(f"[传感器存储] 已打开: {self.root_dir}, 传感器 {len(self._series)} 个")
+
+    # ---- 多进程同步 ----
+
+    @staticmethod
+    def _meta_signature(path: str) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _reload_meta(self, series: _Series) -> None:
+        """元数据文件被其他进程替换时重新加载，调用方需持有锁
+
+        其他进程追加到已映射数据块中的读数通过共享映射直接可见，新建的数据块在读取时再映射。
+        """
+        signature = self._meta_signature(series.meta_path)
+        if signature is None or signature == series.signature:
+            return
+        with open(series.meta_path, "r", encoding="utf-8") as f:
+            series.meta = json.load(f)
+        series.signature = signature
+        self._stats["meta_reloads"] += 1
+
+    def _sync(self) -> None:
+        """加载其他进程登记的传感器并刷新所有传感器的元数据，调用方需持有锁"""
+        root_signature = os.stat(self.root_dir).st_mtime_ns
+        if root_signature != self._root_signature:
+            # 新传感器的目录创建后根目录的修改时间变化，只在此时重新扫描
+            for sensor_id in sorted(os.listdir(self.root_dir)):
+                if sensor_id not in self._series and os.path.isfile(os.path.join(self.root_dir, sensor_id, "meta.json")):
+                    self._series[sensor_id] = _Series(os.path.join(self.root_dir, sensor_id), {})
+            self._root_signature = root_signature
+        for series in self._series.values():
+            self._reload_meta(series)
+
+    @contextmanager
+    def _write_lock(self) -> Iterator[None]:
+        """跨进程写锁：共享同一目录的工作进程依次写入，持有期间先调用 _sync 取得最新的元数据，调用方需持有线程锁"""
+        if fcntl is None:
+            yield
+            return
+        with open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._sync()
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # ---- 写入 ----
+
+    def _save_meta(self, series: _Series) -> None:
+        path = series.meta_path
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(series.meta, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+        # 本进程刚写入的元数据不需要重新加载
+        series.signature = self._meta_signature(path)
+
+    def register(self, sensor_id: str, location_id: str, location_name: str, sensor_type: str, unit: str) -> None:
+        """登记传感器（已存在时更新位置、类型和单位）"""
+        if not _SENSOR_ID.match(sensor_id):
+            raise ValueError(f"无效的传感器编号: {sensor_id!r}")
+        info = {"sensor_id": sensor_id, "location_id": location_id, "location_name": location_name,
+                "type": sensor_type, "unit": unit}
+        with self._lock:
+            series = self._series.get(sensor_id)
+            if series is not None and series.info() == info:
+                return
+            with self._write_lock():
+                series = self._series.get(sensor_id)
+                if series is None:
+                    directory = os.path.join(self.root_dir, sensor_id)
+                    os.makedirs(directory, exist_ok=True)
+                    series = _Series(directory, {**info, "chunks": []})
+                    self._series[sensor_id] = series
+                elif series.info() == info:
+                    return
+                else:
+                    series.meta.update(info)
+                self._save_meta(series)
+
+    def _chunk_arrays(self, series: _Series, index: int, create: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        arrays = series.arrays.get(index)
+        if arrays is None:
+            paths = [os.path.join(series.directory, f"chunk_{index:06d}.{column}.npy") for column in ("ts", "value")]
+            if create:
+                arrays = (
+                    np.lib.format.open_memmap(paths[0], mode="w+", dtype=np.int64, shape=(self.chunk_rows,)),
+                    np.lib.format.open_memmap(paths[1], mode="w+", dtype=np.float64, shape=(self.chunk_rows,))
+                )
+                self._stats["chunks_created"] += 1
+            else:
+                # 写满的数据块不会再写入，只读映射
+                mode = "r" if series.chunks[index]["count"] >= self.chunk_rows else "r+"
+                arrays = (np.load(paths[0], mmap_mode=mode), np.load(paths[1], mmap_mode=mode))
+            series.arrays[index] = arrays
+        return arrays
+
+    def _append(self, series: _Series, timestamps: np.ndarray, values: np.ndarray) -> int:
+        """追加已按时间排序的读数，跳过不晚于最后一条读数的时间，返回写入的行数，调用方需持有锁和写锁"""
+        last = series.last_timestamp
+        if last is not None:
+            keep = timestamps > last
+            timestamps, values = timestamps[keep], values[keep]
+        if timestamps.size == 0:
+            return 0
+
+        written = 0
+        while written < timestamps.size:
+            chunks = series.chunks
+            if not chunks or chunks[-1]["count"] >= self.chunk_rows:
+                chunks.append({"index": len(chunks), "count": 0, "first": None, "last": None})
+                ts_array, value_array = self._chunk_arrays(series, chunks[-1]["index"], create=True)
+            else:
+                ts_array, value_array = self._chunk_arrays(series, chunks[-1]["index"])
+            chunk = chunks[-1]
+            size = min(self.chunk_rows - chunk["count"], timestamps.size - written)
+            start = chunk["count"]
+            ts_array[start:start + size] = timestamps[written:written + size]
+            value_array[start:start + size] = values[written:written + size]
+            ts_array.flush()
+            value_array.flush()
+            if chunk["first"] is None:
+                chunk["first"] = int(timestamps[written])
+            chunk["count"] += size
+            chunk["last"] = int(timestamps[written + size - 1])
+            written += size
+        # 数据块写完后再更新元数据中的行数
+        self._save_meta(series)
+        return written
+
+    def ingest(self, readings: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+        """批量写入读数
+
+        Args:
+            readings: 每项包含 sensor_id、timestamp（ISO时间或秒级时间戳）、value
+
+        Returns:
+            {"accepted": 写入条数, "rejected": 拒绝条数, "errors": 前20条拒绝原因}
+        """
+        errors: List[Dict[str, Any]] = []
+        sensor_ids: List[str] = []
+        timestamps: List[int] = []
+        values: List[float] = []
+        with self._lock:
+            self._seed()
+            self._sync()
+            for index, reading in enumerate(readings):
+                try:
+                    sensor_id = reading["sensor_id"]
+                    if sensor_id not in self._series:
+                        raise ValueError(f"未登记的传感器: {sensor_id}")
+                    timestamp = parse_timestamp(reading["timestamp"])
+                    value = float(reading["value"])
+                    if not np.isfinite(value):
+                        raise ValueError("读数必须是有限数值")
+                except (KeyError, TypeError, ValueError, OverflowError) as e:
+                    errors.append({"index": index, "message": str(e) if not isinstance(e, KeyError) else f"缺少字段: {e}"})
+                    continue
+                sensor_ids.append(sensor_id)
+                timestamps.append(timestamp)
+                values.append(value)
+
+            accepted = 0
+            if sensor_ids:
+                names, inverse = np.unique(np.array(sensor_ids), return_inverse=True)
+                ts_column = np.array(timestamps, dtype=np.int64)
+                value_column = np.array(values, dtype=np.float64)
+                # 按 (传感器, 时间) 排序后每个传感器的读数是连续的一段
+                order = np.lexsort((ts_column, inverse))
+                inverse, ts_column, value_column = inverse[order], ts_column[order], value_column[order]
+                bounds = np.flatnonzero(np.diff(inverse)) + 1
+                groups = zip(np.r_[0, bounds], np.split(ts_column, bounds), np.split(value_column, bounds))
+                with self._write_lock():
+                    for first, ts_part, value_part in groups:
+                        # 同一批次中重复的时间只保留第一条
+                        unique = np.r_[True, np.diff(ts_part) > 0]
+                        accepted += self._append(self._series[str(names[inverse[first]])], ts_part[unique], value_part[unique])
+
+            rejected = len(readings) - accepted
+            self._stats["ingested"] += accepted
+            self._stats["rejected"] += rejected
+        if rejected > len(errors):
+            errors.append({"message": f"{rejected - len(errors)} 条读数的时间不晚于该传感器已有的最新读数或在批次中重复，已忽略"})
+        return {"accepted": accepted, "rejected": rejected, "errors": errors[:20]}
+
+    def _seed(self) -> None:
+        """登记数据文件中的传感器，调用方需持有锁"""
+        store = get_data_store()
+        version = store.version(COLLECTION_MANAGEMENT_FILE)
+        if version == self._seeded_version:
+            return
+        locations = store.get(COLLECTION_MANAGEMENT_FILE).get("environment_monitoring", {}).get("locations", [])
+        for location in locations:
+            for sensor in location.get("sensors", []):
+                try:
+                    self.register(sensor["sensor_id"], location.get("location_id", ""), location.get("name", ""),
+                                  sensor.get("type", ""), sensor.get("unit", ""))
+                except (KeyError, ValueError) as e:
+                    logger.warning(f"[传感器存储] 跳过无效的传感器数据: {sensor}, 错误: {str(e)}")
+        self._seeded_version = version
+
+    # ---- 查询 ----
+
+    def _get_series(self, sensor_id: str) -> _Series:
+        """获取传感器并刷新其元数据，本进程尚未加载的传感器先扫描目录，调用方需持有锁"""
+        if sensor_id not in self._series:
+            self._sync()
+        series = self._series[sensor_id]
+        self._reload_meta(series)
+        return series
+
+    def sensors(self, location: Optional[str] = None, sensor_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """列出传感器，location 匹配位置编号或位置名称中的文字，sensor_type 匹配类型（如 温度、湿度）"""
+        with self._lock:
+            self._seed()
+            self._sync()
+            matched = []
+            for series in self._series.values():
+                info = series.info()
+                if location and location != info["location_id"] and location not in info["location_name"]:
+                    continue
+                if sensor_type and sensor_type != info["type"]:
+                    continue
+                matched.append(info)
+            return matched
+
+    def latest(self, sensor_id: str) -> Optional[Tuple[int, float]]:
+        """传感器最新的一条读数 (时间戳, 读数)"""
+        with self._lock:
+            self._seed()
+            series = self._get_series(sensor_id)
+            if not series.chunks:
+                return None
+            chunk = series.chunks[-1]
+            ts_array, value_array = self._chunk_arrays(series, chunk["index"])
+            return int(ts_array[chunk["count"] - 1]), float(value_array[chunk["count"] - 1])
+
+    def query(self, sensor_id: str, start: Optional[int] = None, end: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """读取时间范围 [start, end) 内的读数，返回按时间排序的 (时间戳数组, 读数数组)"""
+        with self._lock:
+            self._seed()
+            self._stats["queries"] += 1
+            series = self._get_series(sensor_id)
+            ts_parts, value_parts = [], []
+            for chunk in series.chunks:
+                # 按数据块的时间范围跳过不重叠的数据块
+                if chunk["count"] == 0 or (start is not None and chunk["last"] < start) or (end is not None and chunk["first"] >= end):
+                    continue
+                ts_array, value_array = self._chunk_arrays(series, chunk["index"])
+                ts_array, value_array = ts_array[:chunk["count"]], value_array[:chunk["count"]]
+                lo = 0 if start is None else int(np.searchsorted(ts_array, start, side="left"))
+                hi = chunk["count"] if end is None else int(np.searchsorted(ts_array, end, side="left"))
+                ts_parts.append(np.array(ts_array[lo:hi]))
+                value_parts.append(np.array(value_array[lo:hi]))
+        if not ts_parts:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        return np.concatenate(ts_parts), np.concatenate(value_parts)
+
+    def aggregate(self, sensor_id: str, interval: int, aggregates: Iterable[str] = ("min", "max", "mean"),
+                  start: Optional[int] = None, end: Optional[int] = None) -> Dict[str, List[Any]]:
+        """按固定时间间隔降采样
+
+        时间桶从 start 开始对齐（未指定时按 interval 整倍数对齐），只返回有读数的时间桶。
+
+        Returns:
+            列式结果：{"bucket_start": [...], "count": [...], "min": [...], "p95": [...], ...}
+        """
+        names = list(aggregates)
+        timestamps, values = self.query(sensor_id, start, end)
+        with self._lock:
+            self._stats["aggregations"] += 1
+        if timestamps.size == 0:
+            return {"bucket_start": [], "count": [], **{name: [] for name in names}}
+
+        origin = start if start is not None else int(timestamps[0]) // interval * interval
+        buckets = (timestamps - origin) // interval
+        # 读数按时间排序，同一时间桶的读数是连续的一段
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        counts = np.diff(np.r_[starts, timestamps.size])
+        result: Dict[str, Any] = {
+            "bucket_start": [format_timestamp(ts) for ts in origin + buckets[starts] * interval],
+            "count": counts.tolist()
+        }
+        ordered = None
+        for name in names:
+            if name == "min":
+                column = np.minimum.reduceat(values, starts)
+            elif name == "max":
+                column = np.maximum.reduceat(values, starts)
+            elif name == "mean":
+                column = np.add.reduceat(values, starts) / counts
+            else:
+                if ordered is None:
+                    # 桶内按读数排序，百分位数按线性插值在每个桶内取位置
+                    ordered = values[np.lexsort((values, buckets))]
+                position = starts + float(name[1:]) / 100 * (counts - 1)
+                lower = np.floor(position).astype(np.int64)
+                upper = np.minimum(lower + 1, starts + counts - 1)
+                column = ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+            result[name] = np.round(column, 4).tolist()
+        return result
+
+    def revision(self) -> str:
+        """所有传感器读数的版本：任一传感器写入新读数后变化，用于生成ETag"""
+        with self._lock:
+            self._seed()
+            self._sync()
+            digest = hashlib.blake2b(digest_size=12)
+            for sensor_id, series in sorted(self._series.items()):
+                digest.update(f"{sensor_id}|{series.count}|{series.last_timestamp}\n".encode("utf-8"))
+            return digest.hexdigest()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._sync()
+            return {
+                **self._stats,
+                "sensors": len(self._series),
+                "readings": sum(series.count for series in self._series.values()),
+                "chunks": sum(len(series.chunks) for series in self._series.values()),
+                "chunk_rows": self.chunk_rows,
+                "root_dir": self.root_dir
+            }
+
+
+_store: Optional[SensorStore] = None
+_store_lock = threading.Lock()
+
+
+def get_sensor_store() -> SensorStore:
+    """获取全局传感器时间序列存储"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SensorStore(chunk_rows=int(os.getenv("MUSEUM_SENSOR_CHUNK_ROWS", str(DEFAULT_CHUNK_ROWS))))
+        return _store
@@ -0,0 +1,333 @@
+import asyncio
+import inspect
+import json
+import os
+import logging
+import typing
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceCallError(Exception):
+    """服务调用失败（网络错误、非2xx状态码、参数错误等）"""
+
+    def __init__(self, message: str, status_code: int = 500):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class ServiceTransport:
+    """服务调用传输层基类
+
+    MuseumToolkit 通过传输层调用博物馆服务API，返回解析后的JSON结果，失败时抛出 ServiceCallError。
+    """
+
+    name = "base"
+
+    async def arequest(self, endpoint: str, method: str = "GET", data: Optional[Dict[str, Any]] = None) -> Any:
+        raise NotImplementedError
+
+    def request(self, endpoint: str, method: str = "GET", data: Optional[Dict[str, Any]] = None) -> Any:
+        raise NotImplementedError
+
+    async def aclose(self) -> None:
+        pass
+
+
+class HttpTransport(ServiceTransport):
+    """通过HTTP调用服务，适用于智能体与API服务分开部署的场景
+
+    使用共享的长连接连接池：异步客户端绑定创建时的事件循环，同步客户端供非异步调用方使用。
+    """
+
+    name = "http"
+
+    def __init__(self, base_url: Optional[str] = None, timeout: Optional[float] = None,
+                 connect_timeout: Optional[float] = None, max_connections: Optional[int] = None,
+                 max_keepalive_connections: Optional[int] = None, keepalive_expiry: Optional[float] = None,
+                 cache: Optional[Any] = None):
+        """
+        Args:
+            cache: GET请求的条件请求缓存（utils.http_cache.ConditionalCache），
+                   设置后再次请求同一URL时携带 If-None-Match，服务端返回304时使用缓存的数据
+        """
+        self.cache = cache
+        self.base_url = base_url or os.getenv("MUSEUM_SERVICE_BASE_URL", "http://localhost:8000")
+        self.timeout = timeout or float(os.getenv("MUSEUM_HTTP_TIMEOUT", "10.0"))
+        self.connect_timeout = connect_timeout or float(os.getenv("MUSEUM_HTTP_CONNECT_TIMEOUT", "3.0"))
+        self.max_connections = max_connections or int(os.getenv("MUSEUM_HTTP_MAX_CONNECTIONS", "100"))
+        self.max_keepalive_connections = max_keepalive_connections or int(os.getenv("MUSEUM_HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+        self.keepalive_expiry = keepalive_expiry or float(os.getenv("MUSEUM_HTTP_KEEPALIVE_EXPIRY", "30.0"))
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._async_client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sync_client: Optional[httpx.Client] = None
+
+    def configure(self, **options: Any) -> None:
+        """调整超时和连接池配置，已创建的客户端会在下次调用时按新配置重建"""
+        for key, value in options.items():
+            if value is not None:
+                setattr(self, key, value)
+        if self._sync_client is not None:
+            self._sync_client.close()
+            self._sync_client = None
+        # 异步客户端只能在其所属的事件循环中关闭，这里仅丢弃引用
+        self._async_client = None
+        self._async_client_loop = None
+
+    def _client_options(self) -> Dict[str, Any]:
+        return {
+            "timeout": httpx.Timeout(self.timeout, connect=self.connect_timeout),
+            "limits": httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry
+            )
+        }
+
+    def get_async_client(self) -> httpx.AsyncClient:
+        """获取当前事件循环共享的异步连接池客户端"""
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client.is_closed or self._async_client_loop is not loop:
+            self._async_client = httpx.AsyncClient(**self._client_options())
+            self._async_client_loop = loop
+            logger.info(f"创建共享异步HTTP客户端: 最大连接数={self.max_connections}, 超时={self.timeout}s")
+        return self._async_client
+
+    def get_sync_client(self) -> httpx.Client:
+        """获取共享的同步连接池客户端"""
+        if self._sync_client is None or self._sync_client.is_closed:
+            self._sync_client = httpx.Client(**self._client_options())
+        return self._sync_client
+
+    def _build_request(self, endpoint: str, method: str, data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        if method == "GET":
+            return {"method": "GET", "url": f"{self.base_url}{endpoint}", "params": data}
+        elif method == "POST":
+            return {"method": "POST", "url": f"{self.base_url}{endpoint}", "json": data}
+        else:
+            raise ValueError(f"不支持的请求方法: {method}")
+
+    def _cache_key(self, request: Dict[str, Any]) -> Optional[str]:
+        """条件请求缓存的键：完整URL加排序后的查询参数，只缓存GET请求"""
+        if self.cache is None or request["method"] != "GET":
+            return None
+        params = sorted((str(k), str(v)) for k, v in (request["params"] or {}).items() if v is not None)
+        return f"{request['url']}?{params}"
+
+    def _conditional(self, request: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[str]]:
+        key = self._cache_key(request)
+        etag = self.cache.etag(key) if key is not None else None
+        if etag is not None:
+            request = {**request, "headers": {"If-None-Match": etag}}
+        return request, key
+
+    def _handle_response(self, response: httpx.Response, key: Optional[str]) -> Tuple[bool, Any]:
+        """返回 (是否有结果, 结果)；304但缓存已被淘汰时返回 (False, None)，调用方需不带条件重新请求"""
+        if key is not None and response.status_code == 304:
+            cached = self.cache.revalidated(key)
+            return cached is not None, cached
+        result = self._parse_response(response)
+        if key is not None:
+            self.cache.store(key, response.headers.get("etag"), result)
+        return True, result
+
+    @staticmethod
+    def _parse_response(response: httpx.Response) -> Any:
+        try:
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPStatusError as e:
+            raise ServiceCallError(str(e), response.status_code) from e
+        except json.JSONDecodeError as e:
+            raise ServiceCallError(f"无法解析响应内容: {str(e)}", response.status_code) from e
+
+    async def arequest(self, endpoint: str, method: str = "GET", data: Optional[Dict[str, Any]] = None) -> Any:
+        request, key = self._conditional(self._build_request(endpoint, method, data))
+        try:
+            response = await self.get_async_client().request(**request)
+            found, result = self._handle_response(response, key)
+            if not found:
+                response = await self.get_async_client().request(**self._build_request(endpoint, method, data))
+                found, result = self._handle_response(response, key)
+        except httpx.HTTPError as e:
+            raise ServiceCallError(str(e), 503) from e
+        return result
+
+    def request(self, endpoint: str, method: str = "GET", data: Optional[Dict[str, Any]] = None) -> Any:
+        request, key = self._conditional(self._build_request(endpoint, method, data))
+        try:
+            response = self.get_sync_client().request(**request)
+            found, result = self._handle_response(response, key)
+            if not found:
+                response = self.get_sync_client().request(**self._build_request(endpoint, method, data))
+                found, result = self._handle_response(response, key)
+        except httpx.HTTPError as e:
+            raise ServiceCallError(str(e), 503) from e
+        return result
+
+    async def aclose(self) -> None:
+        """关闭共享的HTTP客户端，通常在应用关闭时调用"""
+        if self._async_client is not None and self._async_client_loop is asyncio.get_running_loop():
+            await self._async_client.aclose()
+        self._async_client = None
+        self._async_client_loop = None
+        if self._sync_client is not None:
+            self._sync_client.close()
+            self._sync_client = None
+
+
+class _BoundRoute:
+    """可在进程内直接调用的路由：根据函数签名从路径、查询参数和请求体绑定参数"""
+
+    def __init__(self, route: Any):
+        from pydantic import BaseModel, TypeAdapter
+        from pydantic.fields import FieldInfo
+        from pydantic_core import PydanticUndefined
+
+        self.route = route
+        self.endpoint = route.endpoint
+        self.is_async = asyncio.iscoroutinefunction(route.endpoint)
+        self.params: List[Tuple[str, Any, Any, bool]] = []
+
+        hints = typing.get_type_hints(route.endpoint)
+        for name, parameter in inspect.signature(route.endpoint).parameters.items():
+            annotation = hints.get(name, Any)
+            default = parameter.default
+            if isinstance(default, FieldInfo):
+                default = default.default
+            if default is PydanticUndefined:
+                default = inspect.Parameter.empty
+            is_body = isinstance(annotation, type) and issubclass(annotation, BaseModel)
+            adapter = annotation if is_body else TypeAdapter(annotation)
+            self.params.append((name, adapter, default, is_body))
+
+    def match(self, path: str, method: str) -> Optional[Dict[str, Any]]:
+        if method not in self.route.methods:
+            return None
+        matched = self.route.path_regex.match(path)
+        if matched is None:
+            return None
+        convertors = self.route.param_convertors
+        return {
+            key: convertors[key].convert(value) if key in convertors else value
+            for key, value in matched.groupdict().items()
+        }
+
+    def bind(self, path_params: Dict[str, Any], query: Dict[str, Any], body: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        from pydantic import ValidationError
+
+        kwargs: Dict[str, Any] = {}
+        try:
+            for name, adapter, default, is_body in self.params:
+                if is_body:
+                    kwargs[name] = adapter.model_validate(body or {})
+                elif name in path_params:
+                    kwargs[name] = adapter.validate_python(path_params[name])
+                elif name in query:
+                    kwargs[name] = adapter.validate_python(query[name])
+                elif default is not inspect.Parameter.empty:
+                    kwargs[name] = default
+                else:
+                    raise ServiceCallError(f"缺少必填参数: {name}", 422)
+        except ValidationError as e:
+            raise ServiceCallError(f"参数校验失败: {str(e)}", 422) from e
+        return kwargs
+
+
+class InProcessTransport(ServiceTransport):
+    """进程内直接调用路由函数，适用于智能体与API服务运行在同一进程的场景
+
+    省去了本机回环HTTP调用的序列化和套接字开销，也避免了工作线程耗尽时的自我等待死锁。
+    未注册在给定路由器中的端点（如根路径 "/"）会交给 fallback 传输层处理。
+    """
+
+    name = "inprocess"
+
+    def __init__(self, routers: Iterable[Any], fallback: Optional[ServiceTransport] = None):
+        from fastapi.routing import APIRoute
+
+        self.fallback = fallback
+        self._routes: List[_BoundRoute] = [
+            _BoundRoute(route)
+            for router in routers
+            for route in router.routes
+            if isinstance(route, APIRoute)
+        ]
+        logger.info(f"进程内服务调用已启用: 共 {len(self._routes)} 个路由")
+
+    def _resolve(self, endpoint: str, method: str, data: Optional[Dict[str, Any]]) -> Optional[Tuple[_BoundRoute, Dict[str, Any]]]:
+        if method not in ("GET", "POST"):
+            raise ValueError(f"不支持的请求方法: {method}")
+
+        parts = urlsplit(endpoint)
+        query: Dict[str, Any] = dict(parse_qsl(parts.query, keep_blank_values=True))
+        if method == "GET" and data:
+            query.update({k: v for k, v in data.items() if v is not None})
+        body = data if method == "POST" else None
+
+        for bound in self._routes:
+            path_params = bound.match(parts.path, method)
+            if path_params is not None:
+                return bound, bound.bind(path_params, query, body)
+        return None
+
+    @staticmethod
+    def _unwrap(result: Any) -> Any:
+        """路由函数可能直接返回Response对象（如预编码的JSON），这里还原为数据"""
+        from starlette.responses import Response
+
+        if isinstance(result, Response):
+            if result.status_code >= 400:
+                raise ServiceCallError(f"服务返回错误状态码: {result.status_code}", result.status_code)
+            return json.loads(result.body) if result.body else None
+        return result
+
+    @staticmethod
+    def _call_error(e: Exception) -> ServiceCallError:
+        return ServiceCallError(str(getattr(e, "detail", e)), getattr(e, "status_code", 500))
+
+    async def arequest(self, endpoint: str, method: str = "GET", data: Optional[Dict[str, Any]] = None) -> Any:
+        from fastapi import HTTPException
+        from starlette.concurrency import run_in_threadpool
+
+        resolved = self._resolve(endpoint, method, data)
+        if resolved is None:
+            if self.fallback is None:
+                raise ServiceCallError(f"未找到服务端点: {endpoint}", 404)
+            return await self.fallback.arequest(endpoint, method, data)
+
+        bound, kwargs = resolved
+        try:
+            if bound.is_async:
+                result = await bound.endpoint(**kwargs)
+            else:
+                # 与FastAPI一致，同步路由函数放到线程池执行（如预约写入SQLite时可能等待写锁），避免阻塞事件循环
+                result = await run_in_threadpool(bound.endpoint, **kwargs)
+        except HTTPException as e:
+            raise self._call_error(e) from e
+        return self._unwrap(result)
+
+    def request(self, endpoint: str, method: str = "GET", data: Optional[Dict[str, Any]] = None) -> Any:
+        from fastapi import HTTPException
+
+        resolved = self._resolve(endpoint, method, data)
+        if resolved is None or resolved[0].is_async:
+            # 同步调用方无法在当前线程等待异步路由，交给 fallback 处理
+            if self.fallback is None:
+                raise ServiceCallError(f"未找到可同步调用的服务端点: {endpoint}", 404)
+            return self.fallback.request(endpoint, method, data)
+
+        bound, kwargs = resolved
+        try:
+            result = bound.endpoint(**kwargs)
+        except HTTPException as e:
+            raise self._call_error(e) from e
+        return self._unwrap(result)
+
+    async def aclose(self) -> None:
+        if self.fallback is not None:
+            await self.fallback.aclose()
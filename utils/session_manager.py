@@ -0,0 +1,319 @@
+import os
+import time
+import threading
+import logging
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple, Union, Iterable
+
+from agentscope.memory import MemoryBase, InMemoryMemory
+from agentscope.message import Msg
+
+from utils.context_budget import ContextBudget, SummaryState
+
+logger = logging.getLogger(__name__)
+
+
+class BoundedMemory(InMemoryMemory):
+    """只保留最近 max_messages 条消息的对话记忆"""
+
+    def __init__(self, max_messages: int = 40):
+        super().__init__()
+        self.max_messages = max_messages
+
+    async def add(self, memories: Union[List[Msg], Msg, None], allow_duplicates: bool = False) -> None:
+        await super().add(memories, allow_duplicates=allow_duplicates)
+        if self.max_messages and len(self.content) > self.max_messages:
+            self.content = self.content[-self.max_messages:]
+
+
+# (session_id, owner, max_messages) -> 记忆实例
+MemoryFactory = Callable[[str, str, int], MemoryBase]
+
+
+def in_memory_factory(session_id: str, owner: str, max_messages: int) -> MemoryBase:
+    return BoundedMemory(max_messages)
+
+
+class Session:
+    """单个用户会话，持有该会话在各智能体中的对话记忆"""
+
+    def __init__(self, session_id: str, max_messages: int, memory_factory: MemoryFactory = in_memory_factory):
+        self.session_id = session_id
+        self.max_messages = max_messages
+        self.memory_factory = memory_factory
+        self.created_at = time.time()
+        self.last_access = time.monotonic()
+        self._memories: Dict[str, MemoryBase] = {}
+        self._summaries: Dict[str, SummaryState] = {}
+        self._states: Dict[str, Dict[str, Any]] = {}
+
+    def memory(self, owner: str) -> MemoryBase:
+        """获取某个智能体在本会话中的记忆，不同智能体的上下文互不干扰"""
+        memory = self._memories.get(owner)
+        if memory is None:
+            memory = self.memory_factory(self.session_id, owner, self.max_messages)
+            self._memories[owner] = memory
+        return memory
+
+    def summary(self, owner: str) -> SummaryState:
+        """某个智能体在本会话中较早对话的滚动摘要"""
+        state = self._summaries.get(owner)
+        if state is None:
+            state = SummaryState()
+            self._summaries[owner] = state
+        return state
+
+    def state(self, owner: str) -> Dict[str, Any]:
+        """某个智能体在本会话中的临时状态（如多轮对话中尚未填完的预约信息），只保存在进程内"""
+        state = self._states.get(owner)
+        if state is None:
+            state = {}
+            self._states[owner] = state
+        return state
+
+    def flush(self) -> None:
+        """把持久化记忆中缓冲的消息写入存储，内存记忆无需处理"""
+        for owner, memory in list(self._memories.items()):
+            flush = getattr(memory, "flush", None)
+            if flush is None:
+                continue
+            try:
+                flush()
+            except Exception as e:
+                logger.error(f"[会话管理] 写入会话记忆失败 {self.session_id}/{owner}: {str(e)}")
+
+    async def aflush(self) -> None:
+        """异步写入缓冲的消息，数据库写入在工作线程中执行，不阻塞事件循环"""
+        for owner, memory in list(self._memories.items()):
+            aflush = getattr(memory, "aflush", None)
+            if aflush is None:
+                continue
+            try:
+                await aflush()
+            except Exception as e:
+                logger.error(f"[会话管理] 写入会话记忆失败 {self.session_id}/{owner}: {str(e)}")
+
+    def message_count(self) -> int:
+        return sum(len(memory.content) for memory in self._memories.values())
+
+
+class SessionManager:
+    """按 user_id 管理会话记忆
+
+    - LRU：最多保留 max_sessions 个活跃会话，超出时淘汰最久未访问的会话
+    - TTL：空闲超过 idle_ttl 秒的会话在下次访问管理器时被清理
+    - 每个会话中每个智能体最多保留 max_messages 条消息
+    - memory_factory 决定记忆的存储后端；使用持久化后端时，被淘汰的只是进程内的缓存，
+      会话作用域结束时缓冲的消息批量写入存储，之后再次访问会从存储中懒加载
+    - 被淘汰会话的写入在释放管理器的锁之后进行，不会阻塞其他会话的获取
+    """
+
+    def __init__(self, max_sessions: int = 1000, idle_ttl: float = 1800.0, max_messages: int = 40,
+                 memory_factory: MemoryFactory = in_memory_factory, backend: str = "memory"):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_messages = max_messages
+        self.memory_factory = memory_factory
+        self.backend = backend
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"created": 0, "evicted_lru": 0, "evicted_idle": 0}
+
+    def _evict_idle(self, now: float, evicted: List[Session]) -> None:
+        # OrderedDict按访问顺序排列，最久未访问的在最前面
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_access < self.idle_ttl:
+                break
+            del self._sessions[session_id]
+            evicted.append(session)
+            self._stats["evicted_idle"] += 1
+            logger.info(f"[会话管理] 会话空闲超时已清理: {session_id}")
+
+    def _checkout(self, session_id: str) -> Tuple[Session, List[Session]]:
+        """在锁内获取或创建会话，返回 (会话, 被淘汰的会话列表)，被淘汰的会话由调用方在锁外写入"""
+        now = time.monotonic()
+        evicted: List[Session] = []
+        with self._lock:
+            self._evict_idle(now, evicted)
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = Session(session_id, self.max_messages, self.memory_factory)
+                self._sessions[session_id] = session
+                self._stats["created"] += 1
+                while len(self._sessions) > self.max_sessions:
+                    evicted_id, evicted_session = self._sessions.popitem(last=False)
+                    evicted.append(evicted_session)
+                    self._stats["evicted_lru"] += 1
+                    logger.info(f"[会话管理] 活跃会话数超过上限，淘汰会话: {evicted_id}")
+            else:
+                self._sessions.move_to_end(session_id)
+            session.last_access = now
+        return session, evicted
+
+    def get(self, session_id: str) -> Session:
+        """获取会话，不存在时创建"""
+        session, evicted = self._checkout(session_id)
+        for evicted_session in evicted:
+            evicted_session.flush()
+        return session
+
+    def remove(self, session_id: str) -> None:
+        """主动结束会话"""
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is not None:
+            session.flush()
+
+    def flush_all(self) -> None:
+        """把所有会话中缓冲的消息写入存储（服务关闭时调用）"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+        for session in sessions:
+            session.flush()
+
+    @asynccontextmanager
+    async def session_scope(self, session_id: str) -> AsyncIterator[Session]:
+        """在该作用域内（包括其中创建的异步任务），SessionScopedMemory 都指向此会话的记忆"""
+        session, evicted = self._checkout(session_id)
+        for evicted_session in evicted:
+            await evicted_session.aflush()
+        token = _current_session.set(session)
+        try:
+            yield session
+        finally:
+            _current_session.reset(token)
+            # 一轮对话中产生的消息在一个事务中写入
+            await session.aflush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {
+                **self._stats,
+                "active_sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "idle_ttl": self.idle_ttl,
+                "max_messages": self.max_messages,
+                "backend": self.backend
+            }
+        store = getattr(self.memory_factory, "store", None)
+        if store is not None:
+            stats["store"] = store.get_stats()
+        return stats
+
+
+_current_session: ContextVar[Optional[Session]] = ContextVar("museum_current_session", default=None)
+
+
+class SessionScopedMemory(MemoryBase):
+    """按当前会话路由的记忆
+
+    智能体实例（以及其中的模型、工具集）在所有用户间共享，
+    记忆的读写则根据当前上下文中的会话转发给该会话自己的记忆（BoundedMemory 或持久化记忆）。
+    没有会话上下文时（如脚本中直接调用智能体）使用一份默认的有界记忆。
+    get_memory 始终返回完整的对话记忆；设置了 budget 时，组装提示词时由 fit_prompt 按token预算裁剪，
+    较早的对话以摘要代替。
+    """
+
+    def __init__(self, owner: str, max_messages: int = 40):
+        super().__init__()
+        self.owner = owner
+        self.budget: Optional[ContextBudget] = None
+        self._default = BoundedMemory(max_messages)
+        self._default_summary = SummaryState()
+        self._default_state: Dict[str, Any] = {}
+
+    @property
+    def current(self) -> MemoryBase:
+        session = _current_session.get()
+        return session.memory(self.owner) if session is not None else self._default
+
+    @property
+    def state(self) -> Dict[str, Any]:
+        """当前会话中该智能体的临时状态，随会话一起被LRU/TTL淘汰"""
+        session = _current_session.get()
+        return session.state(self.owner) if session is not None else self._default_state
+
+    async def add(self, memories: Union[List[Msg], Msg, None], allow_duplicates: bool = False) -> None:
+        await self.current.add(memories, allow_duplicates=allow_duplicates)
+
+    async def delete(self, index: Union[Iterable, int]) -> None:
+        await self.current.delete(index)
+
+    async def retrieve(self, *args: Any, **kwargs: Any) -> None:
+        await self.current.retrieve(*args, **kwargs)
+
+    async def size(self) -> int:
+        return await self.current.size()
+
+    async def clear(self) -> None:
+        await self.current.clear()
+
+    async def get_memory(self) -> List[Msg]:
+        return await self.current.get_memory()
+
+    def fit_prompt(self, messages: List[Msg]) -> List[Msg]:
+        """按token预算裁剪即将发送给模型的对话消息，未设置预算时原样返回"""
+        if self.budget is None:
+            return messages
+        session = _current_session.get()
+        if session is None:
+            return self.budget.fit(messages, self._default_summary)
+        return self.budget.fit(messages, session.summary(self.owner), session.session_id)
+
+    def state_dict(self) -> dict:
+        return self.current.state_dict()
+
+    def load_state_dict(self, state_dict: dict, strict: bool = True) -> None:
+        self.current.load_state_dict(state_dict, strict=strict)
+
+
+def sqlite_memory_factory(db_path: Optional[str] = None) -> MemoryFactory:
+    """使用本地SQLite文件持久化对话记忆，同一台机器上的多个工作进程共享会话"""
+    from utils.sqlite_memory import SQLiteMemoryStore, SQLiteMemory
+
+    store = SQLiteMemoryStore(
+        db_path,
+        keep_messages=int(os.getenv("MUSEUM_MEMORY_KEEP_MESSAGES", "200")),
+        retention=float(os.getenv("MUSEUM_MEMORY_RETENTION", str(7 * 24 * 3600))),
+        compact_interval=float(os.getenv("MUSEUM_MEMORY_COMPACT_INTERVAL", "600"))
+    )
+    batch_size = int(os.getenv("MUSEUM_MEMORY_BATCH_SIZE", "16"))
+
+    def factory(session_id: str, owner: str, max_messages: int) -> MemoryBase:
+        return SQLiteMemory(store, session_id, owner, max_messages=max_messages, batch_size=batch_size)
+
+    factory.store = store
+    return factory
+
+
+def _create_session_manager() -> SessionManager:
+    backend = os.getenv("MUSEUM_MEMORY_BACKEND", "memory").lower()
+    memory_factory = in_memory_factory
+    if backend == "sqlite":
+        memory_factory = sqlite_memory_factory()
+    elif backend != "memory":
+        logger.warning(f"[会话管理] 未知的记忆后端 {backend}，使用内存记忆")
+        backend = "memory"
+    return SessionManager(
+        max_sessions=int(os.getenv("MUSEUM_MAX_SESSIONS", "1000")),
+        idle_ttl=float(os.getenv("MUSEUM_SESSION_IDLE_TTL", "1800")),
+        max_messages=int(os.getenv("MUSEUM_SESSION_MAX_MESSAGES", "40")),
+        memory_factory=memory_factory,
+        backend=backend
+    )
+
+
+_session_manager = _create_session_manager()
+
+
+def get_session_manager() -> SessionManager:
+    """获取全局会话管理器"""
+    return _session_manager
+
+
+def session_memory(owner: str) -> SessionScopedMemory:
+    """为智能体创建按会话隔离的记忆"""
+    return SessionScopedMemory(owner, _session_manager.max_messages)
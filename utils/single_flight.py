@@ -0,0 +1,277 @@
+import copy
+import json
+import asyncio
+import threading
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def make_key(*parts: Any) -> str:
+    """把调用参数编码为合并键，字典按键排序，字符串中连续的空白合并为一个空格"""
+
+    def normalize(value: Any) -> Any:
+        if isinstance(value, str):
+            return " ".join(value.split())
+        if isinstance(value, dict):
+            return {str(key): normalize(item) for key, item in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [normalize(item) for item in value]
+        return value
+
+    return json.dumps([normalize(part) for part in parts], ensure_ascii=False, sort_keys=True, default=str)
+
+
+class _SharedStream:
+    """一次流式调用的分块广播：领头调用方的后台任务读取上游，所有订阅者按顺序读取已收到的分块"""
+
+    def __init__(self):
+        self.chunks: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        # 所有订阅者都已离开、后台任务被本广播取消
+        self.cancelled = False
+        self.changed = asyncio.Event()
+        self.task: Optional["asyncio.Task[None]"] = None
+
+    async def pump(self, source: Any) -> None:
+        try:
+            async for chunk in source:
+                self.chunks.append(chunk)
+                self._notify()
+        except BaseException as e:
+            self.error = e
+            if isinstance(e, asyncio.CancelledError):
+                raise
+        finally:
+            self.done = True
+            self._notify()
+
+    def _notify(self) -> None:
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+    def subscribe(self, copy_chunks: bool) -> "_Subscription":
+        """立即登记订阅者并返回其读取器，登记后即使读取器尚未开始迭代，上游流也不会因其他订阅者离开而停止"""
+        return _Subscription(self, copy_chunks)
+
+    def unsubscribe(self) -> None:
+        self.subscribers -= 1
+        # 所有订阅者都已离开时停止读取上游
+        if self.subscribers == 0 and not self.done and self.task is not None:
+            self.cancelled = True
+            self.task.cancel()
+
+
+class _Subscription:
+    """单个订阅者的异步迭代器，读完、出错、aclose() 或被回收时注销订阅"""
+
+    def __init__(self, stream: _SharedStream, copy_chunks: bool):
+        self._stream = stream
+        self._copy_chunks = copy_chunks
+        self._index = 0
+        self._closed = False
+        stream.subscribers += 1
+
+    def __aiter__(self) -> "_Subscription":
+        return self
+
+    async def __anext__(self) -> Any:
+        stream = self._stream
+        try:
+            while not self._closed:
+                if self._index < len(stream.chunks):
+                    chunk = stream.chunks[self._index]
+                    self._index += 1
+                    return copy.deepcopy(chunk) if self._copy_chunks else chunk
+                if stream.done:
+                    if isinstance(stream.error, asyncio.CancelledError):
+                        raise RuntimeError("共享的上游流已被取消")
+                    if stream.error is not None:
+                        raise stream.error
+                    break
+                await stream.changed.wait()
+        except BaseException:
+            self._close()
+            raise
+        self._close()
+        raise StopAsyncIteration
+
+    async def aclose(self) -> None:
+        self._close()
+
+    def _close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._stream.unsubscribe()
+
+    def __del__(self) -> None:
+        # 调用方拿到读取器后没有迭代也没有关闭（如请求中途中止）
+        self._close()
+
+
+class SingleFlight:
+    """合并相同的并发调用
+
+    相同键的调用正在进行时，后到的调用不再重复发起，而是等待并共享同一个结果（包括异常）。
+    调用结束后立即移除，不缓存结果——只合并同时进行的请求。
+    后到的调用方拿到结果的深拷贝，修改结果不会影响其他调用方。
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Tuple[Any, str], Any] = {}
+        self._sync_calls: Dict[str, Tuple[threading.Event, List[Any]]] = {}
+        self._sync_lock = threading.Lock()
+        self._stats = {"calls": 0, "executed": 0, "coalesced": 0, "max_waiters": 0}
+        self._waiters: Dict[str, int] = {}
+
+    def _coalesced(self, key: str) -> None:
+        self._stats["coalesced"] += 1
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        self._stats["max_waiters"] = max(self._stats["max_waiters"], self._waiters[key])
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """执行异步调用，相同键的调用正在进行时共享其结果"""
+        return await self._do(key, fn, stream=False)
+
+    async def do_stream(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """执行可能返回异步生成器的调用（如流式模型），相同键的调用共享同一个上游流"""
+        return await self._do(key, fn, stream=True)
+
+    async def _do(self, key: str, fn: Callable[[], Awaitable[Any]], stream: bool) -> Any:
+        self._stats["calls"] += 1
+        loop = asyncio.get_running_loop()
+        # Future绑定事件循环，不同事件循环中的调用互不合并
+        slot = (loop, key)
+        while slot in self._calls:
+            shared = self._calls[slot]
+            if isinstance(shared, _SharedStream):
+                if self._abandoned(slot, key, shared):
+                    continue
+                self._coalesced(key)
+                return shared.subscribe(copy_chunks=True)
+            self._coalesced(key)
+            try:
+                result = await asyncio.shield(shared)
+            except asyncio.CancelledError:
+                # 领头的调用被取消（如客户端断开）时自己重新发起，本调用被取消时照常抛出
+                if shared.cancelled():
+                    continue
+                raise
+            if isinstance(result, _SharedStream):
+                if self._abandoned(slot, key, result):
+                    continue
+                return result.subscribe(copy_chunks=True)
+            return copy.deepcopy(result)
+
+        future = loop.create_future()
+        self._calls[slot] = future
+        self._stats["executed"] += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            self._finish(slot, key)
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # 没有等待者时避免 "exception was never retrieved" 警告
+            future.exception()
+            self._finish(slot, key)
+            raise
+
+        if not stream or not hasattr(result, "__aiter__"):
+            future.set_result(result)
+            self._finish(slot, key)
+            return result
+
+        # 流式结果：已在等待和之后到达的调用方都订阅同一个广播
+        shared_stream = _SharedStream()
+        self._calls[slot] = shared_stream
+        future.set_result(shared_stream)
+
+        async def pump() -> None:
+            try:
+                await shared_stream.pump(result)
+            finally:
+                if self._calls.get(slot) is shared_stream:
+                    self._finish(slot, key)
+
+        shared_stream.task = loop.create_task(pump())
+        return shared_stream.subscribe(copy_chunks=False)
+
+    def _abandoned(self, slot: Tuple[Any, str], key: str, shared: _SharedStream) -> bool:
+        """共享的上游流已因所有订阅者离开而停止时移除它，调用方像领头调用被取消时一样重新发起"""
+        if not shared.cancelled:
+            return False
+        if self._calls.get(slot) is shared:
+            self._finish(slot, key)
+        return True
+
+    def _finish(self, slot: Tuple[Any, str], key: str) -> None:
+        del self._calls[slot]
+        self._waiters.pop(key, None)
+
+    def call(self, key: str, fn: Callable[[], Any]) -> Any:
+        """同步版本：相同键的调用正在其他线程中进行时，等待并共享其结果"""
+        with self._sync_lock:
+            self._stats["calls"] += 1
+            entry = self._sync_calls.get(key)
+            leader = entry is None
+            if leader:
+                entry = (threading.Event(), [])
+                self._sync_calls[key] = entry
+                self._stats["executed"] += 1
+            else:
+                self._coalesced(key)
+        event, outcome = entry
+        if not leader:
+            event.wait()
+            ok, value = outcome[0]
+            if not ok:
+                raise value
+            return copy.deepcopy(value)
+        try:
+            result = fn()
+            outcome.append((True, result))
+            return result
+        except BaseException as e:
+            outcome.append((False, e))
+            raise
+        finally:
+            with self._sync_lock:
+                del self._sync_calls[key]
+                self._waiters.pop(key, None)
+            event.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        calls = self._stats["calls"]
+        return {
+            **self._stats,
+            "in_flight": len(self._calls) + len(self._sync_calls),
+            "coalesced_rate": round(self._stats["coalesced"] / calls, 4) if calls else 0.0
+        }
+
+
+_groups: Dict[str, SingleFlight] = {}
+_groups_lock = threading.Lock()
+
+
+def get_single_flight(name: str) -> SingleFlight:
+    """获取指定名称的全局请求合并器"""
+    with _groups_lock:
+        group = _groups.get(name)
+        if group is None:
+            group = SingleFlight(name)
+            _groups[name] = group
+        return group
+
+
+def get_single_flight_stats() -> Dict[str, Any]:
+    """所有请求合并器的统计"""
+    with _groups_lock:
+        groups = list(_groups.items())
+    return {name: group.get_stats() for name, group in groups}
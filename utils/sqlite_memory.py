@@ -0,0 +1,302 @@
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import threading
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from agentscope.memory import MemoryBase
+from agentscope.message import Msg
+
+from utils.data_store import PROJECT_ROOT
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.path.join(PROJECT_ROOT, ".cache", "agent_memory.sqlite3")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    msg_id TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_messages_session ON messages (session_id, owner, id);
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    last_active REAL NOT NULL,
+    PRIMARY KEY (session_id, owner)
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_last_active ON sessions (last_active);
+"""
+
+
+class SQLiteMemoryStore:
+    """基于本地SQLite文件（WAL模式）的对话记忆存储
+
+    同一台机器上的多个uvicorn工作进程共享同一个数据库文件：
+    - WAL模式下读写互不阻塞，写入之间由SQLite文件锁串行化
+    - 所有会话的消息存放在一张表中，按 (session_id, owner, id) 建索引，单个会话的读取只走索引范围扫描
+    - 定期压缩：每个会话只保留最近 keep_messages 条消息，长期不活跃的会话整体删除
+    """
+
+    def __init__(self, db_path: Optional[str] = None, keep_messages: int = 200,
+                 retention: float = 7 * 24 * 3600, compact_interval: float = 600.0):
+        """
+        Args:
+            db_path: 数据库文件路径
+            keep_messages: 压缩时每个会话每个智能体保留的消息条数
+            retention: 会话不活跃超过该时长（秒）后在压缩时删除
+            compact_interval: 两次压缩之间的最小间隔（秒）
+        """
+        self.db_path = db_path or os.getenv("MUSEUM_MEMORY_DB_PATH", DEFAULT_DB_PATH)
+        self.keep_messages = keep_messages
+        self.retention = retention
+        self.compact_interval = compact_interval
+        self._lock = threading.Lock()
+        self._last_compacted = time.monotonic()
+        self._stats = {"flushes": 0, "rows_written": 0, "loads": 0, "rows_loaded": 0, "compactions": 0, "rows_compacted": 0}
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        logger.info(f"[对话记忆] SQLite记忆存储已打开: {self.db_path}")
+
+    def last_id(self, session_id: str, owner: str) -> int:
+        """会话中最新一条消息的ID，用于判断其他工作进程是否写入了新消息"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MAX(id) FROM messages WHERE session_id = ? AND owner = ?", (session_id, owner)
+            ).fetchone()
+        return row[0] or 0
+
+    def load_recent(self, session_id: str, owner: str, limit: int) -> Tuple[List[Msg], int]:
+        """只加载最近 limit 条消息，返回 (消息列表, 最新消息ID)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, payload FROM messages WHERE session_id = ? AND owner = ? ORDER BY id DESC LIMIT ?",
+                (session_id, owner, limit)
+            ).fetchall()
+            last_id = rows[0][0] if rows else self._conn.execute(
+                "SELECT MAX(id) FROM messages WHERE session_id = ? AND owner = ?", (session_id, owner)
+            ).fetchone()[0] or 0
+            self._stats["loads"] += 1
+            self._stats["rows_loaded"] += len(rows)
+        return [Msg.from_dict(json.loads(payload)) for _, payload in reversed(rows)], last_id
+
+    def append(self, session_id: str, owner: str, messages: List[Msg], expected_last_id: int) -> Tuple[int, bool]:
+        """在一个事务中批量写入消息
+
+        Returns:
+            (写入后的最新消息ID, 写入前是否已有其他进程写入的新消息)
+        """
+        now = time.time()
+        rows = [(session_id, owner, msg.id, json.dumps(msg.to_dict(), ensure_ascii=False), now) for msg in messages]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                previous = self._conn.execute(
+                    "SELECT MAX(id) FROM messages WHERE session_id = ? AND owner = ?", (session_id, owner)
+                ).fetchone()[0] or 0
+                self._conn.executemany(
+                    "INSERT INTO messages (session_id, owner, msg_id, payload, created_at) VALUES (?, ?, ?, ?, ?)", rows
+                )
+                self._conn.execute(
+                    "INSERT INTO sessions (session_id, owner, last_active) VALUES (?, ?, ?) "
+                    "ON CONFLICT (session_id, owner) DO UPDATE SET last_active = excluded.last_active",
+                    (session_id, owner, now)
+                )
+                last_id = self._conn.execute(
+                    "SELECT MAX(id) FROM messages WHERE session_id = ? AND owner = ?", (session_id, owner)
+                ).fetchone()[0]
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._stats["flushes"] += 1
+            self._stats["rows_written"] += len(rows)
+        self._maybe_compact()
+        return last_id, previous != expected_last_id
+
+    def delete_messages(self, session_id: str, owner: str, msg_ids: Iterable[str]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM messages WHERE session_id = ? AND owner = ? AND msg_id = ?",
+                [(session_id, owner, msg_id) for msg_id in msg_ids]
+            )
+
+    def clear(self, session_id: str, owner: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM messages WHERE session_id = ? AND owner = ?", (session_id, owner))
+
+    def _maybe_compact(self) -> None:
+        if time.monotonic() - self._last_compacted >= self.compact_interval:
+            self.compact()
+
+    def compact(self) -> int:
+        """压缩历史消息，返回删除的行数"""
+        self._last_compacted = time.monotonic()
+        cutoff = time.time() - self.retention
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                deleted = self._conn.execute(
+                    "DELETE FROM messages WHERE (session_id, owner) IN "
+                    "(SELECT session_id, owner FROM sessions WHERE last_active < ?)", (cutoff,)
+                ).rowcount
+                self._conn.execute("DELETE FROM sessions WHERE last_active < ?", (cutoff,))
+                # 每个会话只保留最近 keep_messages 条
+                deleted += self._conn.execute(
+                    "DELETE FROM messages WHERE id IN ("
+                    "  SELECT id FROM (SELECT id, ROW_NUMBER() OVER (PARTITION BY session_id, owner ORDER BY id DESC) AS rank FROM messages)"
+                    "  WHERE rank > ?)", (self.keep_messages,)
+                ).rowcount
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._stats["compactions"] += 1
+            self._stats["rows_compacted"] += deleted
+        if deleted:
+            logger.info(f"[对话记忆] 压缩完成，删除 {deleted} 条历史消息")
+        return deleted
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = self._conn.execute("SELECT COUNT(*), COUNT(DISTINCT session_id) FROM messages").fetchone()
+            return {**self._stats, "db_path": self.db_path, "messages": counts[0], "sessions": counts[1]}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class SQLiteMemory(MemoryBase):
+    """单个会话中单个智能体的持久化记忆，接口与 InMemoryMemory 一致
+
+    - 懒加载：第一次读取时只从数据库加载最近 max_messages 条消息作为提示词上下文
+    - 批量写入：新消息先缓冲在内存中，达到 batch_size 条或调用 flush()（会话作用域结束时）才在一个事务中写入
+    - 读取前检查数据库中的最新消息ID，其他工作进程写入了新消息时重新加载
+    - 异步接口中的数据库读写（包括写入时触发的压缩）都在工作线程中执行，不阻塞事件循环
+    """
+
+    def __init__(self, store: SQLiteMemoryStore, session_id: str, owner: str,
+                 max_messages: int = 40, batch_size: int = 16):
+        super().__init__()
+        self.store = store
+        self.session_id = session_id
+        self.owner = owner
+        self.max_messages = max_messages
+        self.batch_size = batch_size
+        self.content: List[Msg] = []
+        self._pending: List[Msg] = []
+        self._loaded = False
+        self._last_id = 0
+
+    def _apply(self, persisted: List[Msg], last_id: int) -> None:
+        pending_ids = {msg.id for msg in self._pending}
+        self.content = [msg for msg in persisted if msg.id not in pending_ids] + self._pending
+        self._last_id = last_id
+        self._trim()
+        self._loaded = True
+
+    async def _ensure_fresh(self) -> None:
+        if self._loaded:
+            last_id = await asyncio.to_thread(self.store.last_id, self.session_id, self.owner)
+            if last_id == self._last_id:
+                return
+        persisted, last_id = await asyncio.to_thread(
+            self.store.load_recent, self.session_id, self.owner, self.max_messages
+        )
+        self._apply(persisted, last_id)
+
+    def _trim(self) -> None:
+        if self.max_messages and len(self.content) > self.max_messages:
+            self.content = self.content[-self.max_messages:]
+
+    def _appended(self, result: Tuple[int, bool]) -> None:
+        self._last_id, stale = result
+        if stale:
+            # 其他工作进程写入过该会话，下次读取时重新加载
+            self._loaded = False
+
+    def flush(self) -> None:
+        """把缓冲的消息在一个事务中写入数据库（同步调用，用于服务关闭等不在事件循环中的场景）"""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        self._appended(self.store.append(self.session_id, self.owner, pending, self._last_id))
+
+    async def aflush(self) -> None:
+        """把缓冲的消息在一个事务中写入数据库，写入在工作线程中执行"""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        self._appended(await asyncio.to_thread(self.store.append, self.session_id, self.owner, pending, self._last_id))
+
+    async def add(self, memories: Union[List[Msg], Msg, None], allow_duplicates: bool = False) -> None:
+        if memories is None:
+            return
+        if isinstance(memories, Msg):
+            memories = [memories]
+        if not isinstance(memories, list) or not all(isinstance(msg, Msg) for msg in memories):
+            raise TypeError(f"The memories should be a list of Msg or a single Msg, but got {type(memories)}.")
+
+        await self._ensure_fresh()
+        if not allow_duplicates:
+            existing_ids = {msg.id for msg in self.content}
+            memories = [msg for msg in memories if msg.id not in existing_ids]
+        self.content.extend(memories)
+        self._pending.extend(memories)
+        self._trim()
+        if len(self._pending) >= self.batch_size:
+            await self.aflush()
+
+    async def delete(self, index: Union[Iterable, int]) -> None:
+        await self._ensure_fresh()
+        if isinstance(index, int):
+            index = [index]
+        index = list(index)
+        invalid_index = [i for i in index if i < 0 or i >= len(self.content)]
+        if invalid_index:
+            raise IndexError(f"The index {invalid_index} does not exist.")
+
+        removed = {self.content[i].id for i in index}
+        self.content = [msg for i, msg in enumerate(self.content) if i not in index]
+        self._pending = [msg for msg in self._pending if msg.id not in removed]
+        await asyncio.to_thread(self.store.delete_messages, self.session_id, self.owner, removed)
+
+    async def retrieve(self, *args: Any, **kwargs: Any) -> None:
+        raise NotImplementedError(f"The retrieve method is not implemented in {self.__class__.__name__} class.")
+
+    async def size(self) -> int:
+        await self._ensure_fresh()
+        return len(self.content)
+
+    async def clear(self) -> None:
+        self.content = []
+        self._pending = []
+        await asyncio.to_thread(self.store.clear, self.session_id, self.owner)
+        self._last_id = 0
+        self._loaded = True
+
+    async def get_memory(self) -> List[Msg]:
+        await self._ensure_fresh()
+        return self.content
+
+    def state_dict(self) -> dict:
+        return {"content": [msg.to_dict() for msg in self.content]}
+
+    def load_state_dict(self, state_dict: dict, strict: bool = True) -> None:
+        self.content = []
+        for data in state_dict["content"]:
+            data.pop("type", None)
+            self.content.append(Msg.from_dict(data))
+        self._loaded = True
@@ -0,0 +1,213 @@
+import math
+import re
+import threading
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 中日韩统一表意文字及扩展A区
+_CJK_RANGE = "㐀-䶿一-鿿豈-﫿"
+_TOKEN_PATTERN = re.compile(f"[{_CJK_RANGE}]+|[a-z0-9]+")
+_CJK_PATTERN = re.compile(f"[{_CJK_RANGE}]")
+
+
+def tokenize(text: str) -> List[str]:
+    """分词：中文按单字和相邻二字（bigram）切分，英文和数字按整词切分
+
+    例如 "青铜鼎 ding" -> ["青", "青铜", "铜", "铜鼎", "鼎", "ding"]
+    同时索引单字，保证单字查询（如"鼎"）也能命中。
+    """
+    tokens: List[str] = []
+    for run in _TOKEN_PATTERN.findall(text.lower()):
+        if _CJK_PATTERN.match(run):
+            for i, char in enumerate(run):
+                tokens.append(char)
+                if i + 1 < len(run):
+                    tokens.append(run[i:i + 2])
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def tokenize_keywords(text: str) -> List[List[str]]:
+    """查询按空格切分为关键词，每个关键词分词为一组词项：中文只取bigram（单字时取单字），组内去重并保持顺序
+
+    例如 "古代文明 bronze" -> [["古代", "代文", "文明"], ["bronze"]]
+    """
+    groups: List[List[str]] = []
+    for keyword in text.lower().split():
+        terms: List[str] = []
+        for run in _TOKEN_PATTERN.findall(keyword):
+            if _CJK_PATTERN.match(run) and len(run) > 1:
+                terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+            else:
+                terms.append(run)
+        if terms:
+            groups.append(list(dict.fromkeys(terms)))
+    return groups
+
+
+def tokenize_query(text: str) -> List[str]:
+    """查询分词：所有关键词的词项，去重并保持顺序"""
+    return list(dict.fromkeys(term for group in tokenize_keywords(text) for term in group))
+
+
+class InvertedIndex:
+    """内存倒排索引
+
+    - 多字段加权（如名称权重高于描述），按BM25打分排序
+    - 同一关键词内的词项按短语处理：中文关键词的所有bigram都必须命中（"古代文明"不会匹配只含"文明"的文档）
+    - any模式：任一关键词命中即返回，按相关度排序
+    - all模式：所有关键词都必须命中；求交集时按倒排列表从短到长进行
+    - sync()按文档内容增量更新，只重建发生变化的文档
+    """
+
+    def __init__(self, fields: Dict[str, float], k1: float = 1.2, b: float = 0.75):
+        """
+        Args:
+            fields: 参与索引的字段及其权重
+            k1: BM25词频饱和参数
+            b: BM25文档长度归一化参数
+        """
+        self.fields = fields
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[Any, float]] = {}
+        self._doc_terms: Dict[Any, Dict[str, float]] = {}
+        self._doc_lengths: Dict[Any, float] = {}
+        self._doc_signatures: Dict[Any, Tuple[str, ...]] = {}
+        self._docs: Dict[Any, dict] = {}
+        self._order: Dict[Any, int] = {}
+        self._total_length = 0.0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def _signature(self, record: dict) -> Tuple[str, ...]:
+        return tuple(str(record.get(field) or "") for field in self.fields)
+
+    def _add(self, doc_id: Any, record: dict, signature: Tuple[str, ...]) -> None:
+        term_freqs: Dict[str, float] = {}
+        for (field, weight), text in zip(self.fields.items(), signature):
+            for token in tokenize(text):
+                term_freqs[token] = term_freqs.get(token, 0.0) + weight
+
+        length = sum(term_freqs.values())
+        for term, tf in term_freqs.items():
+            self._postings.setdefault(term, {})[doc_id] = tf
+
+        self._doc_terms[doc_id] = term_freqs
+        self._doc_lengths[doc_id] = length
+        self._doc_signatures[doc_id] = signature
+        self._total_length += length
+
+    def _remove(self, doc_id: Any) -> None:
+        for term in self._doc_terms.pop(doc_id, {}):
+            posting = self._postings.get(term)
+            if posting is not None:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self._postings[term]
+        self._total_length -= self._doc_lengths.pop(doc_id, 0.0)
+        self._doc_signatures.pop(doc_id, None)
+
+    def sync(self, documents: Iterable[Tuple[Any, dict]]) -> Dict[str, int]:
+        """用最新的文档集合增量更新索引
+
+        Args:
+            documents: (文档ID, 记录) 序列
+
+        Returns:
+            Dict[str, int]: 新增、更新、删除的文档数量
+        """
+        stats = {"added": 0, "updated": 0, "removed": 0}
+        with self._lock:
+            seen = set()
+            order: Dict[Any, int] = {}
+            for position, (doc_id, record) in enumerate(documents):
+                if doc_id in seen:
+                    continue
+                seen.add(doc_id)
+                order[doc_id] = position
+                signature = self._signature(record)
+                previous = self._doc_signatures.get(doc_id)
+                if previous is None:
+                    self._add(doc_id, record, signature)
+                    stats["added"] += 1
+                elif previous != signature:
+                    self._remove(doc_id)
+                    self._add(doc_id, record, signature)
+                    stats["updated"] += 1
+                self._docs[doc_id] = record
+
+            for doc_id in [d for d in self._docs if d not in seen]:
+                self._remove(doc_id)
+                del self._docs[doc_id]
+                stats["removed"] += 1
+
+            self._order = order
+
+        logger.info(f"倒排索引已同步: {stats}, 文档总数: {len(self._docs)}, 词项数: {len(self._postings)}")
+        return stats
+
+    def _intersect(self, terms: Sequence[str]) -> Set[Any]:
+        """包含所有词项的文档，按倒排列表从短到长求交集"""
+        postings = sorted((self._postings.get(term, {}) for term in terms), key=len)
+        if not postings or not postings[0]:
+            return set()
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting.keys())
+            if not candidates:
+                break
+        return candidates
+
+    def _candidates(self, groups: Sequence[Sequence[str]], match: str) -> Iterable[Any]:
+        if match == "all":
+            return self._intersect([term for group in groups for term in group])
+        candidates: Set[Any] = set()
+        for group in groups:
+            candidates.update(self._intersect(group))
+        return candidates
+
+    def search(self, query: str, match: str = "any", limit: Optional[int] = None) -> List[Tuple[dict, float]]:
+        """检索文档
+
+        Args:
+            query: 查询文本，可以包含多个以空格分隔的关键词
+            match: "any"（任一关键词命中，按相关度排序）或 "all"（所有关键词必须命中）
+            limit: 最多返回的结果数量
+
+        Returns:
+            List[Tuple[dict, float]]: (记录, BM25得分)，按得分从高到低排列
+        """
+        groups = tokenize_keywords(query)
+        if not groups:
+            return []
+        terms = list(dict.fromkeys(term for group in groups for term in group))
+
+        with self._lock:
+            doc_count = len(self._docs)
+            if doc_count == 0:
+                return []
+            avg_length = self._total_length / doc_count or 1.0
+
+            scores: Dict[Any, float] = {}
+            for doc_id in self._candidates(groups, match):
+                length_norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / avg_length)
+                score = 0.0
+                for term in terms:
+                    posting = self._postings.get(term)
+                    if not posting or doc_id not in posting:
+                        continue
+                    idf = math.log(1 + (doc_count - len(posting) + 0.5) / (len(posting) + 0.5))
+                    tf = posting[doc_id]
+                    score += idf * tf * (self.k1 + 1) / (tf + length_norm)
+                scores[doc_id] = score
+
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], self._order.get(item[0], 0)))
+            if limit is not None:
+                ranked = ranked[:limit]
+            return [(self._docs[doc_id], score) for doc_id, score in ranked]